@@ -10,13 +10,16 @@ import time
 from datetime import datetime
 from html import escape as html_escape
 import pytz
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
+from fastapi import APIRouter, Body, Depends, HTTPException, BackgroundTasks
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from pydantic import BaseModel
 from typing import Optional
 from services.metrics_service import get_all_metrics, get_cost_analytics
-from services.sms_service import send_sms
+from services.broadcast_service import (
+    DEFAULT_TIMEZONE, BROADCAST_AUDIENCES, is_within_broadcast_window, get_audience_recipients,
+    start_broadcast, get_broadcast_progress
+)
 from database import (
     get_db_connection, return_db_connection, get_setting, set_setting,
     get_recent_logs, get_flagged_conversations, mark_analysis_reviewed,
@@ -37,23 +40,6 @@ def parse_date_filter(start_date: Optional[str], end_date: Optional[str]):
     return sd, ed
 
 
-# Broadcast time window (8am - 8pm in user's local timezone)
-BROADCAST_START_HOUR = 8
-BROADCAST_END_HOUR = 20  # 8pm
-DEFAULT_TIMEZONE = 'America/New_York'
-
-
-def is_within_broadcast_window(timezone_str: str) -> bool:
-    """Check if current time is within 8am-8pm for the given timezone"""
-    try:
-        tz = pytz.timezone(timezone_str or DEFAULT_TIMEZONE)
-    except pytz.UnknownTimezoneError:
-        tz = pytz.timezone(DEFAULT_TIMEZONE)
-
-    local_time = datetime.now(tz)
-    return BROADCAST_START_HOUR <= local_time.hour < BROADCAST_END_HOUR
-
-
 def validate_e164_phone(phone: str) -> str:
     """Validate and normalize a phone number to E.164 format. Returns normalized number or raises HTTPException."""
     digits = re.sub(r'\D', '', phone)
@@ -100,7 +86,7 @@ def verify_admin(credentials: HTTPBasicCredentials = Depends(security)):
 # =====================================================
 
 @router.get("/admin/stats/overview")
-async def get_overview_stats(
+def get_overview_stats(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     admin: str = Depends(verify_admin)
@@ -115,12 +101,54 @@ async def get_overview_stats(
         raise HTTPException(status_code=500, detail="Error getting overview stats")
 
 
+@router.get("/admin/stats/ai-latency")
+def get_ai_latency(admin: str = Depends(verify_admin)):
+    """OpenAI completion latency histograms (this worker process) and hedging counters"""
+    from services.ai_service import get_ai_latency_stats
+    return JSONResponse(content=get_ai_latency_stats())
+
+
+@router.get("/admin/stats/prompt-cache")
+def get_prompt_cache_stats(admin: str = Depends(verify_admin)):
+    """Prompt context cache hit/miss counters (this worker process)"""
+    from models.prompt_context import get_prompt_context_cache
+    return JSONResponse(content=get_prompt_context_cache().stats())
+
+
+@router.get("/admin/stats/ai-cache")
+def get_ai_cache_stats(admin: str = Depends(verify_admin)):
+    """AI result cache hit rate, per-action hits and entry count (this worker process)"""
+    from services.ai_cache import get_ai_result_cache
+    return JSONResponse(content=get_ai_result_cache().stats())
+
+
+@router.get("/admin/stats/settings-cache")
+def get_settings_cache(admin: str = Depends(verify_admin)):
+    """Settings cache hit/miss counters and listener state (this worker process)"""
+    from database import get_settings_cache_stats
+    return JSONResponse(content=get_settings_cache_stats())
+
+
+@router.get("/admin/stats/log-sink")
+def get_log_sink(admin: str = Depends(verify_admin)):
+    """Batched interaction-log writer counters and queue depth (this worker process)"""
+    from database import get_log_sink_stats
+    return JSONResponse(content=get_log_sink_stats())
+
+
+@router.get("/admin/stats/activity")
+def get_activity_aggregator(admin: str = Depends(verify_admin)):
+    """Coalesced users activity counters and pending users (this worker process)"""
+    from services.activity_aggregator import activity_aggregator
+    return JSONResponse(content=activity_aggregator.stats())
+
+
 # =====================================================
 # BROADCAST API ENDPOINTS
 # =====================================================
 
 @router.get("/admin/broadcast/stats")
-async def get_broadcast_stats(admin: str = Depends(verify_admin)):
+def get_broadcast_stats(admin: str = Depends(verify_admin)):
     """Get user counts by plan type for broadcast targeting, including timezone-aware counts"""
     conn = None
     try:
@@ -171,7 +199,7 @@ async def get_broadcast_stats(admin: str = Depends(verify_admin)):
 
 
 @router.get("/admin/broadcast/recipients-preview")
-async def get_recipients_preview(audience: str = "all", admin: str = Depends(verify_admin)):
+def get_recipients_preview(audience: str = "all", admin: str = Depends(verify_admin)):
     """Preview which users will receive a broadcast and who's excluded (and why)"""
     if audience not in ("all", "free", "premium"):
         raise HTTPException(status_code=400, detail="Invalid audience. Must be all, free, or premium.")
@@ -252,7 +280,7 @@ async def get_recipients_preview(audience: str = "all", admin: str = Depends(ver
 
 
 @router.get("/admin/broadcast/history")
-async def get_broadcast_history(
+def get_broadcast_history(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     admin: str = Depends(verify_admin)
@@ -308,7 +336,7 @@ async def get_broadcast_history(
 
 
 @router.get("/admin/broadcast/status/{broadcast_id}")
-async def get_broadcast_status(broadcast_id: int, admin: str = Depends(verify_admin)):
+def get_broadcast_status(broadcast_id: int, admin: str = Depends(verify_admin)):
     """Get status of a specific broadcast"""
     conn = None
     try:
@@ -336,7 +364,8 @@ async def get_broadcast_status(broadcast_id: int, admin: str = Depends(verify_ad
             "fail_count": row[6],
             "status": row[7],
             "created_at": row[8].isoformat() if row[8] else None,
-            "completed_at": row[9].isoformat() if row[9] else None
+            "completed_at": row[9].isoformat() if row[9] else None,
+            "recipients": get_broadcast_progress(broadcast_id)
         })
     except HTTPException:
         raise
@@ -349,7 +378,7 @@ async def get_broadcast_status(broadcast_id: int, admin: str = Depends(verify_ad
 
 
 @router.get("/admin/recent-messages")
-async def get_recent_user_messages(admin: str = Depends(verify_admin)):
+def get_recent_user_messages(admin: str = Depends(verify_admin)):
     """Get the last 10 messages received from users"""
     conn = None
     try:
@@ -385,75 +414,8 @@ async def get_recent_user_messages(admin: str = Depends(verify_admin)):
             return_db_connection(conn)
 
 
-BROADCAST_PREFIX = "[Remyndrs System Message] "
-
-def send_broadcast_messages(broadcast_id: int, phone_numbers: list, message: str):
-    """Background task to send broadcast messages with rate limiting"""
-    import time
-
-    conn = None
-    success_count = 0
-    fail_count = 0
-
-    # Prepend the broadcast prefix to the message
-    full_message = BROADCAST_PREFIX + message
-
-    try:
-        conn = get_db_connection()
-        c = conn.cursor()
-
-        # Update status to sending
-        c.execute(
-            "UPDATE broadcast_logs SET status = 'sending' WHERE id = %s",
-            (broadcast_id,)
-        )
-        conn.commit()
-
-        for i, phone in enumerate(phone_numbers):
-            try:
-                send_sms(phone, full_message)
-                success_count += 1
-            except Exception as e:
-                logger.error(f"Failed to send broadcast to {phone}: {e}")
-                fail_count += 1
-
-            # Update progress every 10 messages
-            if (i + 1) % 10 == 0:
-                c.execute(
-                    "UPDATE broadcast_logs SET success_count = %s, fail_count = %s WHERE id = %s",
-                    (success_count, fail_count, broadcast_id)
-                )
-                conn.commit()
-
-            # Rate limit: 100ms delay between messages to avoid Twilio limits
-            time.sleep(0.1)
-
-        # Final update
-        c.execute('''
-            UPDATE broadcast_logs
-            SET success_count = %s, fail_count = %s, status = 'completed', completed_at = NOW()
-            WHERE id = %s
-        ''', (success_count, fail_count, broadcast_id))
-        conn.commit()
-
-        logger.info(f"Broadcast {broadcast_id} completed: {success_count} success, {fail_count} failed")
-
-    except Exception as e:
-        logger.error(f"Broadcast {broadcast_id} error: {e}")
-        if conn:
-            c = conn.cursor()
-            c.execute(
-                "UPDATE broadcast_logs SET status = 'failed', completed_at = NOW() WHERE id = %s",
-                (broadcast_id,)
-            )
-            conn.commit()
-    finally:
-        if conn:
-            return_db_connection(conn)
-
-
 @router.post("/admin/broadcast/send")
-async def send_broadcast(request: BroadcastRequest, background_tasks: BackgroundTasks, admin: str = Depends(verify_admin)):
+def send_broadcast(request: BroadcastRequest, admin: str = Depends(verify_admin)):
     """Send a broadcast message to selected audience (only users within 8am-8pm local time)"""
     conn = None
     try:
@@ -469,40 +431,11 @@ async def send_broadcast(request: BroadcastRequest, background_tasks: Background
             phone = validate_e164_phone(request.phone_number)
             phone_numbers = [phone]
         else:
-            # Build query based on audience - include timezone for filtering
-            # Exclude opted-out users (STOP command compliance)
-            if request.audience == "all":
-                c.execute('''
-                    SELECT phone_number, timezone FROM users
-                    WHERE onboarding_complete = TRUE
-                    AND (opted_out = FALSE OR opted_out IS NULL)
-                ''')
-            elif request.audience == "free":
-                c.execute('''
-                    SELECT phone_number, timezone FROM users
-                    WHERE onboarding_complete = TRUE
-                    AND (premium_status = 'free' OR premium_status IS NULL)
-                    AND (opted_out = FALSE OR opted_out IS NULL)
-                ''')
-            elif request.audience == "premium":
-                c.execute('''
-                    SELECT phone_number, timezone FROM users
-                    WHERE onboarding_complete = TRUE
-                    AND premium_status = 'premium'
-                    AND (opted_out = FALSE OR opted_out IS NULL)
-                ''')
-            else:
+            if request.audience not in BROADCAST_AUDIENCES:
                 raise HTTPException(status_code=400, detail="Invalid audience")
 
-            results = c.fetchall()
-
-            # Filter to only users within the 8am-8pm window in their timezone
-            phone_numbers = [
-                r[0] for r in results
-                if is_within_broadcast_window(r[1])
-            ]
-
-            total_audience = len(results)
+            # Only users within the 8am-8pm window in their timezone (opted-out users excluded)
+            phone_numbers, total_audience = get_audience_recipients(c, request.audience)
             skipped_count = total_audience - len(phone_numbers)
 
             if not phone_numbers:
@@ -520,10 +453,10 @@ async def send_broadcast(request: BroadcastRequest, background_tasks: Background
         broadcast_id = c.fetchone()[0]
         conn.commit()
 
-        # Start background task to send messages
-        background_tasks.add_task(send_broadcast_messages, broadcast_id, phone_numbers, request.message)
+        # Record recipients and queue the chunk send tasks (Celery)
+        chunks = start_broadcast(broadcast_id, phone_numbers)
 
-        logger.info(f"Broadcast {broadcast_id} started by {admin}: {len(phone_numbers)} recipients ({skipped_count} skipped - outside time window)")
+        logger.info(f"Broadcast {broadcast_id} started by {admin}: {len(phone_numbers)} recipients in {chunks} chunks ({skipped_count} skipped - outside time window)")
 
         return JSONResponse(content={
             "broadcast_id": broadcast_id,
@@ -555,7 +488,7 @@ class ScheduleBroadcastRequest(BaseModel):
 
 
 @router.post("/admin/broadcast/schedule")
-async def schedule_broadcast(request: ScheduleBroadcastRequest, admin: str = Depends(verify_admin)):
+def schedule_broadcast(request: ScheduleBroadcastRequest, admin: str = Depends(verify_admin)):
     """Schedule a broadcast for future delivery"""
     conn = None
     try:
@@ -616,7 +549,7 @@ async def schedule_broadcast(request: ScheduleBroadcastRequest, admin: str = Dep
 
 
 @router.get("/admin/broadcast/scheduled")
-async def get_scheduled_broadcasts(admin: str = Depends(verify_admin)):
+def get_scheduled_broadcasts(admin: str = Depends(verify_admin)):
     """Get all scheduled broadcasts"""
     conn = None
     try:
@@ -660,7 +593,7 @@ async def get_scheduled_broadcasts(admin: str = Depends(verify_admin)):
 
 
 @router.delete("/admin/broadcast/scheduled/{broadcast_id}/cancel")
-async def cancel_scheduled_broadcast(broadcast_id: int, admin: str = Depends(verify_admin)):
+def cancel_scheduled_broadcast(broadcast_id: int, admin: str = Depends(verify_admin)):
     """Cancel a scheduled broadcast"""
     conn = None
     try:
@@ -705,12 +638,8 @@ async def cancel_scheduled_broadcast(broadcast_id: int, admin: str = Depends(ver
 # =====================================================
 
 def send_scheduled_broadcast(broadcast_id: int, message: str, audience: str, sender: str = 'system', target_phone: str = None):
-    """Send a scheduled broadcast - filters recipients and sends messages"""
+    """Send a scheduled broadcast - filters recipients and hands them to the broadcast engine"""
     conn = None
-    success_count = 0
-    fail_count = 0
-
-    full_message = BROADCAST_PREFIX + message
 
     try:
         conn = get_db_connection()
@@ -726,36 +655,12 @@ def send_scheduled_broadcast(broadcast_id: int, message: str, audience: str, sen
         if audience == "single" and target_phone:
             # Single number mode - send directly, skip user query
             phone_numbers = [target_phone]
+        elif audience in BROADCAST_AUDIENCES:
+            # Only users within the 8am-8pm window (opted-out users excluded)
+            phone_numbers, _ = get_audience_recipients(c, audience)
         else:
-            # Get recipients based on audience (exclude opted-out users)
-            if audience == "all":
-                c.execute('''
-                    SELECT phone_number, timezone FROM users
-                    WHERE onboarding_complete = TRUE
-                    AND (opted_out = FALSE OR opted_out IS NULL)
-                ''')
-            elif audience == "free":
-                c.execute('''
-                    SELECT phone_number, timezone FROM users
-                    WHERE onboarding_complete = TRUE
-                    AND (premium_status = 'free' OR premium_status IS NULL)
-                    AND (opted_out = FALSE OR opted_out IS NULL)
-                ''')
-            elif audience == "premium":
-                c.execute('''
-                    SELECT phone_number, timezone FROM users
-                    WHERE onboarding_complete = TRUE
-                    AND premium_status = 'premium'
-                    AND (opted_out = FALSE OR opted_out IS NULL)
-                ''')
-            else:
-                logger.error(f"Invalid audience for scheduled broadcast {broadcast_id}: {audience}")
-                return
-
-            results = c.fetchall()
-
-            # Filter to only users within the 8am-8pm window
-            phone_numbers = [r[0] for r in results if is_within_broadcast_window(r[1])]
+            logger.error(f"Invalid audience for scheduled broadcast {broadcast_id}: {audience}")
+            return
 
         if not phone_numbers:
             logger.info(f"Scheduled broadcast {broadcast_id}: No recipients in time window")
@@ -767,55 +672,28 @@ def send_scheduled_broadcast(broadcast_id: int, message: str, audience: str, sen
             conn.commit()
             # Still log to broadcast_logs so it appears in history
             c.execute('''
-                INSERT INTO broadcast_logs (sender, message, audience, recipient_count, success_count, fail_count, status, completed_at, source)
-                VALUES (%s, %s, %s, 0, 0, 0, 'completed', NOW(), 'scheduled')
-            ''', (sender, message, audience))
+                INSERT INTO broadcast_logs (sender, message, audience, recipient_count, success_count, fail_count, status, completed_at, source, scheduled_broadcast_id)
+                VALUES (%s, %s, %s, 0, 0, 0, 'completed', NOW(), 'scheduled', %s)
+            ''', (sender, message, audience, broadcast_id))
             conn.commit()
             return
 
-        # Update recipient count
+        # Update recipient count and log to broadcast_logs so it appears in Broadcast History;
+        # the engine completes both rows when the last chunk finishes
         c.execute(
             "UPDATE scheduled_broadcasts SET recipient_count = %s WHERE id = %s",
             (len(phone_numbers), broadcast_id)
         )
-        conn.commit()
-
-        # Send messages with rate limiting
-        for i, phone in enumerate(phone_numbers):
-            try:
-                send_sms(phone, full_message)
-                success_count += 1
-            except Exception as e:
-                logger.error(f"Failed to send scheduled broadcast to {phone}: {e}")
-                fail_count += 1
-
-            # Update progress every 10 messages
-            if (i + 1) % 10 == 0:
-                c.execute(
-                    "UPDATE scheduled_broadcasts SET success_count = %s, fail_count = %s WHERE id = %s",
-                    (success_count, fail_count, broadcast_id)
-                )
-                conn.commit()
-
-            # Rate limit: 100ms delay
-            time.sleep(0.1)
-
-        # Final update on scheduled_broadcasts
         c.execute('''
-            UPDATE scheduled_broadcasts
-            SET success_count = %s, fail_count = %s, status = 'completed', sent_at = NOW()
-            WHERE id = %s
-        ''', (success_count, fail_count, broadcast_id))
-        conn.commit()
-
-        # Also insert into broadcast_logs so it appears in Broadcast History
-        c.execute('''
-            INSERT INTO broadcast_logs (sender, message, audience, recipient_count, success_count, fail_count, status, completed_at, source)
-            VALUES (%s, %s, %s, %s, %s, %s, 'completed', NOW(), 'scheduled')
-        ''', (sender, message, audience, len(phone_numbers), success_count, fail_count))
+            INSERT INTO broadcast_logs (sender, message, audience, recipient_count, status, source, scheduled_broadcast_id)
+            VALUES (%s, %s, %s, %s, 'pending', 'scheduled', %s)
+            RETURNING id
+        ''', (sender, message, audience, len(phone_numbers), broadcast_id))
+        log_id = c.fetchone()[0]
         conn.commit()
 
-        logger.info(f"Scheduled broadcast {broadcast_id} completed: {success_count} success, {fail_count} failed")
+        chunks = start_broadcast(log_id, phone_numbers)
+        logger.info(f"Scheduled broadcast {broadcast_id} started as broadcast {log_id}: {len(phone_numbers)} recipients in {chunks} chunks")
 
     except Exception as e:
         logger.error(f"Scheduled broadcast {broadcast_id} error: {e}")
@@ -902,7 +780,7 @@ def start_broadcast_checker():
 # =====================================================
 
 @router.get("/admin/feedback")
-async def get_feedback(
+def get_feedback(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     admin: str = Depends(verify_admin)
@@ -950,7 +828,7 @@ async def get_feedback(
 
 
 @router.post("/admin/feedback/{feedback_id}/toggle")
-async def toggle_feedback_resolved(feedback_id: int, admin: str = Depends(verify_admin)):
+def toggle_feedback_resolved(feedback_id: int, admin: str = Depends(verify_admin)):
     """Toggle the resolved status of a feedback entry"""
     conn = None
     try:
@@ -988,7 +866,7 @@ async def toggle_feedback_resolved(feedback_id: int, admin: str = Depends(verify
 # =====================================================
 
 @router.get("/admin/contact-messages")
-async def get_contact_messages_endpoint(
+def get_contact_messages_endpoint(
     category: str = None,
     include_resolved: bool = False,
     start_date: Optional[str] = None,
@@ -1003,7 +881,7 @@ async def get_contact_messages_endpoint(
 
 
 @router.post("/admin/contact-messages/{message_id}/toggle")
-async def toggle_contact_message(message_id: int, admin: str = Depends(verify_admin)):
+def toggle_contact_message(message_id: int, admin: str = Depends(verify_admin)):
     """Toggle resolved status of a contact message"""
     from services.support_service import toggle_contact_message_resolved
     success = toggle_contact_message_resolved(message_id)
@@ -1013,10 +891,9 @@ async def toggle_contact_message(message_id: int, admin: str = Depends(verify_ad
 
 
 @router.post("/admin/contact-messages/{message_id}/reply")
-async def reply_to_contact_message_endpoint(message_id: int, request: Request, admin: str = Depends(verify_admin)):
+def reply_to_contact_message_endpoint(message_id: int, body: dict = Body(...), admin: str = Depends(verify_admin)):
     """Reply to a contact message via SMS"""
     from services.support_service import reply_to_contact_message
-    body = await request.json()
     message = body.get("message", "").strip()
     if not message:
         raise HTTPException(status_code=400, detail="Message is required")
@@ -1031,7 +908,7 @@ async def reply_to_contact_message_endpoint(message_id: int, request: Request, a
 # =====================================================
 
 @router.get("/admin/costs")
-async def get_costs(
+def get_costs(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     admin: str = Depends(verify_admin)
@@ -1047,8 +924,9 @@ async def get_costs(
 
 
 @router.get("/admin/debug/users")
-async def debug_users(admin: str = Depends(verify_admin)):
+def debug_users(admin: str = Depends(verify_admin)):
     """Debug endpoint to check user onboarding status"""
+    conn = None
     try:
         conn = get_db_connection()
         c = conn.cursor()
@@ -1059,7 +937,6 @@ async def debug_users(admin: str = Depends(verify_admin)):
             LIMIT 20
         ''')
         users = c.fetchall()
-        return_db_connection(conn)
 
         return JSONResponse(content={
             "users": [
@@ -1076,11 +953,15 @@ async def debug_users(admin: str = Depends(verify_admin)):
     except Exception as e:
         logger.error(f"Error in debug users: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
+    finally:
+        if conn:
+            return_db_connection(conn)
 
 
 @router.delete("/admin/users/incomplete")
-async def delete_incomplete_users(admin: str = Depends(verify_admin)):
+def delete_incomplete_users(admin: str = Depends(verify_admin)):
     """Delete users who haven't completed onboarding"""
+    conn = None
     try:
         conn = get_db_connection()
         c = conn.cursor()
@@ -1092,7 +973,6 @@ async def delete_incomplete_users(admin: str = Depends(verify_admin)):
         # Delete incomplete users
         c.execute('DELETE FROM users WHERE onboarding_complete = FALSE')
         conn.commit()
-        return_db_connection(conn)
 
         logger.info(f"Deleted {count} incomplete user(s)")
         return JSONResponse(content={
@@ -1103,22 +983,25 @@ async def delete_incomplete_users(admin: str = Depends(verify_admin)):
     except Exception as e:
         logger.error(f"Error deleting incomplete users: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
+    finally:
+        if conn:
+            return_db_connection(conn)
 
 
 @router.delete("/admin/users/{phone_number}")
-async def delete_user(phone_number: str, admin: str = Depends(verify_admin)):
+def delete_user(phone_number: str, admin: str = Depends(verify_admin)):
     """Delete a specific user and all their data from all tables"""
     from urllib.parse import unquote
     phone_number = unquote(phone_number)
 
-    conn = get_db_connection()
+    conn = None
     try:
+        conn = get_db_connection()
         c = conn.cursor()
 
         # Verify user exists
         c.execute('SELECT phone_number FROM users WHERE phone_number = %s', (phone_number,))
         if not c.fetchone():
-            return_db_connection(conn)
             raise HTTPException(status_code=404, detail="User not found")
 
         deleted_counts = {}
@@ -1139,6 +1022,7 @@ async def delete_user(phone_number: str, admin: str = Depends(verify_admin)):
             ("confidence_logs", "phone_number"),
             ("onboarding_progress", "phone_number"),
             ("feedback", "user_phone"),
+            ("user_usage", "phone_number"),
             ("users", "phone_number"),
         ]
 
@@ -1156,7 +1040,6 @@ async def delete_user(phone_number: str, admin: str = Depends(verify_admin)):
                 deleted_counts[table_name] = 0
 
         conn.commit()
-        return_db_connection(conn)
 
         masked_phone = f"***-***-{phone_number[-4:]}" if phone_number and len(phone_number) >= 4 else "***"
         logger.info(f"Admin '{admin}' deleted user {masked_phone}: {deleted_counts}")
@@ -1167,13 +1050,13 @@ async def delete_user(phone_number: str, admin: str = Depends(verify_admin)):
             "message": f"User {masked_phone} and all associated data deleted"
         })
     except HTTPException:
-        return_db_connection(conn)
         raise
     except Exception as e:
-        conn.rollback()
-        return_db_connection(conn)
         logger.error(f"Error deleting user {phone_number}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
+    finally:
+        if conn:
+            return_db_connection(conn)
 
 
 # =====================================================
@@ -1188,7 +1071,7 @@ DEFAULT_MAINTENANCE_MESSAGE = "Remyndrs is undergoing maintenance. The service w
 # =====================================================
 
 @router.get("/admin/settings/staging-fallback")
-async def get_staging_fallback(admin: str = Depends(verify_admin)):
+def get_staging_fallback(admin: str = Depends(verify_admin)):
     """Get staging fallback configuration"""
     enabled = get_setting("staging_fallback_enabled", "false") == "true"
     numbers = get_setting("staging_fallback_numbers", "")
@@ -1199,10 +1082,9 @@ async def get_staging_fallback(admin: str = Depends(verify_admin)):
 
 
 @router.post("/admin/settings/staging-fallback")
-async def update_staging_fallback(request: Request, admin: str = Depends(verify_admin)):
+def update_staging_fallback(data: dict = Body(...), admin: str = Depends(verify_admin)):
     """Update staging fallback configuration"""
     try:
-        data = await request.json()
         enabled = data.get("enabled", False)
         numbers = data.get("numbers", "").strip()
 
@@ -1217,17 +1099,16 @@ async def update_staging_fallback(request: Request, admin: str = Depends(verify_
 
 
 @router.get("/admin/settings/maintenance-message")
-async def get_maintenance_message(admin: str = Depends(verify_admin)):
+def get_maintenance_message(admin: str = Depends(verify_admin)):
     """Get the current maintenance message"""
     message = get_setting("maintenance_message", DEFAULT_MAINTENANCE_MESSAGE)
     return JSONResponse(content={"message": message, "is_default": message == DEFAULT_MAINTENANCE_MESSAGE})
 
 
 @router.post("/admin/settings/maintenance-message")
-async def update_maintenance_message(request: Request, admin: str = Depends(verify_admin)):
+def update_maintenance_message(data: dict = Body(...), admin: str = Depends(verify_admin)):
     """Update the maintenance message"""
     try:
-        data = await request.json()
         message = data.get("message", "").strip()
 
         if not message:
@@ -1247,7 +1128,7 @@ async def update_maintenance_message(request: Request, admin: str = Depends(veri
 # =====================================================
 
 @router.get("/admin/conversations")
-async def get_conversations(
+def get_conversations(
     limit: int = 100,
     offset: int = 0,
     phone: Optional[str] = None,
@@ -1268,7 +1149,7 @@ async def get_conversations(
 
 
 @router.get("/admin/conversations/flagged")
-async def get_flagged(
+def get_flagged(
     include_reviewed: bool = False,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
@@ -1285,7 +1166,7 @@ async def get_flagged(
 
 
 @router.post("/admin/conversations/flagged/{analysis_id}/reviewed")
-async def mark_reviewed(analysis_id: int, admin: str = Depends(verify_admin)):
+def mark_reviewed(analysis_id: int, admin: str = Depends(verify_admin)):
     """Mark a flagged conversation as reviewed"""
     try:
         success = mark_analysis_reviewed(analysis_id)
@@ -1301,7 +1182,7 @@ async def mark_reviewed(analysis_id: int, admin: str = Depends(verify_admin)):
 
 
 @router.post("/admin/conversations/analyze")
-async def trigger_analysis(background_tasks: BackgroundTasks, admin: str = Depends(verify_admin)):
+def trigger_analysis(background_tasks: BackgroundTasks, admin: str = Depends(verify_admin)):
     """Manually trigger conversation analysis"""
     from services.conversation_analyzer import analyze_recent_conversations
     try:
@@ -1331,7 +1212,7 @@ class DismissRequest(BaseModel):
 
 
 @router.post("/admin/conversations/good")
-async def mark_good(request: MarkGoodRequest, admin: str = Depends(verify_admin)):
+def mark_good(request: MarkGoodRequest, admin: str = Depends(verify_admin)):
     """Mark a conversation as good/accurate"""
     try:
         success = mark_conversation_good(
@@ -1351,7 +1232,7 @@ async def mark_good(request: MarkGoodRequest, admin: str = Depends(verify_admin)
 
 
 @router.get("/admin/conversations/good")
-async def get_good(admin: str = Depends(verify_admin)):
+def get_good(admin: str = Depends(verify_admin)):
     """Get conversations marked as good"""
     try:
         good = get_good_conversations(limit=50)
@@ -1362,7 +1243,7 @@ async def get_good(admin: str = Depends(verify_admin)):
 
 
 @router.post("/admin/conversations/dismiss")
-async def dismiss_conv(request: DismissRequest, admin: str = Depends(verify_admin)):
+def dismiss_conv(request: DismissRequest, admin: str = Depends(verify_admin)):
     """Dismiss a conversation (already fixed, not applicable)"""
     try:
         success = dismiss_conversation(
@@ -1381,7 +1262,7 @@ async def dismiss_conv(request: DismissRequest, admin: str = Depends(verify_admi
 
 
 @router.post("/admin/conversations/flag")
-async def flag_conversation(request: ManualFlagRequest, admin: str = Depends(verify_admin)):
+def flag_conversation(request: ManualFlagRequest, admin: str = Depends(verify_admin)):
     """Manually flag a conversation for review"""
     try:
         success = manual_flag_conversation(
@@ -1402,7 +1283,7 @@ async def flag_conversation(request: ManualFlagRequest, admin: str = Depends(ver
 
 
 @router.get("/admin/user/reminders")
-async def get_user_reminders_admin(phone: str, admin: str = Depends(verify_admin)):
+def get_user_reminders_admin(phone: str, admin: str = Depends(verify_admin)):
     """Get all reminders for a user by phone number (full or partial ending)"""
     try:
         conn = get_db_connection()
@@ -1464,7 +1345,7 @@ async def get_user_reminders_admin(phone: str, admin: str = Depends(verify_admin
 
 
 @router.post("/admin/reminder/{reminder_id}/mark-sent")
-async def mark_reminder_as_sent(reminder_id: int, admin: str = Depends(verify_admin)):
+def mark_reminder_as_sent(reminder_id: int, admin: str = Depends(verify_admin)):
     """Manually mark a reminder as sent (for fixing stuck reminders)"""
     conn = None
     try:
@@ -1491,7 +1372,7 @@ async def mark_reminder_as_sent(reminder_id: int, admin: str = Depends(verify_ad
 
 
 @router.post("/admin/reminders/cleanup-stuck")
-async def cleanup_stuck_reminders(admin: str = Depends(verify_admin)):
+def cleanup_stuck_reminders(admin: str = Depends(verify_admin)):
     """
     Mark all old unsent reminders as sent to prevent duplicate sends.
     This cleans up reminders that are more than 30 minutes past their scheduled time.
@@ -1543,7 +1424,7 @@ async def cleanup_stuck_reminders(admin: str = Depends(verify_admin)):
 # =====================================================
 
 @router.get("/admin/pipeline/run")
-async def run_full_pipeline(
+def run_full_pipeline(
     hours: int = 24,
     use_ai: bool = False,
     admin: str = Depends(verify_admin)
@@ -1595,15 +1476,16 @@ async def run_full_pipeline(
 
 
 @router.get("/admin/monitoring/run")
-async def run_interaction_monitor(
+def run_interaction_monitor(
     hours: int = 24,
     dry_run: bool = False,
+    full: bool = False,
     admin: str = Depends(verify_admin)
 ):
-    """Run the interaction monitor agent"""
+    """Run the interaction monitor agent (new logs since the last run, or the whole window with full=true)"""
     try:
         from agents.interaction_monitor import analyze_interactions, generate_report
-        results = analyze_interactions(hours=hours, dry_run=dry_run)
+        results = analyze_interactions(hours=hours, dry_run=dry_run, incremental=not full)
         return JSONResponse(content={
             "success": True,
             "run_id": results.get('run_id'),
@@ -1618,7 +1500,7 @@ async def run_interaction_monitor(
 
 
 @router.get("/admin/monitoring/issues")
-async def get_monitoring_issues(
+def get_monitoring_issues(
     limit: int = 50,
     show_all: bool = False,
     admin: str = Depends(verify_admin)
@@ -1697,15 +1579,14 @@ async def get_monitoring_issues(
 
 
 @router.post("/admin/monitoring/issues/{issue_id}/validate")
-async def validate_monitoring_issue(
+def validate_monitoring_issue(
     issue_id: int,
-    request: Request,
+    data: dict = Body(...),
     admin: str = Depends(verify_admin)
 ):
     """Mark a monitoring issue as validated (true issue or false positive)"""
     conn = None
     try:
-        data = await request.json()
         false_positive = data.get("false_positive", False)
         resolution = data.get("resolution", "")
 
@@ -1739,7 +1620,7 @@ async def validate_monitoring_issue(
 
 
 @router.post("/admin/monitoring/issues/{issue_id}/false-positive")
-async def mark_issue_false_positive(
+def mark_issue_false_positive(
     issue_id: int,
     admin: str = Depends(verify_admin)
 ):
@@ -1776,7 +1657,7 @@ async def mark_issue_false_positive(
 
 
 @router.get("/admin/monitoring/stats")
-async def get_monitoring_stats(admin: str = Depends(verify_admin)):
+def get_monitoring_stats(admin: str = Depends(verify_admin)):
     """Get monitoring statistics"""
     conn = None
     try:
@@ -1841,7 +1722,7 @@ async def get_monitoring_stats(admin: str = Depends(verify_admin)):
 # =====================================================
 
 @router.get("/admin/validator/run")
-async def run_issue_validator(
+def run_issue_validator(
     batch: int = 50,
     use_ai: bool = True,
     dry_run: bool = False,
@@ -1866,7 +1747,7 @@ async def run_issue_validator(
 
 
 @router.get("/admin/validator/patterns")
-async def get_issue_patterns(admin: str = Depends(verify_admin)):
+def get_issue_patterns(admin: str = Depends(verify_admin)):
     """Get issue pattern analysis"""
     try:
         from agents.issue_validator import analyze_patterns, init_validator_tables
@@ -1879,7 +1760,7 @@ async def get_issue_patterns(admin: str = Depends(verify_admin)):
 
 
 @router.get("/admin/validator/stats")
-async def get_validator_stats(admin: str = Depends(verify_admin)):
+def get_validator_stats(admin: str = Depends(verify_admin)):
     """Get validator statistics"""
     conn = None
     try:
@@ -1948,7 +1829,7 @@ async def get_validator_stats(admin: str = Depends(verify_admin)):
 # =====================================================
 
 @router.get("/admin/tracker/health")
-async def get_system_health(days: int = 7, admin: str = Depends(verify_admin)):
+def get_system_health(days: int = 7, admin: str = Depends(verify_admin)):
     """Get system health metrics"""
     try:
         from agents.interaction_monitor import init_monitoring_tables
@@ -1977,7 +1858,7 @@ async def get_system_health(days: int = 7, admin: str = Depends(verify_admin)):
 
 
 @router.get("/admin/tracker/open")
-async def get_open_issues_tracker(limit: int = 50, admin: str = Depends(verify_admin)):
+def get_open_issues_tracker(limit: int = 50, admin: str = Depends(verify_admin)):
     """Get open issues needing resolution"""
     try:
         from agents.resolution_tracker import get_open_issues
@@ -1995,16 +1876,15 @@ async def get_open_issues_tracker(limit: int = 50, admin: str = Depends(verify_a
 
 
 @router.post("/admin/tracker/resolve/{issue_id}")
-async def resolve_issue_tracker(
+def resolve_issue_tracker(
     issue_id: int,
-    request: Request,
+    data: dict = Body(...),
     admin: str = Depends(verify_admin)
 ):
     """Resolve an issue"""
     try:
         from agents.resolution_tracker import resolve_issue, RESOLUTION_TYPES
 
-        data = await request.json()
         resolution_type = data.get("resolution_type")
         description = data.get("description", "")
         commit_ref = data.get("commit_ref", "")
@@ -2035,7 +1915,7 @@ async def resolve_issue_tracker(
 
 
 @router.get("/admin/tracker/report")
-async def get_weekly_report(admin: str = Depends(verify_admin)):
+def get_weekly_report(admin: str = Depends(verify_admin)):
     """Get weekly health report"""
     try:
         from agents.interaction_monitor import init_monitoring_tables
@@ -2066,7 +1946,7 @@ async def get_weekly_report(admin: str = Depends(verify_admin)):
 
 
 @router.get("/admin/tracker/trends")
-async def get_health_trends(days: int = 30, admin: str = Depends(verify_admin)):
+def get_health_trends(days: int = 30, admin: str = Depends(verify_admin)):
     """Get health score trends over time"""
     try:
         from agents.interaction_monitor import init_monitoring_tables
@@ -2095,7 +1975,7 @@ async def get_health_trends(days: int = 30, admin: str = Depends(verify_admin)):
 
 
 @router.post("/admin/tracker/snapshot")
-async def save_daily_snapshot(admin: str = Depends(verify_admin)):
+def save_daily_snapshot(admin: str = Depends(verify_admin)):
     """Save a daily health snapshot"""
     try:
         from agents.resolution_tracker import calculate_health_metrics, save_health_snapshot
@@ -2114,7 +1994,7 @@ async def save_daily_snapshot(admin: str = Depends(verify_admin)):
 
 
 @router.get("/admin/tracker/resolution-types")
-async def get_resolution_types(admin: str = Depends(verify_admin)):
+def get_resolution_types(admin: str = Depends(verify_admin)):
     """Get available resolution types"""
     try:
         from agents.resolution_tracker import RESOLUTION_TYPES
@@ -2129,7 +2009,7 @@ async def get_resolution_types(admin: str = Depends(verify_admin)):
 # =====================================================
 
 @router.get("/admin/analyzer/issue/{issue_id}")
-async def get_issue_code_analysis(
+def get_issue_code_analysis(
     issue_id: int,
     force: bool = False,
     use_ai: bool = True,
@@ -2163,7 +2043,7 @@ async def get_issue_code_analysis(
 
 
 @router.get("/admin/analyzer/pattern/{pattern_id}")
-async def get_pattern_code_analysis(
+def get_pattern_code_analysis(
     pattern_id: int,
     force: bool = False,
     use_ai: bool = True,
@@ -2197,7 +2077,7 @@ async def get_pattern_code_analysis(
 
 
 @router.get("/admin/analyzer/run")
-async def run_code_analyzer(
+def run_code_analyzer(
     use_ai: bool = True,
     dry_run: bool = False,
     admin: str = Depends(verify_admin)
@@ -2225,7 +2105,7 @@ async def run_code_analyzer(
 
 
 @router.post("/admin/analyzer/{analysis_id}/applied")
-async def mark_analysis_applied(
+def mark_analysis_applied(
     analysis_id: int,
     admin: str = Depends(verify_admin)
 ):
@@ -2252,7 +2132,7 @@ async def mark_analysis_applied(
 
 
 @router.get("/admin/analyzer/stats")
-async def get_analyzer_stats(admin: str = Depends(verify_admin)):
+def get_analyzer_stats(admin: str = Depends(verify_admin)):
     """Get code analyzer statistics"""
     conn = None
     try:
@@ -2314,7 +2194,7 @@ async def get_analyzer_stats(admin: str = Depends(verify_admin)):
 # =====================================================
 
 @router.get("/admin/alerts/settings")
-async def get_alert_settings(admin: str = Depends(verify_admin)):
+def get_alert_settings(admin: str = Depends(verify_admin)):
     """Get current alert configuration"""
     try:
         from services.alerts_service import (
@@ -2355,10 +2235,9 @@ async def get_alert_settings(admin: str = Depends(verify_admin)):
 
 
 @router.post("/admin/alerts/settings")
-async def update_alert_settings(request: Request, admin: str = Depends(verify_admin)):
+def update_alert_settings(data: dict = Body(...), admin: str = Depends(verify_admin)):
     """Update alert configuration"""
     try:
-        data = await request.json()
 
         # Update settings
         if "alerts_enabled" in data:
@@ -2402,7 +2281,7 @@ async def update_alert_settings(request: Request, admin: str = Depends(verify_ad
 
 
 @router.post("/admin/alerts/test")
-async def send_test_alert(admin: str = Depends(verify_admin)):
+def send_test_alert(admin: str = Depends(verify_admin)):
     """Send a test alert to verify configuration"""
     try:
         from services.alerts_service import send_test_alert
@@ -2417,7 +2296,7 @@ async def send_test_alert(admin: str = Depends(verify_admin)):
 
 
 @router.delete("/admin/alerts/teams-webhook")
-async def clear_teams_webhook(admin: str = Depends(verify_admin)):
+def clear_teams_webhook(admin: str = Depends(verify_admin)):
     """Clear the Teams webhook URL"""
     try:
         set_setting("alert_teams_webhook_url", "")
@@ -2433,7 +2312,7 @@ async def clear_teams_webhook(admin: str = Depends(verify_admin)):
 # =====================================================
 
 @router.get("/admin/recurring")
-async def get_all_recurring_reminders(
+def get_all_recurring_reminders(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     admin: str = Depends(verify_admin)
@@ -2513,19 +2392,21 @@ async def get_all_recurring_reminders(
 
 
 @router.post("/admin/recurring/{recurring_id}/pause")
-async def pause_recurring_admin(recurring_id: int, admin: str = Depends(verify_admin)):
+def pause_recurring_admin(recurring_id: int, admin: str = Depends(verify_admin)):
     """Pause a recurring reminder"""
     conn = None
     try:
         conn = get_db_connection()
         c = conn.cursor()
         c.execute(
-            "UPDATE recurring_reminders SET active = FALSE WHERE id = %s RETURNING id, reminder_text",
+            "UPDATE recurring_reminders SET active = FALSE WHERE id = %s RETURNING id, reminder_text, phone_number",
             (recurring_id,)
         )
         result = c.fetchone()
         if not result:
             raise HTTPException(status_code=404, detail="Recurring reminder not found")
+        from models.usage import invalidate_usage
+        invalidate_usage(c, result[2])
         conn.commit()
         logger.info(f"Admin paused recurring reminder {recurring_id}")
         return {"success": True, "id": result[0], "text": result[1]}
@@ -2540,19 +2421,21 @@ async def pause_recurring_admin(recurring_id: int, admin: str = Depends(verify_a
 
 
 @router.post("/admin/recurring/{recurring_id}/resume")
-async def resume_recurring_admin(recurring_id: int, admin: str = Depends(verify_admin)):
+def resume_recurring_admin(recurring_id: int, admin: str = Depends(verify_admin)):
     """Resume a paused recurring reminder"""
     conn = None
     try:
         conn = get_db_connection()
         c = conn.cursor()
         c.execute(
-            "UPDATE recurring_reminders SET active = TRUE WHERE id = %s RETURNING id, reminder_text",
+            "UPDATE recurring_reminders SET active = TRUE WHERE id = %s RETURNING id, reminder_text, phone_number",
             (recurring_id,)
         )
         result = c.fetchone()
         if not result:
             raise HTTPException(status_code=404, detail="Recurring reminder not found")
+        from models.usage import invalidate_usage
+        invalidate_usage(c, result[2])
         conn.commit()
         logger.info(f"Admin resumed recurring reminder {recurring_id}")
         return {"success": True, "id": result[0], "text": result[1]}
@@ -2567,7 +2450,7 @@ async def resume_recurring_admin(recurring_id: int, admin: str = Depends(verify_
 
 
 @router.delete("/admin/recurring/{recurring_id}")
-async def delete_recurring_admin(recurring_id: int, admin: str = Depends(verify_admin)):
+def delete_recurring_admin(recurring_id: int, admin: str = Depends(verify_admin)):
     """Delete a recurring reminder and handle related reminders"""
     conn = None
     try:
@@ -2601,9 +2484,13 @@ async def delete_recurring_admin(recurring_id: int, admin: str = Depends(verify_
 
         # Now delete the recurring reminder itself
         c.execute(
-            "DELETE FROM recurring_reminders WHERE id = %s",
+            "DELETE FROM recurring_reminders WHERE id = %s RETURNING phone_number",
             (recurring_id,)
         )
+        deleted = c.fetchone()
+        if deleted:
+            from models.usage import invalidate_usage
+            invalidate_usage(c, deleted[0])
 
         conn.commit()
         logger.info(f"Admin deleted recurring reminder {recurring_id}: {reminder_text} (deleted {deleted_pending} pending, unlinked {unlinked_sent} sent)")
@@ -2629,7 +2516,7 @@ class ChangelogEntry(BaseModel):
 
 
 @router.get("/updates", response_class=HTMLResponse)
-async def public_updates_page():
+def public_updates_page():
     """Public changelog page - no auth required"""
     conn = None
     try:
@@ -2791,7 +2678,7 @@ async def public_updates_page():
 
 
 @router.get("/admin/changelog")
-async def get_changelog_entries(
+def get_changelog_entries(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     admin: str = Depends(verify_admin)
@@ -2833,7 +2720,7 @@ async def get_changelog_entries(
 
 
 @router.post("/admin/changelog")
-async def add_changelog_entry(entry: ChangelogEntry, admin: str = Depends(verify_admin)):
+def add_changelog_entry(entry: ChangelogEntry, admin: str = Depends(verify_admin)):
     """Add a new changelog entry"""
     conn = None
     try:
@@ -2864,7 +2751,7 @@ async def add_changelog_entry(entry: ChangelogEntry, admin: str = Depends(verify
 
 
 @router.delete("/admin/changelog/{entry_id}")
-async def delete_changelog_entry(entry_id: int, admin: str = Depends(verify_admin)):
+def delete_changelog_entry(entry_id: int, admin: str = Depends(verify_admin)):
     """Delete a changelog entry"""
     conn = None
     try:
@@ -2899,7 +2786,7 @@ class SupportReplyRequest(BaseModel):
 
 
 @router.get("/admin/support/tickets")
-async def get_support_tickets(
+def get_support_tickets(
     include_closed: bool = False,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
@@ -2913,7 +2800,7 @@ async def get_support_tickets(
 
 
 @router.get("/admin/support/tickets/{ticket_id}/messages")
-async def get_ticket_messages(ticket_id: int, admin: str = Depends(verify_admin)):
+def get_ticket_messages(ticket_id: int, admin: str = Depends(verify_admin)):
     """Get all messages for a specific ticket"""
     from services.support_service import get_ticket_messages
     messages = get_ticket_messages(ticket_id)
@@ -2921,7 +2808,7 @@ async def get_ticket_messages(ticket_id: int, admin: str = Depends(verify_admin)
 
 
 @router.post("/admin/support/tickets/{ticket_id}/reply")
-async def reply_to_support_ticket(ticket_id: int, request: SupportReplyRequest, admin: str = Depends(verify_admin)):
+def reply_to_support_ticket(ticket_id: int, request: SupportReplyRequest, admin: str = Depends(verify_admin)):
     """Send a reply to a support ticket (sends SMS to user)"""
     from services.support_service import reply_to_ticket
 
@@ -2938,7 +2825,7 @@ async def reply_to_support_ticket(ticket_id: int, request: SupportReplyRequest,
 
 
 @router.post("/admin/support/tickets/{ticket_id}/close")
-async def close_support_ticket(ticket_id: int, admin: str = Depends(verify_admin)):
+def close_support_ticket(ticket_id: int, admin: str = Depends(verify_admin)):
     """Close a support ticket"""
     from services.support_service import close_ticket
 
@@ -2950,7 +2837,7 @@ async def close_support_ticket(ticket_id: int, admin: str = Depends(verify_admin
 
 
 @router.post("/admin/support/tickets/{ticket_id}/reopen")
-async def reopen_support_ticket(ticket_id: int, admin: str = Depends(verify_admin)):
+def reopen_support_ticket(ticket_id: int, admin: str = Depends(verify_admin)):
     """Reopen a closed support ticket"""
     from services.support_service import reopen_ticket
 
@@ -2966,7 +2853,7 @@ async def reopen_support_ticket(ticket_id: int, admin: str = Depends(verify_admi
 # =====================================================
 
 @router.get("/admin/cs/search")
-async def cs_search_customers(
+def cs_search_customers(
     q: str = "",
     admin: str = Depends(verify_admin)
 ):
@@ -3001,8 +2888,10 @@ async def cs_search_customers(
         ''', (search_pattern, search_pattern, search_pattern))
 
         results = c.fetchall()
+        from services.activity_aggregator import activity_aggregator
         customers = []
         for row in results:
+            last_active_at, _ = activity_aggregator.effective(row[0], row[6], 0)
             customers.append({
                 "phone": row[0],
                 "phone_masked": f"***{row[0][-4:]}" if row[0] else None,
@@ -3011,7 +2900,7 @@ async def cs_search_customers(
                 "tier": row[3],
                 "subscription_status": row[4],
                 "created_at": str(row[5]) if row[5] else None,
-                "last_active_at": str(row[6]) if row[6] else None,
+                "last_active_at": str(last_active_at) if last_active_at else None,
                 "timezone": row[7],
                 "onboarding_complete": row[8],
             })
@@ -3026,7 +2915,7 @@ async def cs_search_customers(
 
 
 @router.get("/admin/cs/customer/{phone_number}")
-async def cs_get_customer(phone_number: str, admin: str = Depends(verify_admin)):
+def cs_get_customer(phone_number: str, admin: str = Depends(verify_admin)):
     """Get full customer profile"""
     conn = None
     try:
@@ -3093,6 +2982,10 @@ async def cs_get_customer(phone_number: str, admin: str = Depends(verify_admin))
                 "created_at": str(row[2])
             })
 
+        # Include activity this worker hasn't flushed to users yet
+        from services.activity_aggregator import activity_aggregator
+        last_active_at, total_messages = activity_aggregator.effective(phone_number, user[13], user[14])
+
         return {
             "phone": user[0],
             "phone_masked": f"***{user[0][-4:]}",
@@ -3108,8 +3001,8 @@ async def cs_get_customer(phone_number: str, admin: str = Depends(verify_admin))
             "subscription_status": user[10],
             "stripe_customer_id": user[11],
             "stripe_subscription_id": user[12],
-            "last_active_at": str(user[13]) if user[13] else None,
-            "total_messages": user[14] or 0,
+            "last_active_at": str(last_active_at) if last_active_at else None,
+            "total_messages": total_messages,
             "opted_out": user[15],
             "opted_out_at": str(user[16]) if user[16] else None,
             "stats": {
@@ -3133,7 +3026,7 @@ async def cs_get_customer(phone_number: str, admin: str = Depends(verify_admin))
 
 
 @router.get("/admin/cs/customer/{phone_number}/reminders")
-async def cs_get_customer_reminders(phone_number: str, admin: str = Depends(verify_admin)):
+def cs_get_customer_reminders(phone_number: str, admin: str = Depends(verify_admin)):
     """Get customer's reminders"""
     conn = None
     try:
@@ -3167,7 +3060,7 @@ async def cs_get_customer_reminders(phone_number: str, admin: str = Depends(veri
 
 
 @router.get("/admin/cs/customer/{phone_number}/lists")
-async def cs_get_customer_lists(phone_number: str, admin: str = Depends(verify_admin)):
+def cs_get_customer_lists(phone_number: str, admin: str = Depends(verify_admin)):
     """Get customer's lists and items"""
     conn = None
     try:
@@ -3205,7 +3098,7 @@ async def cs_get_customer_lists(phone_number: str, admin: str = Depends(verify_a
 
 
 @router.get("/admin/cs/customer/{phone_number}/memories")
-async def cs_get_customer_memories(phone_number: str, admin: str = Depends(verify_admin)):
+def cs_get_customer_memories(phone_number: str, admin: str = Depends(verify_admin)):
     """Get customer's memories"""
     conn = None
     try:
@@ -3241,7 +3134,7 @@ class UpdateTierRequest(BaseModel):
 
 
 @router.post("/admin/cs/customer/{phone_number}/tier")
-async def cs_update_customer_tier(
+def cs_update_customer_tier(
     phone_number: str,
     request: UpdateTierRequest,
     admin: str = Depends(verify_admin)
@@ -3320,7 +3213,7 @@ async def cs_update_customer_tier(
 
 
 @router.post("/admin/cs/customer/{phone_number}/clear-opted-out")
-async def cs_clear_opted_out(phone_number: str, admin: str = Depends(verify_admin)):
+def cs_clear_opted_out(phone_number: str, admin: str = Depends(verify_admin)):
     """Manually clear the opted_out flag for a user"""
     conn = None
     try:
@@ -3361,7 +3254,7 @@ class AddNoteRequest(BaseModel):
 
 
 @router.post("/admin/cs/customer/{phone_number}/notes")
-async def cs_add_customer_note(
+def cs_add_customer_note(
     phone_number: str,
     request: AddNoteRequest,
     admin: str = Depends(verify_admin)
@@ -3390,7 +3283,7 @@ async def cs_add_customer_note(
 
 
 @router.delete("/admin/cs/customer/{phone_number}/reminder/{reminder_id}")
-async def cs_delete_reminder(
+def cs_delete_reminder(
     phone_number: str,
     reminder_id: int,
     admin: str = Depends(verify_admin)
@@ -3408,6 +3301,8 @@ async def cs_delete_reminder(
         if c.rowcount == 0:
             raise HTTPException(status_code=404, detail="Reminder not found")
 
+        from models.usage import invalidate_usage
+        invalidate_usage(c, phone_number)
         conn.commit()
         logger.info(f"CS: {admin} deleted reminder {reminder_id} for {phone_number[-4:]}")
 
@@ -3427,7 +3322,7 @@ async def cs_delete_reminder(
 # =====================================================
 
 @router.get("/admin/dashboard", response_class=HTMLResponse)
-async def admin_dashboard(admin: str = Depends(verify_admin)):
+def admin_dashboard(admin: str = Depends(verify_admin)):
     """Render HTML admin dashboard"""
     metrics = get_all_metrics()
 
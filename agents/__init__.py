@@ -9,7 +9,7 @@ AGENTS:
 
 Agent 1: Interaction Monitor (interaction_monitor.py)
     Detects anomalies in user SMS interactions using pattern matching.
-    - Queries recent logs for: confusion, errors, failures, timezone issues
+    - Scans logs since its last run for: confusion, errors, failures, timezone issues
     - Detects repeated attempts, delivery failures, parsing problems
     - Stores findings in monitoring_issues table
     - Run: python -m agents.interaction_monitor
@@ -7,9 +7,13 @@ Designed for multi-agent pipeline:
 - Stores findings in monitoring_issues table
 - Outputs structured data for Agent 2 (validator)
 
+Runs are incremental: each analyzes logs after the last completed run's
+watermark (capped at --hours), carrying per-phone detector state across runs.
+
 Usage:
-    python -m agents.interaction_monitor              # Analyze last 24 hours
-    python -m agents.interaction_monitor --hours 48   # Analyze last 48 hours
+    python -m agents.interaction_monitor              # Analyze new logs (last 24 hours at most)
+    python -m agents.interaction_monitor --hours 48   # Analyze new logs (last 48 hours at most)
+    python -m agents.interaction_monitor --full       # Re-scan the whole window, ignoring the watermark
     python -m agents.interaction_monitor --report     # Generate report only (no DB writes)
 """
 
@@ -17,15 +21,18 @@ import re
 import sys
 import json
 import argparse
+from bisect import bisect_right
 from datetime import datetime, timedelta
 from typing import Optional
 from collections import defaultdict
 
+from psycopg2.extras import execute_values
+
 # Add parent directory to path for imports
 sys.path.insert(0, '.')
 
-from database import get_monitoring_cursor, logger
-from config import ENVIRONMENT
+from database import get_monitoring_cursor, get_monitoring_connection, return_monitoring_connection, logger
+from config import ENVIRONMENT, MONITOR_FETCH_SIZE, MONITOR_SETTLE_SECONDS, MONITOR_STATE_TTL_DAYS
 
 
 # ============================================================================
@@ -90,6 +97,13 @@ NOT_FOUND_PATTERNS = [
 ]
 
 
+# Correlation window for confidence rejections and repeated attempts
+CORRELATION_WINDOW_SECONDS = 300
+
+# Identical messages in a row that count as repeated attempts
+REPEAT_ATTEMPTS = 3
+
+
 # ============================================================================
 # DATABASE SCHEMA
 # ============================================================================
@@ -177,6 +191,19 @@ def init_monitoring_tables():
                 status TEXT DEFAULT 'running'
             )
         ''')
+        # Watermark: runs analyze logs after the last completed run's last_log_id
+        cursor.execute('''
+            ALTER TABLE monitoring_runs ADD COLUMN IF NOT EXISTS last_log_id INTEGER
+        ''')
+
+        # Each phone's last logs, so multi-turn detectors carry across runs
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS monitoring_phone_state (
+                phone_number TEXT PRIMARY KEY,
+                recent_logs JSONB NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
 
         logger.info("Monitoring tables initialized")
 
@@ -442,60 +469,74 @@ def detect_flow_violation(current_log: dict, previous_log: Optional[dict]) -> Op
     return None
 
 
-def detect_low_confidence_rejection(log: dict, confidence_logs: list) -> Optional[dict]:
-    """Detect when user rejected a low-confidence interpretation"""
-    # Look for rejections in confidence logs for this user around this time
+def build_confidence_index(confidence_logs: list) -> dict:
+    """Index rejected confidence logs by phone, time-sorted: {phone: (created_at list, rows)}"""
+    by_phone = defaultdict(list)
     for cl in confidence_logs:
-        if cl['confirmed'] is False and cl['phone_number'] == log['phone_number']:
-            # Check if timestamps are close (within 5 minutes)
-            log_time = log.get('created_at')
-            conf_time = cl.get('created_at')
-            if log_time and conf_time:
-                if abs((log_time - conf_time).total_seconds()) < 300:
-                    return {
-                        'issue_type': 'confidence_rejection',
-                        'severity': 'medium',
-                        'details': {
-                            'confidence_score': cl['confidence_score'],
-                            'threshold': cl['threshold'],
-                            'action_type': cl['action_type'],
-                            'user_message': cl.get('user_message', '')[:200]
-                        }
-                    }
+        if cl['confirmed'] is False and cl.get('created_at'):
+            by_phone[cl['phone_number']].append(cl)
+
+    index = {}
+    for phone, rows in by_phone.items():
+        rows.sort(key=lambda cl: cl['created_at'])
+        index[phone] = ([cl['created_at'] for cl in rows], rows)
+    return index
+
+
+def detect_low_confidence_rejection(log: dict, confidence_index: dict) -> Optional[dict]:
+    """Detect when user rejected a low-confidence interpretation"""
+    # Look for a rejection for this user within 5 minutes of this log
+    entry = confidence_index.get(log['phone_number'])
+    log_time = log.get('created_at')
+    if not entry or not log_time:
+        return None
+
+    times, rows = entry
+    window = timedelta(seconds=CORRELATION_WINDOW_SECONDS)
+    i = bisect_right(times, log_time - window)
+    if i < len(times) and times[i] < log_time + window:
+        cl = rows[i]
+        return {
+            'issue_type': 'confidence_rejection',
+            'severity': 'medium',
+            'details': {
+                'confidence_score': cl['confidence_score'],
+                'threshold': cl['threshold'],
+                'action_type': cl['action_type'],
+                'user_message': (cl.get('user_message') or '')[:200]
+            }
+        }
     return None
 
 
-def detect_repeated_attempts(logs_by_phone: dict) -> list:
-    """Detect users making repeated similar attempts (frustration indicator)"""
-    issues = []
+def detect_repeated_attempt(log: dict, recent_logs: list) -> Optional[dict]:
+    """Detect a user sending the same message 3 times within 5 minutes (frustration indicator)
 
-    for phone, logs in logs_by_phone.items():
-        if len(logs) < 3:
-            continue
-
-        # Look for similar messages within short time windows
-        for i in range(len(logs) - 2):
-            window = logs[i:i+3]
-            messages = [l['message_in'].lower()[:50] for l in window]
-
-            # Check if messages are similar (basic similarity)
-            if len(set(messages)) == 1:  # All same
-                time_span = (window[0]['created_at'] - window[-1]['created_at']).total_seconds()
-                if time_span < 300:  # Within 5 minutes
-                    issues.append({
-                        'log_id': window[0]['id'],
-                        'phone_number': phone,
-                        'issue_type': 'repeated_attempts',
-                        'severity': 'high',
-                        'details': {
-                            'attempt_count': 3,
-                            'time_span_seconds': time_span,
-                            'message': window[0]['message_in'][:200]
-                        }
-                    })
-                    break  # One issue per user per run
+    recent_logs are the user's previous logs, oldest first (carried across runs).
+    """
+    window = recent_logs[-(REPEAT_ATTEMPTS - 1):] + [log]
+    if len(window) < REPEAT_ATTEMPTS:
+        return None
 
-    return issues
+    messages = [l['message_in'].lower()[:50] for l in window]
+    if len(set(messages)) != 1:  # Not all the same
+        return None
+
+    time_span = (window[-1]['created_at'] - window[0]['created_at']).total_seconds()
+    if time_span >= CORRELATION_WINDOW_SECONDS:
+        return None
+
+    return {
+        'log_id': window[0]['id'],
+        'phone_number': log['phone_number'],
+        'issue_type': 'repeated_attempts',
+        'severity': 'high',
+        'details': {
+            'attempt_count': REPEAT_ATTEMPTS,
+            'time_span_seconds': time_span,
+            'message': window[0]['message_in'][:200]
+        }
+    }
 
 
 def detect_delivery_failures(hours: int) -> list:
@@ -534,13 +575,97 @@ def detect_delivery_failures(hours: int) -> list:
 # MAIN ANALYSIS ENGINE
 # ============================================================================
 
-def analyze_interactions(hours: int = 24, dry_run: bool = False) -> dict:
+LOG_COLUMNS = ['id', 'phone_number', 'message_in', 'message_out', 'intent', 'success', 'created_at']
+
+
+def _log_range(incremental: bool) -> tuple:
+    """(after_id, upper_id): logs to analyze are after_id < id <= upper_id.
+
+    after_id is the last completed run's watermark (0 for a full scan). upper_id
+    stops before the first log younger than MONITOR_SETTLE_SECONDS, so a
+    log-sink batch that commits late is picked up next run instead of skipped.
+    """
+    with get_monitoring_cursor() as cursor:
+        after_id = 0
+        if incremental:
+            cursor.execute("SELECT MAX(last_log_id) FROM monitoring_runs WHERE status = 'completed'")
+            after_id = cursor.fetchone()[0] or 0
+
+        cursor.execute('''
+            SELECT MIN(id) FROM logs
+            WHERE id > %s AND created_at >= NOW() - %s * INTERVAL '1 second'
+        ''', (after_id, MONITOR_SETTLE_SECONDS))
+        unsettled = cursor.fetchone()[0]
+        if unsettled is not None:
+            return after_id, unsettled - 1
+
+        cursor.execute('SELECT MAX(id) FROM logs')
+        return after_id, max(cursor.fetchone()[0] or 0, after_id)
+
+
+def _stream_logs(after_id: int, upper_id: int, hours: int):
+    """Yield logs in the id range (and time window) oldest first, through a server-side cursor."""
+    conn = None
+    try:
+        conn = get_monitoring_connection()
+        cursor = conn.cursor(name='interaction_monitor_logs')
+        cursor.itersize = MONITOR_FETCH_SIZE
+        cursor.execute('''
+            SELECT id, phone_number, message_in, message_out, intent, success, created_at
+            FROM logs
+            WHERE id > %s AND id <= %s
+            AND created_at > NOW() - INTERVAL '%s hours'
+            ORDER BY created_at ASC, id ASC
+        ''', (after_id, upper_id, hours))
+        for row in cursor:
+            yield dict(zip(LOG_COLUMNS, row))
+        cursor.close()
+    finally:
+        if conn:
+            return_monitoring_connection(conn)
+
+
+def _load_phone_state(after_id: int, upper_id: int) -> dict:
+    """Carried-over recent logs ({phone: [log, ...]}, oldest first) for phones with logs in the range."""
+    with get_monitoring_cursor() as cursor:
+        cursor.execute('''
+            SELECT s.phone_number, s.recent_logs FROM monitoring_phone_state s
+            WHERE s.phone_number IN (SELECT DISTINCT phone_number FROM logs WHERE id > %s AND id <= %s)
+        ''', (after_id, upper_id))
+        state = {}
+        for phone, recent_logs in cursor.fetchall():
+            for log in recent_logs:
+                log['created_at'] = datetime.fromisoformat(log['created_at'])
+            state[phone] = recent_logs
+        return state
+
+
+def _save_phone_state(cursor, state: dict) -> None:
+    """Store each phone's last logs for the next run and drop state for idle phones."""
+    if state:
+        execute_values(cursor, '''
+            INSERT INTO monitoring_phone_state (phone_number, recent_logs, updated_at)
+            VALUES %s
+            ON CONFLICT (phone_number) DO UPDATE
+            SET recent_logs = EXCLUDED.recent_logs, updated_at = EXCLUDED.updated_at
+        ''', [
+            (phone, json.dumps(recent_logs, default=str), datetime.utcnow())
+            for phone, recent_logs in state.items()
+        ])
+    cursor.execute('''
+        DELETE FROM monitoring_phone_state WHERE updated_at < NOW() - %s * INTERVAL '1 day'
+    ''', (MONITOR_STATE_TTL_DAYS,))
+
+
+def analyze_interactions(hours: int = 24, dry_run: bool = False, incremental: bool = True) -> dict:
     """
-    Main analysis function. Queries recent logs and detects anomalies.
+    Main analysis function. Analyzes logs since the last run and detects anomalies.
 
     Args:
-        hours: Number of hours to look back
+        hours: Maximum number of hours to look back
         dry_run: If True, don't write to database
+        incremental: If True, only analyze logs after the last completed run's
+            watermark; False re-scans the whole window with fresh per-phone state
 
     Returns:
         dict with analysis results
@@ -568,37 +693,25 @@ def analyze_interactions(hours: int = 24, dry_run: bool = False) -> dict:
     }
 
     try:
-        # Fetch recent logs
-        with get_monitoring_cursor() as cursor:
-            cursor.execute('''
-                SELECT id, phone_number, message_in, message_out, intent, success, created_at
-                FROM logs
-                WHERE created_at > NOW() - INTERVAL '%s hours'
-                ORDER BY created_at ASC
-            ''', (hours,))
-
-            columns = ['id', 'phone_number', 'message_in', 'message_out', 'intent', 'success', 'created_at']
-            logs = [dict(zip(columns, row)) for row in cursor.fetchall()]
-
-        results['logs_analyzed'] = len(logs)
+        after_id, upper_id = _log_range(incremental)
+        results['log_id_range'] = [after_id, upper_id]
 
-        # Fetch recent confidence logs for correlation
+        # Index recent confidence rejections for correlation
         with get_monitoring_cursor() as cursor:
             cursor.execute('''
                 SELECT phone_number, action_type, confidence_score, threshold,
                        confirmed, user_message, created_at
                 FROM confidence_logs
-                WHERE created_at > NOW() - INTERVAL '%s hours'
+                WHERE confirmed = FALSE
+                AND created_at > NOW() - INTERVAL '%s hours' - INTERVAL '5 minutes'
             ''', (hours,))
 
             columns = ['phone_number', 'action_type', 'confidence_score', 'threshold',
                       'confirmed', 'user_message', 'created_at']
-            confidence_logs = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            confidence_index = build_confidence_index([dict(zip(columns, row)) for row in cursor.fetchall()])
 
-        # Group logs by phone for pattern detection
-        logs_by_phone = defaultdict(list)
-        for log in logs:
-            logs_by_phone[log['phone_number']].append(log)
+        # Each phone's last logs, carried across runs for the multi-turn detectors
+        recent_by_phone = _load_phone_state(after_id, upper_id) if incremental else {}
 
         # Run all detectors on each log
         detectors = [
@@ -611,64 +724,61 @@ def analyze_interactions(hours: int = 24, dry_run: bool = False) -> dict:
         ]
 
         seen_issues = set()  # Avoid duplicates
-        previous_logs = {}  # Track previous log for each phone number
+        repeated_phones = set()  # One repeated_attempts issue per user per run
+
+        def add_issue(issue, log):
+            issue_key = (log['id'], issue['issue_type'])
+            if issue_key not in seen_issues:
+                seen_issues.add(issue_key)
+                issue['log_id'] = log['id']
+                issue['phone_number'] = log['phone_number']
+                results['issues_found'].append(issue)
+                results['summary'][issue['issue_type']] += 1
+
+        for log in _stream_logs(after_id, upper_id, hours):
+            results['logs_analyzed'] += 1
 
-        for log in logs:
             for detector in detectors:
                 issue = detector(log)
                 if issue:
-                    issue_key = (log['id'], issue['issue_type'])
-                    if issue_key not in seen_issues:
-                        seen_issues.add(issue_key)
-                        issue['log_id'] = log['id']
-                        issue['phone_number'] = log['phone_number']
-                        results['issues_found'].append(issue)
-                        results['summary'][issue['issue_type']] += 1
+                    add_issue(issue, log)
 
             # Check confidence rejections
-            issue = detect_low_confidence_rejection(log, confidence_logs)
+            issue = detect_low_confidence_rejection(log, confidence_index)
             if issue:
-                issue_key = (log['id'], 'confidence_rejection')
-                if issue_key not in seen_issues:
-                    seen_issues.add(issue_key)
-                    issue['log_id'] = log['id']
-                    issue['phone_number'] = log['phone_number']
-                    results['issues_found'].append(issue)
-                    results['summary']['confidence_rejection'] += 1
+                add_issue(issue, log)
 
-            # Check context loss (requires previous log from same user)
             phone = log['phone_number']
-            prev_log = previous_logs.get(phone)
+            recent_logs = recent_by_phone.get(phone, [])
+
+            # Check context loss and flow violations (require previous log from same user)
+            prev_log = recent_logs[-1] if recent_logs else None
             if prev_log:
                 issue = detect_context_loss(log, prev_log)
                 if issue:
-                    issue_key = (log['id'], 'context_loss')
-                    if issue_key not in seen_issues:
-                        seen_issues.add(issue_key)
-                        issue['log_id'] = log['id']
-                        issue['phone_number'] = log['phone_number']
-                        results['issues_found'].append(issue)
-                        results['summary']['context_loss'] += 1
-
-                # Check flow violations (requires previous log from same user)
+                    add_issue(issue, log)
+
                 issue = detect_flow_violation(log, prev_log)
                 if issue:
-                    issue_key = (log['id'], 'flow_violation')
-                    if issue_key not in seen_issues:
-                        seen_issues.add(issue_key)
-                        issue['log_id'] = log['id']
-                        issue['phone_number'] = log['phone_number']
-                        results['issues_found'].append(issue)
-                        results['summary']['flow_violation'] += 1
-
-            # Update previous log for this phone number
-            previous_logs[phone] = log
-
-        # Run aggregate pattern detectors
-        repeated_issues = detect_repeated_attempts(logs_by_phone)
-        for issue in repeated_issues:
-            results['issues_found'].append(issue)
-            results['summary']['repeated_attempts'] += 1
+                    add_issue(issue, log)
+
+            # Check repeated attempts (the issue belongs to the first of the attempts)
+            if phone not in repeated_phones:
+                issue = detect_repeated_attempt(log, recent_logs)
+                if issue:
+                    repeated_phones.add(phone)
+                    results['issues_found'].append(issue)
+                    results['summary']['repeated_attempts'] += 1
+
+            # Keep the last logs for this phone number
+            recent_by_phone[phone] = (recent_logs + [{
+                'id': log['id'],
+                'phone_number': phone,
+                'message_in': log['message_in'],
+                'message_out': log['message_out'],
+                'intent': log['intent'],
+                'created_at': log['created_at'],
+            }])[-(REPEAT_ATTEMPTS - 1):]
 
         # Check delivery failures
         delivery_issues = detect_delivery_failures(hours)
@@ -694,17 +804,19 @@ def analyze_interactions(hours: int = 24, dry_run: bool = False) -> dict:
                         json.dumps(issue['details'])
                     ))
 
-        # Complete monitoring run
+        # Complete monitoring run, advancing the watermark with the per-phone state
         if not dry_run and run_id:
             with get_monitoring_cursor() as cursor:
+                _save_phone_state(cursor, recent_by_phone)
                 cursor.execute('''
                     UPDATE monitoring_runs
                     SET completed_at = NOW(),
                         logs_analyzed = %s,
                         issues_found = %s,
+                        last_log_id = %s,
                         status = 'completed'
                     WHERE id = %s
-                ''', (results['logs_analyzed'], len(results['issues_found']), run_id))
+                ''', (results['logs_analyzed'], len(results['issues_found']), upper_id, run_id))
 
         results['completed_at'] = datetime.utcnow().isoformat()
         results['summary'] = dict(results['summary'])
@@ -712,6 +824,7 @@ def analyze_interactions(hours: int = 24, dry_run: bool = False) -> dict:
     except Exception as e:
         logger.error(f"Monitoring analysis failed: {e}", exc_info=True)
         results['error'] = str(e)
+        results['summary'] = dict(results['summary'])
 
         if not dry_run and run_id:
             with get_monitoring_cursor() as cursor:
@@ -841,6 +954,10 @@ def main():
         '--report', action='store_true',
         help='Generate report only (dry run, no DB writes)'
     )
+    parser.add_argument(
+        '--full', action='store_true',
+        help='Re-scan the whole window instead of only logs since the last run'
+    )
     parser.add_argument(
         '--json', action='store_true',
         help='Output results as JSON'
@@ -875,7 +992,7 @@ def main():
     print(f"   Dry run: {args.report}")
     print()
 
-    results = analyze_interactions(hours=args.hours, dry_run=args.report)
+    results = analyze_interactions(hours=args.hours, dry_run=args.report, incremental=not args.full)
 
     if args.json:
         # Convert for JSON serialization
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+"""
+Command routing benchmark: the sms_reply keyword if-cascade vs COMMAND_ROUTER.
+
+Replays the user messages from conversation_test_log.json (plus a set of
+keyword commands, so both paths do real matching work) and times routing
+each message. The "cascade" side is the chain of inline comparisons and
+re.match calls sms_reply ran before the router. Every message is checked
+against every keyword block, because most messages fall through to AI.
+Both sides must report the same matches. Pure CPU: no database needed.
+
+Usage:
+    python benchmarks/bench_command_router.py
+    python benchmarks/bench_command_router.py --log conversation_test_log.json --repeat 200
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# config.py refuses to import without these
+for key, value in {
+    "TWILIO_ACCOUNT_SID": "bench_sid",
+    "TWILIO_AUTH_TOKEN": "bench_token",
+    "TWILIO_PHONE_NUMBER": "+15550000000",
+    "OPENAI_API_KEY": "sk-bench",
+    "DATABASE_URL": "postgresql://localhost/bench",
+}.items():
+    os.environ.setdefault(key, value)
+
+_COMMANDS = [
+    "STOP", "YES", "DELETE REMINDERS", "Delete 2", "delete 1 and 3", "Cancel reminder 4", "check off 2",
+    "Feedback love it", "question: how do lists work?", "STATUS", "snooze 30", "SUMMARY TIME 7am",
+    "set my summary to 8am", "NUDGE OFF", "nudge time 9:30pm", "TIMEZONE America/Chicago",
+    "pause recurring 2", "DELETE ALL", "MY LISTS", "info", "please cancel my subscription",
+]
+
+
+def _first_word(message, keyword):
+    """parse_command(message, [keyword])[0] == keyword, as the cascade tested it."""
+    parts = re.split(r'[\s:]+', message.strip(), maxsplit=1)
+    return bool(parts) and parts[0].upper() == keyword
+
+
+def cascade_matches(incoming_msg):
+    """Every keyword check sms_reply made inline, in cascade order."""
+    matched = []
+    msg_upper = incoming_msg.upper()
+    if incoming_msg.upper() in ("DELETE ACCOUNT", "CANCEL ACCOUNT", "CANCEL MY ACCOUNT", "DELETE MY ACCOUNT", "REMOVE MY ACCOUNT", "CLOSE MY ACCOUNT"):
+        matched.append('delete_account')
+    if incoming_msg.upper() == "YES DELETE ACCOUNT":
+        matched.append('confirm_delete_account')
+    if incoming_msg.upper() in ["RESET ACCOUNT", "RESTART"]:
+        matched.append('reset_account')
+    if incoming_msg.upper() in ("STOP", "STOPALL", "UNSUBSCRIBE", "END", "QUIT"):
+        matched.append('stop')
+    if incoming_msg.upper() in ["START", "YES", "UNSTOP"]:
+        matched.append('start')
+    if msg_upper in ["DELETE REMINDERS", "DELETE MY REMINDERS", "CANCEL REMINDERS", "CANCEL MY REMINDERS", "REMOVE REMINDERS", "REMOVE MY REMINDERS"]:
+        matched.append('delete_reminders_menu')
+    if msg_upper in ["DELETE MEMORIES", "DELETE MY MEMORIES", "FORGET MEMORIES", "FORGET MY MEMORIES", "REMOVE MEMORIES", "REMOVE MY MEMORIES"]:
+        matched.append('delete_memories_menu')
+    if msg_upper in ["DELETE LISTS", "DELETE MY LISTS", "REMOVE LISTS", "REMOVE MY LISTS"]:
+        matched.append('delete_lists_menu')
+    if re.match(r'^(?:delete|remove|cancel)\s+reminder\s+(\d+)$', incoming_msg.strip(), re.IGNORECASE):
+        matched.append('delete_reminder_number')
+    if re.match(r'^(?:delete|remove)\s+\d+\s*(?:[,&]\s*\d+|\s+and\s+\d+|\s+\d+)+', incoming_msg.strip(), re.IGNORECASE):
+        matched.append('delete_multiple')
+    if re.match(r'^(?:delete|remove)\s+(\d+)$', incoming_msg.strip(), re.IGNORECASE):
+        matched.append('delete_number')
+    if re.match(r'^(?:check|check off|done|complete|finished)\s+(\d+)$', incoming_msg.strip(), re.IGNORECASE):
+        matched.append('check_item')
+    if _first_word(incoming_msg, "FEEDBACK"):
+        matched.append('feedback')
+    if _first_word(incoming_msg, "BUG"):
+        matched.append('bug')
+    if incoming_msg.upper() == "EXPORT":
+        matched.append('export')
+    if _first_word(incoming_msg, "QUESTION"):
+        matched.append('question')
+    if incoming_msg.upper() in ["UPGRADE", "SUBSCRIBE", "PREMIUM", "PRICING"]:
+        matched.append('upgrade')
+    if any(phrase in incoming_msg.upper() for phrase in ["CANCEL SUBSCRIPTION", "CANCEL PLAN", "CANCEL PREMIUM", "CANCEL MY SUBSCRIPTION", "CANCEL MY PLAN"]):
+        matched.append('cancel_subscription')
+    if incoming_msg.upper() in ["ACCOUNT", "MANAGE", "BILLING", "SUBSCRIPTION"]:
+        matched.append('account')
+    if incoming_msg.upper() in ["STATUS", "MY ACCOUNT", "ACCOUNT INFO", "USAGE"]:
+        matched.append('status')
+    if _first_word(incoming_msg, "SUPPORT"):
+        matched.append('support')
+    if incoming_msg.upper().startswith("SNOOZE"):
+        matched.append('snooze')
+    msg_upper = incoming_msg.upper().strip()
+    if msg_upper in ["SUMMARY ON", "DAILY SUMMARY ON", "DAILY SUMMARY"]:
+        matched.append('summary_on')
+    if msg_upper in ["SUMMARY OFF", "DAILY SUMMARY OFF", "DISABLE SUMMARY", "DISABLE DAILY SUMMARY", "TURN OFF SUMMARY", "TURN OFF DAILY SUMMARY"] or msg_upper.startswith("SUMMARY OFF ") or msg_upper.startswith("DAILY SUMMARY OFF "):
+        matched.append('summary_off')
+    if msg_upper in ["MY SUMMARY", "SUMMARY STATUS", "SUMMARY"]:
+        matched.append('summary_status')
+    if (re.match(r'^(?:daily\s+)?summary\s+(?:on\s+|time\s+)?(\d{1,2})(?::(\d{2}))?\s*(am|pm|a|p)$', incoming_msg.strip(), re.IGNORECASE)
+            or re.match(r'^(?:change|set|move|update)\s+(?:my\s+)?(?:daily\s+)?summary\s+(?:time\s+)?(?:to\s+)?(\d{1,2})(?::(\d{2}))?\s*(am|pm|a|p)\b', incoming_msg.strip(), re.IGNORECASE)):
+        matched.append('summary_time')
+    if msg_upper in ["NUDGE ON", "NUDGES ON", "SMART NUDGE ON", "SMART NUDGES ON"]:
+        matched.append('nudge_on')
+    if msg_upper in ["NUDGE OFF", "NUDGES OFF", "SMART NUDGE OFF", "SMART NUDGES OFF", "DISABLE NUDGE", "DISABLE NUDGES"]:
+        matched.append('nudge_off')
+    if msg_upper in ["NUDGE STATUS", "MY NUDGE", "MY NUDGES", "NUDGE SETTINGS"]:
+        matched.append('nudge_status')
+    if (re.match(r'^(?:smart\s+)?nudge(?:s)?\s+(?:time\s+)?(\d{1,2})(?::(\d{2}))?\s*(am|pm|a|p)$', incoming_msg.strip(), re.IGNORECASE)
+            or re.match(r'^(?:change|set|move|update)\s+(?:my\s+)?(?:smart\s+)?nudge(?:s)?\s+(?:time\s+)?(?:to\s+)?(\d{1,2})(?::(\d{2}))?\s*(am|pm|a|p)\b', incoming_msg.strip(), re.IGNORECASE)):
+        matched.append('nudge_time')
+    if msg_upper in ["MY TIMEZONE", "TIMEZONE", "MY TZ", "SHOW TIMEZONE"]:
+        matched.append('timezone_show')
+    if msg_upper.startswith("TIMEZONE ") or msg_upper.startswith("SET TIMEZONE "):
+        matched.append('timezone_set')
+    if msg_upper in ["SHOW COMPLETED REMINDERS", "SHOW COMPLETED", "COMPLETED REMINDERS", "PAST REMINDERS", "SHOW PAST REMINDERS"]:
+        matched.append('completed_reminders')
+    if msg_upper in ["MY RECURRING", "MY RECURRING REMINDERS", "RECURRING", "RECURRING REMINDERS", "SHOW RECURRING"]:
+        matched.append('recurring_list')
+    if msg_upper.startswith("DELETE RECURRING ") or msg_upper.startswith("CANCEL RECURRING ") or msg_upper.startswith("REMOVE RECURRING "):
+        matched.append('recurring_delete')
+    if msg_upper.startswith("PAUSE RECURRING "):
+        matched.append('recurring_pause')
+    if msg_upper.startswith("RESUME RECURRING "):
+        matched.append('recurring_resume')
+    if msg_upper in ["DELETE ALL MEMORIES", "DELETE ALL MY MEMORIES", "FORGET ALL MEMORIES", "FORGET ALL MY MEMORIES"]:
+        matched.append('delete_all_memories')
+    if msg_upper in ["DELETE ALL REMINDERS", "DELETE ALL MY REMINDERS", "CANCEL ALL REMINDERS", "CANCEL ALL MY REMINDERS"]:
+        matched.append('delete_all_reminders')
+    if msg_upper in ["DELETE ALL LISTS", "DELETE ALL MY LISTS", "FORGET ALL LISTS", "FORGET ALL MY LISTS"]:
+        matched.append('delete_all_lists')
+    if msg_upper == "DELETE ALL":
+        matched.append('delete_all_menu')
+    if msg_upper in ["DELETE ALL DATA", "DELETE ALL MY DATA", "DELETE EVERYTHING", "FORGET EVERYTHING"]:
+        matched.append('delete_all_data')
+    if incoming_msg.upper() in ["LIST ALL", "LIST MEMORIES", "SHOW MEMORIES", "MY MEMORIES"]:
+        matched.append('list_memories')
+    if incoming_msg.upper() in ["MY LISTS", "SHOW LISTS", "LIST LISTS", "LISTS"]:
+        matched.append('list_lists')
+    if incoming_msg.upper() == "HELP":
+        matched.append('help')
+    if incoming_msg.upper() in ["INFO", "GUIDE", "COMMANDS", "?"]:
+        matched.append('info')
+    if incoming_msg.upper() in ["MORE COMMANDS", "MORE", "ALL COMMANDS", "FULL COMMANDS"]:
+        matched.append('more_commands')
+    return matched
+
+
+def load_messages(path):
+    with open(path) as f:
+        log = json.load(f)
+    return [entry["user_message"].strip() for entry in log.get("test_results", []) if entry.get("user_message")]
+
+
+def time_us(route, messages, repeat):
+    """Median microseconds per message over `repeat` passes."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for message in messages:
+            route(message)
+        samples.append((time.perf_counter() - start) * 1e6 / len(messages))
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--log", default=os.path.join(ROOT, "conversation_test_log.json"))
+    parser.add_argument("--repeat", type=int, default=200, help="timed passes (median reported)")
+    args = parser.parse_args()
+
+    from routes.command_router import COMMAND_ROUTER
+
+    logged = load_messages(args.log)
+    corpora = [("conversation log", logged), ("keyword commands", _COMMANDS), ("combined", logged + _COMMANDS)]
+
+    mismatches = [m for m in logged + _COMMANDS if cascade_matches(m) != list(COMMAND_ROUTER.resolve(m).matches)]
+    for message in mismatches:
+        print(f"MISMATCH {message!r}: cascade={cascade_matches(message)} "
+              f"router={list(COMMAND_ROUTER.resolve(message).matches)}")
+
+    print(f"us per message, median of {args.repeat} passes\n")
+    print(f"{'corpus':<18} {'msgs':>5} {'cascade us':>11} {'router us':>10} {'speedup':>8}")
+    for label, messages in corpora:
+        old = time_us(cascade_matches, messages, args.repeat)
+        new = time_us(COMMAND_ROUTER.resolve, messages, args.repeat)
+        print(f"{label:<18} {len(messages):>5} {old:>11.2f} {new:>10.2f} {old / new:>7.1f}x")
+    print(f"\nsame matches: {'yes' if not mismatches else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+"""
+Intent parser accuracy harness: how much AI traffic the local fast path
+answers, whether its answers agree with the AI's, and how long parsing takes.
+
+Corpora:
+  - conversation_test_log.json: user messages with the replies the AI path
+    produced. Each fast-path reminder is checked against the date, time and
+    text in the logged confirmation (relative reminders within 2 minutes);
+    list adds against the logged "Added ..." reply. The log's timestamps are
+    on the recording machine's clock; --log-offset-hours converts them to the
+    test user's local time (-3: "in 30 minutes" at 20:45 was confirmed for
+    6:15 PM).
+  - tests/test_real_*.py: every literal send_message() text. These have no
+    recorded AI answer, so a fast-path hit only has to be the right kind of
+    action for the file (reminders / lists / memories).
+
+Messages the keyword router answers never reach the AI and are not counted.
+Pure CPU: no database or OpenAI key needed.
+
+Usage:
+    python benchmarks/bench_intent_parser.py
+    python benchmarks/bench_intent_parser.py --verbose --repeat 500
+"""
+
+import argparse
+import ast
+import glob
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# config.py refuses to import without these
+for key, value in {
+    "TWILIO_ACCOUNT_SID": "bench_sid",
+    "TWILIO_AUTH_TOKEN": "bench_token",
+    "TWILIO_PHONE_NUMBER": "+15550000000",
+    "OPENAI_API_KEY": "sk-bench",
+    "DATABASE_URL": "postgresql://localhost/bench",
+}.items():
+    os.environ.setdefault(key, value)
+
+# Lists the logged test user had (the log shows "todo list" and "grocery list")
+_LOG_LISTS = ("grocery list", "todo list")
+
+# Action family each test_real_* corpus is about; others only measure coverage
+_FILE_FAMILIES = {
+    "test_real_reminders.py": "reminder",
+    "test_real_lists.py": "list",
+    "test_real_memories.py": "memory",
+}
+
+_REMINDER_REPLY = re.compile(
+    r"I'll remind you on \w+, (?P<date>\w+ \d{1,2}, \d{4}) at (?P<time>\d{1,2}:\d{2} [AP]M) (?P<text>.+?)\.$")
+_LIST_REPLY = re.compile(r"^(?:Added (?P<item>.+) to your (?P<list>.+?)|Created your (?P<list2>.+) and added (?P<item2>.+?))!?$")
+
+
+def family(action):
+    name = action["action"]
+    if name.startswith("reminder"):
+        return "reminder"
+    return {"add_to_list": "list", "store": "memory"}.get(name, name)
+
+
+def _bare(text):
+    return re.sub(r"^(?:to|about|for|that) ", "", text.strip().lower())
+
+
+def check_against_log(action, reply, now):
+    """'agree', 'DISAGREE' or 'unverified' for a fast-path action vs the logged AI reply."""
+    from dateutil.relativedelta import relativedelta
+
+    match = _REMINDER_REPLY.search(reply or "")
+    if action["action"] in ("reminder", "reminder_relative") and match:
+        logged = datetime.strptime(f"{match.group('date')} {match.group('time')}", "%B %d, %Y %I:%M %p")
+        if action["action"] == "reminder":
+            ours = datetime.strptime(action["reminder_date"], "%Y-%m-%d %H:%M:%S")
+            close = ours == logged
+        else:
+            ours = now + relativedelta(
+                months=action.get("offset_months", 0), weeks=action.get("offset_weeks", 0),
+                days=action.get("offset_days", 0), minutes=action.get("offset_minutes", 0))
+            close = abs(ours - logged) <= timedelta(minutes=2)
+        return "agree" if close and _bare(action["reminder_text"]) == _bare(match.group("text")) else "DISAGREE"
+
+    match = _LIST_REPLY.match(reply or "")
+    if action["action"] == "add_to_list" and match:
+        item = match.group("item") or match.group("item2")
+        list_name = match.group("list") or match.group("list2")
+        same = item.lower() == action["item_text"].lower() and list_name.lower() == action["list_name"].lower()
+        return "agree" if same else "DISAGREE"
+    return "unverified"
+
+
+def load_log(path, offset_hours):
+    with open(path) as f:
+        log = json.load(f)
+    entries = []
+    for entry in log.get("test_results", []):
+        if entry.get("category") == "onboarding" or not entry.get("user_message"):
+            continue
+        now = datetime.fromisoformat(entry["timestamp"]) + timedelta(hours=offset_hours)
+        entries.append((entry["user_message"], now, entry.get("system_response")))
+    return entries
+
+
+def load_real_tests(pattern):
+    """{file name: [message, ...]} for every literal send_message(phone, "...") call."""
+    corpora = {}
+    for path in sorted(glob.glob(pattern)):
+        with open(path) as f:
+            tree = ast.parse(f.read())
+        messages = []
+        for node in ast.walk(tree):
+            if (isinstance(node, ast.Call) and getattr(node.func, "attr", None) == "send_message"
+                    and len(node.args) >= 2 and isinstance(node.args[1], ast.Constant)
+                    and isinstance(node.args[1].value, str)):
+                messages.append(node.args[1].value)
+        corpora[os.path.basename(path)] = messages
+    return corpora
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--log", default=os.path.join(ROOT, "conversation_test_log.json"))
+    parser.add_argument("--log-offset-hours", type=float, default=-3,
+                        help="hours from the log's timestamps to the test user's local time")
+    parser.add_argument("--tests", default=os.path.join(ROOT, "tests", "test_real_*.py"))
+    parser.add_argument("--now", default="2026-01-17T09:00",
+                        help="user-local time for the test_real_* messages")
+    parser.add_argument("--repeat", type=int, default=200, help="timed passes (median reported)")
+    parser.add_argument("--verbose", action="store_true", help="print every message reaching the AI")
+    args = parser.parse_args()
+
+    from config import FAST_PATH_MIN_CONFIDENCE
+    from routes.command_router import COMMAND_ROUTER
+    from services.intent_parser import parse_intent
+
+    def fast(message, now, lists=()):
+        action = parse_intent(message, now, list_names=lambda: lists)
+        return action if action and action["confidence"] >= FAST_PATH_MIN_CONFIDENCE else None
+
+    rows = []  # (corpus, fast-path hit, verdict)
+    timed = []
+
+    for message, now, reply in load_log(args.log, args.log_offset_hours):
+        if COMMAND_ROUTER.resolve(message).name:
+            continue
+        timed.append((message, now, _LOG_LISTS))
+        action = fast(message, now, _LOG_LISTS)
+        verdict = check_against_log(action, reply, now) if action else "-"
+        rows.append(("conversation log", bool(action), verdict))
+        if args.verbose:
+            print(f"[log] {verdict:<10} {message!r} -> {action}")
+
+    now = datetime.fromisoformat(args.now)
+    for name, messages in load_real_tests(args.tests).items():
+        expected = _FILE_FAMILIES.get(name)
+        for message in messages:
+            if not message.strip() or COMMAND_ROUTER.resolve(message).name:
+                continue
+            timed.append((message, now, ()))
+            action = fast(message, now)
+            if not action:
+                verdict = "-"
+            elif expected is None:
+                verdict = "unverified"
+            else:
+                verdict = "agree" if family(action) == expected else "DISAGREE"
+            rows.append((name, bool(action), verdict))
+            if args.verbose:
+                print(f"[{name}] {verdict:<10} {message!r} -> {action}")
+
+    if args.verbose:
+        print()
+    print(f"{'corpus':<28} {'msgs':>6} {'fast':>5} {'cover':>6} {'agree':>6} {'disagree':>9} {'unverif':>8}")
+    corpora = list(dict.fromkeys(row[0] for row in rows)) + ["total"]
+    for corpus in corpora:
+        selected = [row for row in rows if corpus == "total" or row[0] == corpus]
+        hits = sum(row[1] for row in selected)
+        verdicts = [row[2] for row in selected]
+        print(f"{corpus:<28} {len(selected):>6} {hits:>5} {hits / len(selected):>6.0%} "
+              f"{verdicts.count('agree'):>6} {verdicts.count('DISAGREE'):>9} {verdicts.count('unverified'):>8}")
+
+    samples = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        for message, now, lists in timed:
+            parse_intent(message, now, list_names=lambda: lists)
+        samples.append((time.perf_counter() - start) * 1e6 / len(timed))
+    print(f"\nparse_intent: {statistics.median(samples):.1f} us per message "
+          f"(median of {args.repeat} passes over {len(timed)} messages)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+List context loading benchmark: get_lists + get_list_items per list vs get_lists_with_items.
+
+Seeds a throwaway user with N lists of M items in the configured database,
+then times both ways of loading every list with its items. Unlike the
+reminder dispatch benchmark this needs a real PostgreSQL (DATABASE_URL):
+the cost being measured is the per-list round trip and pool checkout.
+
+Usage:
+    DATABASE_URL=postgresql://... python benchmarks/bench_list_context.py
+    python benchmarks/bench_list_context.py --list-counts 1 5 20 50 --items 15 --repeat 50
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# config.py refuses to import without these
+for key, value in {
+    "TWILIO_ACCOUNT_SID": "bench_sid",
+    "TWILIO_AUTH_TOKEN": "bench_token",
+    "TWILIO_PHONE_NUMBER": "+15550000000",
+    "OPENAI_API_KEY": "sk-bench",
+    "DATABASE_URL": "postgresql://localhost/bench",
+}.items():
+    os.environ.setdefault(key, value)
+
+BENCH_PHONE = "+15550009999"
+
+
+def seed(list_count, items_per_list):
+    from models.list_model import create_list, add_list_item
+    cleanup()
+    for n in range(list_count):
+        list_id = create_list(BENCH_PHONE, f"Bench list {n}")
+        for i in range(items_per_list):
+            add_list_item(list_id, BENCH_PHONE, f"item {i}")
+
+
+def cleanup():
+    from database import get_db_connection, return_db_connection
+    conn = get_db_connection()
+    try:
+        c = conn.cursor()
+        c.execute("DELETE FROM list_items WHERE phone_number = %s", (BENCH_PHONE,))
+        c.execute("DELETE FROM lists WHERE phone_number = %s", (BENCH_PHONE,))
+        conn.commit()
+    finally:
+        return_db_connection(conn)
+
+
+def load_per_list():
+    from models.list_model import get_lists, get_list_items
+    return [(lst, get_list_items(lst[0])) for lst in get_lists(BENCH_PHONE)]
+
+
+def load_single_query():
+    from models.list_model import get_lists_with_items
+    return get_lists_with_items(BENCH_PHONE)
+
+
+def time_ms(fn, repeat):
+    fn()  # warm the pool and plan cache
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--list-counts", type=int, nargs="+", default=[1, 5, 10, 20, 40])
+    parser.add_argument("--items", type=int, default=10, help="items per list")
+    parser.add_argument("--repeat", type=int, default=30, help="timed runs per case (median reported)")
+    args = parser.parse_args()
+
+    from database import init_db
+    init_db()
+
+    print(f"{args.items} items per list, median of {args.repeat} runs\n")
+    print(f"{'lists':>6} {'queries (old)':>14} {'old ms':>9} {'new ms':>9} {'speedup':>8}")
+    try:
+        for list_count in args.list_counts:
+            seed(list_count, args.items)
+            old = time_ms(load_per_list, args.repeat)
+            new = time_ms(load_single_query, args.repeat)
+            print(f"{list_count:>6} {list_count + 1:>14} {old:>9.2f} {new:>9.2f} {old / new:>7.1f}x")
+    finally:
+        cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+"""
+Memory de-duplication benchmark: full scan + re-tokenize vs keyword-index candidates.
+
+Seeds a throwaway user with N memories in the configured database, then
+times the duplicate lookup save_memory does before every write: the old way
+(fetch every memory, extract keywords from both texts for each pair) against
+_find_similar_memory (GIN && lookup on memories.keywords, exact Jaccard on
+the candidates only). Needs a real PostgreSQL (DATABASE_URL).
+
+Usage:
+    DATABASE_URL=postgresql://... python benchmarks/bench_memory_dedup.py
+    python benchmarks/bench_memory_dedup.py --memory-counts 10 1000 10000 --repeat 20
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# config.py refuses to import without these
+for key, value in {
+    "TWILIO_ACCOUNT_SID": "bench_sid",
+    "TWILIO_AUTH_TOKEN": "bench_token",
+    "TWILIO_PHONE_NUMBER": "+15550000000",
+    "OPENAI_API_KEY": "sk-bench",
+    "DATABASE_URL": "postgresql://localhost/bench",
+}.items():
+    os.environ.setdefault(key, value)
+
+BENCH_PHONE = "+15550009998"
+
+# Realistic-ish memory text: a few topic words plus filler and unique tokens
+_TOPICS = ["wifi", "password", "garage", "code", "locker", "dentist", "doctor", "plumber", "birthday",
+           "parking", "spot", "car", "passport", "number", "gym", "membership", "insurance", "policy",
+           "anniversary", "allergy", "prescription", "vet", "school", "pickup", "license", "plate"]
+_PROBES = ["My WiFi password is XYZ", "dentist is Dr Lee on Main Street", "gate code 4471",
+           "the kids pickup is at 3pm", "brand new unrelated thought"]
+
+
+def _memory_text(rng, n):
+    words = rng.sample(_TOPICS, rng.randint(2, 5)) + [f"w{n}", f"{rng.randint(0, 99999)}"]
+    rng.shuffle(words)
+    return "my " + " is ".join(words)
+
+
+def seed(memory_count):
+    from psycopg2.extras import execute_values
+    from database import get_db_connection, return_db_connection
+    from models.memory import _keyword_signature
+    cleanup()
+    rng = random.Random(memory_count)
+    rows = []
+    for n in range(memory_count):
+        text = _memory_text(rng, n)
+        rows.append((BENCH_PHONE, text, _keyword_signature(text)))
+    conn = get_db_connection()
+    try:
+        c = conn.cursor()
+        execute_values(c, 'INSERT INTO memories (phone_number, memory_text, keywords) VALUES %s', rows,
+                       page_size=1000)
+        c.execute('ANALYZE memories')
+        conn.commit()
+    finally:
+        return_db_connection(conn)
+
+
+def cleanup():
+    from database import get_db_connection, return_db_connection
+    conn = get_db_connection()
+    try:
+        c = conn.cursor()
+        c.execute("DELETE FROM memories WHERE phone_number = %s", (BENCH_PHONE,))
+        c.execute("DELETE FROM user_usage WHERE phone_number = %s", (BENCH_PHONE,))
+        conn.commit()
+    finally:
+        return_db_connection(conn)
+
+
+def full_scan(cursor, phone_number, memory_text):
+    """The lookup as it was before memories.keywords: every row, both texts re-tokenized."""
+    from models.memory import (_extract_keywords, _SIMILARITY_THRESHOLD, _SHORT_MEMORY_THRESHOLD,
+                               _SHORT_MEMORY_KEYWORD_LIMIT)
+    cursor.execute('SELECT id, memory_text FROM memories WHERE phone_number = %s', (phone_number,))
+    best_id, best_score = None, 0.0
+    new_keywords = _extract_keywords(memory_text)
+    for mem_id, existing_text in cursor.fetchall():
+        keywords_a, keywords_b = _extract_keywords(memory_text), _extract_keywords(existing_text)
+        score = len(keywords_a & keywords_b) / len(keywords_a | keywords_b) if keywords_a and keywords_b else 0.0
+        if score > best_score:
+            best_id, best_score = mem_id, score
+    threshold = _SHORT_MEMORY_THRESHOLD if len(new_keywords) <= _SHORT_MEMORY_KEYWORD_LIMIT else _SIMILARITY_THRESHOLD
+    return best_id if best_score >= threshold else None
+
+
+def time_ms(lookup, repeat):
+    """Median ms to run every probe through `lookup`, plus the results (for the equality check)."""
+    from database import get_db_connection, return_db_connection
+    conn = get_db_connection()
+    try:
+        c = conn.cursor()
+        results = [lookup(c, BENCH_PHONE, probe) for probe in _PROBES]  # warm the plan cache
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for probe in _PROBES:
+                lookup(c, BENCH_PHONE, probe)
+            samples.append((time.perf_counter() - start) * 1000 / len(_PROBES))
+        conn.rollback()
+        return statistics.median(samples), results
+    finally:
+        return_db_connection(conn)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--memory-counts", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per case (median reported)")
+    args = parser.parse_args()
+
+    from database import init_db
+    from models.memory import _find_similar_memory
+    init_db()
+
+    print(f"ms per lookup, median of {args.repeat} runs over {len(_PROBES)} probes\n")
+    print(f"{'memories':>9} {'scan ms':>9} {'index ms':>9} {'speedup':>8} {'same':>5}")
+    try:
+        for memory_count in args.memory_counts:
+            seed(memory_count)
+            old, old_results = time_ms(full_scan, args.repeat)
+            new, new_results = time_ms(_find_similar_memory, args.repeat)
+            same = "yes" if old_results == new_results else "NO"
+            print(f"{memory_count:>9} {old:>9.2f} {new:>9.2f} {old / new:>7.1f}x {same:>5}")
+    finally:
+        cleanup()
+
+
+if __name__ == "__main__":
+    main()
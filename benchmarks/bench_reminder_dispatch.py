@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+"""
+Reminder dispatch benchmark: top-of-hour spike against a stub Twilio.
+
+Compares the legacy path (10 claimed per 30s tick, one send_single_reminder
+task per reminder) with batch mode (adaptive claim size, concurrent sends,
+one bulk UPDATE per send wave). The database layer is replaced with in-memory
+fakes so only dispatch overhead and Twilio latency are measured.
+
+Usage:
+    python benchmarks/bench_reminder_dispatch.py
+    python benchmarks/bench_reminder_dispatch.py --reminders 10000 --latency-ms 120
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# config.py refuses to import without these
+for key, value in {
+    "TWILIO_ACCOUNT_SID": "bench_sid",
+    "TWILIO_AUTH_TOKEN": "bench_token",
+    "TWILIO_PHONE_NUMBER": "+15550000000",
+    "OPENAI_API_KEY": "sk-bench",
+    "DATABASE_URL": "postgresql://localhost/bench",
+}.items():
+    os.environ.setdefault(key, value)
+
+LEGACY_CLAIM_SIZE = 10
+LEGACY_TICK_SECONDS = 30
+
+
+class FakeReminderStore:
+    """In-memory stand-in for the reminders table."""
+
+    def __init__(self, count):
+        self.rows = {
+            i: {"id": i, "phone_number": f"+1555{i:07d}", "reminder_text": f"Reminder {i}", "sent": False, "claimed": False}
+            for i in range(1, count + 1)
+        }
+        self.lock = threading.Lock()
+        self.update_statements = 0
+
+    def count_due(self):
+        return sum(1 for r in self.rows.values() if not r["sent"] and not r["claimed"])
+
+    def claim(self, batch_size=10):
+        with self.lock:
+            self.update_statements += 1
+            batch = []
+            for r in self.rows.values():
+                if not r["sent"] and not r["claimed"]:
+                    r["claimed"] = True
+                    batch.append({**{k: r[k] for k in ("id", "phone_number", "reminder_text")}, "claimed_at": "t0"})
+                    if len(batch) == batch_size:
+                        break
+            return batch
+
+    def renew(self, ids, claimed_at):
+        with self.lock:
+            self.update_statements += 1
+            return {i for i in ids if not self.rows[i]["sent"]}
+
+    def mark_sent(self, ids):
+        with self.lock:
+            self.update_statements += 1
+            for i in ids:
+                self.rows[i]["sent"] = True
+            return len(ids)
+
+    def release(self, ids, claimed_at):
+        with self.lock:
+            for i in ids:
+                self.rows[i]["claimed"] = False
+            return len(ids)
+
+
+class StubTwilio:
+    """Sleeps for a fixed latency per message, like a Twilio API round trip."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.sent = 0
+        self.lock = threading.Lock()
+
+    def send_sms(self, to_number, message, **kwargs):
+        time.sleep(self.latency)
+        with self.lock:
+            self.sent += 1
+
+
+def bench_legacy(count, latency, sample):
+    """Per-reminder sends, serial within a worker, capped at 10 claims per tick."""
+    store = FakeReminderStore(sample)
+    twilio = StubTwilio(latency)
+    start = time.perf_counter()
+    while True:
+        batch = store.claim(LEGACY_CLAIM_SIZE)
+        if not batch:
+            break
+        for reminder in batch:
+            twilio.send_sms(reminder["phone_number"], reminder["reminder_text"])
+            store.mark_sent([reminder["id"]])
+    elapsed = time.perf_counter() - start
+
+    per_reminder = elapsed / sample
+    ticks = -(-count // LEGACY_CLAIM_SIZE)
+    drain_seconds = max(ticks * LEGACY_TICK_SECONDS, count * per_reminder)
+    return {
+        "drain_seconds": drain_seconds,
+        "throughput_per_min": count / drain_seconds * 60,
+        "update_statements": count + ticks,
+    }
+
+
+def bench_batch(count, latency):
+    """Batch mode through the real dispatch and delivery code."""
+    import tasks.reminder_tasks as rt
+
+    store = FakeReminderStore(count)
+    twilio = StubTwilio(latency)
+    batches = []
+
+    class _Result:
+        id = "bench"
+
+    def fake_delay(reminders):
+        batches.append(reminders)
+        return _Result()
+
+    patches = [
+        patch.object(rt, "count_due_reminders", store.count_due),
+        patch.object(rt, "claim_due_reminders", store.claim),
+        patch.object(rt, "renew_reminder_claims", store.renew),
+        patch.object(rt, "mark_reminders_sent_bulk", store.mark_sent),
+        patch.object(rt, "release_reminder_claims", store.release),
+        patch.object(rt, "update_last_sent_reminders_bulk", lambda mapping: len(mapping)),
+        patch.object(rt, "track_reminder_delivery", lambda *a, **k: None),
+        patch.object(rt.send_reminder_batch, "delay", fake_delay),
+    ]
+    for p in patches:
+        p.start()
+    try:
+        ticks = 0
+        start = time.perf_counter()
+        while store.count_due():
+            ticks += 1
+            batches.clear()
+            rt.check_and_send_reminders()
+            # Batches run on separate workers in production; run them back to back here
+            for reminders in batches:
+                rt.deliver_reminder_batch(reminders, send_fn=twilio.send_sms)
+        elapsed = time.perf_counter() - start
+    finally:
+        for p in patches:
+            p.stop()
+
+    assert twilio.sent == count, f"sent {twilio.sent} of {count}"
+    return {
+        "drain_seconds": elapsed,
+        "throughput_per_min": count / elapsed * 60,
+        "update_statements": store.update_statements,
+        "ticks": ticks,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--reminders", type=int, default=10000)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="stub Twilio latency per message")
+    parser.add_argument("--legacy-sample", type=int, default=200, help="reminders to time on the legacy path")
+    args = parser.parse_args()
+
+    latency = args.latency_ms / 1000
+    print(f"Spike: {args.reminders} reminders due at once, Twilio latency {args.latency_ms:.0f}ms\n")
+
+    legacy = bench_legacy(args.reminders, latency, min(args.legacy_sample, args.reminders))
+    print("legacy (single mode)")
+    print(f"  drain time:        {legacy['drain_seconds']:10.1f}s (extrapolated)")
+    print(f"  throughput:        {legacy['throughput_per_min']:10.0f}/min")
+    print(f"  UPDATE statements: {legacy['update_statements']:10d}")
+
+    batch = bench_batch(args.reminders, latency)
+    print("batch mode")
+    print(f"  drain time:        {batch['drain_seconds']:10.1f}s ({batch['ticks']} ticks)")
+    print(f"  throughput:        {batch['throughput_per_min']:10.0f}/min")
+    print(f"  UPDATE statements: {batch['update_statements']:10d}")
+
+    print(f"\nspeedup: {legacy['drain_seconds'] / batch['drain_seconds']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
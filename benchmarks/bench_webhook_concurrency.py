@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+"""
+Webhook concurrency benchmark: N simultaneous /sms requests handled inline on
+the event loop (the old behavior) vs on worker threads (sms_reply today).
+
+Seeds N onboarded users in the configured database, then fires one keyword
+message per user at once and times the batch. --db-latency-ms adds a sleep
+to every cursor.execute on the pool's connections, standing in for the
+round trip to a remote database; with the handler inline every request
+waits for every other request's queries. Rate limiting is bypassed and the
+AI is never reached (keyword messages only). Needs a real PostgreSQL
+(DATABASE_URL).
+
+Usage:
+    DATABASE_URL=postgresql://... python benchmarks/bench_webhook_concurrency.py
+    python benchmarks/bench_webhook_concurrency.py --concurrency 1 10 40 --db-latency-ms 5 --repeat 5
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# config.py refuses to import without these
+for key, value in {
+    "TWILIO_ACCOUNT_SID": "bench_sid",
+    "TWILIO_AUTH_TOKEN": "bench_token",
+    "TWILIO_PHONE_NUMBER": "+15550000000",
+    "OPENAI_API_KEY": "sk-bench",
+    "DATABASE_URL": "postgresql://localhost/bench",
+}.items():
+    os.environ.setdefault(key, value)
+
+BENCH_PHONE_PREFIX = "+1555009"
+
+
+def bench_phones(count):
+    return [f"{BENCH_PHONE_PREFIX}{n:04d}" for n in range(count)]
+
+
+def use_slow_pool(latency_ms):
+    """Swap in a pool whose cursors sleep before every execute."""
+    import psycopg2.extensions
+    from psycopg2 import pool
+    import database
+
+    class SlowCursor(psycopg2.extensions.cursor):
+        def execute(self, query, vars=None):
+            time.sleep(latency_ms / 1000)
+            return super().execute(query, vars)
+
+    database._connection_pool = pool.ThreadedConnectionPool(
+        database.MIN_CONNECTIONS, database.MAX_CONNECTIONS, database.DATABASE_URL, cursor_factory=SlowCursor)
+
+
+def seed(phones):
+    from models.user import create_or_update_user
+    cleanup(phones)
+    for phone in phones:
+        create_or_update_user(phone, first_name="Bench", timezone="America/New_York", onboarding_complete=True)
+
+
+def cleanup(phones):
+    from database import get_db_connection, return_db_connection, flush_log_sink
+    flush_log_sink()
+    conn = get_db_connection()
+    try:
+        c = conn.cursor()
+        for table in ("logs", "user_usage", "users"):
+            c.execute(f"DELETE FROM {table} WHERE phone_number = ANY(%s)", (list(phones),))
+        conn.commit()
+    finally:
+        return_db_connection(conn)
+
+
+def fake_request(message, phone):
+    from fastapi import Request
+    request = AsyncMock(spec=Request)
+    request.headers = {}
+    request.url = "http://localhost:8000/sms"
+    request.form = AsyncMock(return_value={"Body": message, "From": phone})
+    request.client = MagicMock()
+    return request
+
+
+async def run_batch(phones, message, threaded):
+    import main
+
+    async def inline(phone):
+        return main._handle_sms(message, phone, time.time())
+
+    async def one(phone):
+        if threaded:
+            return await main.sms_reply(fake_request(message, phone), Body=message, From=phone)
+        return await inline(phone)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(phone) for phone in phones))
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 5, 10, 20, 40])
+    parser.add_argument("--db-latency-ms", type=float, default=2.0, help="sleep added to every query")
+    parser.add_argument("--message", default="HELP", help="keyword message each user sends")
+    parser.add_argument("--repeat", type=int, default=5, help="timed batches per case (median reported)")
+    args = parser.parse_args()
+
+    from database import init_db
+    init_db()
+    use_slow_pool(args.db_latency_ms)
+
+    phones = bench_phones(max(args.concurrency))
+    seed(phones)
+    print(f"{args.message!r}, {args.db_latency_ms} ms per query, median of {args.repeat} batches\n")
+    print(f"{'requests':>9} {'inline ms':>10} {'threaded ms':>12} {'speedup':>8}")
+    try:
+        with patch('main.check_rate_limit', return_value=True):
+            for concurrency in args.concurrency:
+                batch = phones[:concurrency]
+                timings = {}
+                for threaded in (False, True):
+                    asyncio.run(run_batch(batch, args.message, threaded))  # warm up
+                    timings[threaded] = statistics.median(
+                        asyncio.run(run_batch(batch, args.message, threaded)) for _ in range(args.repeat))
+                print(f"{concurrency:>9} {timings[False]:>10.1f} {timings[True]:>12.1f} "
+                      f"{timings[False] / timings[True]:>7.1f}x")
+    finally:
+        cleanup(phones)
+
+
+if __name__ == "__main__":
+    main()
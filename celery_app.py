@@ -6,6 +6,7 @@ Uses Upstash Redis as broker and result backend for production-grade task queue.
 import os
 import ssl
 from celery import Celery
+from celery.signals import worker_process_shutdown
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -18,7 +19,7 @@ celery_app = Celery(
     "sms_reminders",
     broker=REDIS_URL,
     backend=REDIS_URL,
-    include=["tasks.reminder_tasks", "tasks.monitoring_tasks", "tasks.twilio_tasks"],
+    include=["tasks.reminder_tasks", "tasks.monitoring_tasks", "tasks.twilio_tasks", "tasks.broadcast_tasks"],
 )
 
 # SSL configuration for Upstash (uses rediss:// protocol)
@@ -40,10 +41,13 @@ celery_app.conf.update(
     task_reject_on_worker_lost=True,  # Re-queue if worker dies
     worker_prefetch_multiplier=1,     # Fetch one task at a time
 
-    # Queue routing: monitoring tasks go to dedicated 'monitoring' queue
-    # All other tasks (reminders) stay on the default 'celery' queue
+    # Queue routing: monitoring tasks go to dedicated 'monitoring' queue,
+    # broadcast chunks (up to an hour each) to 'broadcast' so they never hold
+    # the reminder worker's slots. All other tasks (reminders) stay on the
+    # default 'celery' queue
     task_routes={
         "tasks.monitoring_tasks.*": {"queue": "monitoring"},
+        "tasks.broadcast_tasks.*": {"queue": "broadcast"},
     },
 
     # Result settings
@@ -66,3 +70,10 @@ if ssl_config:
 
 # Load beat schedule from celery_config
 celery_app.config_from_object("celery_config")
+
+
+@worker_process_shutdown.connect
+def drain_log_sink(**kwargs):
+    """Pool processes exit without running atexit, so write queued log rows here."""
+    from database import flush_log_sink
+    flush_log_sink()
@@ -6,6 +6,8 @@ Defines periodic tasks for reminder checking and monitoring.
 from datetime import timedelta
 from celery.schedules import crontab
 
+from config import REMINDER_SCHEDULER_ENABLED, REMINDER_CHECK_INTERVAL, REMINDER_RECOVERY_INTERVAL
+
 # Beat schedule - periodic tasks
 beat_schedule = {
     # ===========================================
@@ -23,10 +25,13 @@ beat_schedule = {
     # REMINDER TASKS
     # ===========================================
 
-    # Check for due reminders every 30 seconds
+    # Check for due reminders every 30 seconds. With the event-driven
+    # scheduler (scheduler.py) running this is only a recovery sweep.
     "check-reminders-every-30-seconds": {
         "task": "tasks.reminder_tasks.check_and_send_reminders",
-        "schedule": timedelta(seconds=30),
+        "schedule": timedelta(
+            seconds=REMINDER_RECOVERY_INTERVAL if REMINDER_SCHEDULER_ENABLED else REMINDER_CHECK_INTERVAL
+        ),
         "options": {
             "expires": 25,  # Task expires if not picked up in 25 seconds
         },
@@ -36,6 +41,30 @@ beat_schedule = {
         "task": "tasks.reminder_tasks.release_stale_claims_task",
         "schedule": timedelta(minutes=5),
     },
+    # Repair drift in the materialized tier-limit counters nightly
+    "reconcile-usage-counters": {
+        "task": "tasks.reminder_tasks.reconcile_usage_counters_task",
+        "schedule": crontab(hour=3, minute=30),  # 3:30 AM UTC
+        "options": {"expires": 3600},
+    },
+    # Roll dashboard metrics up into hourly/daily buckets
+    "rollup-metrics": {
+        "task": "tasks.reminder_tasks.rollup_metrics_task",
+        "schedule": timedelta(minutes=5),
+        "options": {"expires": 240},
+    },
+    "rebuild-daily-metrics": {
+        "task": "tasks.reminder_tasks.rollup_metrics_task",
+        "schedule": crontab(hour=3, minute=45),  # 3:45 AM UTC
+        "kwargs": {"rebuild_daily": True},
+        "options": {"expires": 3600},
+    },
+    # Re-queue broadcasts whose chunk tasks stopped making progress
+    "resume-stalled-broadcasts": {
+        "task": "tasks.broadcast_tasks.resume_stalled_broadcasts_task",
+        "schedule": timedelta(minutes=5),
+        "options": {"expires": 240},
+    },
     # Analyze conversations every 4 hours
     "analyze-conversations": {
         "task": "tasks.reminder_tasks.analyze_conversations_task",
@@ -219,7 +248,8 @@ beat_schedule = {
     },
 }
 
-# Note: Monitoring tasks are routed to the 'monitoring' queue via task_routes in celery_app.py.
+# Note: Monitoring tasks are routed to the 'monitoring' queue and broadcast tasks to the
+# 'broadcast' queue via task_routes in celery_app.py.
 # Reminder tasks remain on the default 'celery' queue.
 
 # Monitoring task schedule summary:
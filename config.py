@@ -63,13 +63,95 @@ OPENAI_MAX_TOKENS = 800
 # Reminder Configuration
 REMINDER_CHECK_INTERVAL = 30  # seconds (used by Celery Beat)
 
+# Reminder dispatch: 'batch' claims an adaptively sized batch and sends it
+# concurrently from one task; 'single' fans out one send_single_reminder task per reminder
+REMINDER_DISPATCH_MODE = os.environ.get("REMINDER_DISPATCH_MODE", "batch").lower()
+REMINDER_BATCH_MIN_SIZE = 10          # Batch size when the backlog is small
+REMINDER_BATCH_MAX_SIZE = 500         # Upper bound per batch task
+REMINDER_MAX_BATCHES_PER_TICK = 20    # Batch tasks dispatched per 30s check (10k reminders at max size)
+REMINDER_SEND_CONCURRENCY = int(os.environ.get("REMINDER_SEND_CONCURRENCY", "16"))  # Parallel Twilio requests per batch
+REMINDER_BATCH_SEND_DEADLINE = 180    # Seconds a batch may spend sending (inside send_reminder_batch's 240s soft limit)
+
+# Event-driven reminder scheduler (scheduler.py). Preloads upcoming reminders
+# into a timing wheel and hears about new/snoozed ones via LISTEN/NOTIFY.
+# When enabled, the Beat poll becomes a slower recovery sweep.
+REMINDER_SCHEDULER_ENABLED = os.environ.get("REMINDER_SCHEDULER_ENABLED", "false").lower() == "true"
+REMINDER_NOTIFY_CHANNEL = "reminders_scheduled"
+REMINDER_SCHEDULER_TICK_SECONDS = 0.25      # Timing wheel resolution
+REMINDER_SCHEDULER_LOOKAHEAD_MINUTES = 10   # How far ahead the wheel is preloaded
+REMINDER_SCHEDULER_REFILL_SECONDS = 60      # How often the lookahead window is reloaded
+REMINDER_RECOVERY_INTERVAL = 300            # Beat recovery sweep (seconds) while the scheduler runs
+
+# Settings cache (database.get_setting). Values are cached per process;
+# set_setting NOTIFYs SETTINGS_NOTIFY_CHANNEL and a listener thread in every
+# process drops the changed key. While the listener is disconnected the short
+# fallback TTL applies so admin toggles still land within a second or so.
+SETTINGS_CACHE_TTL = 60                # Seconds, with the listener connected
+SETTINGS_CACHE_FALLBACK_TTL = 1        # Seconds, without it
+SETTINGS_NOTIFY_CHANNEL = "settings_changed"
+SETTINGS_LISTENER_ENABLED = os.environ.get("SETTINGS_LISTENER_ENABLED", "true").lower() == "true"
+
+# Interaction/API-usage/confidence log sink (database.log_interaction etc.).
+# Rows are queued in memory and written by a background thread in multi-row
+# INSERTs; when the queue is full the caller writes its row directly.
+LOG_SINK_ENABLED = os.environ.get("LOG_SINK_ENABLED", "true").lower() == "true"
+LOG_SINK_BATCH_SIZE = 200          # Rows per INSERT
+LOG_SINK_FLUSH_INTERVAL = 1.0      # Seconds a row may wait for its batch to fill
+LOG_SINK_MAX_QUEUE = 10000         # Rows held in memory before callers write inline
+LOG_SINK_ENQUEUE_TIMEOUT = 0.05    # Seconds a caller waits for queue room first
+LOG_SINK_SHUTDOWN_TIMEOUT = 10     # Seconds allowed to drain the queue on exit
+
+# users.last_active_at / total_messages are accumulated per process and written
+# in one bulk UPDATE every ACTIVITY_FLUSH_INTERVAL seconds
+ACTIVITY_COALESCE_ENABLED = os.environ.get("ACTIVITY_COALESCE_ENABLED", "true").lower() == "true"
+ACTIVITY_FLUSH_INTERVAL = 5        # Seconds
+
 # Celery/Redis Configuration (Upstash)
 UPSTASH_REDIS_URL = os.environ.get("UPSTASH_REDIS_URL", "redis://localhost:6379/0")
 
+# Dashboard metrics rollups (services/metrics_rollup.py). A bucket is rolled
+# up this long after it ends so late log-sink writes land first; the first
+# run backfills history at most METRICS_ROLLUP_MAX_HOURS per run
+METRICS_ROLLUP_LAG_MINUTES = 5
+METRICS_ROLLUP_MAX_HOURS = 24 * 30
+
+# Interaction monitor (agents/interaction_monitor.py): rows per server-side
+# cursor fetch; logs younger than MONITOR_SETTLE_SECONDS wait for the next run
+# so log-sink batches still in flight aren't skipped by the watermark; per-phone
+# detector state idle for MONITOR_STATE_TTL_DAYS is dropped
+MONITOR_FETCH_SIZE = 1000
+MONITOR_SETTLE_SECONDS = 60
+MONITOR_STATE_TTL_DAYS = 7
+
+# Conversation analyzer (services/conversation_analyzer.py): conversations are
+# packed into batches up to an estimated prompt-token budget and analyzed
+# CONVERSATION_ANALYSIS_CONCURRENCY at a time. A run stops starting batches
+# after CONVERSATION_ANALYSIS_TIME_BUDGET seconds so it ends inside
+# analyze_conversations_task's 600s limit (budget plus one un-retried
+# CONVERSATION_ANALYSIS_TIMEOUT request); the rest waits for the next run
+CONVERSATION_ANALYSIS_MAX_LOGS = 2000        # Unanalyzed logs fetched per run
+CONVERSATION_ANALYSIS_BATCH_TOKENS = 6000    # Estimated prompt tokens per batch
+CONVERSATION_ANALYSIS_MAX_BATCH = 40         # Conversations per batch (bounds the flagged output)
+CONVERSATION_ANALYSIS_MAX_TOKENS = 2000      # Completion tokens per batch
+CONVERSATION_ANALYSIS_CONCURRENCY = 4
+CONVERSATION_ANALYSIS_TIMEOUT = 60           # Seconds per OpenAI request
+CONVERSATION_ANALYSIS_TIME_BUDGET = 480      # Seconds
+
 # Memory Configuration
 MAX_MEMORIES_TO_DISPLAY = 20
 MAX_MEMORIES_IN_CONTEXT = 10
 
+# AI prompt context cache: formatted memories/reminders/lists blocks per user,
+# invalidated by writes in this process and, for Celery's reminder writes, over
+# SETTINGS_NOTIFY_CHANNEL; the TTL bounds staleness while the listener is down
+PROMPT_CONTEXT_CACHE_TTL = 300          # Seconds
+PROMPT_CONTEXT_CACHE_MAX_USERS = 5000   # LRU bound on users held in memory
+
+# Search (models/search.py): memories, pending reminders and list items.
+# Substring/full-text matches win; pg_trgm word similarity at or above this
+# threshold only fills in when nothing matched exactly (typos)
+SEARCH_FUZZY_THRESHOLD = 0.5
+
 # Reminder Formatting
 MAX_COMPLETED_REMINDERS_DISPLAY = 5
 
@@ -77,6 +159,21 @@ MAX_COMPLETED_REMINDERS_DISPLAY = 5
 MAX_LISTS_PER_USER = 20
 MAX_ITEMS_PER_LIST = 40
 
+# Data export (services/export_service.py): rows per server-side cursor fetch,
+# and how much of a zip/email export is buffered in memory before spilling to disk
+EXPORT_FETCH_SIZE = 500
+EXPORT_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+# Broadcasts (services/broadcast_service.py): recipients are split into chunks
+# of BROADCAST_CHUNK_SIZE, each sent by one Celery task, at BROADCAST_SEND_RATE
+# messages per second for the whole account (a Redis limiter shared by every
+# worker when BROADCAST_RATE_BACKEND is 'redis'). A broadcast with no progress
+# for BROADCAST_STALL_SECONDS is resumed from its recorded per-recipient results
+BROADCAST_CHUNK_SIZE = 500
+BROADCAST_SEND_RATE = int(os.environ.get("BROADCAST_SEND_RATE", "10"))
+BROADCAST_RATE_BACKEND = os.environ.get("BROADCAST_RATE_BACKEND", "redis").lower()
+BROADCAST_STALL_SECONDS = 600
+
 # Admin Authentication
 ADMIN_USERNAME = os.environ.get("ADMIN_USERNAME", "admin")
 ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD")
@@ -89,6 +186,15 @@ CS_PASSWORD = os.environ.get("CS_PASSWORD", ADMIN_PASSWORD)
 # Rate Limiting
 RATE_LIMIT_MESSAGES = 15  # Max messages per window
 RATE_LIMIT_WINDOW = 60    # Window in seconds (1 minute)
+# 'memory' keeps limiter/dedup state per worker process; 'redis' shares it
+# across workers through UPSTASH_REDIS_URL (falls back to memory if Redis is down)
+RATE_LIMIT_BACKEND = os.environ.get("RATE_LIMIT_BACKEND", "memory").lower()
+RATE_LIMIT_MAX_KEYS = 10000   # LRU bound per in-process limiter/dedup store
+WEBHOOK_DEDUP_TTL = 600       # Seconds a Twilio MessageSid is remembered for retries
+# Redis limiter/dedup calls run inline on the webhook's event loop, so they
+# time out fast and, after a failure, skip Redis for REDIS_RETRY_AFTER
+REDIS_SOCKET_TIMEOUT = 0.2    # Seconds, connect and read
+REDIS_RETRY_AFTER = 30        # Seconds answered from memory after a Redis failure
 
 # Input Validation Limits
 MAX_LIST_NAME_LENGTH = 50
@@ -97,6 +203,42 @@ MAX_MESSAGE_LENGTH = 500
 
 # Request Timeout Configuration (in seconds)
 OPENAI_TIMEOUT = 12  # OpenAI API call timeout (must be < Twilio's 15s webhook timeout)
+
+# OpenAI request hedging: when the first completion is slower than the
+# OPENAI_HEDGE_PERCENTILE of recent latencies, send one identical request and
+# use whichever answers first. Costs a second completion on hedged requests only.
+OPENAI_HEDGE_ENABLED = os.environ.get("OPENAI_HEDGE_ENABLED", "false").lower() == "true"
+OPENAI_HEDGE_PERCENTILE = 0.95
+OPENAI_HEDGE_MIN_SAMPLES = 20   # Below this many samples, hedge at OPENAI_HEDGE_MAX_DELAY
+OPENAI_HEDGE_MIN_DELAY = 1.5    # Seconds - never hedge sooner than this
+OPENAI_HEDGE_MAX_DELAY = 5.0    # Seconds - leaves the hedge time to finish inside OPENAI_TIMEOUT
+OPENAI_MAX_CONNECTIONS = 50     # Shared async client connection pool size
+
+# Local intent parser (services/intent_parser.py): common reminder/list/memory
+# messages are answered without the AI when the local parse scores at least
+# FAST_PATH_MIN_CONFIDENCE; everything else goes to the AI as before.
+FAST_PATH_ENABLED = os.environ.get("FAST_PATH_ENABLED", "true").lower() == "true"
+FAST_PATH_MIN_CONFIDENCE = 90
+
+# AI result cache (services/ai_cache.py): AI parses are reused for later
+# messages with the same template ("remind me at «time» to «text»") from
+# users in the same timezone on the same weekday. Only the listed actions
+# are cached; parse_list_items splits are cached by exact text.
+AI_CACHE_ENABLED = os.environ.get("AI_CACHE_ENABLED", "true").lower() == "true"
+AI_CACHE_TTL = 6 * 3600         # Seconds
+AI_CACHE_MAX_ENTRIES = 10000    # LRU bound across all templates
+AI_CACHE_ACTIONS = tuple(
+    action.strip() for action in os.environ.get(
+        "AI_CACHE_ACTIONS", "reminder,reminder_relative,reminder_recurring,add_to_list,parse_list_items"
+    ).split(",") if action.strip()
+)
+
+# sms_reply handles each message on a worker thread from its own pool of
+# this size. It is separate from the default threadpool (plain-def routes,
+# run_in_threadpool) because those threads are what the handler waits on
+# while the AI call builds its prompt; sharing one pool could deadlock.
+SMS_WORKER_THREADS = 40
+
 REQUEST_TIMEOUT = 60  # Overall request timeout
 TWILIO_WEBHOOK_TIMEOUT = 14  # If processing exceeds this, send reply via direct SMS instead of TwiML
 
@@ -4,8 +4,7 @@ A standalone portal for CS reps to search customers and handle support tickets
 """
 
 import secrets
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Body, Depends, HTTPException, Request
 from fastapi.responses import HTMLResponse
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from database import get_db_connection, return_db_connection
@@ -45,7 +44,7 @@ def verify_cs_auth(credentials: HTTPBasicCredentials = Depends(security)):
 
 
 @router.get("/cs", response_class=HTMLResponse)
-async def cs_portal(request: Request, user: str = Depends(verify_cs_auth)):
+def cs_portal(request: Request, user: str = Depends(verify_cs_auth)):
     """Customer Service Portal main page"""
 
     # Get open ticket count for badge
@@ -1632,7 +1631,7 @@ async def cs_portal(request: Request, user: str = Depends(verify_cs_auth)):
 
 # API endpoint to get customer tickets
 @router.get("/cs/customer/{phone_number}/tickets")
-async def get_customer_tickets(phone_number: str, user: str = Depends(verify_cs_auth)):
+def get_customer_tickets(phone_number: str, user: str = Depends(verify_cs_auth)):
     """Get support tickets for a specific customer"""
     conn = None
     try:
@@ -1671,7 +1670,7 @@ async def get_customer_tickets(phone_number: str, user: str = Depends(verify_cs_
 # =====================================================
 
 @router.get("/cs/support/tickets")
-async def cs_get_all_tickets(
+def cs_get_all_tickets(
     include_closed: bool = False,
     category: str = None,
     source: str = None,
@@ -1684,7 +1683,7 @@ async def cs_get_all_tickets(
 
 
 @router.get("/cs/support/tickets/{ticket_id}/messages")
-async def cs_get_ticket_messages(ticket_id: int, user: str = Depends(verify_cs_auth)):
+def cs_get_ticket_messages(ticket_id: int, user: str = Depends(verify_cs_auth)):
     """Get messages for a specific ticket"""
     conn = None
     try:
@@ -1716,12 +1715,11 @@ async def cs_get_ticket_messages(ticket_id: int, user: str = Depends(verify_cs_a
 
 
 @router.post("/cs/support/tickets/{ticket_id}/reply")
-async def cs_reply_to_ticket(ticket_id: int, request: Request, user: str = Depends(verify_cs_auth)):
+def cs_reply_to_ticket(ticket_id: int, body: dict = Body(...), user: str = Depends(verify_cs_auth)):
     """Reply to a support ticket"""
     from services.support_service import reply_to_ticket
 
     try:
-        body = await request.json()
         message = body.get('message', '').strip()
 
         if not message:
@@ -1743,7 +1741,7 @@ async def cs_reply_to_ticket(ticket_id: int, request: Request, user: str = Depen
 
 
 @router.post("/cs/support/tickets/{ticket_id}/close")
-async def cs_close_ticket(ticket_id: int, user: str = Depends(verify_cs_auth)):
+def cs_close_ticket(ticket_id: int, user: str = Depends(verify_cs_auth)):
     """Close a support ticket"""
     from services.support_service import close_ticket
 
@@ -1762,7 +1760,7 @@ async def cs_close_ticket(ticket_id: int, user: str = Depends(verify_cs_auth)):
 
 
 @router.post("/cs/support/tickets/{ticket_id}/reopen")
-async def cs_reopen_ticket(ticket_id: int, user: str = Depends(verify_cs_auth)):
+def cs_reopen_ticket(ticket_id: int, user: str = Depends(verify_cs_auth)):
     """Reopen a support ticket"""
     from services.support_service import reopen_ticket
 
@@ -1785,7 +1783,7 @@ async def cs_reopen_ticket(ticket_id: int, user: str = Depends(verify_cs_auth)):
 # =====================================================
 
 @router.get("/cs/search")
-async def cs_search_customers(q: str = "", user: str = Depends(verify_cs_auth)):
+def cs_search_customers(q: str = "", user: str = Depends(verify_cs_auth)):
     """Search customers by phone number or name"""
     conn = None
     try:
@@ -1847,7 +1845,7 @@ async def cs_search_customers(q: str = "", user: str = Depends(verify_cs_auth)):
 
 
 @router.get("/cs/customer/{phone_number}")
-async def cs_get_customer(phone_number: str, user: str = Depends(verify_cs_auth)):
+def cs_get_customer(phone_number: str, user: str = Depends(verify_cs_auth)):
     """Get customer details"""
     conn = None
     try:
@@ -1896,7 +1894,7 @@ async def cs_get_customer(phone_number: str, user: str = Depends(verify_cs_auth)
 
 
 @router.get("/cs/customer/{phone_number}/reminders")
-async def cs_get_customer_reminders(phone_number: str, user: str = Depends(verify_cs_auth)):
+def cs_get_customer_reminders(phone_number: str, user: str = Depends(verify_cs_auth)):
     """Get customer reminders"""
     conn = None
     try:
@@ -1929,7 +1927,7 @@ async def cs_get_customer_reminders(phone_number: str, user: str = Depends(verif
 
 
 @router.get("/cs/customer/{phone_number}/lists")
-async def cs_get_customer_lists(phone_number: str, user: str = Depends(verify_cs_auth)):
+def cs_get_customer_lists(phone_number: str, user: str = Depends(verify_cs_auth)):
     """Get customer lists with items"""
     conn = None
     try:
@@ -1968,7 +1966,7 @@ async def cs_get_customer_lists(phone_number: str, user: str = Depends(verify_cs
 
 
 @router.get("/cs/customer/{phone_number}/memories")
-async def cs_get_customer_memories(phone_number: str, user: str = Depends(verify_cs_auth)):
+def cs_get_customer_memories(phone_number: str, user: str = Depends(verify_cs_auth)):
     """Get customer memories"""
     conn = None
     try:
@@ -1998,11 +1996,10 @@ async def cs_get_customer_memories(phone_number: str, user: str = Depends(verify
 
 
 @router.post("/cs/customer/{phone_number}/tier")
-async def cs_update_customer_tier(phone_number: str, request: Request, user: str = Depends(verify_cs_auth)):
+def cs_update_customer_tier(phone_number: str, body: dict = Body(...), user: str = Depends(verify_cs_auth)):
     """Update customer subscription tier"""
     conn = None
     try:
-        body = await request.json()
         new_tier = body.get('tier', 'free')
 
         if new_tier not in ['free', 'premium', 'family']:
@@ -2029,11 +2026,10 @@ async def cs_update_customer_tier(phone_number: str, request: Request, user: str
 
 
 @router.post("/cs/customer/{phone_number}/notes")
-async def cs_add_customer_note(phone_number: str, request: Request, user: str = Depends(verify_cs_auth)):
+def cs_add_customer_note(phone_number: str, body: dict = Body(...), user: str = Depends(verify_cs_auth)):
     """Add a note to customer record"""
     conn = None
     try:
-        body = await request.json()
         note = body.get('note', '').strip()
 
         if not note:
@@ -2061,7 +2057,7 @@ async def cs_add_customer_note(phone_number: str, request: Request, user: str =
 
 
 @router.post("/cs/customer/{phone_number}/clear-pending")
-async def cs_clear_pending_states(phone_number: str, user: str = Depends(verify_cs_auth)):
+def cs_clear_pending_states(phone_number: str, user: str = Depends(verify_cs_auth)):
     """Clear all pending states for a customer (fixes stuck confirmation loops)"""
     conn = None
     try:
@@ -2099,7 +2095,7 @@ async def cs_clear_pending_states(phone_number: str, user: str = Depends(verify_
 # =====================================================
 
 @router.get("/cs/feedback")
-async def cs_get_feedback(include_resolved: bool = False, user: str = Depends(verify_cs_auth)):
+def cs_get_feedback(include_resolved: bool = False, user: str = Depends(verify_cs_auth)):
     """Get feedback entries from legacy feedback table"""
     conn = None
     try:
@@ -2145,7 +2141,7 @@ async def cs_get_feedback(include_resolved: bool = False, user: str = Depends(ve
 
 
 @router.post("/cs/feedback/{feedback_id}/resolve")
-async def cs_resolve_feedback(feedback_id: int, user: str = Depends(verify_cs_auth)):
+def cs_resolve_feedback(feedback_id: int, user: str = Depends(verify_cs_auth)):
     """Mark a feedback entry as resolved"""
     conn = None
     try:
@@ -2168,7 +2164,7 @@ async def cs_resolve_feedback(feedback_id: int, user: str = Depends(verify_cs_au
 # =====================================================
 
 @router.post("/cs/support/tickets/{ticket_id}/assign")
-async def cs_assign_ticket(ticket_id: int, request: Request, user: str = Depends(verify_cs_auth)):
+def cs_assign_ticket(ticket_id: int, request: Request, user: str = Depends(verify_cs_auth)):
     """Assign a ticket to the current CS rep"""
     from services.support_service import assign_ticket
 
@@ -2191,7 +2187,7 @@ async def cs_assign_ticket(ticket_id: int, request: Request, user: str = Depends
 # =====================================================
 
 @router.get("/cs/contact-messages")
-async def cs_get_contact_messages(category: str = None, include_resolved: bool = False, user: str = Depends(verify_cs_auth)):
+def cs_get_contact_messages(category: str = None, include_resolved: bool = False, user: str = Depends(verify_cs_auth)):
     """Get contact messages (feedback, bug reports, questions)"""
     from services.support_service import get_contact_messages
     messages = get_contact_messages(category_filter=category, include_resolved=include_resolved)
@@ -2199,7 +2195,7 @@ async def cs_get_contact_messages(category: str = None, include_resolved: bool =
 
 
 @router.post("/cs/contact-messages/{message_id}/toggle")
-async def cs_toggle_contact_message(message_id: int, user: str = Depends(verify_cs_auth)):
+def cs_toggle_contact_message(message_id: int, user: str = Depends(verify_cs_auth)):
     """Toggle resolved status of a contact message"""
     from services.support_service import toggle_contact_message_resolved
     success = toggle_contact_message_resolved(message_id)
@@ -2213,7 +2209,7 @@ async def cs_toggle_contact_message(message_id: int, user: str = Depends(verify_
 # =====================================================
 
 @router.get("/cs/support/sla")
-async def cs_get_sla_info(user: str = Depends(verify_cs_auth)):
+def cs_get_sla_info(user: str = Depends(verify_cs_auth)):
     """Get SLA metrics for the ticket dashboard"""
     from services.support_service import get_ticket_sla_info
     return get_ticket_sla_info()
@@ -2224,7 +2220,7 @@ async def cs_get_sla_info(user: str = Depends(verify_cs_auth)):
 # =====================================================
 
 @router.get("/cs/canned-responses")
-async def cs_get_canned_responses(user: str = Depends(verify_cs_auth)):
+def cs_get_canned_responses(user: str = Depends(verify_cs_auth)):
     """Get all canned responses"""
     conn = None
     try:
@@ -2279,11 +2275,10 @@ async def cs_get_canned_responses(user: str = Depends(verify_cs_auth)):
 
 
 @router.post("/cs/canned-responses")
-async def cs_create_canned_response(request: Request, user: str = Depends(verify_cs_auth)):
+def cs_create_canned_response(body: dict = Body(...), user: str = Depends(verify_cs_auth)):
     """Create a new canned response"""
     conn = None
     try:
-        body = await request.json()
         title = body.get('title', '').strip()
         message = body.get('message', '').strip()
         category = body.get('category', 'general')
@@ -2313,7 +2308,7 @@ async def cs_create_canned_response(request: Request, user: str = Depends(verify
 
 
 @router.delete("/cs/canned-responses/{response_id}")
-async def cs_delete_canned_response(response_id: int, user: str = Depends(verify_cs_auth)):
+def cs_delete_canned_response(response_id: int, user: str = Depends(verify_cs_auth)):
     """Delete a canned response"""
     conn = None
     try:
@@ -2336,75 +2331,28 @@ async def cs_delete_canned_response(response_id: int, user: str = Depends(verify
 # =====================================================
 
 @router.get("/cs/customer/{phone_number}/export")
-async def cs_export_customer_data(phone_number: str, user: str = Depends(verify_cs_auth)):
-    """Export all customer data as JSON"""
-    from fastapi.responses import JSONResponse
-    conn = None
+async def cs_export_customer_data(phone_number: str, format: str = "json", user: str = Depends(verify_cs_auth)):
+    """Export all customer data, streamed (format: json, ndjson or zip of CSVs)"""
+    from fastapi.responses import StreamingResponse
+    from starlette.concurrency import run_in_threadpool
+    from services.export_service import stream_user_export, EXPORT_FORMATS
+
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
     try:
-        conn = get_db_connection()
-        c = conn.cursor()
-
-        # User profile
-        c.execute("""
-            SELECT phone_number, first_name, last_name, email, zip_code, timezone,
-                   onboarding_complete, premium_status, created_at, last_active_at
-            FROM users WHERE phone_number = %s
-        """, (phone_number,))
-        user_row = c.fetchone()
-        if not user_row:
-            raise HTTPException(status_code=404, detail="Customer not found")
-
-        profile = {
-            'phone_number': user_row[0], 'first_name': user_row[1], 'last_name': user_row[2],
-            'email': user_row[3], 'zip_code': user_row[4], 'timezone': user_row[5],
-            'onboarding_complete': user_row[6], 'premium_status': user_row[7],
-            'created_at': user_row[8].isoformat() if user_row[8] else None,
-            'last_active_at': user_row[9].isoformat() if user_row[9] else None
-        }
-
-        # Reminders
-        c.execute("SELECT id, reminder_text, reminder_date, sent, created_at FROM reminders WHERE phone_number = %s ORDER BY created_at DESC", (phone_number,))
-        reminders = [{'id': r[0], 'text': r[1], 'date': r[2].isoformat() if r[2] else None, 'sent': r[3], 'created_at': r[4].isoformat() if r[4] else None} for r in c.fetchall()]
-
-        # Recurring reminders
-        c.execute("SELECT id, reminder_text, recurrence_type, recurrence_day, reminder_time, timezone, active, created_at FROM recurring_reminders WHERE phone_number = %s", (phone_number,))
-        recurring = [{'id': r[0], 'text': r[1], 'type': r[2], 'day': r[3], 'time': str(r[4]), 'timezone': r[5], 'active': r[6], 'created_at': r[7].isoformat() if r[7] else None} for r in c.fetchall()]
-
-        # Memories
-        c.execute("SELECT id, memory_text, created_at FROM memories WHERE phone_number = %s ORDER BY created_at DESC", (phone_number,))
-        memories = [{'id': r[0], 'text': r[1], 'created_at': r[2].isoformat() if r[2] else None} for r in c.fetchall()]
-
-        # Lists and items
-        c.execute("SELECT id, list_name, created_at FROM lists WHERE phone_number = %s ORDER BY created_at", (phone_number,))
-        lists_data = []
-        for lst in c.fetchall():
-            c.execute("SELECT id, item_text, completed, created_at FROM list_items WHERE list_id = %s ORDER BY created_at", (lst[0],))
-            items = [{'id': i[0], 'text': i[1], 'completed': i[2], 'created_at': i[3].isoformat() if i[3] else None} for i in c.fetchall()]
-            lists_data.append({'id': lst[0], 'name': lst[1], 'created_at': lst[2].isoformat() if lst[2] else None, 'items': items})
-
-        export_data = {
-            'exported_at': datetime.utcnow().isoformat() + 'Z',
-            'exported_by': user,
-            'profile': profile,
-            'reminders': reminders,
-            'recurring_reminders': recurring,
-            'memories': memories,
-            'lists': lists_data
-        }
-
-        logger.info(f"Data export for {phone_number[-4:]} by {user}")
-        return JSONResponse(
-            content=export_data,
-            headers={"Content-Disposition": f"attachment; filename=remyndrs-export-{phone_number[-4:]}.json"}
-        )
-    except HTTPException:
-        raise
+        chunks = await run_in_threadpool(stream_user_export, phone_number, format, user)
     except Exception as e:
         logger.error(f"Error exporting customer data: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
-    finally:
-        if conn:
-            return_db_connection(conn)
+    if chunks is None:
+        raise HTTPException(status_code=404, detail="Customer not found")
+
+    logger.info(f"Data export ({format}) for {phone_number[-4:]} by {user}")
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f"attachment; filename=remyndrs-export-{phone_number[-4:]}.{format}"}
+    )
 
 
 # =====================================================
@@ -2412,12 +2360,12 @@ async def cs_export_customer_data(phone_number: str, user: str = Depends(verify_
 # =====================================================
 
 @router.post("/cs/customer/{phone_number}/refund")
-async def cs_issue_refund(phone_number: str, request: Request, user: str = Depends(verify_cs_auth)):
+def cs_issue_refund(phone_number: str, body: dict = Body(...), user: str = Depends(verify_cs_auth)):
     """Issue a refund for a Stripe subscriber"""
     from services.stripe_service import issue_refund
 
+    conn = None
     try:
-        body = await request.json()
         amount_cents = body.get('amount_cents')
         reason = body.get('reason', 'requested_by_customer')
 
@@ -2433,7 +2381,6 @@ async def cs_issue_refund(phone_number: str, request: Request, user: str = Depen
                 (phone_number, f"[REFUND] Issued refund of {amount_str}. Reason: {reason}", user)
             )
             conn.commit()
-            return_db_connection(conn)
 
             logger.info(f"Refund issued for {phone_number[-4:]} by {user}")
             return {'success': True, 'refund_id': result.get('refund_id')}
@@ -2444,3 +2391,6 @@ async def cs_issue_refund(phone_number: str, request: Request, user: str = Depen
     except Exception as e:
         logger.error(f"Error issuing refund: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
+    finally:
+        if conn:
+            return_db_connection(conn)
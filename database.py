@@ -3,17 +3,42 @@ Database Module
 Handles database initialization and connection management for PostgreSQL
 """
 
+import atexit
+import json
+import os
+import select
+import threading
+import time
+import uuid
 import psycopg2
+import psycopg2.extensions
 from psycopg2 import pool
+from psycopg2.extras import execute_values
 from contextlib import contextmanager
+from datetime import datetime
 from config import DATABASE_URL, MONITORING_DATABASE_URL, ENCRYPTION_ENABLED, logger
+from config import (
+    SETTINGS_CACHE_TTL, SETTINGS_CACHE_FALLBACK_TTL, SETTINGS_NOTIFY_CHANNEL, SETTINGS_LISTENER_ENABLED,
+    LOG_SINK_ENABLED, LOG_SINK_BATCH_SIZE, LOG_SINK_FLUSH_INTERVAL, LOG_SINK_MAX_QUEUE,
+    LOG_SINK_ENQUEUE_TIMEOUT, LOG_SINK_SHUTDOWN_TIMEOUT,
+)
+from utils.log_sink import BatchedLogSink
 
 # Connection pool settings
-MIN_CONNECTIONS = 2
 MAX_CONNECTIONS = 10
+# psycopg2 closes any connection handed back while `minconn` are already
+# idle, so with minconn below maxconn concurrent handler threads reconnect
+# (holding the pool lock) on most checkouts. Keep the pool full instead.
+MIN_CONNECTIONS = MAX_CONNECTIONS
+CONNECTION_WAIT_TIMEOUT = 10  # Seconds a caller waits for a free connection before PoolError
 
 # Initialize connection pool
 _connection_pool = None
+_pool_init_lock = threading.Lock()
+# Request handlers run on worker threads, so more callers than connections
+# can be in flight; they wait here for a returned connection instead of
+# getting "pool exhausted" straight away
+_connection_returned = threading.Condition()
 
 
 def init_connection_pool():
@@ -32,11 +57,24 @@ def init_connection_pool():
 
 
 def get_db_connection():
-    """Get a database connection from the pool"""
+    """Get a database connection from the pool, waiting up to CONNECTION_WAIT_TIMEOUT for one to free up"""
     global _connection_pool
     if _connection_pool is None:
-        init_connection_pool()
-    return _connection_pool.getconn()
+        with _pool_init_lock:
+            if _connection_pool is None:
+                init_connection_pool()
+    deadline = None
+    with _connection_returned:
+        while True:
+            try:
+                return _connection_pool.getconn()
+            except pool.PoolError:
+                if deadline is None:
+                    deadline = time.monotonic() + CONNECTION_WAIT_TIMEOUT
+                remaining = deadline - time.monotonic()
+                if _connection_pool.closed or remaining <= 0:
+                    raise
+                _connection_returned.wait(remaining)
 
 
 def return_db_connection(conn):
@@ -47,7 +85,9 @@ def return_db_connection(conn):
             conn.rollback()
         except Exception:
             pass
-        _connection_pool.putconn(conn)
+        with _connection_returned:
+            _connection_pool.putconn(conn)
+            _connection_returned.notify()
 
 
 @contextmanager
@@ -128,6 +168,27 @@ def get_monitoring_cursor():
             return_monitoring_connection(conn)
 
 
+# Substring/typo search indexes (models/search.py); only built when pg_trgm is available
+_TRIGRAM_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_memories_trgm ON memories USING GIN (lower(memory_text) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_reminders_trgm ON reminders USING GIN (lower(reminder_text) gin_trgm_ops) WHERE sent = FALSE",
+    "CREATE INDEX IF NOT EXISTS idx_list_items_trgm ON list_items USING GIN (lower(item_text) gin_trgm_ops)",
+]
+
+
+def _enable_trigram_search(c):
+    """Install pg_trgm and its indexes if the server has it, without aborting init_db's transaction."""
+    c.execute("SAVEPOINT trigram_search")
+    try:
+        c.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for index_migration in _TRIGRAM_INDEXES:
+            c.execute(index_migration)
+        c.execute("RELEASE SAVEPOINT trigram_search")
+    except Exception as e:
+        c.execute("ROLLBACK TO SAVEPOINT trigram_search")
+        logger.warning(f"pg_trgm unavailable, search runs without typo tolerance: {e}")
+
+
 def init_db():
     """Initialize all database tables"""
     try:
@@ -600,6 +661,76 @@ def init_db():
             # Backfill NULLs to FALSE
             "UPDATE users SET day_4_email_sent = FALSE WHERE day_4_email_sent IS NULL",
             "UPDATE users SET awaiting_email_collection = FALSE WHERE awaiting_email_collection IS NULL",
+            # Due-user buckets: daily summary / smart nudge time as UTC minute-of-day.
+            # schedule_utc_offset is the offset (minutes) the buckets were computed with;
+            # NULL means stale, refreshed by refresh_schedule_buckets()
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS daily_summary_utc_minute SMALLINT",
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS smart_nudge_utc_minute SMALLINT",
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS schedule_utc_offset SMALLINT",
+            # Recurring occurrences: one reminder per (recurring_id, occurrence_date)
+            "ALTER TABLE reminders ADD COLUMN IF NOT EXISTS occurrence_date DATE",
+            # Backfill existing occurrences (UTC date, oldest row wins) before the unique index is built
+            """UPDATE reminders r SET occurrence_date = DATE(r.reminder_date)
+               WHERE r.recurring_id IS NOT NULL AND r.occurrence_date IS NULL
+                 AND r.id = (SELECT MIN(r2.id) FROM reminders r2
+                             WHERE r2.recurring_id = r.recurring_id AND DATE(r2.reminder_date) = DATE(r.reminder_date))
+                 AND NOT EXISTS (SELECT 1 FROM reminders r3
+                                 WHERE r3.recurring_id = r.recurring_id AND r3.occurrence_date = DATE(r.reminder_date))""",
+            # Materialized usage counters for tier limit checks (models/usage.py).
+            # Rows are created on first read and kept in step by the models' write paths.
+            """CREATE TABLE IF NOT EXISTS user_usage (
+                phone_number TEXT PRIMARY KEY,
+                memories INTEGER NOT NULL DEFAULT 0,
+                lists INTEGER NOT NULL DEFAULT 0,
+                recurring_active INTEGER NOT NULL DEFAULT 0,
+                reminders_today INTEGER NOT NULL DEFAULT 0,
+                reminders_day DATE,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )""",
+            # Per-list item count; NULL means not yet counted
+            "ALTER TABLE lists ADD COLUMN IF NOT EXISTS item_count INTEGER",
+            """UPDATE lists l SET item_count = (SELECT COUNT(*) FROM list_items li WHERE li.list_id = l.id)
+               WHERE l.item_count IS NULL""",
+            # Memory dedup keyword signature (models/memory.py _keyword_signature);
+            # NULL rows are filled per user on their next save_memory
+            "ALTER TABLE memories ADD COLUMN IF NOT EXISTS keywords TEXT[]",
+            # Blind keyword index for search with encryption on (models/search.py);
+            # NULL rows are filled per user on their next search
+            "ALTER TABLE memories ADD COLUMN IF NOT EXISTS search_tokens TEXT[]",
+            "ALTER TABLE reminders ADD COLUMN IF NOT EXISTS search_tokens TEXT[]",
+            "ALTER TABLE list_items ADD COLUMN IF NOT EXISTS search_tokens TEXT[]",
+            # Dashboard metrics rollups (services/metrics_rollup.py)
+            """CREATE TABLE IF NOT EXISTS metrics_hourly (
+                bucket TIMESTAMP NOT NULL,
+                plan TEXT NOT NULL,
+                messages INTEGER NOT NULL DEFAULT 0,
+                prompt_tokens BIGINT NOT NULL DEFAULT 0,
+                completion_tokens BIGINT NOT NULL DEFAULT 0,
+                PRIMARY KEY (bucket, plan)
+            )""",
+            """CREATE TABLE IF NOT EXISTS metrics_daily (
+                day DATE NOT NULL,
+                metric TEXT NOT NULL,
+                value BIGINT NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, metric)
+            )""",
+            """CREATE TABLE IF NOT EXISTS metrics_rollup_state (
+                name TEXT PRIMARY KEY,
+                watermark TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )""",
+            # Broadcast engine (services/broadcast_service.py): per-recipient results and progress
+            "ALTER TABLE broadcast_logs ADD COLUMN IF NOT EXISTS scheduled_broadcast_id INTEGER",
+            "ALTER TABLE broadcast_logs ADD COLUMN IF NOT EXISTS progress_at TIMESTAMP",
+            """CREATE TABLE IF NOT EXISTS broadcast_recipients (
+                broadcast_id INTEGER NOT NULL REFERENCES broadcast_logs(id) ON DELETE CASCADE,
+                phone_number TEXT NOT NULL,
+                chunk INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                error TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (broadcast_id, phone_number)
+            )""",
         ]
 
         # Create indexes on phone_hash columns for efficient lookups
@@ -619,6 +750,7 @@ def init_db():
             "CREATE INDEX IF NOT EXISTS idx_recurring_reminders_phone ON recurring_reminders(phone_number)",
             "CREATE INDEX IF NOT EXISTS idx_recurring_reminders_active ON recurring_reminders(active, next_occurrence) WHERE active = TRUE",
             "CREATE INDEX IF NOT EXISTS idx_reminders_recurring_id ON reminders(recurring_id) WHERE recurring_id IS NOT NULL",
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_reminders_recurring_occurrence ON reminders(recurring_id, occurrence_date) WHERE occurrence_date IS NOT NULL",
             # Daily summary: index for efficient querying of users who need summary
             "CREATE INDEX IF NOT EXISTS idx_users_daily_summary ON users(daily_summary_enabled) WHERE daily_summary_enabled = TRUE",
             # Onboarding recovery: index for finding abandoned signups
@@ -628,6 +760,28 @@ def init_db():
             "CREATE INDEX IF NOT EXISTS idx_smart_nudges_phone ON smart_nudges(phone_number, sent_at)",
             # Twilio costs: index for date-range queries
             "CREATE INDEX IF NOT EXISTS idx_twilio_costs_date ON twilio_costs(cost_date)",
+            # Due-user buckets: per-minute daily summary / smart nudge lookups
+            "CREATE INDEX IF NOT EXISTS idx_users_daily_summary_bucket ON users(daily_summary_utc_minute) WHERE daily_summary_enabled = TRUE",
+            "CREATE INDEX IF NOT EXISTS idx_users_smart_nudge_bucket ON users(smart_nudge_utc_minute) WHERE smart_nudges_enabled = TRUE",
+            "CREATE INDEX IF NOT EXISTS idx_users_schedule_stale ON users(timezone) WHERE schedule_utc_offset IS NULL",
+            # Memory dedup: candidate lookup by shared keyword
+            "CREATE INDEX IF NOT EXISTS idx_memories_phone ON memories(phone_number)",
+            "CREATE INDEX IF NOT EXISTS idx_memories_keywords ON memories USING GIN (keywords)",
+            # Search: full-text and blind keyword indexes (trigram indexes need pg_trgm, see below)
+            "CREATE INDEX IF NOT EXISTS idx_memories_fts ON memories USING GIN (to_tsvector('english', memory_text))",
+            "CREATE INDEX IF NOT EXISTS idx_reminders_fts ON reminders USING GIN (to_tsvector('english', reminder_text)) WHERE sent = FALSE",
+            "CREATE INDEX IF NOT EXISTS idx_list_items_fts ON list_items USING GIN (to_tsvector('english', item_text))",
+            "CREATE INDEX IF NOT EXISTS idx_memories_search_tokens ON memories USING GIN (search_tokens)",
+            "CREATE INDEX IF NOT EXISTS idx_reminders_search_tokens ON reminders USING GIN (search_tokens) WHERE sent = FALSE",
+            "CREATE INDEX IF NOT EXISTS idx_list_items_search_tokens ON list_items USING GIN (search_tokens)",
+            # Metrics rollups: range scans by created_at for each bucket and the live edges
+            "CREATE INDEX IF NOT EXISTS idx_logs_created_at ON logs(created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_api_usage_created_at ON api_usage(created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_memories_created_at ON memories(created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_reminders_created_at ON reminders(created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_lists_created_at ON lists(created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_list_items_created_at ON list_items(created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_broadcast_recipients_open ON broadcast_recipients(broadcast_id, chunk) WHERE status IN ('pending', 'sending')",
         ]
 
         for migration in migrations:
@@ -650,6 +804,8 @@ def init_db():
                 else:
                     logger.error(f"Unexpected index migration error: {index_migration[:80]}... — {e}")
 
+        _enable_trigram_search(c)
+
         conn.commit()
         return_db_connection(conn)
         logger.info("Database initialized successfully")
@@ -657,66 +813,232 @@ def init_db():
         logger.error(f"Database initialization failed: {e}")
         raise
 
-def log_interaction(phone_number, message_in, message_out, intent, success):
-    """Log an interaction to the database with optional encryption"""
+# =====================================================
+# INTERACTION LOGGING (batched)
+# =====================================================
+# log_interaction, log_api_usage and log_confidence run on every message, so
+# their rows are queued and written by a background thread in multi-row
+# INSERTs instead of one pooled connection + commit each. created_at is taken
+# when the row is queued, not when the batch lands. Call flush_log_sink()
+# before reading back or deleting a user's rows.
+
+_LOG_INSERTS = {
+    'logs': 'INSERT INTO logs (phone_number, message_in, message_out, intent, success, created_at) VALUES %s',
+    'logs_encrypted': '''INSERT INTO logs (phone_number, message_in, message_out, intent, success, created_at,
+                         phone_hash, message_in_encrypted, message_out_encrypted) VALUES %s''',
+    'api_usage': '''INSERT INTO api_usage (phone_number, request_type, prompt_tokens, completion_tokens,
+                    total_tokens, model, created_at) VALUES %s''',
+    'confidence_logs': '''INSERT INTO confidence_logs (phone_number, action_type, confidence_score, threshold,
+                          confirmed, user_message, created_at) VALUES %s''',
+}
+
+
+def _write_log_batch(records):
+    """Write queued (table, row) records, one multi-row INSERT per table, in a single transaction."""
+    rows_by_table = {}
+    for table, row in records:
+        if table == 'logs' and ENCRYPTION_ENABLED:
+            # Encrypt here so the AES work stays off the request path too
+            from utils.encryption import encrypt_field, hash_phone
+            phone_number, message_in, message_out = row[0], row[1], row[2]
+            table = 'logs_encrypted'
+            row = row + (hash_phone(phone_number), encrypt_field(message_in), encrypt_field(message_out))
+        rows_by_table.setdefault(table, []).append(row)
+
     conn = None
     try:
         conn = get_db_connection()
         c = conn.cursor()
-
-        if ENCRYPTION_ENABLED:
-            from utils.encryption import encrypt_field, hash_phone
-            phone_hash = hash_phone(phone_number)
-            msg_in_encrypted = encrypt_field(message_in)
-            msg_out_encrypted = encrypt_field(message_out)
-            c.execute(
-                '''INSERT INTO logs (phone_number, phone_hash, message_in, message_out,
-                   message_in_encrypted, message_out_encrypted, intent, success)
-                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s)''',
-                (phone_number, phone_hash, message_in, message_out,
-                 msg_in_encrypted, msg_out_encrypted, intent, success)
-            )
-        else:
-            c.execute(
-                'INSERT INTO logs (phone_number, message_in, message_out, intent, success) VALUES (%s, %s, %s, %s, %s)',
-                (phone_number, message_in, message_out, intent, success)
-            )
+        for table, rows in rows_by_table.items():
+            execute_values(c, _LOG_INSERTS[table], rows, page_size=LOG_SINK_BATCH_SIZE)
         conn.commit()
-    except Exception as e:
-        logger.error(f"Error logging interaction: {e}")
+    except Exception:
+        if conn:
+            conn.rollback()
+        raise
     finally:
         if conn:
             return_db_connection(conn)
 
 
+_log_sink = BatchedLogSink(
+    _write_log_batch, name="interaction log",
+    batch_size=LOG_SINK_BATCH_SIZE, flush_interval=LOG_SINK_FLUSH_INTERVAL,
+    max_queue=LOG_SINK_MAX_QUEUE, enqueue_timeout=LOG_SINK_ENQUEUE_TIMEOUT,
+)
+
+
+def _submit_log(table, row):
+    record = (table, row + (datetime.utcnow(),))
+    if LOG_SINK_ENABLED:
+        _log_sink.submit(record)
+    else:
+        _log_sink.write_now(record)
+
+
+def flush_log_sink(timeout=LOG_SINK_SHUTDOWN_TIMEOUT):
+    """Write every queued log row now. Returns False if the queue didn't drain within timeout."""
+    return _log_sink.flush(timeout)
+
+
+def get_log_sink_stats():
+    """Counters for the admin dashboard: queued, written, batches, direct_writes, failed, pending."""
+    return _log_sink.stats()
+
+
+# Drain on interpreter exit; Celery pool processes skip atexit and call flush_log_sink themselves
+atexit.register(flush_log_sink)
+
+
+def log_interaction(phone_number, message_in, message_out, intent, success):
+    """Log an interaction to the database with optional encryption"""
+    _submit_log('logs', (phone_number, message_in, message_out, intent, success))
+
+
 def log_api_usage(phone_number, request_type, prompt_tokens, completion_tokens, total_tokens, model):
     """Log API token usage for cost tracking"""
-    conn = None
+    _submit_log('api_usage', (phone_number, request_type, prompt_tokens, completion_tokens, total_tokens, model))
+
+
+# =====================================================
+# SETTINGS (cached per process)
+# =====================================================
+# get_setting runs on the /sms hot path (staging fallback, maintenance
+# message, confidence threshold), so values are cached in memory. set_setting
+# updates the local copy and NOTIFYs SETTINGS_NOTIFY_CHANNEL in the same
+# transaction; a daemon listener thread in every process drops the changed key
+# when the notification arrives. Prompt context invalidations from Celery
+# share the channel and listener.
+
+_MISSING = object()
+_settings_cache = {}  # key -> (value or _MISSING, monotonic time fetched)
+_settings_lock = threading.Lock()
+_settings_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+_settings_listener = {'pid': None, 'connected': False}
+# Identifies this process in NOTIFY payloads; its own set_setting already updated the cache
+_SETTINGS_ORIGIN = uuid.uuid4().hex
+# Bumped on every invalidation so a read that raced one doesn't cache the old value
+_settings_generation = [0]
+
+
+def _settings_ttl():
+    """Full TTL while the listener is connected, a short one while it isn't."""
+    return SETTINGS_CACHE_TTL if _settings_listener['connected'] else SETTINGS_CACHE_FALLBACK_TTL
+
+
+def _settings_listener_loop():
+    """LISTEN for setting changes and drop them from this process's cache. Reconnects forever."""
+    while True:
+        conn = None
+        try:
+            conn = psycopg2.connect(DATABASE_URL)
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            conn.cursor().execute(f"LISTEN {SETTINGS_NOTIFY_CHANNEL}")
+            # Changes made while we weren't listening were never heard
+            clear_settings_cache()
+            _settings_listener['connected'] = True
+            while True:
+                if select.select([conn], [], [], 5) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    _handle_settings_notify(conn.notifies.pop(0).payload)
+        except Exception as e:
+            logger.warning(f"Settings listener disconnected, retrying: {e}")
+        finally:
+            _settings_listener['connected'] = False
+            if conn:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+        time.sleep(5)
+
+
+def _settings_origin():
+    return f"{_SETTINGS_ORIGIN}:{os.getpid()}"
+
+
+def _handle_settings_notify(payload):
+    """Invalidate the key named in a set_setting NOTIFY, unless this process sent it.
+
+    The channel also carries prompt context invalidations
+    (models.prompt_context.notify_prompt_context_changed).
+    """
     try:
-        conn = get_db_connection()
-        c = conn.cursor()
-        c.execute(
-            '''INSERT INTO api_usage (phone_number, request_type, prompt_tokens, completion_tokens, total_tokens, model)
-               VALUES (%s, %s, %s, %s, %s, %s)''',
-            (phone_number, request_type, prompt_tokens, completion_tokens, total_tokens, model)
-        )
-        conn.commit()
-    except Exception as e:
-        logger.error(f"Error logging API usage: {e}")
-    finally:
-        if conn:
-            return_db_connection(conn)
+        data = json.loads(payload)
+        if isinstance(data, dict) and 'prompt_context' in data:
+            from models.prompt_context import invalidate_prompt_context
+            for phone_number in data['prompt_context']:
+                invalidate_prompt_context(phone_number, *data.get('kinds', ()))
+            return
+        key, origin = data['key'], data.get('origin')
+    except (ValueError, KeyError, TypeError):
+        key, origin = payload, None
+    if origin != _settings_origin():
+        invalidate_setting(key)
+
+
+def _ensure_settings_listener():
+    """Start the listener thread once per process (again after a fork)."""
+    if not SETTINGS_LISTENER_ENABLED or _settings_listener['pid'] == os.getpid():
+        return
+    with _settings_lock:
+        if _settings_listener['pid'] == os.getpid():
+            return
+        _settings_listener['pid'] = os.getpid()
+        _settings_listener['connected'] = False
+        _settings_cache.clear()
+        threading.Thread(target=_settings_listener_loop, name="settings-listener", daemon=True).start()
+
+
+def invalidate_setting(key):
+    """Drop one cached setting so the next get_setting reads the database"""
+    with _settings_lock:
+        _settings_generation[0] += 1
+        if _settings_cache.pop(key, None) is not None:
+            _settings_stats['invalidations'] += 1
+
+
+def clear_settings_cache():
+    """Drop every cached setting in this process"""
+    with _settings_lock:
+        _settings_generation[0] += 1
+        _settings_cache.clear()
+
+
+def get_settings_cache_stats():
+    """Hit/miss counters for the settings cache in this process"""
+    with _settings_lock:
+        stats = dict(_settings_stats, cached_keys=len(_settings_cache))
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else None
+    stats['listener_connected'] = _settings_listener['connected']
+    return stats
 
 
 def get_setting(key, default=None):
-    """Get a setting value from the database"""
+    """Get a setting value, from the per-process cache when fresh"""
+    _ensure_settings_listener()
+    with _settings_lock:
+        cached = _settings_cache.get(key)
+        if cached is not None and time.monotonic() - cached[1] < _settings_ttl():
+            _settings_stats['hits'] += 1
+            return default if cached[0] is _MISSING else cached[0]
+        _settings_stats['misses'] += 1
+        generation = _settings_generation[0]
+
     conn = None
     try:
         conn = get_db_connection()
         c = conn.cursor()
         c.execute('SELECT value FROM settings WHERE key = %s', (key,))
         result = c.fetchone()
-        return result[0] if result else default
+        value = result[0] if result else _MISSING
+        with _settings_lock:
+            if generation == _settings_generation[0]:
+                _settings_cache[key] = (value, time.monotonic())
+        return default if value is _MISSING else value
     except Exception as e:
         logger.error(f"Error getting setting {key}: {e}")
         return default
@@ -726,7 +1048,7 @@ def get_setting(key, default=None):
 
 
 def set_setting(key, value):
-    """Set a setting value in the database"""
+    """Set a setting value in the database and notify every process's cache"""
     conn = None
     try:
         conn = get_db_connection()
@@ -736,7 +1058,14 @@ def set_setting(key, value):
             VALUES (%s, %s, CURRENT_TIMESTAMP)
             ON CONFLICT (key) DO UPDATE SET value = %s, updated_at = CURRENT_TIMESTAMP
         ''', (key, value, value))
+        # Delivered on commit, so listeners never see an uncommitted value
+        c.execute(
+            'SELECT pg_notify(%s, %s)',
+            (SETTINGS_NOTIFY_CHANNEL, json.dumps({'key': key, 'origin': _settings_origin()}))
+        )
         conn.commit()
+        with _settings_lock:
+            _settings_cache[key] = (value, time.monotonic())
         return True
     except Exception as e:
         logger.error(f"Error setting {key}: {e}")
@@ -757,22 +1086,8 @@ def log_confidence(phone_number, action_type, confidence_score, threshold, confi
         confirmed: True if user confirmed, False if rejected, None if no confirmation needed
         user_message: The original user message (for debugging)
     """
-    conn = None
-    try:
-        conn = get_db_connection()
-        c = conn.cursor()
-        c.execute(
-            '''INSERT INTO confidence_logs (phone_number, action_type, confidence_score, threshold, confirmed, user_message)
-               VALUES (%s, %s, %s, %s, %s, %s)''',
-            (phone_number, action_type, confidence_score, threshold, confirmed, user_message)
-        )
-        conn.commit()
-        logger.debug(f"Logged confidence: {action_type} score={confidence_score} threshold={threshold} confirmed={confirmed}")
-    except Exception as e:
-        logger.error(f"Error logging confidence: {e}")
-    finally:
-        if conn:
-            return_db_connection(conn)
+    _submit_log('confidence_logs', (phone_number, action_type, confidence_score, threshold, confirmed, user_message))
+    logger.debug(f"Logged confidence: {action_type} score={confidence_score} threshold={threshold} confirmed={confirmed}")
 
 
 def get_recent_logs(limit=100, offset=0, phone_filter=None, intent_filter=None, hide_reviewed=False, start_date=None, end_date=None):
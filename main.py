@@ -7,6 +7,9 @@ import re
 import json
 import pytz
 import asyncio
+import anyio
+import anyio.from_thread
+import anyio.to_thread
 from datetime import datetime, timedelta
 from fastapi import FastAPI, Form, Request, HTTPException
 from fastapi.responses import Response, HTMLResponse, FileResponse, JSONResponse, RedirectResponse
@@ -17,13 +20,16 @@ from twilio.request_validator import RequestValidator
 
 # Local imports
 import secrets
-from config import logger, ENVIRONMENT, MAX_LISTS_PER_USER, MAX_ITEMS_PER_LIST, TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER, PUBLIC_PHONE_NUMBER, ADMIN_USERNAME, ADMIN_PASSWORD, RATE_LIMIT_MESSAGES, RATE_LIMIT_WINDOW, REQUEST_TIMEOUT, TWILIO_WEBHOOK_TIMEOUT
-from collections import defaultdict
+from config import logger, ENVIRONMENT, MAX_LISTS_PER_USER, MAX_ITEMS_PER_LIST, TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER, PUBLIC_PHONE_NUMBER, ADMIN_USERNAME, ADMIN_PASSWORD, RATE_LIMIT_MESSAGES, RATE_LIMIT_WINDOW, REQUEST_TIMEOUT, TWILIO_WEBHOOK_TIMEOUT, WEBHOOK_DEDUP_TTL, SMS_WORKER_THREADS
 import time
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from fastapi import Depends
-from database import init_db, log_interaction, get_setting, log_confidence
-from models.user import get_user, is_user_onboarded, create_or_update_user, get_user_timezone, get_last_active_list, get_pending_list_item, get_pending_reminder_delete, get_pending_memory_delete, get_pending_reminder_date, get_pending_list_create, mark_user_opted_out, get_user_first_name, get_pending_reminder_confirmation, is_user_opted_out, cancel_engagement_nudge, increment_post_onboarding_interactions, get_pending_nudge_response
+from database import init_db, log_interaction, get_setting, log_confidence, flush_log_sink
+from models.user import get_user, is_user_onboarded, create_or_update_user, get_user_timezone, get_last_active_list, get_pending_list_item, get_pending_reminder_delete, get_pending_memory_delete, get_pending_reminder_date, get_pending_list_create, mark_user_opted_out, get_user_first_name, get_pending_reminder_confirmation, is_user_opted_out, cancel_engagement_nudge, increment_post_onboarding_interactions, get_pending_nudge_response, get_pending_delete_account, get_pending_cancellation_feedback
+from models.user_context import start_user_context, end_user_context
+from routes.command_router import COMMAND_ROUTER
+from models.prompt_context import invalidate_prompt_context
+from models.usage import adjust_usage, invalidate_usage
 from models.memory import save_memory, get_memories, search_memories, delete_memory
 from models.reminder import (
     save_reminder, get_user_reminders, search_pending_reminders, delete_reminder,
@@ -41,6 +47,7 @@ from models.list_model import (
 )
 from services.sms_service import send_sms
 from services.ai_service import process_with_ai, parse_list_items
+from services.intent_parser import fast_path_intent
 from services.onboarding_service import handle_onboarding
 from services.first_action_service import should_prompt_daily_summary, mark_daily_summary_prompted, get_daily_summary_prompt_message
 from services.trial_messaging_service import (
@@ -52,8 +59,10 @@ from services.trial_messaging_service import (
 )
 # NOTE: Reminder checking is now handled by Celery Beat (see tasks/reminder_tasks.py)
 from services.metrics_service import track_user_activity, increment_message_count, set_referral_source
+from services.activity_aggregator import activity_aggregator
 from utils.timezone import get_user_current_time
 from utils.formatting import get_help_text, format_reminders_list, format_reminder_confirmation
+from utils.rate_limit import create_rate_limiter, create_dedup_store
 from utils.validation import mask_phone_number, validate_list_name, validate_item_text, validate_message, log_security_event, detect_sensitive_data, get_sensitive_data_warning, sanitize_text
 from admin_dashboard import router as dashboard_router, start_broadcast_checker
 from cs_portal import router as cs_router
@@ -210,6 +219,14 @@ def parse_command(message: str, known_commands: list = None):
 logger.info("🚀 SMS Memory Service starting...")
 app = FastAPI()
 
+
+@app.on_event("shutdown")
+def drain_write_buffers():
+    """Write queued log rows and coalesced user activity before the worker exits"""
+    flush_log_sink()
+    activity_aggregator.flush()
+
+
 # CORS middleware - allow requests from remyndrs.com
 app.add_middleware(
     CORSMiddleware,
@@ -283,45 +300,29 @@ async def global_exception_handler(request: Request, exc: Exception):
         media_type="application/json"
     )
 
-# Rate limiting storage: {phone_number: [timestamp1, timestamp2, ...]}
-rate_limit_store = defaultdict(list)
+# Rate limiting and webhook dedup (in-process or Redis, per RATE_LIMIT_BACKEND)
+rate_limit_store = create_rate_limiter("sms", RATE_LIMIT_MESSAGES, RATE_LIMIT_WINDOW)
 
 # Webhook idempotency: track processed MessageSids to prevent duplicate handling
-_processed_message_sids = {}
+_processed_message_sids = create_dedup_store("message_sid", WEBHOOK_DEDUP_TTL)
 
 def check_rate_limit(phone_number: str) -> bool:
     """Check if phone number has exceeded rate limit. Returns True if allowed."""
-    current_time = time.time()
-    window_start = current_time - RATE_LIMIT_WINDOW
-
-    # Clean old timestamps and keep only those within the window
-    rate_limit_store[phone_number] = [
-        ts for ts in rate_limit_store[phone_number] if ts > window_start
-    ]
-
-    # Check if under limit
-    if len(rate_limit_store[phone_number]) >= RATE_LIMIT_MESSAGES:
-        log_security_event("RATE_LIMIT", {"phone": phone_number, "count": len(rate_limit_store[phone_number])})
+    if not rate_limit_store.allow(phone_number):
+        log_security_event("RATE_LIMIT", {"phone": phone_number, "limit": RATE_LIMIT_MESSAGES})
         return False
-
-    # Add current timestamp
-    rate_limit_store[phone_number].append(current_time)
     return True
 
 # IP-based rate limiting for public endpoints (signup, contact)
-_ip_rate_store = defaultdict(list)
 _IP_RATE_LIMIT = 5  # max requests per window
 _IP_RATE_WINDOW = 300  # 5 minute window
+_ip_rate_store = create_rate_limiter("ip", _IP_RATE_LIMIT, _IP_RATE_WINDOW)
 
 def check_ip_rate_limit(ip: str) -> bool:
     """Check if IP has exceeded public endpoint rate limit. Returns True if allowed."""
-    current_time = time.time()
-    window_start = current_time - _IP_RATE_WINDOW
-    _ip_rate_store[ip] = [ts for ts in _ip_rate_store[ip] if ts > window_start]
-    if len(_ip_rate_store[ip]) >= _IP_RATE_LIMIT:
-        log_security_event("IP_RATE_LIMIT", {"ip": ip, "count": len(_ip_rate_store[ip])})
+    if not _ip_rate_store.allow(ip):
+        log_security_event("IP_RATE_LIMIT", {"ip": ip, "limit": _IP_RATE_LIMIT})
         return False
-    _ip_rate_store[ip].append(current_time)
     return True
 
 from utils.auth import check_auth_rate_limit, record_auth_failure, enforce_auth_rate_limit
@@ -379,9 +380,25 @@ logger.info(f"✅ Application initialized in {ENVIRONMENT} mode")
 # WEBHOOK ENDPOINT
 # =====================================================
 
+_sms_limiter = None
+
+
+def _sms_worker_limiter():
+    """Thread limiter for _handle_sms, kept apart from the default threadpool (see SMS_WORKER_THREADS)."""
+    global _sms_limiter
+    if _sms_limiter is None:
+        _sms_limiter = anyio.CapacityLimiter(SMS_WORKER_THREADS)
+    return _sms_limiter
+
+
 @app.post("/sms")
 async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(...)):
-    """Handle incoming SMS from Twilio"""
+    """Handle incoming SMS from Twilio.
+
+    Signature validation and MessageSid dedup read the request here; the
+    message itself is handled by _handle_sms() on a worker thread so its
+    database calls don't stall other webhooks on the event loop.
+    """
     request_start_time = time.time()
     try:
         # Validate Twilio signature (skip in development and staging)
@@ -410,20 +427,30 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         # duplicate processing if Twilio retries the webhook
         form_data_for_sid = await request.form()
         message_sid = form_data_for_sid.get("MessageSid", "")
-        if message_sid and message_sid in _processed_message_sids:
+        if message_sid and not _processed_message_sids.first_seen(message_sid):
             logger.info(f"Duplicate webhook for MessageSid {message_sid}, skipping")
             resp = MessagingResponse()
             return Response(content=str(resp), media_type="application/xml")
-        if message_sid:
-            _processed_message_sids[message_sid] = time.time()
-            # Evict expired entries (older than 10 minutes) periodically
-            if len(_processed_message_sids) > 1000:
-                cutoff = time.time() - 600
-                expired = [sid for sid, ts in _processed_message_sids.items() if ts < cutoff]
-                for sid in expired:
-                    del _processed_message_sids[sid]
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ CRITICAL ERROR in webhook: {e}", exc_info=True)
+        error_msg = "Sorry, something went wrong. Please try again in a moment."
+        return twiml_or_sms_fallback(From, error_msg, request_start_time)
+
+    return await anyio.to_thread.run_sync(_handle_sms, Body, From, request_start_time, limiter=_sms_worker_limiter())
 
-        incoming_msg = Body.strip()
+
+def _handle_sms(incoming_msg: str, phone_number: str, request_start_time: float):
+    """Handle a validated incoming SMS and build the TwiML reply.
+
+    Runs on a thread from the SMS worker limiter. The AI call hops back to
+    the event loop through anyio.from_thread so it keeps using the shared
+    async OpenAI client; its prompt reads then take a default-pool thread.
+    """
+    user_context_token = None
+    try:
+        incoming_msg = incoming_msg.strip()
 
         # Normalize compact time formats: "125pm" → "1:25 pm", "1215pm" → "12:15 pm"
         incoming_msg = re.sub(
@@ -433,8 +460,6 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
             flags=re.IGNORECASE
         )
 
-        phone_number = From
-
         # Staging Fallback: If enabled in production, fail for test numbers to trigger Twilio fallback URL
         if ENVIRONMENT == "production":
             staging_fallback_enabled = get_setting("staging_fallback_enabled", "false") == "true"
@@ -467,6 +492,16 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
 
         logger.info(f"Received from {mask_phone_number(phone_number)}: {incoming_msg[:50]}...")
 
+        # Load the user's row once for this request; models.user accessors
+        # and tier checks read from it instead of re-querying users
+        user_context_token = start_user_context(phone_number)
+
+        # Match the message against every keyword command once; the blocks
+        # below check membership in `route` instead of re-testing the text
+        route = COMMAND_ROUTER.resolve(incoming_msg)
+        if route:
+            logger.info(f"Command route: {route.name}")
+
         # Track user activity for metrics
         track_user_activity(phone_number)
         increment_message_count(phone_number)
@@ -474,7 +509,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         # ==========================================
         # DELETE ACCOUNT COMMAND (two-step confirmation)
         # ==========================================
-        if incoming_msg.upper() in ("DELETE ACCOUNT", "CANCEL ACCOUNT", "CANCEL MY ACCOUNT", "DELETE MY ACCOUNT", "REMOVE MY ACCOUNT", "CLOSE MY ACCOUNT"):
+        if 'delete_account' in route:
             logger.info(f"DELETE ACCOUNT requested by {mask_phone_number(phone_number)}")
             create_or_update_user(phone_number, pending_delete_account=True)
             resp = MessagingResponse()
@@ -488,19 +523,9 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
             return Response(content=str(resp), media_type="application/xml")
 
         # Handle YES DELETE ACCOUNT confirmation
-        if incoming_msg.upper() == "YES DELETE ACCOUNT":
-            user = get_user(phone_number)
+        if 'confirm_delete_account' in route:
             # Check pending_delete_account flag
-            if user:
-                from database import get_db_connection, return_db_connection
-                conn_check = get_db_connection()
-                c_check = conn_check.cursor()
-                c_check.execute('SELECT pending_delete_account FROM users WHERE phone_number = %s', (phone_number,))
-                result = c_check.fetchone()
-                return_db_connection(conn_check)
-                pending = result[0] if result else False
-            else:
-                pending = False
+            pending = get_pending_delete_account(phone_number)
 
             if not pending:
                 resp = MessagingResponse()
@@ -519,71 +544,76 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
                     logger.warning(f"Stripe cancellation issue for {mask_phone_number(phone_number)}: {cancel_result['error']}")
 
                 # Delete all user data (order matters for foreign key constraints)
-                from database import get_db_connection, return_db_connection
+                from database import get_db_connection, return_db_connection, flush_log_sink
+                flush_log_sink()  # queued log rows would otherwise land after the delete
                 conn = get_db_connection()
-                c = conn.cursor()
+                try:
+                    c = conn.cursor()
 
-                # Clean up monitoring agent FK chain (these tables reference logs via monitoring_issues)
-                # Use savepoints since monitoring tables may not exist in all environments
-                c.execute("SELECT id FROM logs WHERE phone_number = %s", (phone_number,))
-                log_ids = [row[0] for row in c.fetchall()]
+                    # Clean up monitoring agent FK chain (these tables reference logs via monitoring_issues)
+                    # Use savepoints since monitoring tables may not exist in all environments
+                    c.execute("SELECT id FROM logs WHERE phone_number = %s", (phone_number,))
+                    log_ids = [row[0] for row in c.fetchall()]
 
-                if log_ids:
-                    # Get monitoring_issues IDs that reference this user's logs
-                    mi_ids = []
-                    try:
-                        c.execute("SAVEPOINT mi_lookup")
-                        c.execute("SELECT id FROM monitoring_issues WHERE log_id = ANY(%s)", (log_ids,))
-                        mi_ids = [row[0] for row in c.fetchall()]
-                    except Exception:
-                        c.execute("ROLLBACK TO SAVEPOINT mi_lookup")
-
-                    if mi_ids:
-                        # Use indexed savepoint names to avoid SQL injection via table names
-                        monitoring_tables = ['code_analysis', 'issue_pattern_links', 'fix_proposals', 'issue_resolutions']
-                        for idx, table in enumerate(monitoring_tables):
+                    if log_ids:
+                        # Get monitoring_issues IDs that reference this user's logs
+                        mi_ids = []
+                        try:
+                            c.execute("SAVEPOINT mi_lookup")
+                            c.execute("SELECT id FROM monitoring_issues WHERE log_id = ANY(%s)", (log_ids,))
+                            mi_ids = [row[0] for row in c.fetchall()]
+                        except Exception:
+                            c.execute("ROLLBACK TO SAVEPOINT mi_lookup")
+
+                        if mi_ids:
+                            # Use indexed savepoint names to avoid SQL injection via table names
+                            monitoring_tables = ['code_analysis', 'issue_pattern_links', 'fix_proposals', 'issue_resolutions']
+                            for idx, table in enumerate(monitoring_tables):
+                                try:
+                                    c.execute(f"SAVEPOINT del_mon_{idx}")
+                                    from psycopg2 import sql
+                                    c.execute(sql.SQL("DELETE FROM {} WHERE issue_id = ANY(%s)").format(sql.Identifier(table)), (mi_ids,))
+                                except Exception:
+                                    c.execute(f"ROLLBACK TO SAVEPOINT del_mon_{idx}")
                             try:
-                                c.execute(f"SAVEPOINT del_mon_{idx}")
-                                from psycopg2 import sql
-                                c.execute(sql.SQL("DELETE FROM {} WHERE issue_id = ANY(%s)").format(sql.Identifier(table)), (mi_ids,))
+                                c.execute("SAVEPOINT del_mi")
+                                c.execute("DELETE FROM monitoring_issues WHERE id = ANY(%s)", (mi_ids,))
                             except Exception:
-                                c.execute(f"ROLLBACK TO SAVEPOINT del_mon_{idx}")
+                                c.execute("ROLLBACK TO SAVEPOINT del_mi")
+
+                        # conversation_analysis also references logs(id)
+                        c.execute("DELETE FROM conversation_analysis WHERE log_id = ANY(%s)", (log_ids,))
+
+                    # Delete remaining monitoring/analysis rows by phone_number
+                    cleanup_tables = ['conversation_analysis', 'monitoring_issues']
+                    for idx, table in enumerate(cleanup_tables):
                         try:
-                            c.execute("SAVEPOINT del_mi")
-                            c.execute("DELETE FROM monitoring_issues WHERE id = ANY(%s)", (mi_ids,))
+                            c.execute(f"SAVEPOINT del_ph_{idx}")
+                            from psycopg2 import sql
+                            c.execute(sql.SQL("DELETE FROM {} WHERE phone_number = %s").format(sql.Identifier(table)), (phone_number,))
                         except Exception:
-                            c.execute("ROLLBACK TO SAVEPOINT del_mi")
-
-                    # conversation_analysis also references logs(id)
-                    c.execute("DELETE FROM conversation_analysis WHERE log_id = ANY(%s)", (log_ids,))
+                            c.execute(f"ROLLBACK TO SAVEPOINT del_ph_{idx}")
+                    c.execute("DELETE FROM support_messages WHERE phone_number = %s", (phone_number,))
+                    c.execute("DELETE FROM support_tickets WHERE phone_number = %s", (phone_number,))
+                    c.execute("DELETE FROM confidence_logs WHERE phone_number = %s", (phone_number,))
+                    c.execute("DELETE FROM api_usage WHERE phone_number = %s", (phone_number,))
+                    c.execute("DELETE FROM customer_notes WHERE phone_number = %s", (phone_number,))
+
+                    # Now delete the main tables
+                    c.execute("DELETE FROM reminders WHERE phone_number = %s", (phone_number,))
+                    c.execute("DELETE FROM recurring_reminders WHERE phone_number = %s", (phone_number,))
+                    c.execute("DELETE FROM memories WHERE phone_number = %s", (phone_number,))
+                    c.execute("DELETE FROM list_items WHERE phone_number = %s", (phone_number,))
+                    c.execute("DELETE FROM lists WHERE phone_number = %s", (phone_number,))
+                    c.execute("DELETE FROM logs WHERE phone_number = %s", (phone_number,))
+                    c.execute("DELETE FROM onboarding_progress WHERE phone_number = %s", (phone_number,))
+                    c.execute("DELETE FROM feedback WHERE user_phone = %s", (phone_number,))
+                    invalidate_usage(c, phone_number)
 
-                # Delete remaining monitoring/analysis rows by phone_number
-                cleanup_tables = ['conversation_analysis', 'monitoring_issues']
-                for idx, table in enumerate(cleanup_tables):
-                    try:
-                        c.execute(f"SAVEPOINT del_ph_{idx}")
-                        from psycopg2 import sql
-                        c.execute(sql.SQL("DELETE FROM {} WHERE phone_number = %s").format(sql.Identifier(table)), (phone_number,))
-                    except Exception:
-                        c.execute(f"ROLLBACK TO SAVEPOINT del_ph_{idx}")
-                c.execute("DELETE FROM support_messages WHERE phone_number = %s", (phone_number,))
-                c.execute("DELETE FROM support_tickets WHERE phone_number = %s", (phone_number,))
-                c.execute("DELETE FROM confidence_logs WHERE phone_number = %s", (phone_number,))
-                c.execute("DELETE FROM api_usage WHERE phone_number = %s", (phone_number,))
-                c.execute("DELETE FROM customer_notes WHERE phone_number = %s", (phone_number,))
-
-                # Now delete the main tables
-                c.execute("DELETE FROM reminders WHERE phone_number = %s", (phone_number,))
-                c.execute("DELETE FROM recurring_reminders WHERE phone_number = %s", (phone_number,))
-                c.execute("DELETE FROM memories WHERE phone_number = %s", (phone_number,))
-                c.execute("DELETE FROM list_items WHERE phone_number = %s", (phone_number,))
-                c.execute("DELETE FROM lists WHERE phone_number = %s", (phone_number,))
-                c.execute("DELETE FROM logs WHERE phone_number = %s", (phone_number,))
-                c.execute("DELETE FROM onboarding_progress WHERE phone_number = %s", (phone_number,))
-                c.execute("DELETE FROM feedback WHERE user_phone = %s", (phone_number,))
-
-                conn.commit()
-                return_db_connection(conn)
+                    conn.commit()
+                    invalidate_prompt_context(phone_number)
+                finally:
+                    return_db_connection(conn)
 
                 # Mark user as opted out (STOP equivalent)
                 mark_user_opted_out(phone_number)
@@ -624,59 +654,43 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
                 return Response(content=str(resp), media_type="application/xml")
 
         # Clear pending_delete_account if user sends anything else while it's pending
-        user_check_delete = get_user(phone_number)
-        if user_check_delete:
-            from database import get_db_connection, return_db_connection
-            conn_check = get_db_connection()
-            c_check = conn_check.cursor()
-            c_check.execute('SELECT pending_delete_account FROM users WHERE phone_number = %s', (phone_number,))
-            result = c_check.fetchone()
-            return_db_connection(conn_check)
-            if result and result[0]:
-                create_or_update_user(phone_number, pending_delete_account=False)
-                resp = MessagingResponse()
-                resp.message("Account deletion cancelled. Your data is safe!")
-                log_interaction(phone_number, incoming_msg, "Delete account cancelled", "delete_account_cancelled", True)
-                return Response(content=str(resp), media_type="application/xml")
+        if get_pending_delete_account(phone_number):
+            create_or_update_user(phone_number, pending_delete_account=False)
+            resp = MessagingResponse()
+            resp.message("Account deletion cancelled. Your data is safe!")
+            log_interaction(phone_number, incoming_msg, "Delete account cancelled", "delete_account_cancelled", True)
+            return Response(content=str(resp), media_type="application/xml")
 
         # ==========================================
         # CANCELLATION FEEDBACK HANDLING
         # ==========================================
-        user_check_cancel = get_user(phone_number)
-        if user_check_cancel:
-            from database import get_db_connection, return_db_connection
-            conn_check = get_db_connection()
-            c_check = conn_check.cursor()
-            c_check.execute('SELECT pending_cancellation_feedback FROM users WHERE phone_number = %s', (phone_number,))
-            cancel_result = c_check.fetchone()
-            return_db_connection(conn_check)
-            if cancel_result and cancel_result[0]:
-                # User has pending cancellation feedback
-                msg_upper = incoming_msg.strip().upper()
-                if msg_upper == "SKIP":
-                    create_or_update_user(phone_number, pending_cancellation_feedback=False)
-                    # Don't return - let the message flow through normally
-                else:
-                    feedback_map = {
-                        '1': 'Too expensive',
-                        '2': 'Not using enough',
-                        '3': 'Missing a feature',
-                        '4': 'Other',
-                    }
-                    feedback_text = feedback_map.get(msg_upper, incoming_msg.strip())
-                    # Save as a categorized ticket
-                    from services.support_service import create_categorized_ticket
-                    create_categorized_ticket(
-                        phone_number,
-                        f"[CANCELLATION] {feedback_text}",
-                        'feedback',
-                        'sms'
-                    )
-                    create_or_update_user(phone_number, pending_cancellation_feedback=False)
-                    resp = MessagingResponse()
-                    resp.message("Thank you for the feedback! We'll use it to improve Remyndrs. Text UPGRADE anytime to resubscribe.")
-                    log_interaction(phone_number, incoming_msg, "Cancellation feedback received", "cancellation_feedback", True)
-                    return Response(content=str(resp), media_type="application/xml")
+        if get_pending_cancellation_feedback(phone_number):
+            # User has pending cancellation feedback
+            msg_upper = incoming_msg.strip().upper()
+            if msg_upper == "SKIP":
+                create_or_update_user(phone_number, pending_cancellation_feedback=False)
+                # Don't return - let the message flow through normally
+            else:
+                feedback_map = {
+                    '1': 'Too expensive',
+                    '2': 'Not using enough',
+                    '3': 'Missing a feature',
+                    '4': 'Other',
+                }
+                feedback_text = feedback_map.get(msg_upper, incoming_msg.strip())
+                # Save as a categorized ticket
+                from services.support_service import create_categorized_ticket
+                create_categorized_ticket(
+                    phone_number,
+                    f"[CANCELLATION] {feedback_text}",
+                    'feedback',
+                    'sms'
+                )
+                create_or_update_user(phone_number, pending_cancellation_feedback=False)
+                resp = MessagingResponse()
+                resp.message("Thank you for the feedback! We'll use it to improve Remyndrs. Text UPGRADE anytime to resubscribe.")
+                log_interaction(phone_number, incoming_msg, "Cancellation feedback received", "cancellation_feedback", True)
+                return Response(content=str(resp), media_type="application/xml")
 
         # ==========================================
         # RESET ACCOUNT COMMAND (developer only)
@@ -685,28 +699,33 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         normalized_phone = phone_number.replace("+1", "").replace("-", "").replace(" ", "").replace("(", "").replace(")", "")
         is_developer = normalized_phone == "8593935374"
 
-        if incoming_msg.upper() in ["RESET ACCOUNT", "RESTART"] and (is_developer or ENVIRONMENT == "staging"):
+        if 'reset_account' in route and (is_developer or ENVIRONMENT == "staging"):
             logger.info(f"RESET ACCOUNT matched - resetting user (developer={is_developer}, env={ENVIRONMENT})")
 
             if is_developer:
                 logger.info("Developer full reset - deleting all user data")
                 try:
-                    from database import get_db_connection, return_db_connection
+                    from database import get_db_connection, return_db_connection, flush_log_sink
+                    flush_log_sink()
                     conn = get_db_connection()
-                    c = conn.cursor()
+                    try:
+                        c = conn.cursor()
 
-                    # Delete all user data to simulate brand new user
-                    c.execute("DELETE FROM reminders WHERE phone_number = %s", (phone_number,))
-                    c.execute("DELETE FROM recurring_reminders WHERE phone_number = %s", (phone_number,))
-                    c.execute("DELETE FROM memories WHERE phone_number = %s", (phone_number,))
-                    c.execute("DELETE FROM list_items WHERE phone_number = %s", (phone_number,))
-                    c.execute("DELETE FROM lists WHERE phone_number = %s", (phone_number,))
-                    c.execute("DELETE FROM logs WHERE phone_number = %s", (phone_number,))
-                    c.execute("DELETE FROM onboarding_progress WHERE phone_number = %s", (phone_number,))
-                    c.execute("DELETE FROM users WHERE phone_number = %s", (phone_number,))
+                        # Delete all user data to simulate brand new user
+                        c.execute("DELETE FROM reminders WHERE phone_number = %s", (phone_number,))
+                        c.execute("DELETE FROM recurring_reminders WHERE phone_number = %s", (phone_number,))
+                        c.execute("DELETE FROM memories WHERE phone_number = %s", (phone_number,))
+                        c.execute("DELETE FROM list_items WHERE phone_number = %s", (phone_number,))
+                        c.execute("DELETE FROM lists WHERE phone_number = %s", (phone_number,))
+                        c.execute("DELETE FROM logs WHERE phone_number = %s", (phone_number,))
+                        c.execute("DELETE FROM onboarding_progress WHERE phone_number = %s", (phone_number,))
+                        c.execute("DELETE FROM users WHERE phone_number = %s", (phone_number,))
+                        invalidate_usage(c, phone_number)
 
-                    conn.commit()
-                    return_db_connection(conn)
+                        conn.commit()
+                        invalidate_prompt_context(phone_number)
+                    finally:
+                        return_db_connection(conn)
                     logger.info("Full reset complete - all user data deleted")
                 except Exception as e:
                     logger.error(f"Error during full reset: {e}")
@@ -762,7 +781,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         # Twilio handles STOP natively; we also handle alternative keywords
         # to ensure our opted_out flag stays in sync
         # ==========================================
-        if incoming_msg.upper() in ("STOP", "STOPALL", "UNSUBSCRIBE", "END", "QUIT"):
+        if 'stop' in route:
             logger.info(f"Opt-out command '{incoming_msg.upper()}' received from {mask_phone_number(phone_number)}")
 
             # Mark user as opted out in our database
@@ -776,7 +795,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         # START/RESUBSCRIBE COMMAND (Twilio sends basic subscription message)
         # ==========================================
         # Note: "YES" is also used for confirmations, so check if user has pending action first
-        if incoming_msg.upper() in ["START", "YES", "UNSTOP"]:
+        if 'start' in route:
             # Check if user has a pending confirmation (delete, reminder confirmation, etc.)
             user_check = get_user(phone_number)
             pending_delete = get_pending_reminder_delete(phone_number)
@@ -1458,7 +1477,6 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
             logger.info(f"Auto-clearing stale opted_out flag for {mask_phone_number(phone_number)} — user is actively texting")
             create_or_update_user(phone_number, opted_out=False, opted_out_at=None)
 
-        msg_upper = incoming_msg.upper()
         # Check for AM/PM in various formats: "8am", "8 am", "8:00am", "8a", "8:00a", "a.m.", etc.
         # Also recognize "morning" as AM and "afternoon"/"evening"/"night" as PM
         has_am_pm = bool(re.search(r'\d\s*(am|pm|a\.m\.|p\.m\.|a|p)\b', incoming_msg, re.IGNORECASE))
@@ -1621,6 +1639,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
                 # Complex time like "in 30 minutes" or "tomorrow at 9am"
                 # Reconstruct the request and let AI process it
                 incoming_msg = f"remind me to {pending_text} {incoming_msg}"
+                route = COMMAND_ROUTER.resolve(incoming_msg)
                 create_or_update_user(phone_number, pending_reminder_text=None, pending_reminder_time=None)
                 # Fall through to AI processing with reconstructed message
             else:
@@ -2202,7 +2221,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         # DELETE REMINDERS (show list to pick from)
         # ==========================================
         # Handle "Delete reminders", "Cancel reminders", etc. - shows numbered list
-        if msg_upper in ["DELETE REMINDERS", "DELETE MY REMINDERS", "CANCEL REMINDERS", "CANCEL MY REMINDERS", "REMOVE REMINDERS", "REMOVE MY REMINDERS"]:
+        if 'delete_reminders_menu' in route:
             reminders = get_user_reminders(phone_number)
             pending = [r for r in reminders if not r[4]]  # r[4] is 'sent' flag
 
@@ -2253,7 +2272,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         # DELETE MEMORIES (show list to pick from)
         # ==========================================
         # Handle "Delete memories", "Forget memories", etc. - shows numbered list
-        if msg_upper in ["DELETE MEMORIES", "DELETE MY MEMORIES", "FORGET MEMORIES", "FORGET MY MEMORIES", "REMOVE MEMORIES", "REMOVE MY MEMORIES"]:
+        if 'delete_memories_menu' in route:
             memories = get_memories(phone_number)
 
             if not memories:
@@ -2293,7 +2312,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         # DELETE LISTS (show list to pick from)
         # ==========================================
         # Handle "Delete lists", "Remove lists", etc. - shows numbered list of lists
-        if msg_upper in ["DELETE LISTS", "DELETE MY LISTS", "REMOVE LISTS", "REMOVE MY LISTS"]:
+        if 'delete_lists_menu' in route:
             lists = get_lists(phone_number)
 
             if not lists:
@@ -2331,7 +2350,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         # DELETE REMINDER BY NUMBER
         # ==========================================
         # Handle "Delete reminder 1", "Cancel reminder 2", etc.
-        delete_reminder_match = re.match(r'^(?:delete|remove|cancel)\s+reminder\s+(\d+)$', incoming_msg.strip(), re.IGNORECASE)
+        delete_reminder_match = route.get('delete_reminder_number')
         if delete_reminder_match:
             reminder_num = int(delete_reminder_match.group(1))
             # Get user's reminders (pending only)
@@ -2366,7 +2385,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         # DELETE MULTIPLE NUMBERS (catch and redirect)
         # ==========================================
         # Catch "Delete 1 and 2", "Remove 1, 2, 3", "Delete 1 2" etc. before they fall through to AI
-        multi_delete_match = re.match(r'^(?:delete|remove)\s+\d+\s*(?:[,&]\s*\d+|\s+and\s+\d+|\s+\d+)+', incoming_msg.strip(), re.IGNORECASE)
+        multi_delete_match = route.get('delete_multiple')
         if multi_delete_match:
             resp = MessagingResponse()
             resp.message("I can only delete one at a time. Just text 'Delete 1', then 'Delete 2', etc.")
@@ -2377,7 +2396,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         # DELETE BY NUMBER (smart disambiguation)
         # ==========================================
         # Handle "Delete 1", "Remove 2", etc. - ask user what they want to delete
-        delete_match = re.match(r'^(?:delete|remove)\s+(\d+)$', incoming_msg.strip(), re.IGNORECASE)
+        delete_match = route.get('delete_number')
         if delete_match:
             item_num = int(delete_match.group(1))
 
@@ -2586,7 +2605,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         # CHECK OFF ITEM BY NUMBER (context-aware)
         # ==========================================
         # Handle "Check 2", "Check off 3", "Done 1", etc. when user has a last active list
-        check_match = re.match(r'^(?:check|check off|done|complete|finished)\s+(\d+)$', incoming_msg.strip(), re.IGNORECASE)
+        check_match = route.get('check_item')
         if check_match:
             item_num = int(check_match.group(1))
             last_active = get_last_active_list(phone_number)
@@ -2614,8 +2633,8 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         # ==========================================
         # FEEDBACK HANDLING
         # ==========================================
-        command, message_text = parse_command(incoming_msg, known_commands=["FEEDBACK"])
-        if command == "FEEDBACK":
+        if 'feedback' in route:
+            _, message_text = parse_command(incoming_msg, known_commands=["FEEDBACK"])
             feedback_message = message_text.strip()
             if feedback_message:
                 # Save as lightweight contact message (not a support ticket)
@@ -2638,8 +2657,8 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         # ==========================================
         # BUG REPORT HANDLING (route to feedback)
         # ==========================================
-        command, message_text = parse_command(incoming_msg, known_commands=["BUG"])
-        if command == "BUG":
+        if 'bug' in route:
+            _, message_text = parse_command(incoming_msg, known_commands=["BUG"])
             bug_message = message_text.strip()
             if bug_message:
                 # Save as lightweight contact message (not a support ticket)
@@ -2662,7 +2681,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         # ==========================================
         # EXPORT COMMAND - Email user their data
         # ==========================================
-        if incoming_msg.upper() == "EXPORT":
+        if 'export' in route:
             user = get_user(phone_number)
             user_email = user.get('email') if user else None
 
@@ -2693,13 +2712,14 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         # QUESTION HANDLING (route to AI with full message)
         # ==========================================
         is_question_command = False
-        command, message_text = parse_command(incoming_msg, known_commands=["QUESTION"])
-        if command == "QUESTION":
+        if 'question' in route:
+            _, message_text = parse_command(incoming_msg, known_commands=["QUESTION"])
             question_text = message_text.strip()
             if question_text:
                 # Route the question to AI processing as natural language
                 # Fall through to AI processing at the bottom with the full question text
                 incoming_msg = question_text
+                route = COMMAND_ROUTER.resolve(incoming_msg)
                 is_question_command = True
                 logger.info(f"QUESTION command - routing to AI: {question_text[:50]}...")
             else:
@@ -2710,7 +2730,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         # ==========================================
         # UPGRADE / SUBSCRIPTION HANDLING
         # ==========================================
-        if incoming_msg.upper() in ["UPGRADE", "SUBSCRIBE", "PREMIUM", "PRICING"]:
+        if 'upgrade' in route:
             from services.stripe_service import get_upgrade_message, get_user_subscription, create_checkout_session
             from config import STRIPE_ENABLED, APP_BASE_URL, PREMIUM_MONTHLY_PRICE, PREMIUM_ANNUAL_PRICE
 
@@ -2750,13 +2770,13 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
                 log_interaction(phone_number, incoming_msg, "Upgrade info sent", "upgrade_info", True)
                 return Response(content=str(resp), media_type="application/xml")
 
-        if any(phrase in incoming_msg.upper() for phrase in ["CANCEL SUBSCRIPTION", "CANCEL PLAN", "CANCEL PREMIUM", "CANCEL MY SUBSCRIPTION", "CANCEL MY PLAN"]):
+        if 'cancel_subscription' in route:
             resp = MessagingResponse()
             resp.message("To manage or cancel your subscription, text ACCOUNT to get your billing portal link.")
             log_interaction(phone_number, incoming_msg, "Cancel subscription redirect", "cancel_subscription_redirect", True)
             return Response(content=str(resp), media_type="application/xml")
 
-        if incoming_msg.upper() in ["ACCOUNT", "MANAGE", "BILLING", "SUBSCRIPTION"]:
+        if 'account' in route:
             from services.stripe_service import get_user_subscription, create_customer_portal_session
             from config import STRIPE_ENABLED, APP_BASE_URL
 
@@ -2784,7 +2804,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         # ==========================================
         # STATUS COMMAND (Account Overview)
         # ==========================================
-        if incoming_msg.upper() in ["STATUS", "MY ACCOUNT", "ACCOUNT INFO", "USAGE"]:
+        if 'status' in route:
             try:
                 from services.tier_service import get_usage_summary, get_trial_info
                 from services.stripe_service import get_user_subscription
@@ -2910,8 +2930,8 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         # ==========================================
         # SUPPORT HANDLING (Premium users, or all users in beta mode)
         # ==========================================
-        command, message_text = parse_command(incoming_msg, known_commands=["SUPPORT"])
-        if command == "SUPPORT":
+        if 'support' in route:
+            _, message_text = parse_command(incoming_msg, known_commands=["SUPPORT"])
             from services.support_service import is_premium_user, add_support_message
 
             # Support is open to all users
@@ -2939,7 +2959,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         # ==========================================
         # SNOOZE HANDLING
         # ==========================================
-        if incoming_msg.upper().startswith("SNOOZE"):
+        if 'snooze' in route:
             # Check if there's a recent reminder to snooze
             last_reminder = get_last_sent_reminder(phone_number, max_age_minutes=30)
 
@@ -2999,7 +3019,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         msg_upper = incoming_msg.upper().strip()
 
         # Enable daily summary: "SUMMARY ON", "DAILY SUMMARY ON"
-        if msg_upper in ["SUMMARY ON", "DAILY SUMMARY ON", "DAILY SUMMARY"]:
+        if 'summary_on' in route:
             from models.user import get_daily_summary_settings
 
             # Get current settings for undo capability
@@ -3037,7 +3057,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
             return Response(content=str(resp), media_type="application/xml")
 
         # Disable daily summary: "SUMMARY OFF", "DAILY SUMMARY OFF", "DISABLE SUMMARY", etc.
-        if msg_upper in ["SUMMARY OFF", "DAILY SUMMARY OFF", "DISABLE SUMMARY", "DISABLE DAILY SUMMARY", "TURN OFF SUMMARY", "TURN OFF DAILY SUMMARY"] or msg_upper.startswith("SUMMARY OFF ") or msg_upper.startswith("DAILY SUMMARY OFF "):
+        if 'summary_off' in route:
             from models.user import get_daily_summary_settings
 
             # Get current settings for undo capability
@@ -3067,7 +3087,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
             return Response(content=str(resp), media_type="application/xml")
 
         # Check daily summary status: "MY SUMMARY", "SUMMARY STATUS"
-        if msg_upper in ["MY SUMMARY", "SUMMARY STATUS", "SUMMARY"]:
+        if 'summary_status' in route:
             from models.user import get_daily_summary_settings
 
             settings = get_daily_summary_settings(phone_number)
@@ -3095,17 +3115,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         # Set daily summary time: "SUMMARY TIME 7AM", "SUMMARY ON 10PM", "DAILY SUMMARY TIME 8:30AM"
         # Also supports shorthand: "SUMMARY TIME 10a", "SUMMARY TIME 3p"
         # Also natural language: "change my daily summary time to 8am", "set my summary to 7am"
-        summary_time_match = re.match(
-            r'^(?:daily\s+)?summary\s+(?:on\s+|time\s+)?(\d{1,2})(?::(\d{2}))?\s*(am|pm|a|p)$',
-            incoming_msg.strip(),
-            re.IGNORECASE
-        )
-        if not summary_time_match:
-            summary_time_match = re.match(
-                r'^(?:change|set|move|update)\s+(?:my\s+)?(?:daily\s+)?summary\s+(?:time\s+)?(?:to\s+)?(\d{1,2})(?::(\d{2}))?\s*(am|pm|a|p)\b',
-                incoming_msg.strip(),
-                re.IGNORECASE
-            )
+        summary_time_match = route.get('summary_time')
 
         if summary_time_match:
             hour = int(summary_time_match.group(1))
@@ -3167,7 +3177,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         # ==========================================
 
         # Enable smart nudges: "NUDGE ON", "NUDGES ON"
-        if msg_upper in ["NUDGE ON", "NUDGES ON", "SMART NUDGE ON", "SMART NUDGES ON"]:
+        if 'nudge_on' in route:
             from models.user import get_smart_nudge_settings
 
             # Get current settings for undo
@@ -3201,7 +3211,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
             return Response(content=str(resp), media_type="application/xml")
 
         # Disable smart nudges: "NUDGE OFF", "NUDGES OFF"
-        if msg_upper in ["NUDGE OFF", "NUDGES OFF", "SMART NUDGE OFF", "SMART NUDGES OFF", "DISABLE NUDGE", "DISABLE NUDGES"]:
+        if 'nudge_off' in route:
             from models.user import get_smart_nudge_settings
 
             current_settings = get_smart_nudge_settings(phone_number)
@@ -3228,7 +3238,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
             return Response(content=str(resp), media_type="application/xml")
 
         # Check nudge status: "NUDGE STATUS", "MY NUDGE", "NUDGE"
-        if msg_upper in ["NUDGE STATUS", "MY NUDGE", "MY NUDGES", "NUDGE SETTINGS"]:
+        if 'nudge_status' in route:
             from models.user import get_smart_nudge_settings
 
             settings = get_smart_nudge_settings(phone_number)
@@ -3254,17 +3264,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
             return Response(content=str(resp), media_type="application/xml")
 
         # Set nudge time: "NUDGE TIME 9AM", "NUDGE TIME 10:30PM"
-        nudge_time_match = re.match(
-            r'^(?:smart\s+)?nudge(?:s)?\s+(?:time\s+)?(\d{1,2})(?::(\d{2}))?\s*(am|pm|a|p)$',
-            incoming_msg.strip(),
-            re.IGNORECASE
-        )
-        if not nudge_time_match:
-            nudge_time_match = re.match(
-                r'^(?:change|set|move|update)\s+(?:my\s+)?(?:smart\s+)?nudge(?:s)?\s+(?:time\s+)?(?:to\s+)?(\d{1,2})(?::(\d{2}))?\s*(am|pm|a|p)\b',
-                incoming_msg.strip(),
-                re.IGNORECASE
-            )
+        nudge_time_match = route.get('nudge_time')
 
         if nudge_time_match:
             hour = int(nudge_time_match.group(1))
@@ -3320,7 +3320,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         # ==========================================
 
         # Show current timezone
-        if msg_upper in ["MY TIMEZONE", "TIMEZONE", "MY TZ", "SHOW TIMEZONE"]:
+        if 'timezone_show' in route:
             user_tz = get_user_timezone(phone_number)
             user_time = get_user_current_time(phone_number)
             current_time_str = user_time.strftime('%I:%M %p on %A, %B %d').lstrip('0')
@@ -3331,7 +3331,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
             return Response(content=str(resp), media_type="application/xml")
 
         # Update timezone
-        if msg_upper.startswith("TIMEZONE ") or msg_upper.startswith("SET TIMEZONE "):
+        if 'timezone_set' in route:
             # Extract timezone string
             if msg_upper.startswith("SET TIMEZONE "):
                 tz_input = incoming_msg[13:].strip()
@@ -3380,7 +3380,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         # ==========================================
         # SHOW COMPLETED REMINDERS
         # ==========================================
-        if msg_upper in ["SHOW COMPLETED REMINDERS", "SHOW COMPLETED", "COMPLETED REMINDERS", "PAST REMINDERS", "SHOW PAST REMINDERS"]:
+        if 'completed_reminders' in route:
             reminders = get_user_reminders(phone_number)
             # Filter to only sent/completed reminders
             completed = [r for r in reminders if r[4]]  # r[4] is sent flag
@@ -3429,7 +3429,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         # ==========================================
 
         # Show all recurring reminders
-        if msg_upper in ["MY RECURRING", "MY RECURRING REMINDERS", "RECURRING", "RECURRING REMINDERS", "SHOW RECURRING"]:
+        if 'recurring_list' in route:
             recurring_list = get_recurring_reminders(phone_number, include_inactive=True)
 
             if not recurring_list:
@@ -3502,7 +3502,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
             return Response(content=str(resp), media_type="application/xml")
 
         # Delete recurring reminder (avoid "STOP" prefix - conflicts with carrier opt-out)
-        if msg_upper.startswith("DELETE RECURRING ") or msg_upper.startswith("CANCEL RECURRING ") or msg_upper.startswith("REMOVE RECURRING "):
+        if 'recurring_delete' in route:
             # Extract number
             parts = incoming_msg.split()
             if len(parts) >= 3:
@@ -3533,7 +3533,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
             return Response(content=str(resp), media_type="application/xml")
 
         # Pause recurring reminder
-        if msg_upper.startswith("PAUSE RECURRING "):
+        if 'recurring_pause' in route:
             parts = incoming_msg.split()
             if len(parts) >= 3:
                 try:
@@ -3567,7 +3567,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
             return Response(content=str(resp), media_type="application/xml")
 
         # Resume recurring reminder
-        if msg_upper.startswith("RESUME RECURRING "):
+        if 'recurring_resume' in route:
             parts = incoming_msg.split()
             if len(parts) >= 3:
                 try:
@@ -3609,7 +3609,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         # ==========================================
 
         # Delete all memories only
-        if msg_upper in ["DELETE ALL MEMORIES", "DELETE ALL MY MEMORIES", "FORGET ALL MEMORIES", "FORGET ALL MY MEMORIES"]:
+        if 'delete_all_memories' in route:
             resp = MessagingResponse()
             resp.message("⚠️ WARNING: This will permanently delete ALL your memories.\n\nReply YES to confirm or anything else to cancel.")
             create_or_update_user(phone_number, pending_delete=True, pending_list_item="__DELETE_ALL_MEMORIES__")
@@ -3617,7 +3617,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
             return Response(content=str(resp), media_type="application/xml")
 
         # Delete all reminders only
-        if msg_upper in ["DELETE ALL REMINDERS", "DELETE ALL MY REMINDERS", "CANCEL ALL REMINDERS", "CANCEL ALL MY REMINDERS"]:
+        if 'delete_all_reminders' in route:
             resp = MessagingResponse()
             resp.message("⚠️ WARNING: This will permanently delete ALL your reminders.\n\nReply YES to confirm or anything else to cancel.")
             create_or_update_user(phone_number, pending_delete=True, pending_list_item="__DELETE_ALL_REMINDERS__")
@@ -3625,7 +3625,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
             return Response(content=str(resp), media_type="application/xml")
 
         # Delete all lists only
-        if msg_upper in ["DELETE ALL LISTS", "DELETE ALL MY LISTS", "FORGET ALL LISTS", "FORGET ALL MY LISTS"]:
+        if 'delete_all_lists' in route:
             resp = MessagingResponse()
             resp.message("⚠️ WARNING: This will permanently delete ALL your lists and their items.\n\nReply YES to confirm or anything else to cancel.")
             create_or_update_user(phone_number, pending_delete=True, pending_list_item="__DELETE_ALL_LISTS__")
@@ -3633,14 +3633,14 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
             return Response(content=str(resp), media_type="application/xml")
 
         # Delete all - show options menu
-        if msg_upper == "DELETE ALL":
+        if 'delete_all_menu' in route:
             resp = MessagingResponse()
             resp.message("What would you like to delete?\n\n• DELETE ALL MEMORIES\n\n• DELETE ALL REMINDERS\n\n• DELETE ALL LISTS\n\n• DELETE ALL DATA (deletes everything)\n\nText one of the above to continue.")
             log_interaction(phone_number, incoming_msg, "Showing delete options", "delete_all_options", True)
             return Response(content=str(resp), media_type="application/xml")
 
         # Delete everything (all data) - requires explicit "DELETE ALL DATA"
-        if msg_upper in ["DELETE ALL DATA", "DELETE ALL MY DATA", "DELETE EVERYTHING", "FORGET EVERYTHING"]:
+        if 'delete_all_data' in route:
             resp = MessagingResponse()
             resp.message("⚠️ WARNING: This will permanently delete ALL your data (memories, reminders, and lists).\n\nReply YES to confirm or anything else to cancel.")
             create_or_update_user(phone_number, pending_delete=True, pending_list_item="__DELETE_ALL_DATA__")
@@ -3666,12 +3666,16 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
                     for list_id in list_ids:
                         try:
                             conn = get_db_connection()
-                            c = conn.cursor()
-                            c.execute('DELETE FROM lists WHERE id = %s', (int(list_id),))
-                            if c.rowcount > 0:
-                                deleted_count += 1
-                            conn.commit()
-                            return_db_connection(conn)
+                            try:
+                                c = conn.cursor()
+                                c.execute('DELETE FROM lists WHERE id = %s', (int(list_id),))
+                                if c.rowcount > 0:
+                                    deleted_count += 1
+                                    adjust_usage(c, phone_number, lists=-1)
+                                conn.commit()
+                                invalidate_prompt_context(phone_number)
+                            finally:
+                                return_db_connection(conn)
                         except Exception as e:
                             logger.error(f"Error deleting list {list_id}: {e}")
 
@@ -3691,15 +3695,20 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
 
                         # Get list name before deleting
                         conn = get_db_connection()
-                        c = conn.cursor()
-                        c.execute('SELECT list_name FROM lists WHERE id = %s', (int(list_id),))
-                        result = c.fetchone()
-                        list_name = result[0] if result else f"{list_filter} list"
+                        try:
+                            c = conn.cursor()
+                            c.execute('SELECT list_name FROM lists WHERE id = %s', (int(list_id),))
+                            result = c.fetchone()
+                            list_name = result[0] if result else f"{list_filter} list"
 
-                        c.execute('DELETE FROM lists WHERE id = %s', (int(list_id),))
-                        deleted = c.rowcount > 0
-                        conn.commit()
-                        return_db_connection(conn)
+                            c.execute('DELETE FROM lists WHERE id = %s', (int(list_id),))
+                            deleted = c.rowcount > 0
+                            if deleted:
+                                adjust_usage(c, phone_number, lists=-1)
+                            conn.commit()
+                            invalidate_prompt_context(phone_number)
+                        finally:
+                            return_db_connection(conn)
 
                         create_or_update_user(phone_number, pending_delete=False, pending_list_item=None)
                         if deleted:
@@ -3726,10 +3735,14 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
                 # Handle bulk deletion types
                 if pending_action == "__DELETE_ALL_MEMORIES__":
                     conn = get_db_connection()
-                    c = conn.cursor()
-                    c.execute('DELETE FROM memories WHERE phone_number = %s', (phone_number,))
-                    conn.commit()
-                    return_db_connection(conn)
+                    try:
+                        c = conn.cursor()
+                        c.execute('DELETE FROM memories WHERE phone_number = %s', (phone_number,))
+                        invalidate_usage(c, phone_number)
+                        conn.commit()
+                        invalidate_prompt_context(phone_number)
+                    finally:
+                        return_db_connection(conn)
                     create_or_update_user(phone_number, pending_delete=False, pending_list_item=None)
                     resp = MessagingResponse()
                     resp.message("All your memories have been permanently deleted.")
@@ -3738,10 +3751,14 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
 
                 elif pending_action == "__DELETE_ALL_REMINDERS__":
                     conn = get_db_connection()
-                    c = conn.cursor()
-                    c.execute('DELETE FROM reminders WHERE phone_number = %s', (phone_number,))
-                    conn.commit()
-                    return_db_connection(conn)
+                    try:
+                        c = conn.cursor()
+                        c.execute('DELETE FROM reminders WHERE phone_number = %s', (phone_number,))
+                        invalidate_usage(c, phone_number)
+                        conn.commit()
+                        invalidate_prompt_context(phone_number)
+                    finally:
+                        return_db_connection(conn)
                     create_or_update_user(phone_number, pending_delete=False, pending_list_item=None)
                     resp = MessagingResponse()
                     resp.message("All your reminders have been permanently deleted.")
@@ -3750,10 +3767,14 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
 
                 elif pending_action == "__DELETE_ALL_LISTS__":
                     conn = get_db_connection()
-                    c = conn.cursor()
-                    c.execute('DELETE FROM lists WHERE phone_number = %s', (phone_number,))
-                    conn.commit()
-                    return_db_connection(conn)
+                    try:
+                        c = conn.cursor()
+                        c.execute('DELETE FROM lists WHERE phone_number = %s', (phone_number,))
+                        invalidate_usage(c, phone_number)
+                        conn.commit()
+                        invalidate_prompt_context(phone_number)
+                    finally:
+                        return_db_connection(conn)
                     create_or_update_user(phone_number, pending_delete=False, pending_list_item=None)
                     resp = MessagingResponse()
                     resp.message("All your lists have been permanently deleted.")
@@ -3762,12 +3783,16 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
 
                 elif pending_action == "__DELETE_ALL_DATA__":
                     conn = get_db_connection()
-                    c = conn.cursor()
-                    c.execute('DELETE FROM memories WHERE phone_number = %s', (phone_number,))
-                    c.execute('DELETE FROM reminders WHERE phone_number = %s', (phone_number,))
-                    c.execute('DELETE FROM lists WHERE phone_number = %s', (phone_number,))
-                    conn.commit()
-                    return_db_connection(conn)
+                    try:
+                        c = conn.cursor()
+                        c.execute('DELETE FROM memories WHERE phone_number = %s', (phone_number,))
+                        c.execute('DELETE FROM reminders WHERE phone_number = %s', (phone_number,))
+                        c.execute('DELETE FROM lists WHERE phone_number = %s', (phone_number,))
+                        invalidate_usage(c, phone_number)
+                        conn.commit()
+                        invalidate_prompt_context(phone_number)
+                    finally:
+                        return_db_connection(conn)
                     create_or_update_user(phone_number, pending_delete=False, pending_list_item=None)
                     resp = MessagingResponse()
                     resp.message("All your data (memories, reminders, and lists) has been permanently deleted.")
@@ -3784,12 +3809,16 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
                     for list_id in list_ids:
                         try:
                             conn = get_db_connection()
-                            c = conn.cursor()
-                            c.execute('DELETE FROM lists WHERE id = %s', (int(list_id),))
-                            if c.rowcount > 0:
-                                deleted_count += 1
-                            conn.commit()
-                            return_db_connection(conn)
+                            try:
+                                c = conn.cursor()
+                                c.execute('DELETE FROM lists WHERE id = %s', (int(list_id),))
+                                if c.rowcount > 0:
+                                    deleted_count += 1
+                                    adjust_usage(c, phone_number, lists=-1)
+                                conn.commit()
+                                invalidate_prompt_context(phone_number)
+                            finally:
+                                return_db_connection(conn)
                         except Exception as e:
                             logger.error(f"Error deleting list {list_id}: {e}")
 
@@ -3827,7 +3856,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         # ==========================================
         # LIST ALL COMMAND
         # ==========================================
-        if incoming_msg.upper() in ["LIST ALL", "LIST MEMORIES", "SHOW MEMORIES", "MY MEMORIES"]:
+        if 'list_memories' in route:
             # Tuple format: (id, memory_text, parsed_data, created_at)
             memories = get_memories(phone_number)
             if memories:
@@ -3846,7 +3875,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         # ==========================================
         # LIST COMMANDS (MY LISTS, SHOW LISTS)
         # ==========================================
-        if incoming_msg.upper() in ["MY LISTS", "SHOW LISTS", "LIST LISTS", "LISTS"]:
+        if 'list_lists' in route:
             # Clear any pending list item state so number responses show lists, not add items
             create_or_update_user(phone_number, pending_list_item=None, pending_delete=False)
             lists = get_lists(phone_number)
@@ -3915,7 +3944,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         # HELP - Twilio reserved keyword (handled by Twilio Messaging Service)
         # Return empty response so only Twilio's message is sent
         # ==========================================
-        if incoming_msg.upper() == "HELP":
+        if 'help' in route:
             log_interaction(phone_number, incoming_msg, "[Handled by Twilio]", "help_twilio", True)
             resp = MessagingResponse()
             return Response(content=str(resp), media_type="application/xml")
@@ -3923,7 +3952,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         # ==========================================
         # INFO COMMAND (Help Guide)
         # ==========================================
-        if incoming_msg.upper() in ["INFO", "GUIDE", "COMMANDS", "?"]:
+        if 'info' in route:
             resp = MessagingResponse()
             resp.message(get_help_text())
             log_interaction(phone_number, incoming_msg, "Help guide sent", "help_command", True)
@@ -3932,7 +3961,7 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         # ==========================================
         # MORE COMMANDS (Extended Help)
         # ==========================================
-        if incoming_msg.upper() in ["MORE COMMANDS", "MORE", "ALL COMMANDS", "FULL COMMANDS"]:
+        if 'more_commands' in route:
             from utils.formatting import get_extended_help_text
             resp = MessagingResponse()
             resp.message(get_extended_help_text())
@@ -4125,7 +4154,13 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
             resp.message(staging_prefix(reply_text))
             return Response(content=str(resp), media_type="application/xml")
 
-        ai_response = process_with_ai(normalized_msg, phone_number, None)
+        # Common reminder/list/memory phrasings are parsed locally; the AI
+        # gets everything the fast path isn't confident about
+        ai_response = fast_path_intent(incoming_msg, phone_number)
+        if ai_response:
+            logger.info(f"Fast path: {ai_response['action']} (confidence {ai_response['confidence']})")
+        else:
+            ai_response = anyio.from_thread.run(process_with_ai, normalized_msg, phone_number, None)
         logger.info(f"AI response: {ai_response}")
 
         # Check for multi-command response (handle both formats: action="multiple" or multiple=true)
@@ -4175,6 +4210,9 @@ async def sms_reply(request: Request, Body: str = Form(...), From: str = Form(..
         logger.error(f"❌ CRITICAL ERROR in webhook: {e}", exc_info=True)
         error_msg = "Sorry, something went wrong. Please try again in a moment."
         return twiml_or_sms_fallback(phone_number, error_msg, request_start_time)
+    finally:
+        if user_context_token is not None:
+            end_user_context(user_context_token)
 
 
 def process_single_action(ai_response, phone_number, incoming_msg):
@@ -5277,7 +5315,7 @@ def process_single_action(ai_response, phone_number, incoming_msg):
                 # Try to find item in any list
                 found = find_item_in_any_list(phone_number, item_text)
                 if len(found) == 1:
-                    list_name = found[0][1]
+                    list_name, item_text = found[0][1], found[0][3]
                     if mark_item_complete(phone_number, list_name, item_text):
                         reply_text = f"Checked off {item_text} from your {list_name}"
                     else:
@@ -5742,7 +5780,7 @@ async def stripe_webhook(request: Request):
 
 
 @app.get("/api/payment-info")
-async def payment_info(session_id: str = None):
+def payment_info(session_id: str = None):
     """Resolve a Stripe session_id into display data for the success page"""
     from config import STRIPE_ENABLED
     from models.user import get_user_first_name
@@ -5766,7 +5804,7 @@ async def payment_info(session_id: str = None):
 
 
 @app.get("/payment/success")
-async def payment_success(session_id: str = None):
+def payment_success(session_id: str = None):
     """Redirect to Netlify success page"""
     import urllib.parse
     redirect_url = "https://remyndrs.com/payment/success"
@@ -5776,7 +5814,7 @@ async def payment_success(session_id: str = None):
 
 
 @app.get("/payment/cancelled")
-async def payment_cancelled():
+def payment_cancelled():
     """Redirect to Netlify cancelled page"""
     return RedirectResponse(url="https://remyndrs.com/payment/cancelled", status_code=302)
 
@@ -5786,7 +5824,7 @@ async def payment_cancelled():
 # =====================================================
 
 @app.get("/")
-async def health_check():
+def health_check():
     """Health check endpoint"""
     logger.info("Health check called")
     return {
@@ -5983,7 +6021,7 @@ async def website_contact(request: Request):
 
 
 @app.get("/contact.vcf")
-async def get_contact_vcf():
+def get_contact_vcf():
     """Serve Remyndrs contact card (VCF) for saving to phone contacts"""
     import os
     import base64
@@ -6015,7 +6053,7 @@ END:VCARD"""
 
 
 @app.get("/static/remyndrs-logo.png")
-async def get_logo():
+def get_logo():
     """Serve Remyndrs logo for contact card"""
     import os
     logo_path = os.path.join(os.path.dirname(__file__), "static", "remyndrs-logo.png")
@@ -6023,7 +6061,7 @@ async def get_logo():
 
 
 @app.get("/consent", response_class=HTMLResponse)
-async def consent_page():
+def consent_page():
     """Public page showing SMS opt-in consent information for Twilio verification"""
     html = """
 <!DOCTYPE html>
@@ -6121,7 +6159,7 @@ async def consent_page():
 
 
 @app.get("/memories/{phone_number}")
-async def view_memories(phone_number: str, admin: str = Depends(verify_admin)):
+def view_memories(phone_number: str, admin: str = Depends(verify_admin)):
     """View all memories for a phone number - for testing/admin"""
     # Tuple format: (id, memory_text, parsed_data, created_at)
     memories = get_memories(phone_number)
@@ -6139,7 +6177,7 @@ async def view_memories(phone_number: str, admin: str = Depends(verify_admin)):
     }
 
 @app.get("/reminders/{phone_number}")
-async def view_reminders(phone_number: str, admin: str = Depends(verify_admin)):
+def view_reminders(phone_number: str, admin: str = Depends(verify_admin)):
     """View all reminders for a phone number - for testing/admin"""
     # Tuple format: (id, reminder_date, reminder_text, recurring_id, sent)
     reminders = get_user_reminders(phone_number)
@@ -6158,51 +6196,54 @@ async def view_reminders(phone_number: str, admin: str = Depends(verify_admin)):
     }
 
 @app.get("/admin/stats")
-async def admin_stats(admin: str = Depends(verify_admin)):
+def admin_stats(admin: str = Depends(verify_admin)):
     """Admin dashboard showing key metrics"""
-    from database import get_db_connection
-    conn = get_db_connection()
-    c = conn.cursor()
-
-    # Total users
-    c.execute('SELECT COUNT(DISTINCT phone_number) FROM users WHERE onboarding_complete = TRUE')
-    total_users = c.fetchone()[0]
-
-    # Total memories
-    c.execute('SELECT COUNT(*) FROM memories')
-    total_memories = c.fetchone()[0]
-
-    # Total reminders
-    c.execute('SELECT COUNT(*) FROM reminders')
-    total_reminders = c.fetchone()[0]
-
-    # Pending reminders
-    c.execute('SELECT COUNT(*) FROM reminders WHERE sent = FALSE')
-    pending_reminders = c.fetchone()[0]
-
-    # Sent reminders
-    c.execute('SELECT COUNT(*) FROM reminders WHERE sent = TRUE')
-    sent_reminders = c.fetchone()[0]
-
-    # Most active users (top 5)
-    c.execute('''
-        SELECT phone_number, COUNT(*) as interaction_count
-        FROM logs
-        GROUP BY phone_number
-        ORDER BY interaction_count DESC
-        LIMIT 5
-    ''')
-    top_users = c.fetchall()
-
-    # Activity last 24 hours
-    c.execute('''
-        SELECT COUNT(*)
-        FROM logs
-        WHERE created_at >= NOW() - INTERVAL '1 day'
-    ''')
-    activity_24h = c.fetchone()[0]
-
-    conn.close()
+    from database import get_db_connection, return_db_connection
+    conn = None
+    try:
+        conn = get_db_connection()
+        c = conn.cursor()
+
+        # Total users
+        c.execute('SELECT COUNT(DISTINCT phone_number) FROM users WHERE onboarding_complete = TRUE')
+        total_users = c.fetchone()[0]
+
+        # Total memories
+        c.execute('SELECT COUNT(*) FROM memories')
+        total_memories = c.fetchone()[0]
+
+        # Total reminders
+        c.execute('SELECT COUNT(*) FROM reminders')
+        total_reminders = c.fetchone()[0]
+
+        # Pending reminders
+        c.execute('SELECT COUNT(*) FROM reminders WHERE sent = FALSE')
+        pending_reminders = c.fetchone()[0]
+
+        # Sent reminders
+        c.execute('SELECT COUNT(*) FROM reminders WHERE sent = TRUE')
+        sent_reminders = c.fetchone()[0]
+
+        # Most active users (top 5)
+        c.execute('''
+            SELECT phone_number, COUNT(*) as interaction_count
+            FROM logs
+            GROUP BY phone_number
+            ORDER BY interaction_count DESC
+            LIMIT 5
+        ''')
+        top_users = c.fetchall()
+
+        # Activity last 24 hours
+        c.execute('''
+            SELECT COUNT(*)
+            FROM logs
+            WHERE created_at >= NOW() - INTERVAL '1 day'
+        ''')
+        activity_24h = c.fetchone()[0]
+    finally:
+        if conn:
+            return_db_connection(conn)
 
     return {
         "overview": {
@@ -6228,7 +6269,7 @@ async def admin_stats(admin: str = Depends(verify_admin)):
 
 
 @app.post("/admin/cleanup-duplicate-reminders")
-async def cleanup_duplicate_reminders(admin: str = Depends(verify_admin)):
+def cleanup_duplicate_reminders(admin: str = Depends(verify_admin)):
     """
     Clean up duplicate reminders created by the recurring reminder bug.
     Keeps the oldest reminder for each (recurring_id, date) combination and deletes the rest.
@@ -6261,11 +6302,14 @@ async def cleanup_duplicate_reminders(admin: str = Depends(verify_admin)):
             WHERE id IN (
                 SELECT id FROM duplicates WHERE rn > 1
             )
-            RETURNING id
+            RETURNING id, phone_number
         ''')
 
-        deleted_ids = [row[0] for row in c.fetchall()]
+        deleted_rows = c.fetchall()
+        deleted_ids = [row[0] for row in deleted_rows]
         deleted_count = len(deleted_ids)
+        for phone_number in {row[1] for row in deleted_rows}:
+            invalidate_usage(c, phone_number)
 
         conn.commit()
 
@@ -8,6 +8,9 @@ from typing import Any, Optional
 
 from database import get_db_connection, return_db_connection
 from config import logger, ENCRYPTION_ENABLED
+from models.prompt_context import invalidate_prompt_context, LISTS
+from models.usage import adjust_usage, adjust_list_item_count, get_usage
+from models.search import search, blind_tokens
 
 
 def create_list(phone_number: str, list_name: str) -> Optional[int]:
@@ -21,17 +24,19 @@ def create_list(phone_number: str, list_name: str) -> Optional[int]:
             from utils.encryption import hash_phone
             phone_hash = hash_phone(phone_number)
             c.execute(
-                'INSERT INTO lists (phone_number, phone_hash, list_name) VALUES (%s, %s, %s) RETURNING id',
+                'INSERT INTO lists (phone_number, phone_hash, list_name, item_count) VALUES (%s, %s, %s, 0) RETURNING id',
                 (phone_number, phone_hash, list_name)
             )
         else:
             c.execute(
-                'INSERT INTO lists (phone_number, list_name) VALUES (%s, %s) RETURNING id',
+                'INSERT INTO lists (phone_number, list_name, item_count) VALUES (%s, %s, 0) RETURNING id',
                 (phone_number, list_name)
             )
 
         list_id = c.fetchone()[0]
+        adjust_usage(c, phone_number, lists=1)
         conn.commit()
+        invalidate_prompt_context(phone_number, LISTS)
         logger.info(f"Created list '{list_name}'")
         return list_id
     except Exception as e:
@@ -98,6 +103,76 @@ def get_lists(phone_number: str) -> list[tuple[int, str, int, int]]:
             return_db_connection(conn)
 
 
+# One row per list with its items aggregated in-database, so loading every
+# list costs a single round trip instead of get_lists + get_list_items per list
+_LISTS_WITH_ITEMS_SQL = '''
+    SELECT l.id, l.list_name, l.created_at,
+           COALESCE(
+               json_agg(
+                   json_build_object('id', li.id, 'item_text', li.item_text,
+                                     'completed', li.completed, 'created_at', li.created_at)
+                   ORDER BY li.created_at, li.id
+               ) FILTER (WHERE li.id IS NOT NULL),
+               '[]'::json
+           ) AS items
+    FROM lists l
+    LEFT JOIN list_items li ON l.id = li.list_id
+    WHERE {owner_condition}
+    GROUP BY l.id, l.list_name, l.created_at
+    ORDER BY l.created_at DESC
+'''
+
+
+def get_lists_with_items(phone_number: str) -> list[dict[str, Any]]:
+    """Get all lists for a user with their items, in one query.
+
+    Lists are newest first (same order as get_lists); items are in the order
+    they were added (same as get_list_items).
+
+    Returns:
+        List of dicts with id, list_name, created_at, item_count,
+        completed_count and items (dicts with id, item_text, completed, created_at)
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        c = conn.cursor()
+
+        if ENCRYPTION_ENABLED:
+            from utils.encryption import hash_phone
+            phone_hash = hash_phone(phone_number)
+            c.execute(_LISTS_WITH_ITEMS_SQL.format(owner_condition='l.phone_hash = %s'), (phone_hash,))
+            rows = c.fetchall()
+            if not rows:
+                # Fallback for lists created before encryption
+                c.execute(_LISTS_WITH_ITEMS_SQL.format(owner_condition='l.phone_number = %s'), (phone_number,))
+                rows = c.fetchall()
+        else:
+            c.execute(_LISTS_WITH_ITEMS_SQL.format(owner_condition='l.phone_number = %s'), (phone_number,))
+            rows = c.fetchall()
+
+        results = []
+        for list_id, list_name, created_at, items in rows:
+            for item in items:
+                if item['created_at']:
+                    item['created_at'] = datetime.fromisoformat(item['created_at'])
+            results.append({
+                'id': list_id,
+                'list_name': list_name,
+                'created_at': created_at,
+                'item_count': len(items),
+                'completed_count': sum(1 for item in items if item['completed']),
+                'items': items,
+            })
+        return results
+    except Exception as e:
+        logger.error(f"Error getting lists with items: {e}")
+        return []
+    finally:
+        if conn:
+            return_db_connection(conn)
+
+
 def get_list_by_name(phone_number: str, list_name: str) -> Optional[tuple[int, str]]:
     """Find a list by name (case-insensitive)"""
     conn = None
@@ -253,9 +328,10 @@ def add_list_item(list_id: int, phone_number: str, item_text: str) -> Optional[i
             phone_hash = hash_phone(phone_number)
             item_text_encrypted = encrypt_field(item_text)
             c.execute(
-                '''INSERT INTO list_items (list_id, phone_number, phone_hash, item_text, item_text_encrypted)
-                   VALUES (%s, %s, %s, %s, %s) RETURNING id''',
-                (list_id, phone_number, phone_hash, item_text, item_text_encrypted)
+                '''INSERT INTO list_items (list_id, phone_number, phone_hash, item_text, item_text_encrypted,
+                                           search_tokens)
+                   VALUES (%s, %s, %s, %s, %s, %s) RETURNING id''',
+                (list_id, phone_number, phone_hash, item_text, item_text_encrypted, blind_tokens(item_text))
             )
         else:
             c.execute(
@@ -264,7 +340,9 @@ def add_list_item(list_id: int, phone_number: str, item_text: str) -> Optional[i
             )
 
         item_id = c.fetchone()[0]
+        adjust_list_item_count(c, list_id, 1)
         conn.commit()
+        invalidate_prompt_context(phone_number, LISTS)
         logger.info(f"Added item to list {list_id}")
         return item_id
     except Exception as e:
@@ -308,6 +386,7 @@ def mark_item_complete(phone_number: str, list_name: str, item_text: str) -> boo
         )
         updated = c.rowcount > 0
         conn.commit()
+        invalidate_prompt_context(phone_number, LISTS)
         return updated
     except Exception as e:
         logger.error(f"Error marking item complete: {e}")
@@ -350,6 +429,7 @@ def mark_item_incomplete(phone_number: str, list_name: str, item_text: str) -> b
         )
         updated = c.rowcount > 0
         conn.commit()
+        invalidate_prompt_context(phone_number, LISTS)
         return updated
     except Exception as e:
         logger.error(f"Error marking item incomplete: {e}")
@@ -360,7 +440,11 @@ def mark_item_incomplete(phone_number: str, list_name: str, item_text: str) -> b
 
 
 def find_item_in_any_list(phone_number: str, item_text: str) -> list[tuple[int, str, int, str]]:
-    """Find an item across all user's lists (for check off without specifying list)"""
+    """Find an unchecked item across all user's lists (for check off without specifying list).
+
+    Exact (case-insensitive) matches win; without one, falls back to the
+    ranked keyword search, so "mlk" or "milk" can find "Almond milk".
+    """
     conn = None
     try:
         conn = get_db_connection()
@@ -384,13 +468,18 @@ def find_item_in_any_list(phone_number: str, item_text: str) -> list[tuple[int,
             ''', (phone_number, item_text))
 
         results = c.fetchall()
-        return results
     except Exception as e:
         logger.error(f"Error finding item: {e}")
         return []
     finally:
         if conn:
             return_db_connection(conn)
+    return results or search_list_items(phone_number, item_text, unchecked_only=True)
+
+
+def search_list_items(phone_number: str, search_term: str, unchecked_only: bool = False) -> list[tuple[int, str, int, str]]:
+    """Search items across all user's lists by keyword, best match first (see models.search)"""
+    return search('unchecked_list_items' if unchecked_only else 'list_items', phone_number, search_term)
 
 
 def delete_list_item(phone_number: str, list_name: str, item_text: str) -> bool:
@@ -424,7 +513,10 @@ def delete_list_item(phone_number: str, list_name: str, item_text: str) -> bool:
             (list_id, item_text)
         )
         deleted = c.rowcount > 0
+        if deleted:
+            adjust_list_item_count(c, list_id, -c.rowcount)
         conn.commit()
+        invalidate_prompt_context(phone_number, LISTS)
         return deleted
     except Exception as e:
         logger.error(f"Error deleting list item: {e}")
@@ -466,7 +558,10 @@ def delete_list(phone_number: str, list_name: str) -> bool:
 
         deleted = c.rowcount > 0
         logger.info(f"Delete rowcount: {c.rowcount}, deleted={deleted}")
+        if deleted:
+            adjust_usage(c, phone_number, lists=-c.rowcount)
         conn.commit()
+        invalidate_prompt_context(phone_number, LISTS)
         if deleted:
             logger.info(f"Deleted list '{list_name}'")
         return deleted
@@ -502,6 +597,7 @@ def rename_list(phone_number: str, old_name: str, new_name: str) -> bool:
 
         updated = c.rowcount > 0
         conn.commit()
+        invalidate_prompt_context(phone_number, LISTS)
         return updated
     except Exception as e:
         logger.error(f"Error renaming list: {e}")
@@ -538,7 +634,9 @@ def clear_list(phone_number: str, list_name: str) -> bool:
 
         list_id = list_result[0]
         c.execute('DELETE FROM list_items WHERE list_id = %s', (list_id,))
+        c.execute('UPDATE lists SET item_count = 0 WHERE id = %s', (list_id,))
         conn.commit()
+        invalidate_prompt_context(phone_number, LISTS)
         logger.info(f"Cleared all items from list '{list_name}'")
         return True
     except Exception as e:
@@ -550,38 +648,29 @@ def clear_list(phone_number: str, list_name: str) -> bool:
 
 
 def get_list_count(phone_number: str) -> int:
-    """Get the number of lists a user has"""
-    conn = None
-    try:
-        conn = get_db_connection()
-        c = conn.cursor()
-
-        if ENCRYPTION_ENABLED:
-            from utils.encryption import hash_phone
-            phone_hash = hash_phone(phone_number)
-            # Count from both phone_hash and phone_number to include pre-encryption lists
-            c.execute('SELECT COUNT(*) FROM lists WHERE phone_hash = %s OR phone_number = %s', (phone_hash, phone_number))
-        else:
-            c.execute('SELECT COUNT(*) FROM lists WHERE phone_number = %s', (phone_number,))
-
-        count = c.fetchone()[0]
-        return count
-    except Exception as e:
-        logger.error(f"Error getting list count: {e}")
-        return 0
-    finally:
-        if conn:
-            return_db_connection(conn)
+    """Get the number of lists a user has (from the user_usage counters)"""
+    return get_usage(phone_number)['lists']
 
 
 def get_item_count(list_id: int) -> int:
-    """Get the number of items in a list"""
+    """Get the number of items in a list (lists.item_count, counted once if not yet set)"""
     conn = None
     try:
         conn = get_db_connection()
         c = conn.cursor()
-        c.execute('SELECT COUNT(*) FROM list_items WHERE list_id = %s', (list_id,))
+        c.execute('SELECT item_count FROM lists WHERE id = %s', (list_id,))
+        row = c.fetchone()
+        if not row:
+            return 0
+        if row[0] is not None:
+            return row[0]
+        c.execute(
+            '''UPDATE lists SET item_count = (SELECT COUNT(*) FROM list_items WHERE list_id = %s)
+               WHERE id = %s RETURNING item_count''',
+            (list_id, list_id)
+        )
         count = c.fetchone()[0]
+        conn.commit()
         return count
     except Exception as e:
         logger.error(f"Error getting item count: {e}")
@@ -651,7 +740,7 @@ def delete_list_item_by_id(item_id: int, phone_number: str) -> bool:
                 '''DELETE FROM list_items
                    WHERE id = %s AND list_id IN (
                        SELECT id FROM lists WHERE phone_hash = %s OR phone_number = %s
-                   )''',
+                   ) RETURNING list_id''',
                 (item_id, phone_hash, phone_number)
             )
         else:
@@ -659,12 +748,16 @@ def delete_list_item_by_id(item_id: int, phone_number: str) -> bool:
                 '''DELETE FROM list_items
                    WHERE id = %s AND list_id IN (
                        SELECT id FROM lists WHERE phone_number = %s
-                   )''',
+                   ) RETURNING list_id''',
                 (item_id, phone_number)
             )
 
-        deleted = c.rowcount > 0
+        deleted_from = c.fetchone()
+        deleted = deleted_from is not None
+        if deleted:
+            adjust_list_item_count(c, deleted_from[0], -1)
         conn.commit()
+        invalidate_prompt_context(phone_number, LISTS)
         if deleted:
             logger.info(f"Deleted list item {item_id} via undo")
         return deleted
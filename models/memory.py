@@ -4,12 +4,18 @@ Handles all memory-related database operations
 """
 
 import json
+import math
 import re
 from datetime import datetime
 from typing import Any, Optional
 
+from psycopg2.extras import execute_values
+
 from database import get_db_connection, return_db_connection
 from config import logger, ENCRYPTION_ENABLED
+from models.prompt_context import invalidate_prompt_context, MEMORIES
+from models.usage import adjust_usage, invalidate_usage
+from models.search import search, blind_tokens
 
 # Common words to ignore when comparing memory similarity
 _STOP_WORDS = frozenset({
@@ -37,10 +43,13 @@ def _extract_keywords(text: str) -> set[str]:
     return {w for w in words if w not in _STOP_WORDS and len(w) > 1}
 
 
-def _memory_similarity(text_a: str, text_b: str) -> float:
-    """Calculate Jaccard similarity between two memory texts based on keywords."""
-    keywords_a = _extract_keywords(text_a)
-    keywords_b = _extract_keywords(text_b)
+def _keyword_signature(text: str) -> list[str]:
+    """Stored form of _extract_keywords (memories.keywords): sorted so equal sets compare equal."""
+    return sorted(_extract_keywords(text))
+
+
+def _keyword_jaccard(keywords_a: set[str], keywords_b: set[str]) -> float:
+    """Jaccard similarity between two keyword sets."""
     if not keywords_a or not keywords_b:
         return 0.0
     intersection = keywords_a & keywords_b
@@ -48,44 +57,70 @@ def _memory_similarity(text_a: str, text_b: str) -> float:
     return len(intersection) / len(union)
 
 
+def _backfill_keywords(cursor, owner_column: str, owner_value: str) -> None:
+    """Compute memories.keywords for a user's rows written before the column existed."""
+    cursor.execute(
+        f'SELECT id, memory_text FROM memories WHERE {owner_column} = %s AND keywords IS NULL',
+        (owner_value,)
+    )
+    rows = cursor.fetchall()
+    if rows:
+        execute_values(
+            cursor,
+            'UPDATE memories m SET keywords = v.keywords FROM (VALUES %s) AS v (id, keywords) WHERE m.id = v.id',
+            [(mem_id, _keyword_signature(text or '')) for mem_id, text in rows],
+            template='(%s, %s::text[])'
+        )
+
+
 def _find_similar_memory(cursor, phone_number: str, memory_text: str) -> Optional[int]:
-    """Find an existing memory with high keyword overlap. Returns the memory ID or None."""
+    """Find an existing memory with high keyword overlap. Returns the memory ID or None.
+
+    Only memories sharing a keyword with the new text (GIN && on
+    memories.keywords) and whose keyword count could reach the threshold are
+    fetched; exact Jaccard is computed on that short list. Ties go to the
+    lowest id.
+    """
+    new_keywords = _extract_keywords(memory_text)
+    if not new_keywords:
+        return None  # Jaccard is 0 against everything
+
+    # Use lower threshold when the new memory is short (few keywords)
+    # to catch key-value updates like "WiFi is ABC" → "WiFi is XYZ"
+    threshold = _SIMILARITY_THRESHOLD
+    if len(new_keywords) <= _SHORT_MEMORY_KEYWORD_LIMIT:
+        threshold = _SHORT_MEMORY_THRESHOLD
+
+    # Rows stored under phone_hash take precedence; legacy rows are matched by phone_number
+    owner_column, owner_value = 'phone_number', phone_number
     if ENCRYPTION_ENABLED:
         from utils.encryption import hash_phone
         phone_hash = hash_phone(phone_number)
-        cursor.execute(
-            'SELECT id, memory_text FROM memories WHERE phone_hash = %s',
-            (phone_hash,)
-        )
-        results = cursor.fetchall()
-        if not results:
-            cursor.execute(
-                'SELECT id, memory_text FROM memories WHERE phone_number = %s',
-                (phone_number,)
-            )
-            results = cursor.fetchall()
-    else:
-        cursor.execute(
-            'SELECT id, memory_text FROM memories WHERE phone_number = %s',
-            (phone_number,)
-        )
-        results = cursor.fetchall()
+        cursor.execute('SELECT EXISTS (SELECT 1 FROM memories WHERE phone_hash = %s)', (phone_hash,))
+        if cursor.fetchone()[0]:
+            owner_column, owner_value = 'phone_hash', phone_hash
+
+    _backfill_keywords(cursor, owner_column, owner_value)
+
+    # |A ∩ B| / |A ∪ B| >= t needs t·|A| <= |B| <= |A|/t
+    size = len(new_keywords)
+    cursor.execute(
+        f'''SELECT id, keywords FROM memories
+            WHERE {owner_column} = %s AND keywords && %s::text[]
+              AND cardinality(keywords) BETWEEN %s AND %s
+            ORDER BY id''',
+        (owner_value, sorted(new_keywords),
+         math.ceil(size * threshold - 1e-9), math.floor(size / threshold + 1e-9))
+    )
 
     best_id = None
     best_score = 0.0
-    new_keywords = _extract_keywords(memory_text)
-    for mem_id, existing_text in results:
-        score = _memory_similarity(memory_text, existing_text)
+    for mem_id, keywords in cursor.fetchall():
+        score = _keyword_jaccard(new_keywords, set(keywords))
         if score > best_score:
             best_score = score
             best_id = mem_id
 
-    # Use lower threshold when the new memory is short (few keywords)
-    # to catch key-value updates like "WiFi is ABC" → "WiFi is XYZ"
-    threshold = _SIMILARITY_THRESHOLD
-    if len(new_keywords) <= _SHORT_MEMORY_KEYWORD_LIMIT:
-        threshold = _SHORT_MEMORY_THRESHOLD
-
     if best_score >= threshold:
         return best_id
     return None
@@ -103,6 +138,7 @@ def save_memory(phone_number: str, memory_text: str, parsed_data: dict[str, Any]
 
         # Check for existing similar memory to update
         existing_id = _find_similar_memory(c, phone_number, memory_text)
+        keywords = _keyword_signature(memory_text)
 
         if existing_id:
             # Update existing memory
@@ -111,17 +147,19 @@ def save_memory(phone_number: str, memory_text: str, parsed_data: dict[str, Any]
                 memory_text_encrypted = encrypt_field(memory_text)
                 c.execute(
                     '''UPDATE memories SET memory_text = %s, memory_text_encrypted = %s,
-                       parsed_data = %s, created_at = NOW()
+                       parsed_data = %s, keywords = %s, search_tokens = %s, created_at = NOW()
                        WHERE id = %s''',
-                    (memory_text, memory_text_encrypted, json.dumps(parsed_data), existing_id)
+                    (memory_text, memory_text_encrypted, json.dumps(parsed_data), keywords,
+                     blind_tokens(memory_text), existing_id)
                 )
             else:
                 c.execute(
-                    '''UPDATE memories SET memory_text = %s, parsed_data = %s, created_at = NOW()
+                    '''UPDATE memories SET memory_text = %s, parsed_data = %s, keywords = %s, created_at = NOW()
                        WHERE id = %s''',
-                    (memory_text, json.dumps(parsed_data), existing_id)
+                    (memory_text, json.dumps(parsed_data), keywords, existing_id)
                 )
             conn.commit()
+            invalidate_prompt_context(phone_number, MEMORIES)
             logger.info(f"Updated existing memory {existing_id} for user")
             return True
         else:
@@ -131,16 +169,20 @@ def save_memory(phone_number: str, memory_text: str, parsed_data: dict[str, Any]
                 phone_hash = hash_phone(phone_number)
                 memory_text_encrypted = encrypt_field(memory_text)
                 c.execute(
-                    '''INSERT INTO memories (phone_number, phone_hash, memory_text, memory_text_encrypted, parsed_data)
-                       VALUES (%s, %s, %s, %s, %s)''',
-                    (phone_number, phone_hash, memory_text, memory_text_encrypted, json.dumps(parsed_data))
+                    '''INSERT INTO memories (phone_number, phone_hash, memory_text, memory_text_encrypted,
+                                            parsed_data, keywords, search_tokens)
+                       VALUES (%s, %s, %s, %s, %s, %s, %s)''',
+                    (phone_number, phone_hash, memory_text, memory_text_encrypted, json.dumps(parsed_data),
+                     keywords, blind_tokens(memory_text))
                 )
             else:
                 c.execute(
-                    'INSERT INTO memories (phone_number, memory_text, parsed_data) VALUES (%s, %s, %s)',
-                    (phone_number, memory_text, json.dumps(parsed_data))
+                    'INSERT INTO memories (phone_number, memory_text, parsed_data, keywords) VALUES (%s, %s, %s, %s)',
+                    (phone_number, memory_text, json.dumps(parsed_data), keywords)
                 )
+            adjust_usage(c, phone_number, memories=1)
             conn.commit()
+            invalidate_prompt_context(phone_number, MEMORIES)
             logger.info(f"Saved new memory for user")
             return False
     except Exception as e:
@@ -201,8 +243,10 @@ def delete_all_memories(phone_number: str) -> None:
             c.execute('DELETE FROM memories WHERE phone_hash = %s OR phone_number = %s', (phone_hash, phone_number))
         else:
             c.execute('DELETE FROM memories WHERE phone_number = %s', (phone_number,))
+        invalidate_usage(c, phone_number)
 
         conn.commit()
+        invalidate_prompt_context(phone_number, MEMORIES)
         logger.info(f"Deleted all memories for user")
     except Exception as e:
         logger.error(f"Error deleting memories: {e}")
@@ -212,49 +256,8 @@ def delete_all_memories(phone_number: str) -> None:
 
 
 def search_memories(phone_number: str, search_term: str) -> list[tuple[int, str, datetime]]:
-    """Search memories by keyword (case-insensitive)"""
-    conn = None
-    try:
-        conn = get_db_connection()
-        c = conn.cursor()
-
-        search_pattern = f'%{search_term}%'
-
-        if ENCRYPTION_ENABLED:
-            from utils.encryption import hash_phone
-            phone_hash = hash_phone(phone_number)
-            c.execute(
-                '''SELECT id, memory_text, created_at FROM memories
-                   WHERE phone_hash = %s AND LOWER(memory_text) LIKE LOWER(%s)
-                   ORDER BY created_at DESC''',
-                (phone_hash, search_pattern)
-            )
-            results = c.fetchall()
-            if not results:
-                # Fallback for memories created before encryption
-                c.execute(
-                    '''SELECT id, memory_text, created_at FROM memories
-                       WHERE phone_number = %s AND LOWER(memory_text) LIKE LOWER(%s)
-                       ORDER BY created_at DESC''',
-                    (phone_number, search_pattern)
-                )
-                results = c.fetchall()
-        else:
-            c.execute(
-                '''SELECT id, memory_text, created_at FROM memories
-                   WHERE phone_number = %s AND LOWER(memory_text) LIKE LOWER(%s)
-                   ORDER BY created_at DESC''',
-                (phone_number, search_pattern)
-            )
-            results = c.fetchall()
-
-        return results
-    except Exception as e:
-        logger.error(f"Error searching memories: {e}")
-        return []
-    finally:
-        if conn:
-            return_db_connection(conn)
+    """Search memories by keyword, best match first (see models.search)"""
+    return search('memories', phone_number, search_term)
 
 
 def delete_memory(phone_number: str, memory_id: int) -> bool:
@@ -285,8 +288,11 @@ def delete_memory(phone_number: str, memory_id: int) -> bool:
             )
 
         deleted = c.rowcount > 0
+        if deleted:
+            adjust_usage(c, phone_number, memories=-1)
         conn.commit()
         if deleted:
+            invalidate_prompt_context(phone_number, MEMORIES)
             logger.info(f"Deleted memory {memory_id}")
         return deleted
     except Exception as e:
@@ -0,0 +1,122 @@
+"""
+Prompt Context Cache
+Process-wide cache of the per-user context blocks (memories, reminders, lists)
+that process_with_ai appends to the static system prompt
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, Optional
+
+from config import PROMPT_CONTEXT_CACHE_TTL, PROMPT_CONTEXT_CACHE_MAX_USERS, SETTINGS_NOTIFY_CHANNEL
+
+MEMORIES = 'memories'
+REMINDERS = 'reminders'
+LISTS = 'lists'
+CONTEXT_KINDS = (MEMORIES, REMINDERS, LISTS)
+
+
+class PromptContextCache:
+    """Formatted context blocks keyed by (phone_number, kind).
+
+    Each entry carries a stamp (e.g. timezone and local date) supplied by the
+    caller; a lookup with a different stamp is a miss, so text rendered
+    relative to "today" never outlives the day it was rendered for. Writes in
+    models.memory, models.reminder and models.list_model call
+    invalidate_prompt_context(); writes Celery makes (reminders sent, recurring
+    occurrences) also call notify_prompt_context_changed() so the web process
+    hears about them. The TTL bounds staleness while its listener is down.
+    """
+
+    def __init__(self, ttl_seconds: float = PROMPT_CONTEXT_CACHE_TTL, max_users: int = PROMPT_CONTEXT_CACHE_MAX_USERS):
+        self.ttl_seconds = ttl_seconds
+        self.max_users = max_users
+        # phone_number -> {kind: (stamp, text, expires_at)}, least recently used first
+        self._entries: OrderedDict[str, dict[str, tuple[Hashable, str, float]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, phone_number: str, kind: str, stamp: Hashable) -> Optional[str]:
+        """Return the cached block, or None if missing, expired or rendered for another stamp."""
+        now = time.monotonic()
+        with self._lock:
+            blocks = self._entries.get(phone_number)
+            entry = blocks.get(kind) if blocks else None
+            if entry is None or entry[0] != stamp or entry[2] <= now:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(phone_number)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, phone_number: str, kind: str, stamp: Hashable, text: str, expires_in: Optional[float] = None) -> None:
+        """Store a rendered block. expires_in shortens (never extends) the TTL."""
+        ttl = self.ttl_seconds if expires_in is None else min(self.ttl_seconds, max(0.0, expires_in))
+        with self._lock:
+            blocks = self._entries.setdefault(phone_number, {})
+            blocks[kind] = (stamp, text, time.monotonic() + ttl)
+            self._entries.move_to_end(phone_number)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, phone_number: str, *kinds: str) -> None:
+        """Drop the given kinds (all kinds if none given) for one user."""
+        with self._lock:
+            blocks = self._entries.get(phone_number)
+            if not blocks:
+                return
+            for kind in kinds or CONTEXT_KINDS:
+                if blocks.pop(kind, None) is not None:
+                    self.invalidations += 1
+            if not blocks:
+                del self._entries[phone_number]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            users = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            "users": users,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+_prompt_context_cache = PromptContextCache()
+
+
+def get_prompt_context_cache() -> PromptContextCache:
+    return _prompt_context_cache
+
+
+def invalidate_prompt_context(phone_number: Optional[str], *kinds: str) -> None:
+    """Forget cached prompt context for a user after a write. Safe to call with no phone."""
+    if phone_number:
+        _prompt_context_cache.invalidate(phone_number, *kinds)
+
+
+# Users per NOTIFY payload (Postgres caps payloads at 8000 bytes)
+_NOTIFY_BATCH = 100
+
+
+def notify_prompt_context_changed(cursor, phone_numbers: Iterable[str], *kinds: str) -> None:
+    """Invalidate these users' blocks in every process once the caller commits.
+
+    Rides the settings channel (SETTINGS_NOTIFY_CHANNEL), whose listener thread
+    runs in every process that reads settings (database._settings_listener_loop).
+    pg_notify is transactional, so a rolled-back write notifies no one.
+    """
+    phones = sorted({phone for phone in phone_numbers if phone})
+    for start in range(0, len(phones), _NOTIFY_BATCH):
+        payload = {'prompt_context': phones[start:start + _NOTIFY_BATCH], 'kinds': list(kinds)}
+        cursor.execute('SELECT pg_notify(%s, %s)', (SETTINGS_NOTIFY_CHANNEL, json.dumps(payload)))
@@ -7,7 +7,31 @@ from datetime import date, datetime, timedelta, time
 from typing import Any, Optional
 
 from database import get_db_connection, return_db_connection
-from config import logger, ENCRYPTION_ENABLED
+from config import logger, ENCRYPTION_ENABLED, REMINDER_NOTIFY_CHANNEL
+from models.prompt_context import invalidate_prompt_context, notify_prompt_context_changed, REMINDERS
+from models.usage import adjust_usage, created_today
+from models.search import search, blind_tokens
+
+
+def _notify_reminder_scheduled(c, reminder_id: int) -> None:
+    """Tell the reminder scheduler a reminder was created or moved.
+
+    pg_notify is transactional - the scheduler only hears about it once the
+    caller commits, and never hears about a rolled-back write.
+    """
+    _notify_reminders_scheduled(c, [reminder_id])
+
+
+def _notify_reminders_scheduled(c, reminder_ids: list[int]) -> None:
+    """Bulk form of _notify_reminder_scheduled - one notification per reminder, one statement."""
+    if not reminder_ids:
+        return
+    c.execute(
+        '''SELECT pg_notify(%s, json_build_object('id', id, 'reminder_date', reminder_date)::text)
+           FROM reminders WHERE id = ANY(%s)''',
+        (REMINDER_NOTIFY_CHANNEL, list(reminder_ids))
+    )
+
 
 def save_reminder(phone_number: str, reminder_text: str, reminder_date: datetime) -> None:
     """Save a new reminder to the database with optional encryption"""
@@ -21,17 +45,22 @@ def save_reminder(phone_number: str, reminder_text: str, reminder_date: datetime
             phone_hash = hash_phone(phone_number)
             reminder_text_encrypted = encrypt_field(reminder_text)
             c.execute(
-                '''INSERT INTO reminders (phone_number, phone_hash, reminder_text, reminder_text_encrypted, reminder_date)
-                   VALUES (%s, %s, %s, %s, %s)''',
-                (phone_number, phone_hash, reminder_text, reminder_text_encrypted, reminder_date)
+                '''INSERT INTO reminders (phone_number, phone_hash, reminder_text, reminder_text_encrypted,
+                                          search_tokens, reminder_date)
+                   VALUES (%s, %s, %s, %s, %s, %s) RETURNING id''',
+                (phone_number, phone_hash, reminder_text, reminder_text_encrypted,
+                 blind_tokens(reminder_text), reminder_date)
             )
         else:
             c.execute(
-                'INSERT INTO reminders (phone_number, reminder_text, reminder_date) VALUES (%s, %s, %s)',
+                'INSERT INTO reminders (phone_number, reminder_text, reminder_date) VALUES (%s, %s, %s) RETURNING id',
                 (phone_number, reminder_text, reminder_date)
             )
 
+        _notify_reminder_scheduled(c, c.fetchone()[0])
+        adjust_usage(c, phone_number, reminders_today=1)
         conn.commit()
+        invalidate_prompt_context(phone_number, REMINDERS)
         logger.info(f"Saved reminder at {reminder_date}")
     except Exception as e:
         logger.error(f"Error saving reminder: {e}")
@@ -65,7 +94,8 @@ def mark_reminder_sent(reminder_id: int) -> None:
     try:
         conn = get_db_connection()
         c = conn.cursor()
-        c.execute('UPDATE reminders SET sent = TRUE WHERE id = %s', (reminder_id,))
+        c.execute('UPDATE reminders SET sent = TRUE WHERE id = %s RETURNING phone_number', (reminder_id,))
+        notify_prompt_context_changed(c, [row[0] for row in c.fetchall()], REMINDERS)
         conn.commit()
         logger.info(f"Marked reminder {reminder_id} as sent")
     except Exception as e:
@@ -230,49 +260,8 @@ def get_reminders_for_date(phone_number: str, target_date: date, timezone_str: s
 
 
 def search_pending_reminders(phone_number: str, search_term: str) -> list[tuple[int, str, datetime]]:
-    """Search pending reminders by keyword (case-insensitive)"""
-    conn = None
-    try:
-        conn = get_db_connection()
-        c = conn.cursor()
-
-        search_pattern = f'%{search_term}%'
-
-        if ENCRYPTION_ENABLED:
-            from utils.encryption import hash_phone
-            phone_hash = hash_phone(phone_number)
-            c.execute(
-                '''SELECT id, reminder_text, reminder_date FROM reminders
-                   WHERE phone_hash = %s AND sent = FALSE AND LOWER(reminder_text) LIKE LOWER(%s)
-                   ORDER BY reminder_date''',
-                (phone_hash, search_pattern)
-            )
-            results = c.fetchall()
-            if not results:
-                # Fallback for reminders created before encryption
-                c.execute(
-                    '''SELECT id, reminder_text, reminder_date FROM reminders
-                       WHERE phone_number = %s AND sent = FALSE AND LOWER(reminder_text) LIKE LOWER(%s)
-                       ORDER BY reminder_date''',
-                    (phone_number, search_pattern)
-                )
-                results = c.fetchall()
-        else:
-            c.execute(
-                '''SELECT id, reminder_text, reminder_date FROM reminders
-                   WHERE phone_number = %s AND sent = FALSE AND LOWER(reminder_text) LIKE LOWER(%s)
-                   ORDER BY reminder_date''',
-                (phone_number, search_pattern)
-            )
-            results = c.fetchall()
-
-        return results
-    except Exception as e:
-        logger.error(f"Error searching pending reminders: {e}")
-        return []
-    finally:
-        if conn:
-            return_db_connection(conn)
+    """Search pending reminders by keyword, best match first (see models.search)"""
+    return search('reminders', phone_number, search_term)
 
 
 def delete_reminder(phone_number: str, reminder_id: int) -> bool:
@@ -287,24 +276,28 @@ def delete_reminder(phone_number: str, reminder_id: int) -> bool:
             phone_hash = hash_phone(phone_number)
             # Only delete if it belongs to this user and hasn't been sent
             c.execute(
-                'DELETE FROM reminders WHERE id = %s AND phone_hash = %s AND sent = FALSE',
+                'DELETE FROM reminders WHERE id = %s AND phone_hash = %s AND sent = FALSE RETURNING created_at, snoozed',
                 (reminder_id, phone_hash)
             )
             if c.rowcount == 0:
                 # Fallback for reminders created before encryption
                 c.execute(
-                    'DELETE FROM reminders WHERE id = %s AND phone_number = %s AND sent = FALSE',
+                    'DELETE FROM reminders WHERE id = %s AND phone_number = %s AND sent = FALSE RETURNING created_at, snoozed',
                     (reminder_id, phone_number)
                 )
         else:
             c.execute(
-                'DELETE FROM reminders WHERE id = %s AND phone_number = %s AND sent = FALSE',
+                'DELETE FROM reminders WHERE id = %s AND phone_number = %s AND sent = FALSE RETURNING created_at, snoozed',
                 (reminder_id, phone_number)
             )
 
-        deleted = c.rowcount > 0
+        deleted_row = c.fetchone()
+        deleted = deleted_row is not None
+        if deleted and created_today(deleted_row[0]) and not deleted_row[1]:
+            adjust_usage(c, phone_number, reminders_today=-1)
         conn.commit()
         if deleted:
+            invalidate_prompt_context(phone_number, REMINDERS)
             logger.info(f"Deleted reminder {reminder_id}")
         return deleted
     except Exception as e:
@@ -367,8 +360,11 @@ def update_reminder_time(phone_number: str, reminder_id: int, new_date_utc: date
                 )
 
         updated = c.rowcount > 0
+        if updated:
+            _notify_reminder_scheduled(c, reminder_id)
         conn.commit()
         if updated:
+            invalidate_prompt_context(phone_number, REMINDERS)
             logger.info(f"Updated reminder {reminder_id} to {new_date_utc}")
         return updated
     except Exception as e:
@@ -450,7 +446,14 @@ def mark_reminder_snoozed(reminder_id: int) -> None:
     try:
         conn = get_db_connection()
         c = conn.cursor()
-        c.execute('UPDATE reminders SET snoozed = TRUE WHERE id = %s', (reminder_id,))
+        c.execute(
+            'UPDATE reminders SET snoozed = TRUE WHERE id = %s AND snoozed IS NOT TRUE RETURNING phone_number, created_at',
+            (reminder_id,)
+        )
+        row = c.fetchone()
+        # Snoozed reminders don't count toward the daily limit
+        if row and created_today(row[1]):
+            adjust_usage(c, row[0], reminders_today=-1)
         conn.commit()
     except Exception as e:
         logger.error(f"Error marking reminder snoozed: {e}")
@@ -471,6 +474,7 @@ def claim_due_reminders(batch_size: int = 10) -> list[dict[str, Any]]:
 
     Returns:
         List of claimed reminder dicts with id, phone_number, reminder_text
+        and claimed_at (ISO string, the claim token for renew_reminder_claims)
     """
     conn = None
     try:
@@ -500,7 +504,7 @@ def claim_due_reminders(batch_size: int = 10) -> list[dict[str, Any]]:
             SET claimed_at = NOW()
             FROM claimed c
             WHERE r.id = c.id
-            RETURNING r.id, r.phone_number, r.reminder_text
+            RETURNING r.id, r.phone_number, r.reminder_text, r.claimed_at
         """, (now, batch_size))
 
         results = c.fetchall()
@@ -512,6 +516,7 @@ def claim_due_reminders(batch_size: int = 10) -> list[dict[str, Any]]:
                 "id": row[0],
                 "phone_number": row[1],
                 "reminder_text": row[2],
+                "claimed_at": row[3].isoformat(),
             }
             for row in results
         ]
@@ -563,6 +568,228 @@ def release_stale_claims(timeout_minutes: int = 5) -> int:
             return_db_connection(conn)
 
 
+def claim_reminders_by_ids(reminder_ids: list[int]) -> list[dict[str, Any]]:
+    """
+    Claim specific reminders the scheduler has timed as due.
+
+    Same guarantees as claim_due_reminders (SKIP LOCKED, stale claims only),
+    plus the due check, so a reminder snoozed after it was timed is left alone.
+
+    Returns:
+        List of claimed reminder dicts with id, phone_number, reminder_text
+        and claimed_at (ISO string, the claim token for renew_reminder_claims)
+    """
+    if not reminder_ids:
+        return []
+    conn = None
+    try:
+        conn = get_db_connection()
+        c = conn.cursor()
+        c.execute("""
+            WITH claimed AS (
+                SELECT id
+                FROM reminders
+                WHERE id = ANY(%s)
+                  AND reminder_date <= %s
+                  AND sent = FALSE
+                  AND (claimed_at IS NULL OR claimed_at < NOW() - INTERVAL '5 minutes')
+                FOR UPDATE SKIP LOCKED
+            )
+            UPDATE reminders r
+            SET claimed_at = NOW()
+            FROM claimed c
+            WHERE r.id = c.id
+            RETURNING r.id, r.phone_number, r.reminder_text, r.claimed_at
+        """, (list(reminder_ids), datetime.utcnow()))
+        results = c.fetchall()
+        conn.commit()
+        return [
+            {
+                "id": row[0],
+                "phone_number": row[1],
+                "reminder_text": row[2],
+                "claimed_at": row[3].isoformat(),
+            }
+            for row in results
+        ]
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        logger.error(f"Error claiming reminders by id: {e}")
+        return []
+    finally:
+        if conn:
+            return_db_connection(conn)
+
+
+def get_upcoming_reminders(window_minutes: int) -> list[tuple[int, datetime]]:
+    """Get (id, reminder_date) for unsent, unclaimed reminders due within the window (overdue included)"""
+    conn = None
+    try:
+        conn = get_db_connection()
+        c = conn.cursor()
+        c.execute("""
+            SELECT id, reminder_date
+            FROM reminders
+            WHERE reminder_date <= %s
+              AND sent = FALSE
+              AND (claimed_at IS NULL OR claimed_at < NOW() - INTERVAL '5 minutes')
+            ORDER BY reminder_date ASC
+        """, (datetime.utcnow() + timedelta(minutes=window_minutes),))
+        return c.fetchall()
+    except Exception as e:
+        logger.error(f"Error getting upcoming reminders: {e}")
+        return []
+    finally:
+        if conn:
+            return_db_connection(conn)
+
+
+def count_due_reminders() -> int:
+    """Count due, unsent, unclaimed reminders (backlog depth for adaptive batch sizing)"""
+    conn = None
+    try:
+        conn = get_db_connection()
+        c = conn.cursor()
+        c.execute("""
+            SELECT COUNT(*)
+            FROM reminders
+            WHERE reminder_date <= %s
+              AND sent = FALSE
+              AND (claimed_at IS NULL OR claimed_at < NOW() - INTERVAL '5 minutes')
+        """, (datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),))
+        return c.fetchone()[0]
+    except Exception as e:
+        logger.error(f"Error counting due reminders: {e}")
+        return 0
+    finally:
+        if conn:
+            return_db_connection(conn)
+
+
+def renew_reminder_claims(reminder_ids: list[int], claimed_at: Optional[str]) -> set[int]:
+    """Renew the claim on reminders right before sending them.
+
+    A batch owns a reminder while claimed_at still holds the value it was
+    claimed with. Once the claim goes stale another claim overwrites it, so
+    the compare fails here and only one batch ever sends the reminder. The
+    ones still owned get a fresh 5-minute lease for the send; anything sent,
+    deleted or re-claimed since is left out.
+
+    Raises on failure - callers must not send reminders they couldn't verify.
+
+    Returns:
+        The subset of reminder_ids this batch still owns
+    """
+    if not reminder_ids or claimed_at is None:
+        return set()
+    conn = None
+    try:
+        conn = get_db_connection()
+        c = conn.cursor()
+        c.execute("""
+            UPDATE reminders
+            SET claimed_at = NOW()
+            WHERE id = ANY(%s) AND sent = FALSE AND claimed_at = %s
+            RETURNING id
+        """, (list(reminder_ids), claimed_at))
+        owned = {row[0] for row in c.fetchall()}
+        conn.commit()
+        return owned
+    finally:
+        if conn:
+            return_db_connection(conn)
+
+
+def mark_reminders_sent_bulk(reminder_ids: list[int]) -> int:
+    """Mark many reminders as sent (and delivered) in one statement.
+
+    Raises on failure so the caller can retry the UPDATE - the SMS has
+    already gone out, so the send itself must never be retried.
+
+    Returns:
+        Number of reminders updated
+    """
+    if not reminder_ids:
+        return 0
+    conn = None
+    try:
+        conn = get_db_connection()
+        c = conn.cursor()
+        c.execute("""
+            UPDATE reminders
+            SET sent = TRUE, delivery_status = 'sent', sent_at = %s
+            WHERE id = ANY(%s) AND sent = FALSE
+            RETURNING phone_number
+        """, (datetime.utcnow(), list(reminder_ids)))
+        count = c.rowcount
+        notify_prompt_context_changed(c, [row[0] for row in c.fetchall()], REMINDERS)
+        conn.commit()
+        logger.info(f"Marked {count} reminders as sent")
+        return count
+    except Exception as e:
+        logger.error(f"Error bulk marking reminders sent: {e}")
+        raise
+    finally:
+        if conn:
+            return_db_connection(conn)
+
+
+def release_reminder_claims(reminder_ids: list[int], claimed_at: Optional[str]) -> int:
+    """Release claims on reminders a batch didn't get to, so the next tick picks them up.
+
+    Only claims still holding the batch's claimed_at are released, never one
+    another batch has taken since.
+    """
+    if not reminder_ids or claimed_at is None:
+        return 0
+    conn = None
+    try:
+        conn = get_db_connection()
+        c = conn.cursor()
+        c.execute(
+            'UPDATE reminders SET claimed_at = NULL WHERE id = ANY(%s) AND sent = FALSE AND claimed_at = %s',
+            (list(reminder_ids), claimed_at)
+        )
+        count = c.rowcount
+        conn.commit()
+        return count
+    except Exception as e:
+        logger.error(f"Error releasing reminder claims: {e}")
+        return 0
+    finally:
+        if conn:
+            return_db_connection(conn)
+
+
+def update_last_sent_reminders_bulk(last_sent: dict[str, int]) -> None:
+    """Bulk version of update_last_sent_reminder.
+
+    Args:
+        last_sent: {phone_number: reminder_id} for the most recent reminder sent to each user
+    """
+    if not last_sent:
+        return
+    from psycopg2.extras import execute_values
+    conn = None
+    try:
+        conn = get_db_connection()
+        c = conn.cursor()
+        now = datetime.utcnow()
+        execute_values(c, """
+            UPDATE users u
+            SET last_sent_reminder_id = v.reminder_id, last_sent_reminder_at = v.sent_at
+            FROM (VALUES %s) AS v(phone_number, reminder_id, sent_at)
+            WHERE u.phone_number = v.phone_number
+        """, [(phone, reminder_id, now) for phone, reminder_id in last_sent.items()])
+        conn.commit()
+    except Exception as e:
+        logger.error(f"Error bulk updating last sent reminders: {e}")
+    finally:
+        if conn:
+            return_db_connection(conn)
+
+
 # =====================================================
 # RECURRING REMINDER FUNCTIONS
 # =====================================================
@@ -594,6 +821,7 @@ def save_recurring_reminder(phone_number: str, reminder_text: str, recurrence_ty
             (phone_number, reminder_text, recurrence_type, recurrence_day, reminder_time, timezone)
         )
         recurring_id = c.fetchone()[0]
+        adjust_usage(c, phone_number, recurring_active=1)
         conn.commit()
         logger.info(f"Saved recurring reminder {recurring_id}: {recurrence_type} at {reminder_time}")
         return recurring_id
@@ -726,10 +954,17 @@ def pause_recurring_reminder(recurring_id: int, phone_number: str) -> bool:
         conn = get_db_connection()
         c = conn.cursor()
         c.execute(
-            'UPDATE recurring_reminders SET active = FALSE WHERE id = %s AND phone_number = %s',
+            '''UPDATE recurring_reminders rr SET active = FALSE
+               FROM (SELECT id, active FROM recurring_reminders
+                     WHERE id = %s AND phone_number = %s FOR UPDATE) prev
+               WHERE rr.id = prev.id
+               RETURNING prev.active''',
             (recurring_id, phone_number)
         )
-        success = c.rowcount > 0
+        row = c.fetchone()
+        success = row is not None
+        if success and bool(row[0]) != False:
+            adjust_usage(c, phone_number, recurring_active=-1)
         conn.commit()
         if success:
             logger.info(f"Paused recurring reminder {recurring_id}")
@@ -749,10 +984,17 @@ def resume_recurring_reminder(recurring_id: int, phone_number: str) -> bool:
         conn = get_db_connection()
         c = conn.cursor()
         c.execute(
-            'UPDATE recurring_reminders SET active = TRUE WHERE id = %s AND phone_number = %s',
+            '''UPDATE recurring_reminders rr SET active = TRUE
+               FROM (SELECT id, active FROM recurring_reminders
+                     WHERE id = %s AND phone_number = %s FOR UPDATE) prev
+               WHERE rr.id = prev.id
+               RETURNING prev.active''',
             (recurring_id, phone_number)
         )
-        success = c.rowcount > 0
+        row = c.fetchone()
+        success = row is not None
+        if success and bool(row[0]) != True:
+            adjust_usage(c, phone_number, recurring_active=1)
         conn.commit()
         if success:
             logger.info(f"Resumed recurring reminder {recurring_id}")
@@ -774,19 +1016,21 @@ def delete_recurring_reminder(recurring_id: int, phone_number: str) -> bool:
 
         # SECURITY: Verify ownership FIRST before deleting any linked reminders
         c.execute(
-            'SELECT id FROM recurring_reminders WHERE id = %s AND phone_number = %s',
+            'SELECT id, active FROM recurring_reminders WHERE id = %s AND phone_number = %s',
             (recurring_id, phone_number)
         )
-        if not c.fetchone():
+        owned = c.fetchone()
+        if not owned:
             logger.warning(f"Delete failed for recurring {recurring_id} - not owned by user or doesn't exist")
             return False
 
         # Now safe to delete pending reminders (ownership verified)
         c.execute(
-            'DELETE FROM reminders WHERE recurring_id = %s AND sent = FALSE',
+            'DELETE FROM reminders WHERE recurring_id = %s AND sent = FALSE RETURNING created_at, snoozed',
             (recurring_id,)
         )
-        deleted_pending = c.rowcount
+        deleted_rows = c.fetchall()
+        deleted_pending = len(deleted_rows)
         logger.info(f"Deleted {deleted_pending} pending reminders for recurring {recurring_id}")
 
         # Set recurring_id to NULL for sent reminders (keep history)
@@ -801,9 +1045,17 @@ def delete_recurring_reminder(recurring_id: int, phone_number: str) -> bool:
             (recurring_id, phone_number)
         )
         success = c.rowcount > 0
+        if success:
+            adjust_usage(
+                c, phone_number,
+                recurring_active=-1 if owned[1] else 0,
+                reminders_today=-sum(1 for created_at, snoozed in deleted_rows
+                                     if created_today(created_at) and not snoozed),
+            )
         conn.commit()
 
         if success:
+            invalidate_prompt_context(phone_number, REMINDERS)
             logger.info(f"Deleted recurring reminder {recurring_id}")
         return success
     except Exception as e:
@@ -881,6 +1133,109 @@ def update_recurring_reminder_generated(recurring_id: int, last_generated_date:
             return_db_connection(conn)
 
 
+def materialize_recurring_occurrences(occurrences: list[dict[str, Any]]) -> int:
+    """
+    Insert many recurring reminder occurrences in one transaction.
+
+    Occurrences that already exist are skipped by the unique
+    (recurring_id, occurrence_date) index, so re-running over the same
+    horizon is a no-op. For every pattern that got a new occurrence,
+    last_generated_date/next_occurrence are set in a single UPDATE.
+
+    Args:
+        occurrences: dicts with recurring_id, phone_number, reminder_text,
+            reminder_date (naive UTC datetime), local_time, timezone
+
+    Returns:
+        Number of reminders created
+    """
+    if not occurrences:
+        return 0
+
+    from psycopg2.extras import execute_values
+
+    conn = None
+    try:
+        conn = get_db_connection()
+        c = conn.cursor()
+
+        if ENCRYPTION_ENABLED:
+            from utils.encryption import encrypt_field, hash_phone
+            # Encrypt once per pattern, not once per occurrence
+            encrypted = {}
+            for occ in occurrences:
+                if occ['recurring_id'] not in encrypted:
+                    encrypted[occ['recurring_id']] = (
+                        hash_phone(occ['phone_number']), encrypt_field(occ['reminder_text']),
+                        blind_tokens(occ['reminder_text'])
+                    )
+            rows = [
+                (occ['phone_number'], *encrypted[occ['recurring_id']], occ['reminder_text'],
+                 occ['reminder_date'], occ['local_time'], occ['timezone'],
+                 occ['recurring_id'], occ['reminder_date'].date())
+                for occ in occurrences
+            ]
+            columns = '''(phone_number, phone_hash, reminder_text_encrypted, search_tokens, reminder_text,
+                          reminder_date, local_time, original_timezone, recurring_id, occurrence_date)'''
+        else:
+            rows = [
+                (occ['phone_number'], occ['reminder_text'], occ['reminder_date'], occ['local_time'],
+                 occ['timezone'], occ['recurring_id'], occ['reminder_date'].date())
+                for occ in occurrences
+            ]
+            columns = '''(phone_number, reminder_text, reminder_date, local_time, original_timezone,
+                          recurring_id, occurrence_date)'''
+
+        inserted = execute_values(
+            c,
+            f'''INSERT INTO reminders {columns}
+                VALUES %s
+                ON CONFLICT (recurring_id, occurrence_date) WHERE occurrence_date IS NOT NULL DO NOTHING
+                RETURNING id, recurring_id, reminder_date''',
+            rows, page_size=1000, fetch=True
+        )
+
+        if inserted:
+            _notify_reminders_scheduled(c, [row[0] for row in inserted])
+
+            phones = {occ['recurring_id']: occ['phone_number'] for occ in occurrences}
+            created_per_phone = {}
+            for _, recurring_id, _ in inserted:
+                phone_number = phones[recurring_id]
+                created_per_phone[phone_number] = created_per_phone.get(phone_number, 0) + 1
+            for phone_number, created in created_per_phone.items():
+                adjust_usage(c, phone_number, reminders_today=created)
+            # Written by Celery: the web process's prompt cache hears about it over NOTIFY
+            notify_prompt_context_changed(c, created_per_phone, REMINDERS)
+
+            latest = {}
+            for _, recurring_id, reminder_date in inserted:
+                if recurring_id not in latest or reminder_date > latest[recurring_id]:
+                    latest[recurring_id] = reminder_date
+            execute_values(
+                c,
+                '''UPDATE recurring_reminders rr
+                   SET last_generated_date = v.next_occurrence::date, next_occurrence = v.next_occurrence
+                   FROM (VALUES %s) AS v(id, next_occurrence)
+                   WHERE rr.id = v.id''',
+                [(recurring_id, reminder_date) for recurring_id, reminder_date in latest.items()],
+                template='(%s, %s::timestamp)', page_size=len(latest)
+            )
+
+        conn.commit()
+        if inserted:
+            for phone_number in created_per_phone:
+                invalidate_prompt_context(phone_number, REMINDERS)
+        logger.info(f"Materialized {len(inserted)} of {len(occurrences)} recurring occurrences")
+        return len(inserted)
+    except Exception as e:
+        logger.error(f"Error materializing recurring occurrences: {e}")
+        raise
+    finally:
+        if conn:
+            return_db_connection(conn)
+
+
 def save_reminder_with_local_time(phone_number: str, reminder_text: str, reminder_date: datetime, local_time: str, timezone: str, recurring_id: Optional[int] = None) -> Optional[int]:
     """
     Save a new reminder with local time info for timezone recalculation.
@@ -901,30 +1256,49 @@ def save_reminder_with_local_time(phone_number: str, reminder_text: str, reminde
         conn = get_db_connection()
         c = conn.cursor()
 
+        # Occurrences of a recurring reminder are unique per (recurring_id, UTC date)
+        occurrence_date = None
+        if recurring_id is not None:
+            occurrence_date = (reminder_date if isinstance(reminder_date, datetime)
+                               else datetime.fromisoformat(str(reminder_date))).date()
+
         if ENCRYPTION_ENABLED:
             from utils.encryption import encrypt_field, hash_phone
             phone_hash = hash_phone(phone_number)
             reminder_text_encrypted = encrypt_field(reminder_text)
             c.execute(
                 '''INSERT INTO reminders
-                   (phone_number, phone_hash, reminder_text, reminder_text_encrypted,
-                    reminder_date, local_time, original_timezone, recurring_id)
-                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                   (phone_number, phone_hash, reminder_text, reminder_text_encrypted, search_tokens,
+                    reminder_date, local_time, original_timezone, recurring_id, occurrence_date)
+                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                   ON CONFLICT (recurring_id, occurrence_date) WHERE occurrence_date IS NOT NULL DO NOTHING
                    RETURNING id''',
-                (phone_number, phone_hash, reminder_text, reminder_text_encrypted,
-                 reminder_date, local_time, timezone, recurring_id)
+                (phone_number, phone_hash, reminder_text, reminder_text_encrypted, blind_tokens(reminder_text),
+                 reminder_date, local_time, timezone, recurring_id, occurrence_date)
             )
         else:
             c.execute(
                 '''INSERT INTO reminders
-                   (phone_number, reminder_text, reminder_date, local_time, original_timezone, recurring_id)
-                   VALUES (%s, %s, %s, %s, %s, %s)
+                   (phone_number, reminder_text, reminder_date, local_time, original_timezone,
+                    recurring_id, occurrence_date)
+                   VALUES (%s, %s, %s, %s, %s, %s, %s)
+                   ON CONFLICT (recurring_id, occurrence_date) WHERE occurrence_date IS NOT NULL DO NOTHING
                    RETURNING id''',
-                (phone_number, reminder_text, reminder_date, local_time, timezone, recurring_id)
+                (phone_number, reminder_text, reminder_date, local_time, timezone, recurring_id, occurrence_date)
             )
 
-        reminder_id = c.fetchone()[0]
+        row = c.fetchone()
+        if row is None:
+            logger.info(f"Reminder for recurring {recurring_id} on {occurrence_date} already exists")
+            return None
+        reminder_id = row[0]
+        _notify_reminder_scheduled(c, reminder_id)
+        adjust_usage(c, phone_number, reminders_today=1)
+        if recurring_id is not None:
+            # Occurrences are generated by Celery, away from the web process's prompt cache
+            notify_prompt_context_changed(c, [phone_number], REMINDERS)
         conn.commit()
+        invalidate_prompt_context(phone_number, REMINDERS)
         logger.info(f"Saved reminder {reminder_id} at {reminder_date} (local: {local_time} {timezone})")
         return reminder_id
     except Exception as e:
@@ -1022,6 +1396,7 @@ def recalculate_pending_reminders_for_timezone(phone_number: str, new_timezone:
                        WHERE id = %s''',
                     (new_utc, new_timezone, reminder_id)
                 )
+                _notify_reminder_scheduled(c, reminder_id)
                 updated_count += 1
 
             except Exception as e:
@@ -1029,6 +1404,7 @@ def recalculate_pending_reminders_for_timezone(phone_number: str, new_timezone:
                 continue
 
         conn.commit()
+        invalidate_prompt_context(phone_number, REMINDERS)
         logger.info(f"Recalculated {updated_count} reminders for new timezone {new_timezone}")
         return updated_count
 
@@ -0,0 +1,193 @@
+"""
+Search Model
+Ranked keyword search shared by memories, pending reminders and list items:
+substring and full-text (tsvector) matches first, pg_trgm word similarity for
+typos, or a blind keyword index (search_tokens) when encryption is enabled
+"""
+
+import re
+from typing import Optional
+
+from psycopg2.extras import execute_values
+
+from database import get_db_connection, return_db_connection
+from config import logger, ENCRYPTION_ENABLED, SEARCH_FUZZY_THRESHOLD
+
+SEARCH_SOURCES = ('memories', 'reminders', 'list_items', 'unchecked_list_items')
+
+_TS_CONFIG = 'english'
+
+# Words that never narrow a search on their own
+_STOP_WORDS = frozenset({
+    'a', 'an', 'the', 'my', 'to', 'of', 'and', 'or', 'for', 'in', 'on', 'at',
+    'is', 'it', 'me', 'about', 'with',
+})
+
+# Per source: returned columns (the shape callers already unpack), the row
+# table/alias that carries phone_number/phone_hash and search_tokens, the
+# plaintext and encrypted text columns, extra filter, and tie-break order
+_SOURCES = {
+    'memories': {
+        'select': 'm.id, m.memory_text, m.created_at',
+        'from': 'memories m',
+        'table': 'memories', 'alias': 'm',
+        'text': 'm.memory_text', 'encrypted': 'm.memory_text_encrypted',
+        'where': 'TRUE',
+        'order': 'm.created_at DESC',
+    },
+    'reminders': {
+        'select': 'r.id, r.reminder_text, r.reminder_date',
+        'from': 'reminders r',
+        'table': 'reminders', 'alias': 'r',
+        'text': 'r.reminder_text', 'encrypted': 'r.reminder_text_encrypted',
+        'where': 'r.sent = FALSE',
+        'order': 'r.reminder_date',
+    },
+    'list_items': {
+        'select': 'l.id, l.list_name, li.id, li.item_text',
+        'from': 'list_items li JOIN lists l ON li.list_id = l.id',
+        'table': 'list_items', 'alias': 'li',
+        'text': 'li.item_text', 'encrypted': 'li.item_text_encrypted',
+        'where': 'TRUE',
+        'order': 'l.list_name, li.id',
+    },
+}
+_SOURCES['unchecked_list_items'] = {**_SOURCES['list_items'], 'where': 'li.completed = FALSE'}
+
+# Whether pg_trgm is installed; checked once per process
+_trigram_available: Optional[bool] = None
+
+
+def search_tokens(text: str) -> list[str]:
+    """Normalized keywords of a text: lowercase words of 2+ characters, minus stop words."""
+    words = re.findall(r'[a-z0-9]+', (text or '').lower())
+    return sorted({w for w in words if len(w) > 1 and w not in _STOP_WORDS})
+
+
+def blind_tokens(text: str) -> list[str]:
+    """search_tokens of a text as blind-index digests (the stored search_tokens column)."""
+    from utils.encryption import blind_index
+    return blind_index(search_tokens(text))
+
+
+def _escape_like(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _trigram_enabled(cursor) -> bool:
+    global _trigram_available
+    if _trigram_available is None:
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+        _trigram_available = cursor.fetchone()[0]
+        if not _trigram_available:
+            logger.warning("pg_trgm not installed - search has no typo tolerance")
+    return _trigram_available
+
+
+def _text_search(cursor, spec: dict, phone_number: str, query: str) -> list[tuple]:
+    """Plaintext search: substring/full-text matches ranked first; fuzzy-only rows if there are none."""
+    text = spec['text']
+    fuzzy = _trigram_enabled(cursor)
+    if fuzzy:
+        # <% uses this threshold and can be answered from the trigram index
+        cursor.execute("SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)",
+                       (str(SEARCH_FUZZY_THRESHOLD),))
+    substring = f"lower({text}) LIKE %(pattern)s"
+    full_text = f"to_tsvector('{_TS_CONFIG}', {text}) @@ plainto_tsquery('{_TS_CONFIG}', %(query)s)"
+    similarity = f"word_similarity(lower(%(query)s), lower({text}))" if fuzzy else "0"
+    fuzzy_match = f"OR lower(%(query)s) <%% lower({text})" if fuzzy else ""
+
+    cursor.execute(
+        f'''SELECT {spec['select']},
+                   ({substring} OR {full_text}) AS matched,
+                   {substring} AS is_substring,
+                   ts_rank(to_tsvector('{_TS_CONFIG}', {text}), plainto_tsquery('{_TS_CONFIG}', %(query)s)) AS rank,
+                   {similarity} AS similarity
+            FROM {spec['from']}
+            WHERE {spec['alias']}.phone_number = %(owner)s AND {spec['where']}
+              AND ({substring} OR {full_text} {fuzzy_match})
+            ORDER BY matched DESC, is_substring DESC, rank DESC, similarity DESC, {spec['order']}''',
+        {'pattern': f"%{_escape_like(query.lower())}%", 'query': query, 'owner': phone_number}
+    )
+    rows = cursor.fetchall()
+    width = len(rows[0]) - 4 if rows else 0
+    exact = [row for row in rows if row[width]]
+    return [row[:width] for row in (exact or rows)]
+
+
+def _backfill_blind_tokens(cursor, spec: dict, owner_column: str, owner_value: str) -> None:
+    """Fill search_tokens for a user's rows written before the column existed or by a path that skips it."""
+    from utils.encryption import safe_decrypt
+    alias = spec['alias']
+    cursor.execute(
+        f'''SELECT {alias}.id, {spec['text']}, {spec['encrypted']} FROM {spec['from']}
+            WHERE {alias}.{owner_column} = %s AND {spec['where']} AND {alias}.search_tokens IS NULL''',
+        (owner_value,)
+    )
+    rows = cursor.fetchall()
+    if rows:
+        execute_values(
+            cursor,
+            f'''UPDATE {spec['table']} t SET search_tokens = v.tokens
+                FROM (VALUES %s) AS v (id, tokens) WHERE t.id = v.id''',
+            [(row_id, blind_tokens(plain or safe_decrypt(encrypted))) for row_id, plain, encrypted in rows],
+            template='(%s, %s::text[])'
+        )
+
+
+def _blind_search(cursor, spec: dict, owner_column: str, owner_value: str, query: str) -> list[tuple]:
+    """Encrypted search over search_tokens: rows with every query keyword first, else most keywords."""
+    tokens = blind_tokens(query)
+    if not tokens:
+        return []
+    _backfill_blind_tokens(cursor, spec, owner_column, owner_value)
+    alias = spec['alias']
+    cursor.execute(
+        f'''SELECT {spec['select']},
+                   cardinality(ARRAY(SELECT unnest({alias}.search_tokens)
+                                     INTERSECT SELECT unnest(%(tokens)s::text[]))) AS hits
+            FROM {spec['from']}
+            WHERE {alias}.{owner_column} = %(owner)s AND {spec['where']}
+              AND {alias}.search_tokens && %(tokens)s::text[]
+            ORDER BY hits DESC, {spec['order']}''',
+        {'tokens': tokens, 'owner': owner_value}
+    )
+    rows = cursor.fetchall()
+    width = len(rows[0]) - 1 if rows else 0
+    complete = [row for row in rows if row[width] == len(tokens)]
+    return [row[:width] for row in (complete or rows)]
+
+
+def search(source: str, phone_number: str, query: str, limit: Optional[int] = None) -> list[tuple]:
+    """Search one of SEARCH_SOURCES for a user, best match first.
+
+    Rows have the source's usual shape: (id, text, created_at) for memories,
+    (id, text, reminder_date) for pending reminders, and
+    (list_id, list_name, item_id, item_text) for (unchecked) list items. Exact matches
+    (substring or full-text; with encryption, every query keyword) hide
+    partial/fuzzy ones, so a typo only widens the result when nothing matched.
+    """
+    spec = _SOURCES[source]
+    query = (query or '').strip()
+    if not query:
+        return []
+    conn = None
+    try:
+        conn = get_db_connection()
+        c = conn.cursor()
+        if ENCRYPTION_ENABLED:
+            from utils.encryption import hash_phone
+            results = _blind_search(c, spec, 'phone_hash', hash_phone(phone_number), query)
+            if not results:
+                # Fallback for rows created before encryption
+                results = _blind_search(c, spec, 'phone_number', phone_number, query)
+        else:
+            results = _text_search(c, spec, phone_number, query)
+        conn.commit()  # keeps any search_tokens backfill
+        return results[:limit] if limit else results
+    except Exception as e:
+        logger.error(f"Error searching {source}: {e}")
+        return []
+    finally:
+        if conn:
+            return_db_connection(conn)
@@ -0,0 +1,172 @@
+"""
+Usage Model
+Materialized per-user counters (user_usage) and per-list item counts
+(lists.item_count) read by the tier limit checks
+"""
+
+from datetime import datetime
+from typing import Any
+
+from database import get_db_connection, return_db_connection
+from config import logger
+
+# Counters kept in user_usage, in column order
+USAGE_COUNTERS = ('memories', 'lists', 'recurring_active', 'reminders_today')
+
+# Live counts for the given phone numbers; the same definitions the old
+# COUNT(*) helpers used. %(today)s is the start of the current UTC day.
+_ACTUAL_USAGE_SQL = '''
+    SELECT p.phone_number,
+           (SELECT COUNT(*) FROM memories m WHERE m.phone_number = p.phone_number),
+           (SELECT COUNT(*) FROM lists l WHERE l.phone_number = p.phone_number),
+           (SELECT COUNT(*) FROM recurring_reminders rr
+             WHERE rr.phone_number = p.phone_number AND rr.active = TRUE),
+           (SELECT COUNT(*) FROM reminders r
+             WHERE r.phone_number = p.phone_number AND r.created_at >= %(today)s
+             AND (r.snoozed IS NOT TRUE))
+    FROM unnest(%(phones)s::text[]) AS p (phone_number)
+'''
+
+
+def _today_start() -> datetime:
+    return datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def created_today(created_at) -> bool:
+    """True if a row's created_at falls in the current UTC day (counts toward reminders_today)."""
+    return created_at is not None and created_at >= _today_start()
+
+
+def adjust_usage(cursor, phone_number: str, memories: int = 0, lists: int = 0,
+                 recurring_active: int = 0, reminders_today: int = 0) -> None:
+    """Apply counter deltas inside the caller's transaction.
+
+    Only updates an existing row: a user without one is counted from the
+    source tables on their next get_usage(), which already includes this write.
+    reminders_today restarts from the delta when the stored day isn't today.
+    """
+    if not (memories or lists or recurring_active or reminders_today):
+        return
+    cursor.execute(
+        '''UPDATE user_usage SET
+               memories = GREATEST(memories + %(memories)s, 0),
+               lists = GREATEST(lists + %(lists)s, 0),
+               recurring_active = GREATEST(recurring_active + %(recurring)s, 0),
+               reminders_today = CASE WHEN reminders_day = %(day)s
+                                      THEN GREATEST(reminders_today + %(reminders)s, 0)
+                                      ELSE GREATEST(%(reminders)s, 0) END,
+               reminders_day = %(day)s,
+               updated_at = NOW()
+           WHERE phone_number = %(phone)s''',
+        {'memories': memories, 'lists': lists, 'recurring': recurring_active,
+         'reminders': reminders_today, 'day': _today_start().date(), 'phone': phone_number}
+    )
+
+
+def invalidate_usage(cursor, phone_number: str) -> None:
+    """Drop a user's counters inside the caller's transaction (after bulk deletes); rebuilt on next read."""
+    cursor.execute('DELETE FROM user_usage WHERE phone_number = %s', (phone_number,))
+
+
+def _rebuild_usage(cursor, phone_numbers: list[str]) -> dict[str, dict[str, int]]:
+    """Count from the source tables and store the result. Returns {phone: counters}."""
+    today = _today_start()
+    cursor.execute(_ACTUAL_USAGE_SQL, {'today': today, 'phones': list(phone_numbers)})
+    rows = cursor.fetchall()
+    for row in rows:
+        cursor.execute(
+            '''INSERT INTO user_usage (phone_number, memories, lists, recurring_active,
+                                       reminders_today, reminders_day, updated_at)
+               VALUES (%s, %s, %s, %s, %s, %s, NOW())
+               ON CONFLICT (phone_number) DO UPDATE SET
+                   memories = EXCLUDED.memories, lists = EXCLUDED.lists,
+                   recurring_active = EXCLUDED.recurring_active,
+                   reminders_today = EXCLUDED.reminders_today,
+                   reminders_day = EXCLUDED.reminders_day, updated_at = NOW()''',
+            row + (today.date(),)
+        )
+    return {row[0]: dict(zip(USAGE_COUNTERS, row[1:])) for row in rows}
+
+
+def get_usage(phone_number: str) -> dict[str, int]:
+    """Current counters for a user: one primary-key read, or a rebuild if there's no row yet."""
+    conn = None
+    try:
+        conn = get_db_connection()
+        c = conn.cursor()
+        c.execute(
+            '''SELECT memories, lists, recurring_active,
+                      CASE WHEN reminders_day = %s THEN reminders_today ELSE 0 END
+               FROM user_usage WHERE phone_number = %s''',
+            (_today_start().date(), phone_number)
+        )
+        row = c.fetchone()
+        if row:
+            return dict(zip(USAGE_COUNTERS, row))
+        usage = _rebuild_usage(c, [phone_number])[phone_number]
+        conn.commit()
+        return usage
+    except Exception as e:
+        logger.error(f"Error getting usage counters: {e}")
+        return dict.fromkeys(USAGE_COUNTERS, 0)
+    finally:
+        if conn:
+            return_db_connection(conn)
+
+
+def adjust_list_item_count(cursor, list_id: int, delta: int) -> None:
+    """Apply an item-count delta to a list inside the caller's transaction."""
+    cursor.execute(
+        'UPDATE lists SET item_count = GREATEST(item_count + %s, 0) WHERE id = %s AND item_count IS NOT NULL',
+        (delta, list_id)
+    )
+
+
+def reconcile_usage() -> dict[str, Any]:
+    """Repair drift: recount every stored user_usage row and lists.item_count, fixing mismatches.
+
+    Counter updates live in the models' write paths; writes that bypass them
+    (admin SQL, a crash between statements) are corrected here.
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        c = conn.cursor()
+        today = _today_start()
+        c.execute('SELECT phone_number FROM user_usage')
+        phones = [row[0] for row in c.fetchall()]
+
+        c.execute(
+            f'''WITH actual AS ({_ACTUAL_USAGE_SQL})
+                UPDATE user_usage u SET
+                    memories = a.memories, lists = a.lists, recurring_active = a.recurring_active,
+                    reminders_today = a.reminders_today, reminders_day = %(day)s, updated_at = NOW()
+                FROM actual a (phone_number, memories, lists, recurring_active, reminders_today)
+                WHERE u.phone_number = a.phone_number
+                  -- Rows adjusted in the last minute may belong to transactions
+                  -- this snapshot can't see yet; the next run checks them
+                  AND u.updated_at < NOW() - INTERVAL '1 minute'
+                  AND (u.memories, u.lists, u.recurring_active,
+                       CASE WHEN u.reminders_day = %(day)s THEN u.reminders_today ELSE 0 END)
+                      IS DISTINCT FROM (a.memories, a.lists, a.recurring_active, a.reminders_today)
+                RETURNING u.phone_number''',
+            {'today': today, 'phones': phones, 'day': today.date()}
+        )
+        users_fixed = c.rowcount
+
+        c.execute(
+            '''UPDATE lists l SET item_count = actual.n
+               FROM (SELECT l2.id, COUNT(li.id) AS n
+                     FROM lists l2 LEFT JOIN list_items li ON li.list_id = l2.id
+                     GROUP BY l2.id) actual
+               WHERE l.id = actual.id AND l.item_count IS DISTINCT FROM actual.n'''
+        )
+        lists_fixed = c.rowcount
+        conn.commit()
+
+        if users_fixed or lists_fixed:
+            logger.warning(f"Usage counters drifted: fixed {users_fixed} users, {lists_fixed} lists")
+        return {'users_checked': len(phones), 'users_fixed': users_fixed, 'lists_fixed': lists_fixed}
+    finally:
+        if conn:
+            return_db_connection(conn)
@@ -11,6 +11,7 @@ from psycopg2 import sql
 from database import get_db_connection, return_db_connection
 from config import logger, ENCRYPTION_ENABLED
 from utils.db_helpers import USER_COLUMNS
+from models.user_context import get_user_context, update_user_context, invalidate_user_context
 
 # Whitelist of allowed fields for SQL updates (prevents SQL injection via kwargs)
 ALLOWED_USER_FIELDS = {
@@ -45,11 +46,21 @@ ALLOWED_USER_FIELDS = {
     'day_4_email_sent', 'awaiting_email_collection',
 }
 
+# Fields that feed the daily summary / smart nudge UTC minute-of-day buckets
+SCHEDULE_BUCKET_SOURCE_FIELDS = {'timezone', 'daily_summary_time', 'smart_nudge_time'}
+
+# tz name -> UTC offset (minutes) this process last synced buckets to
+_bucket_tz_offsets: dict[str, int] = {}
+
 
 def get_user(phone_number: str) -> Optional[Tuple[Any, ...]]:
     """Get user info from database"""
     conn = None
     try:
+        ctx = get_user_context(phone_number)
+        if ctx is not None:
+            return ctx.row
+
         conn = get_db_connection()
         c = conn.cursor()
 
@@ -91,6 +102,11 @@ def get_onboarding_step(phone_number: str) -> int:
 
 def create_or_update_user(phone_number: str, **kwargs: Any) -> None:
     """Create or update user record with optional encryption"""
+    # Pending-state changes during a webhook are written back once at the end
+    ctx = get_user_context(phone_number)
+    if ctx is not None and ctx.stage(kwargs):
+        return
+
     conn = None
     try:
         conn = get_db_connection()
@@ -129,12 +145,19 @@ def create_or_update_user(phone_number: str, **kwargs: Any) -> None:
                 update_fields.append(sql.SQL("{} = %s").format(sql.Identifier(key)))
                 values.append(value)
 
+            # Timezone or summary/nudge time changed: due-user buckets are stale
+            if update_fields and SCHEDULE_BUCKET_SOURCE_FIELDS.intersection(kwargs):
+                update_fields.append(sql.SQL("schedule_utc_offset = NULL"))
+
             if update_fields:
                 values.append(phone_number)
                 query = sql.SQL("UPDATE users SET {} WHERE phone_number = %s").format(
                     sql.SQL(', ').join(update_fields)
                 )
                 c.execute(query, values)
+                context_updates = {k: v for k, v in kwargs.items() if k in ALLOWED_USER_FIELDS}
+                if ENCRYPTION_ENABLED and phone_hash and not exists[1]:
+                    context_updates['phone_hash'] = phone_hash
         else:
             # Insert new user with any provided fields
             fields = [sql.Identifier('phone_number')]
@@ -161,6 +184,14 @@ def create_or_update_user(phone_number: str, **kwargs: Any) -> None:
             c.execute(query, values)
 
         conn.commit()
+
+        # Keep the request's user context in step with what was written.
+        # New rows pick up column defaults, so reload rather than guess.
+        if exists:
+            if update_fields:
+                update_user_context(phone_number, **context_updates)
+        else:
+            invalidate_user_context(phone_number)
     except Exception as e:
         logger.error(f"Error creating/updating user: {e}")
     finally:
@@ -198,14 +229,15 @@ def update_user_timezone(phone_number: str, new_timezone: str) -> Tuple[bool, Op
             from utils.encryption import hash_phone
             phone_hash = hash_phone(phone_number)
             # Try phone_hash first
-            c.execute('UPDATE users SET timezone = %s WHERE phone_hash = %s', (new_timezone, phone_hash))
+            c.execute('UPDATE users SET timezone = %s, schedule_utc_offset = NULL WHERE phone_hash = %s', (new_timezone, phone_hash))
             if c.rowcount == 0:
                 # Fallback to phone_number
-                c.execute('UPDATE users SET timezone = %s WHERE phone_number = %s', (new_timezone, phone_number))
+                c.execute('UPDATE users SET timezone = %s, schedule_utc_offset = NULL WHERE phone_number = %s', (new_timezone, phone_number))
         else:
-            c.execute('UPDATE users SET timezone = %s WHERE phone_number = %s', (new_timezone, phone_number))
+            c.execute('UPDATE users SET timezone = %s, schedule_utc_offset = NULL WHERE phone_number = %s', (new_timezone, phone_number))
 
         conn.commit()
+        update_user_context(phone_number, timezone=new_timezone)
         logger.info(f"Updated timezone for {phone_number[-4:]} from {old_timezone} to {new_timezone}")
         return (True, old_timezone)
     except Exception as e:
@@ -220,6 +252,13 @@ def get_user_first_name(phone_number: str) -> Optional[str]:
     """Get user's first name"""
     conn = None
     try:
+        ctx = get_user_context(phone_number)
+        if ctx is not None:
+            if ENCRYPTION_ENABLED and ctx.get('first_name_encrypted'):
+                from utils.encryption import decrypt_field
+                return decrypt_field(ctx.get('first_name_encrypted'))
+            return ctx.get('first_name')
+
         conn = get_db_connection()
         c = conn.cursor()
 
@@ -255,6 +294,10 @@ def get_last_active_list(phone_number: str) -> Optional[str]:
     """Get user's last active list name"""
     conn = None
     try:
+        ctx = get_user_context(phone_number)
+        if ctx is not None:
+            return ctx.get('last_active_list') or None
+
         conn = get_db_connection()
         c = conn.cursor()
 
@@ -285,6 +328,10 @@ def get_pending_list_item(phone_number: str) -> Optional[str]:
     """Get user's pending list item (for list selection or deletion)"""
     conn = None
     try:
+        ctx = get_user_context(phone_number)
+        if ctx is not None:
+            return ctx.get('pending_list_item') or None
+
         conn = get_db_connection()
         c = conn.cursor()
 
@@ -315,6 +362,10 @@ def get_pending_reminder_delete(phone_number: str) -> Optional[str]:
     """Get user's pending reminder delete data (stores matching reminder IDs when multiple found)"""
     conn = None
     try:
+        ctx = get_user_context(phone_number)
+        if ctx is not None:
+            return ctx.get('pending_reminder_delete') or None
+
         conn = get_db_connection()
         c = conn.cursor()
 
@@ -345,6 +396,10 @@ def get_pending_memory_delete(phone_number: str) -> Optional[str]:
     """Get user's pending memory delete data (stores matching memory IDs when multiple found or awaiting confirmation)"""
     conn = None
     try:
+        ctx = get_user_context(phone_number)
+        if ctx is not None:
+            return ctx.get('pending_memory_delete') or None
+
         conn = get_db_connection()
         c = conn.cursor()
 
@@ -371,10 +426,30 @@ def get_pending_memory_delete(phone_number: str) -> Optional[str]:
             return_db_connection(conn)
 
 
+def _parse_pending_reminder_date(pending_text: Optional[str], pending_date: Optional[str]) -> Optional[dict[str, Any]]:
+    """Decode a pending_reminder_date value (JSON recurrence info or plain date string)"""
+    if not pending_date:
+        return None
+    # Try JSON parsing for recurrence info stored by clarify_time
+    try:
+        parsed = json.loads(pending_date)
+        if isinstance(parsed, dict):
+            parsed['text'] = pending_text
+            return parsed
+    except (json.JSONDecodeError, TypeError):
+        pass
+    # Plain date string (backward compatible)
+    return {'text': pending_text, 'date': pending_date}
+
+
 def get_pending_reminder_date(phone_number: str) -> Optional[dict[str, Any]]:
     """Get user's pending reminder date (for clarify_date_time flow - date without time)"""
     conn = None
     try:
+        ctx = get_user_context(phone_number)
+        if ctx is not None:
+            return _parse_pending_reminder_date(ctx.get('pending_reminder_text'), ctx.get('pending_reminder_date'))
+
         conn = get_db_connection()
         c = conn.cursor()
 
@@ -390,18 +465,8 @@ def get_pending_reminder_date(phone_number: str) -> Optional[dict[str, Any]]:
             c.execute('SELECT pending_reminder_text, pending_reminder_date FROM users WHERE phone_number = %s', (phone_number,))
             result = c.fetchone()
 
-        if result and result[1]:
-            pending_date = result[1]
-            # Try JSON parsing for recurrence info stored by clarify_time
-            try:
-                parsed = json.loads(pending_date)
-                if isinstance(parsed, dict):
-                    parsed['text'] = result[0]
-                    return parsed
-            except (json.JSONDecodeError, TypeError):
-                pass
-            # Plain date string (backward compatible)
-            return {'text': result[0], 'date': pending_date}
+        if result:
+            return _parse_pending_reminder_date(result[0], result[1])
         return None
     except Exception as e:
         logger.error(f"Error getting pending reminder date: {e}")
@@ -415,6 +480,10 @@ def get_pending_list_create(phone_number: str) -> Optional[str]:
     """Get user's pending list create data (for duplicate list handling)"""
     conn = None
     try:
+        ctx = get_user_context(phone_number)
+        if ctx is not None:
+            return ctx.get('pending_list_create') or None
+
         conn = get_db_connection()
         c = conn.cursor()
 
@@ -441,6 +510,48 @@ def get_pending_list_create(phone_number: str) -> Optional[str]:
             return_db_connection(conn)
 
 
+def get_pending_delete_account(phone_number: str) -> bool:
+    """Check if user has a DELETE ACCOUNT request awaiting confirmation"""
+    conn = None
+    try:
+        ctx = get_user_context(phone_number)
+        if ctx is not None:
+            return bool(ctx.get('pending_delete_account'))
+
+        conn = get_db_connection()
+        c = conn.cursor()
+        c.execute('SELECT pending_delete_account FROM users WHERE phone_number = %s', (phone_number,))
+        result = c.fetchone()
+        return bool(result and result[0])
+    except Exception as e:
+        logger.error(f"Error getting pending delete account: {e}")
+        return False
+    finally:
+        if conn:
+            return_db_connection(conn)
+
+
+def get_pending_cancellation_feedback(phone_number: str) -> bool:
+    """Check if user was asked for cancellation feedback and hasn't answered yet"""
+    conn = None
+    try:
+        ctx = get_user_context(phone_number)
+        if ctx is not None:
+            return bool(ctx.get('pending_cancellation_feedback'))
+
+        conn = get_db_connection()
+        c = conn.cursor()
+        c.execute('SELECT pending_cancellation_feedback FROM users WHERE phone_number = %s', (phone_number,))
+        result = c.fetchone()
+        return bool(result and result[0])
+    except Exception as e:
+        logger.error(f"Error getting pending cancellation feedback: {e}")
+        return False
+    finally:
+        if conn:
+            return_db_connection(conn)
+
+
 def mark_user_opted_out(phone_number: str) -> bool:
     """Mark a user as opted out (STOP command compliance)"""
     conn = None
@@ -452,6 +563,7 @@ def mark_user_opted_out(phone_number: str) -> bool:
             (phone_number,)
         )
         conn.commit()
+        update_user_context(phone_number, opted_out=True)
         logger.info(f"User opted out: {phone_number[-4:]}")
         return True
     except Exception as e:
@@ -466,6 +578,10 @@ def is_user_opted_out(phone_number: str) -> bool:
     """Check if a user has opted out"""
     conn = None
     try:
+        ctx = get_user_context(phone_number)
+        if ctx is not None:
+            return ctx.get('opted_out') == True
+
         conn = get_db_connection()
         c = conn.cursor()
 
@@ -538,11 +654,93 @@ def get_daily_summary_settings(phone_number: str) -> Optional[dict[str, Any]]:
             return_db_connection(conn)
 
 
+def _current_utc_offsets() -> dict[str, int]:
+    """Current UTC offset in minutes for every known timezone."""
+    import pytz
+    from datetime import datetime
+
+    utc_now = datetime.now(pytz.UTC)
+    return {
+        tz_name: int(utc_now.astimezone(pytz.timezone(tz_name)).utcoffset().total_seconds() // 60)
+        for tz_name in pytz.all_timezones
+    }
+
+
+_BUCKET_REFRESH_SQL = '''
+    UPDATE users u
+    SET schedule_utc_offset = v.utc_offset,
+        daily_summary_utc_minute = MOD(
+            (EXTRACT(HOUR FROM COALESCE(u.daily_summary_time, TIME '08:00')) * 60
+             + EXTRACT(MINUTE FROM COALESCE(u.daily_summary_time, TIME '08:00')))::int
+            - v.utc_offset + 1440, 1440),
+        smart_nudge_utc_minute = MOD(
+            (EXTRACT(HOUR FROM COALESCE(u.smart_nudge_time, TIME '09:00')) * 60
+             + EXTRACT(MINUTE FROM COALESCE(u.smart_nudge_time, TIME '09:00')))::int
+            - v.utc_offset + 1440, 1440)
+    FROM (VALUES %s) AS v(tz_name, utc_offset)
+    WHERE COALESCE(u.timezone, 'America/New_York') = v.tz_name
+      AND {condition}
+'''
+
+
+def refresh_schedule_buckets() -> int:
+    """Bring the daily summary / smart nudge UTC minute-of-day buckets up to date.
+
+    Buckets are computed with the timezone's current UTC offset, so they go
+    stale when a zone crosses a DST transition and when a user's timezone or
+    preferred time changes (writes reset schedule_utc_offset to NULL).
+    Called at the start of each per-minute lookup; when nothing changed it is
+    one indexed query that matches no rows.
+
+    Returns:
+        Number of users whose buckets were recomputed
+    """
+    from psycopg2.extras import execute_values
+
+    offsets = _current_utc_offsets()
+    changed = {tz_name: off for tz_name, off in offsets.items() if _bucket_tz_offsets.get(tz_name) != off}
+
+    conn = None
+    try:
+        conn = get_db_connection()
+        c = conn.cursor()
+        updated = 0
+
+        if changed:
+            # DST transition (or first run in this process): shift zones whose offset moved
+            execute_values(
+                c, _BUCKET_REFRESH_SQL.format(condition='u.schedule_utc_offset IS DISTINCT FROM v.utc_offset'),
+                list(changed.items()), page_size=len(changed)
+            )
+            updated += c.rowcount
+
+        # New users, and users whose timezone or summary/nudge time changed
+        execute_values(
+            c, _BUCKET_REFRESH_SQL.format(condition='u.schedule_utc_offset IS NULL'),
+            list(offsets.items()), page_size=len(offsets)
+        )
+        updated += c.rowcount
+
+        conn.commit()
+        _bucket_tz_offsets.update(changed)
+        if updated:
+            logger.info(f"Refreshed schedule buckets for {updated} users")
+        return updated
+    except Exception as e:
+        logger.error(f"Error refreshing schedule buckets: {e}")
+        return 0
+    finally:
+        if conn:
+            return_db_connection(conn)
+
+
 def get_users_due_for_daily_summary() -> list[dict[str, Any]]:
     """Get all users who should receive their daily summary now.
 
     This function is timezone-aware: it finds users whose local time
     matches their summary time preference and haven't received a summary today.
+    Matching is an indexed lookup on the precomputed UTC minute-of-day bucket
+    (see refresh_schedule_buckets).
 
     Returns:
         List of dicts: [{'phone_number': str, 'timezone': str, 'first_name': str}]
@@ -550,53 +748,43 @@ def get_users_due_for_daily_summary() -> list[dict[str, Any]]:
     import pytz
     from datetime import datetime
 
+    refresh_schedule_buckets()
+
     conn = None
     try:
         conn = get_db_connection()
         c = conn.cursor()
 
-        # Get all users with daily summary enabled
+        utc_now = datetime.now(pytz.UTC)
+
+        # Only users whose summary time falls on this UTC minute
         c.execute('''
-            SELECT phone_number, timezone, first_name, daily_summary_time, daily_summary_last_sent,
+            SELECT phone_number, timezone, first_name, daily_summary_last_sent,
                    COALESCE(smart_nudges_enabled, FALSE)
             FROM users
-            WHERE daily_summary_enabled = TRUE
+            WHERE daily_summary_utc_minute = %s
+              AND daily_summary_enabled = TRUE
               AND onboarding_complete = TRUE
               AND (opted_out IS NULL OR opted_out = FALSE)
-        ''')
+        ''', (utc_now.hour * 60 + utc_now.minute,))
 
         results = c.fetchall()
         due_users = []
 
-        utc_now = datetime.now(pytz.UTC)
-
         for row in results:
-            phone_number, user_tz_str, first_name, summary_time, last_sent, nudges_enabled = row
+            phone_number, user_tz_str, first_name, last_sent, nudges_enabled = row
 
             try:
                 user_tz = pytz.timezone(user_tz_str or 'America/New_York')
-                user_now = utc_now.astimezone(user_tz)
-
-                # Parse user's summary time preference
-                if summary_time:
-                    time_str = str(summary_time)
-                    time_parts = time_str.split(':')
-                    user_hour = int(time_parts[0])
-                    user_minute = int(time_parts[1]) if len(time_parts) > 1 else 0
-                else:
-                    user_hour, user_minute = 8, 0  # Default to 8:00 AM
-
-                # Check if current local time matches user's preference (within same minute)
-                if user_now.hour == user_hour and user_now.minute == user_minute:
-                    # Check if we already sent today (in user's local date)
-                    user_today = user_now.date()
-                    if last_sent != user_today:
-                        due_users.append({
-                            'phone_number': phone_number,
-                            'timezone': user_tz_str or 'America/New_York',
-                            'first_name': first_name,
-                            'smart_nudges_enabled': nudges_enabled or False,
-                        })
+                # Check if we already sent today (in user's local date)
+                user_today = utc_now.astimezone(user_tz).date()
+                if last_sent != user_today:
+                    due_users.append({
+                        'phone_number': phone_number,
+                        'timezone': user_tz_str or 'America/New_York',
+                        'first_name': first_name,
+                        'smart_nudges_enabled': nudges_enabled or False,
+                    })
             except Exception as e:
                 logger.error(f"Error checking summary for user {phone_number[-4:]}: {e}")
                 continue
@@ -686,6 +874,11 @@ def get_pending_reminder_confirmation(phone_number: str) -> Optional[dict[str, A
     import json
     conn = None
     try:
+        ctx = get_user_context(phone_number)
+        if ctx is not None:
+            pending = ctx.get('pending_reminder_confirmation')
+            return json.loads(pending) if pending else None
+
         conn = get_db_connection()
         c = conn.cursor()
 
@@ -759,6 +952,7 @@ def cancel_engagement_nudge(phone_number: str) -> bool:
         conn.commit()
 
         if result:
+            update_user_context(phone_number, five_minute_nudge_scheduled_at=None)
             logger.info(f"Cancelled engagement nudge for user ...{phone_number[-4:]}")
             return True
         return False
@@ -811,6 +1005,8 @@ def increment_post_onboarding_interactions(phone_number: str) -> int:
             result = c.fetchone()
 
         conn.commit()
+        if result:
+            update_user_context(phone_number, post_onboarding_interactions=result[0])
         return result[0] if result else -1
     except Exception as e:
         logger.error(f"Error incrementing post-onboarding interactions: {e}")
@@ -923,7 +1119,8 @@ def get_users_due_for_smart_nudge() -> list[dict[str, Any]]:
     """Get all users who should receive their smart nudge now.
 
     Timezone-aware: finds users whose local time matches their nudge time
-    preference and haven't received a nudge today.
+    preference and haven't received a nudge today, via the precomputed
+    UTC minute-of-day bucket (see refresh_schedule_buckets).
 
     Returns:
         List of dicts: [{'phone_number': str, 'timezone': str, 'first_name': str, 'premium_status': str}]
@@ -931,51 +1128,41 @@ def get_users_due_for_smart_nudge() -> list[dict[str, Any]]:
     import pytz
     from datetime import datetime
 
+    refresh_schedule_buckets()
+
     conn = None
     try:
         conn = get_db_connection()
         c = conn.cursor()
 
+        utc_now = datetime.now(pytz.UTC)
+
         c.execute('''
-            SELECT phone_number, timezone, first_name, smart_nudge_time, smart_nudge_last_sent, premium_status
+            SELECT phone_number, timezone, first_name, smart_nudge_last_sent, premium_status
             FROM users
-            WHERE smart_nudges_enabled = TRUE
+            WHERE smart_nudge_utc_minute = %s
+              AND smart_nudges_enabled = TRUE
               AND onboarding_complete = TRUE
               AND (opted_out IS NULL OR opted_out = FALSE)
-        ''')
+        ''', (utc_now.hour * 60 + utc_now.minute,))
 
         results = c.fetchall()
         due_users = []
 
-        utc_now = datetime.now(pytz.UTC)
-
         for row in results:
-            phone_number, user_tz_str, first_name, nudge_time, last_sent, premium_status = row
+            phone_number, user_tz_str, first_name, last_sent, premium_status = row
 
             try:
                 user_tz = pytz.timezone(user_tz_str or 'America/New_York')
-                user_now = utc_now.astimezone(user_tz)
-
-                # Parse user's nudge time preference
-                if nudge_time:
-                    time_str = str(nudge_time)
-                    time_parts = time_str.split(':')
-                    user_hour = int(time_parts[0])
-                    user_minute = int(time_parts[1]) if len(time_parts) > 1 else 0
-                else:
-                    user_hour, user_minute = 9, 0  # Default 9:00 AM
-
-                # Check if current local time matches preference (within same minute)
-                if user_now.hour == user_hour and user_now.minute == user_minute:
-                    # Check if we already sent today (in user's local date)
-                    user_today = user_now.date()
-                    if last_sent != user_today:
-                        due_users.append({
-                            'phone_number': phone_number,
-                            'timezone': user_tz_str or 'America/New_York',
-                            'first_name': first_name,
-                            'premium_status': premium_status or 'free'
-                        })
+                # Check if we already sent today (in user's local date)
+                user_today = utc_now.astimezone(user_tz).date()
+                if last_sent != user_today:
+                    due_users.append({
+                        'phone_number': phone_number,
+                        'timezone': user_tz_str or 'America/New_York',
+                        'first_name': first_name,
+                        'premium_status': premium_status or 'free'
+                    })
             except Exception as e:
                 logger.error(f"Error checking nudge for user {phone_number[-4:]}: {e}")
                 continue
@@ -1041,6 +1228,11 @@ def get_pending_nudge_response(phone_number: str) -> Optional[dict[str, Any]]:
     import json
     conn = None
     try:
+        ctx = get_user_context(phone_number)
+        if ctx is not None:
+            pending = ctx.get('pending_nudge_response')
+            return json.loads(pending) if pending else None
+
         conn = get_db_connection()
         c = conn.cursor()
 
@@ -0,0 +1,189 @@
+"""
+User Context
+Request-scoped cache of a user's row so a single webhook reads users once
+and writes its pending conversation state back once
+"""
+
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, Tuple
+
+from psycopg2 import sql
+
+from database import get_db_connection, return_db_connection
+from config import logger
+from utils.db_helpers import (
+    USER_COLUMNS, USER_CONTEXT_COLUMNS, execute_with_phone_lookup,
+)
+
+# Number of leading columns that make up the get_user() tuple
+_USER_ROW_LENGTH = len([col for col in USER_COLUMNS.split(',') if col.strip()])
+_CONTEXT_FIELDS = [col.strip() for col in USER_CONTEXT_COLUMNS.split(',') if col.strip()]
+
+# Conversation-state columns whose writes are buffered for the request and
+# flushed in one UPDATE when the context ends
+PENDING_STATE_FIELDS = frozenset(field for field in _CONTEXT_FIELDS if field.startswith('pending_'))
+
+_current_user_context: contextvars.ContextVar[Optional['UserContext']] = contextvars.ContextVar(
+    'user_context', default=None
+)
+
+
+class UserContext:
+    """Lazily-loaded snapshot of one users row, shared by every accessor in a request.
+
+    The row is fetched on first access (phone_hash lookup with phone_number
+    fallback, same as get_user) and then served from memory. Writes made
+    through models.user update the snapshot in place via apply(); writes the
+    snapshot can't mirror exactly (e.g. inserting a new user) call invalidate()
+    so the next read reloads.
+
+    Writes that only touch pending_* state are staged instead: the snapshot
+    changes immediately and the staged fields are written together by
+    flush() when the request ends.
+    """
+
+    def __init__(self, phone_number: str):
+        self.phone_number = phone_number
+        self._fields: Optional[dict[str, Any]] = None
+        self._loaded = False
+        self._dirty: dict[str, Any] = {}
+        self.load_count = 0
+        self.write_count = 0
+
+    def _load(self) -> None:
+        conn = None
+        try:
+            conn = get_db_connection()
+            c = conn.cursor()
+            result = execute_with_phone_lookup(
+                c, f'SELECT {USER_CONTEXT_COLUMNS} FROM users WHERE {{phone_condition}}',
+                self.phone_number
+            )
+            self._fields = dict(zip(_CONTEXT_FIELDS, result)) if result else None
+            self._loaded = True
+            self.load_count += 1
+        except Exception as e:
+            # Leave unloaded so the next access retries
+            logger.error(f"Error loading user context: {e}")
+            self._fields = None
+        finally:
+            if conn:
+                return_db_connection(conn)
+
+    @property
+    def exists(self) -> bool:
+        """True if the user has a row in the users table."""
+        if not self._loaded:
+            self._load()
+        return self._fields is not None
+
+    @property
+    def row(self) -> Optional[Tuple[Any, ...]]:
+        """The user row in USER_COLUMNS order (same shape as get_user())."""
+        if not self.exists:
+            return None
+        return tuple(self._fields[field] for field in _CONTEXT_FIELDS[:_USER_ROW_LENGTH])
+
+    def get(self, field: str, default: Any = None) -> Any:
+        """Get a single column value, or default if the user doesn't exist."""
+        if not self.exists:
+            return default
+        return self._fields.get(field, default)
+
+    def apply(self, fields: dict[str, Any]) -> None:
+        """Mirror a successful UPDATE into the cached row."""
+        if not self._loaded or self._fields is None:
+            return
+        for key, value in fields.items():
+            if key in self._fields:
+                self._fields[key] = value
+            # The write already reached the database; a staged value would overwrite it
+            self._dirty.pop(key, None)
+
+    def stage(self, fields: dict[str, Any]) -> bool:
+        """Buffer a pending-state write until flush().
+
+        Returns False (nothing staged) unless the user exists and every field
+        is a pending_* column; the caller then writes through as usual.
+        """
+        if not fields or not PENDING_STATE_FIELDS.issuperset(fields) or not self.exists:
+            return False
+        self._fields.update(fields)
+        self._dirty.update(fields)
+        return True
+
+    def flush(self) -> None:
+        """Write all staged pending-state fields in a single UPDATE."""
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, {}
+        conn = None
+        try:
+            conn = get_db_connection()
+            c = conn.cursor()
+            query = sql.SQL("UPDATE users SET {} WHERE phone_number = %s").format(
+                sql.SQL(', ').join(sql.SQL("{} = %s").format(sql.Identifier(key)) for key in dirty)
+            )
+            c.execute(query, [*dirty.values(), self.phone_number])
+            conn.commit()
+            self.write_count += 1
+        except Exception as e:
+            logger.error(f"Error writing pending state: {e}")
+        finally:
+            if conn:
+                return_db_connection(conn)
+
+    def invalidate(self) -> None:
+        """Drop the cached row so the next access reloads it."""
+        # Staged writes must land before the reload or they'd be lost
+        self.flush()
+        self._fields = None
+        self._loaded = False
+
+
+def get_user_context(phone_number: str) -> Optional[UserContext]:
+    """Return the active request's context for this phone number, if any."""
+    ctx = _current_user_context.get()
+    if ctx is not None and ctx.phone_number == phone_number:
+        return ctx
+    return None
+
+
+def start_user_context(phone_number: str) -> contextvars.Token:
+    """Start a request-scoped user context. Pair with end_user_context()."""
+    return _current_user_context.set(UserContext(phone_number))
+
+
+def end_user_context(token: contextvars.Token) -> None:
+    """End the user context started with start_user_context(), writing back staged state."""
+    ctx = _current_user_context.get()
+    try:
+        if ctx is not None:
+            ctx.flush()
+    finally:
+        _current_user_context.reset(token)
+
+
+@contextmanager
+def user_context(phone_number: str) -> Iterator[UserContext]:
+    """Context manager form of start_user_context()/end_user_context()."""
+    token = start_user_context(phone_number)
+    try:
+        yield _current_user_context.get()
+    finally:
+        end_user_context(token)
+
+
+def update_user_context(phone_number: str, **fields: Any) -> None:
+    """Mirror a write to the users table into the active context, if any."""
+    ctx = get_user_context(phone_number)
+    if ctx is not None:
+        ctx.apply(fields)
+
+
+def invalidate_user_context(phone_number: str) -> None:
+    """Force the active context (if any) to reload on next access."""
+    ctx = get_user_context(phone_number)
+    if ctx is not None:
+        ctx.invalidate()
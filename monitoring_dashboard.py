@@ -39,7 +39,7 @@ def verify_admin(credentials: HTTPBasicCredentials = Depends(security)):
 
 
 @router.get("/admin/monitoring", response_class=HTMLResponse)
-async def monitoring_dashboard(admin: str = Depends(verify_admin)):
+def monitoring_dashboard(admin: str = Depends(verify_admin)):
     """Render the monitoring dashboard UI"""
 
     html = f"""
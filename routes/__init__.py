@@ -12,6 +12,7 @@ from routes.handlers import (
     handle_pending_reminder_confirmation,
     handle_time_clarification,
 )
+from routes.command_router import CommandRouter, RouteMatch, COMMAND_ROUTER
 
 __all__ = [
     'handle_pending_delete',
@@ -21,4 +22,7 @@ __all__ = [
     'handle_pending_list_item',
     'handle_pending_reminder_confirmation',
     'handle_time_clarification',
+    'CommandRouter',
+    'RouteMatch',
+    'COMMAND_ROUTER',
 ]
@@ -0,0 +1,254 @@
+"""
+Command Router
+Table of the SMS keyword commands, resolved in one pass per message
+
+Each rule registers the exact phrases, prefixes or precompiled patterns the
+sms_reply cascade used to test inline. resolve() walks a keyword trie over the
+uppercased message once, evaluates only the rules whose trigger keywords it
+passed (plus the few substring rules that can't be indexed), and returns every
+rule that matched in cascade order. Blocks in sms_reply check membership in
+that result instead of re-testing the message themselves.
+"""
+
+import re
+from typing import Any, Iterable, Optional
+
+# Trie node keys (single characters are child edges)
+_PREFIX_RULES = 'prefix'
+_EXACT_RULES = 'exact'
+
+
+class _Rule:
+    __slots__ = ('name', 'priority', 'phrases', 'prefixes', 'patterns', 'contains')
+
+    def __init__(self, name, priority, phrases, prefixes, patterns, contains):
+        self.name = name
+        self.priority = priority
+        self.phrases = phrases
+        self.prefixes = prefixes
+        self.patterns = patterns
+        self.contains = contains
+
+    def match(self, key: str, text: str) -> Any:
+        """The phrase, prefix, substring or re.Match that matched, or None."""
+        if key in self.phrases:
+            return key
+        for prefix in self.prefixes:
+            if key.startswith(prefix):
+                return prefix
+        for pattern in self.patterns:
+            found = pattern.match(text)
+            if found:
+                return found
+        for fragment in self.contains:
+            if fragment in key:
+                return fragment
+        return None
+
+
+class RouteMatch:
+    """Every rule a message matched, in priority (cascade) order."""
+
+    __slots__ = ('matches',)
+
+    def __init__(self, matches: dict[str, Any]):
+        self.matches = matches
+
+    @property
+    def name(self) -> Optional[str]:
+        """The highest-priority matching rule, or None."""
+        return next(iter(self.matches), None)
+
+    def get(self, name: str) -> Any:
+        """The match for a rule (re.Match for pattern rules), or None."""
+        return self.matches.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.matches
+
+    def __bool__(self) -> bool:
+        return bool(self.matches)
+
+    def __repr__(self) -> str:
+        return f"RouteMatch({list(self.matches)})"
+
+
+class CommandRouter:
+    """Keyword-trie router over registered command rules.
+
+    Rules are prioritized in registration order. Matching is on the stripped
+    message: phrases and prefixes compare against its uppercase form,
+    patterns run against the original text (compile them with re.IGNORECASE
+    where case shouldn't matter). A pattern is only tried when the message
+    starts with one of its `triggers`; patterns without triggers, and
+    `contains` substrings, are checked for every message.
+    """
+
+    def __init__(self):
+        self._trie: dict[str, Any] = {}
+        self._unindexed: list[_Rule] = []
+        self._rules: dict[str, _Rule] = {}
+
+    def add(
+        self,
+        name: str,
+        phrases: Iterable[str] = (),
+        prefixes: Iterable[str] = (),
+        patterns: Iterable[str] = (),
+        triggers: Iterable[str] = (),
+        contains: Iterable[str] = (),
+        flags: int = re.IGNORECASE,
+    ) -> None:
+        """Register a rule. Later rules have lower priority."""
+        if name in self._rules:
+            raise ValueError(f"Duplicate command rule: {name}")
+        rule = _Rule(
+            name, len(self._rules),
+            frozenset(p.upper() for p in phrases),
+            tuple(p.upper() for p in prefixes),
+            tuple(re.compile(p, flags) for p in patterns),
+            tuple(c.upper() for c in contains),
+        )
+        self._rules[name] = rule
+
+        for phrase in rule.phrases:
+            self._node(phrase).setdefault(_EXACT_RULES, []).append(rule)
+        for prefix in rule.prefixes + tuple(t.upper() for t in triggers):
+            self._node(prefix).setdefault(_PREFIX_RULES, []).append(rule)
+        if rule.contains or (rule.patterns and not triggers):
+            self._unindexed.append(rule)
+
+    def _node(self, key: str) -> dict[str, Any]:
+        node = self._trie
+        for char in key:
+            node = node.setdefault(char, {})
+        return node
+
+    def _candidates(self, key: str) -> list[_Rule]:
+        candidates = list(self._unindexed)
+        node = self._trie
+        for char in key:
+            node = node.get(char)
+            if node is None:
+                break
+            candidates.extend(node.get(_PREFIX_RULES, ()))
+        else:
+            candidates.extend(node.get(_EXACT_RULES, ()))
+        return candidates
+
+    def resolve(self, message: str) -> RouteMatch:
+        """Match a message against every rule in a single trie walk."""
+        text = (message or '').strip()
+        key = text.upper()
+        matches = {}
+        for rule in sorted(set(self._candidates(key)), key=lambda r: r.priority):
+            found = rule.match(key, text)
+            if found is not None:
+                matches[rule.name] = found
+        return RouteMatch(matches)
+
+    @property
+    def rule_names(self) -> list[str]:
+        return list(self._rules)
+
+
+def _command(keyword: str) -> dict[str, Any]:
+    """Rule spec matching parse_command(): the keyword as the first word (space or colon after)."""
+    return {'patterns': [rf'{keyword}(?:[\s:]|$)'], 'triggers': [keyword]}
+
+
+def build_command_router() -> CommandRouter:
+    """The sms_reply keyword commands, in the order the cascade checks them."""
+    router = CommandRouter()
+    add = router.add
+
+    # Account lifecycle (checked before support mode and onboarding)
+    add('delete_account', phrases=["DELETE ACCOUNT", "CANCEL ACCOUNT", "CANCEL MY ACCOUNT", "DELETE MY ACCOUNT",
+                                   "REMOVE MY ACCOUNT", "CLOSE MY ACCOUNT"])
+    add('confirm_delete_account', phrases=["YES DELETE ACCOUNT"])
+    add('reset_account', phrases=["RESET ACCOUNT", "RESTART"])
+    add('stop', phrases=["STOP", "STOPALL", "UNSUBSCRIBE", "END", "QUIT"])
+    add('start', phrases=["START", "YES", "UNSTOP"])
+
+    # Bulk delete menus and delete/check by number
+    add('delete_reminders_menu', phrases=["DELETE REMINDERS", "DELETE MY REMINDERS", "CANCEL REMINDERS",
+                                          "CANCEL MY REMINDERS", "REMOVE REMINDERS", "REMOVE MY REMINDERS"])
+    add('delete_memories_menu', phrases=["DELETE MEMORIES", "DELETE MY MEMORIES", "FORGET MEMORIES",
+                                         "FORGET MY MEMORIES", "REMOVE MEMORIES", "REMOVE MY MEMORIES"])
+    add('delete_lists_menu', phrases=["DELETE LISTS", "DELETE MY LISTS", "REMOVE LISTS", "REMOVE MY LISTS"])
+    add('delete_reminder_number', patterns=[r'^(?:delete|remove|cancel)\s+reminder\s+(\d+)$'],
+        triggers=["DELETE", "REMOVE", "CANCEL"])
+    add('delete_multiple', patterns=[r'^(?:delete|remove)\s+\d+\s*(?:[,&]\s*\d+|\s+and\s+\d+|\s+\d+)+'],
+        triggers=["DELETE", "REMOVE"])
+    add('delete_number', patterns=[r'^(?:delete|remove)\s+(\d+)$'], triggers=["DELETE", "REMOVE"])
+    add('check_item', patterns=[r'^(?:check|check off|done|complete|finished)\s+(\d+)$'],
+        triggers=["CHECK", "DONE", "COMPLETE", "FINISHED"])
+
+    # Feedback, export, questions, billing
+    add('feedback', **_command('FEEDBACK'))
+    add('bug', **_command('BUG'))
+    add('export', phrases=["EXPORT"])
+    add('question', **_command('QUESTION'))
+    add('upgrade', phrases=["UPGRADE", "SUBSCRIBE", "PREMIUM", "PRICING"])
+    add('cancel_subscription', contains=["CANCEL SUBSCRIPTION", "CANCEL PLAN", "CANCEL PREMIUM",
+                                         "CANCEL MY SUBSCRIPTION", "CANCEL MY PLAN"])
+    add('account', phrases=["ACCOUNT", "MANAGE", "BILLING", "SUBSCRIPTION"])
+    add('status', phrases=["STATUS", "MY ACCOUNT", "ACCOUNT INFO", "USAGE"])
+    add('support', **_command('SUPPORT'))
+    add('snooze', prefixes=["SNOOZE"])
+
+    # Daily summary
+    add('summary_on', phrases=["SUMMARY ON", "DAILY SUMMARY ON", "DAILY SUMMARY"])
+    add('summary_off', phrases=["SUMMARY OFF", "DAILY SUMMARY OFF", "DISABLE SUMMARY", "DISABLE DAILY SUMMARY",
+                                "TURN OFF SUMMARY", "TURN OFF DAILY SUMMARY"],
+        prefixes=["SUMMARY OFF ", "DAILY SUMMARY OFF "])
+    add('summary_status', phrases=["MY SUMMARY", "SUMMARY STATUS", "SUMMARY"])
+    add('summary_time', patterns=[
+        r'^(?:daily\s+)?summary\s+(?:on\s+|time\s+)?(\d{1,2})(?::(\d{2}))?\s*(am|pm|a|p)$',
+        r'^(?:change|set|move|update)\s+(?:my\s+)?(?:daily\s+)?summary\s+(?:time\s+)?(?:to\s+)?(\d{1,2})(?::(\d{2}))?\s*(am|pm|a|p)\b',
+    ], triggers=["DAILY", "SUMMARY", "CHANGE", "SET", "MOVE", "UPDATE"])
+
+    # Smart nudges
+    add('nudge_on', phrases=["NUDGE ON", "NUDGES ON", "SMART NUDGE ON", "SMART NUDGES ON"])
+    add('nudge_off', phrases=["NUDGE OFF", "NUDGES OFF", "SMART NUDGE OFF", "SMART NUDGES OFF", "DISABLE NUDGE",
+                              "DISABLE NUDGES"])
+    add('nudge_status', phrases=["NUDGE STATUS", "MY NUDGE", "MY NUDGES", "NUDGE SETTINGS"])
+    add('nudge_time', patterns=[
+        r'^(?:smart\s+)?nudge(?:s)?\s+(?:time\s+)?(\d{1,2})(?::(\d{2}))?\s*(am|pm|a|p)$',
+        r'^(?:change|set|move|update)\s+(?:my\s+)?(?:smart\s+)?nudge(?:s)?\s+(?:time\s+)?(?:to\s+)?(\d{1,2})(?::(\d{2}))?\s*(am|pm|a|p)\b',
+    ], triggers=["SMART", "NUDGE", "CHANGE", "SET", "MOVE", "UPDATE"])
+
+    # Timezone
+    add('timezone_show', phrases=["MY TIMEZONE", "TIMEZONE", "MY TZ", "SHOW TIMEZONE"])
+    add('timezone_set', prefixes=["TIMEZONE ", "SET TIMEZONE "])
+
+    # Completed and recurring reminders
+    add('completed_reminders', phrases=["SHOW COMPLETED REMINDERS", "SHOW COMPLETED", "COMPLETED REMINDERS",
+                                        "PAST REMINDERS", "SHOW PAST REMINDERS"])
+    add('recurring_list', phrases=["MY RECURRING", "MY RECURRING REMINDERS", "RECURRING", "RECURRING REMINDERS",
+                                   "SHOW RECURRING"])
+    add('recurring_delete', prefixes=["DELETE RECURRING ", "CANCEL RECURRING ", "REMOVE RECURRING "])
+    add('recurring_pause', prefixes=["PAUSE RECURRING "])
+    add('recurring_resume', prefixes=["RESUME RECURRING "])
+
+    # Delete all
+    add('delete_all_memories', phrases=["DELETE ALL MEMORIES", "DELETE ALL MY MEMORIES", "FORGET ALL MEMORIES",
+                                        "FORGET ALL MY MEMORIES"])
+    add('delete_all_reminders', phrases=["DELETE ALL REMINDERS", "DELETE ALL MY REMINDERS", "CANCEL ALL REMINDERS",
+                                         "CANCEL ALL MY REMINDERS"])
+    add('delete_all_lists', phrases=["DELETE ALL LISTS", "DELETE ALL MY LISTS", "FORGET ALL LISTS",
+                                     "FORGET ALL MY LISTS"])
+    add('delete_all_menu', phrases=["DELETE ALL"])
+    add('delete_all_data', phrases=["DELETE ALL DATA", "DELETE ALL MY DATA", "DELETE EVERYTHING",
+                                    "FORGET EVERYTHING"])
+
+    # Listing and help
+    add('list_memories', phrases=["LIST ALL", "LIST MEMORIES", "SHOW MEMORIES", "MY MEMORIES"])
+    add('list_lists', phrases=["MY LISTS", "SHOW LISTS", "LIST LISTS", "LISTS"])
+    add('help', phrases=["HELP"])
+    add('info', phrases=["INFO", "GUIDE", "COMMANDS", "?"])
+    add('more_commands', phrases=["MORE COMMANDS", "MORE", "ALL COMMANDS", "FULL COMMANDS"])
+    return router
+
+
+COMMAND_ROUTER = build_command_router()
@@ -9,7 +9,7 @@ from typing import Any
 from config import logger, ENVIRONMENT
 from models.user import create_or_update_user, get_last_active_list
 from models.list_model import (
-    create_list, get_list_by_name, get_lists, get_list_items,
+    create_list, get_list_by_name, get_lists, get_list_items, get_lists_with_items,
     add_list_item, get_item_count, mark_item_complete, mark_item_incomplete,
     delete_list_item, delete_list as db_delete_list, clear_list as db_clear_list,
     rename_list as db_rename_list, find_item_in_any_list
@@ -322,26 +322,25 @@ def handle_show_current_list(phone_number: str, incoming_msg: str) -> str:
 
 def _show_all_lists_or_single(phone_number: str) -> str:
     """Helper to show all lists or single list directly."""
-    lists = get_lists(phone_number)
+    lists = get_lists_with_items(phone_number)
 
     if len(lists) == 1:
-        list_id = lists[0][0]
-        list_name = lists[0][1]
+        list_name = lists[0]['list_name']
         create_or_update_user(phone_number, last_active_list=list_name)
-        items = get_list_items(list_id)
+        items = lists[0]['items']
 
         if items:
             item_lines = []
-            for i, (item_id, item_text, completed) in enumerate(items, 1):
-                if completed:
-                    item_lines.append(f"{i}. [x] {item_text}")
+            for i, item in enumerate(items, 1):
+                if item['completed']:
+                    item_lines.append(f"{i}. [x] {item['item_text']}")
                 else:
-                    item_lines.append(f"{i}. {item_text}")
+                    item_lines.append(f"{i}. {item['item_text']}")
             return f"{list_name}:\n\n" + "\n".join(item_lines)
         else:
             return f"Your {list_name} is empty."
     elif lists:
-        list_lines = [f"{i+1}. {l[1]} ({l[2]} items)" for i, l in enumerate(lists)]
+        list_lines = [f"{i+1}. {l['list_name']} ({l['item_count']} items)" for i, l in enumerate(lists)]
         return "Your lists:\n\n" + "\n".join(list_lines) + "\n\nReply with a number to see that list."
     else:
         return "You don't have any lists yet. Try 'Create a grocery list'!"
@@ -376,7 +375,7 @@ def handle_complete_item(
         # Try to find item in any list
         found = find_item_in_any_list(phone_number, item_text)
         if len(found) == 1:
-            list_name = found[0][1]
+            list_name, item_text = found[0][1], found[0][3]
             if mark_item_complete(phone_number, list_name, item_text):
                 reply_text = f"Checked off {item_text} from your {list_name}"
             else:
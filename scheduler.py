@@ -0,0 +1,26 @@
+"""
+SMS Reminders - Reminder Scheduler Entrypoint
+Runs the event-driven reminder scheduler (timing wheel + LISTEN/NOTIFY).
+
+Usage:
+    REMINDER_SCHEDULER_ENABLED=true python scheduler.py
+
+Set REMINDER_SCHEDULER_ENABLED=true on Beat as well so its 30-second
+reminder poll drops to a REMINDER_RECOVERY_INTERVAL sweep. Deployed as the
+sms-reminders-scheduler service in render.yaml.
+"""
+
+import sys
+
+from database import init_db
+from config import logger, REMINDER_SCHEDULER_ENABLED
+from services.reminder_scheduler import ReminderScheduler
+
+if __name__ == "__main__":
+    if not REMINDER_SCHEDULER_ENABLED:
+        # Beat is still polling every 30 seconds; the flag must match on both
+        logger.error("REMINDER_SCHEDULER_ENABLED is not set - reminder scheduler not started")
+        sys.exit(1)
+    logger.info("Reminder scheduler starting - initializing database...")
+    init_db()
+    ReminderScheduler().run_forever()
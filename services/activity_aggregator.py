@@ -0,0 +1,149 @@
+"""
+Activity Aggregator
+Coalesces per-message users.last_active_at / total_messages updates in memory
+and writes them as one bulk UPDATE every few seconds
+"""
+
+import atexit
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from psycopg2.extras import execute_values
+
+from database import get_db_connection, return_db_connection
+from config import logger, ACTIVITY_FLUSH_INTERVAL, ACTIVITY_COALESCE_ENABLED
+
+# One statement for every user with pending activity. GREATEST keeps a flush
+# from another process that ran later from being moved backwards.
+_BULK_UPDATE_SQL = '''
+    UPDATE users AS u
+    SET last_active_at = GREATEST(u.last_active_at, v.last_active_at),
+        total_messages = COALESCE(u.total_messages, 0) + v.messages
+    FROM (VALUES %s) AS v (phone_number, last_active_at, messages)
+    WHERE u.phone_number = v.phone_number
+'''
+_VALUES_TEMPLATE = '(%s, %s::timestamp, %s::integer)'
+
+
+class ActivityAggregator:
+    """Per-process pending activity, flushed by a daemon thread.
+
+    record() only touches a dict under a lock. Every `flush_interval` seconds
+    the pending entries are swapped out and written in one
+    UPDATE ... FROM (VALUES ...); if that fails they are merged back and
+    retried on the next flush. pending() exposes the unflushed deltas so
+    admin views can show effective values.
+    """
+
+    def __init__(self, flush_interval: float = ACTIVITY_FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        # phone_number -> [latest activity time, unflushed message count]
+        self._pending: dict[str, list] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pid = None
+        self._stats = {'recorded': 0, 'flushes': 0, 'rows_updated': 0, 'errors': 0}
+
+    def _ensure_started(self) -> None:
+        """Start the flush thread on first use, and again in a forked child."""
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    if self._pid is not None:
+                        self._pending = {}  # the parent flushes its own copy
+                    threading.Thread(target=self._run, daemon=True, name="activity-aggregator").start()
+                    self._pid = pid
+
+    def record(self, phone_number: str, when: Optional[datetime] = None, messages: int = 0) -> None:
+        """Note activity for a user: bump last_active_at to `when` and add `messages`."""
+        self._ensure_started()
+        when = when or datetime.utcnow()
+        with self._lock:
+            entry = self._pending.get(phone_number)
+            if entry is None:
+                self._pending[phone_number] = [when, messages]
+            else:
+                entry[0] = max(entry[0], when)
+                entry[1] += messages
+            self._stats['recorded'] += 1
+
+    def pending(self, phone_number: str) -> tuple[Optional[datetime], int]:
+        """Unflushed (last_active_at, message delta) for a user in this process."""
+        with self._lock:
+            entry = self._pending.get(phone_number)
+            return (entry[0], entry[1]) if entry else (None, 0)
+
+    def effective(self, phone_number: str, last_active_at: Optional[datetime],
+                  total_messages: Optional[int]) -> tuple[Optional[datetime], int]:
+        """Combine values read from users with this process's unflushed activity."""
+        pending_at, pending_messages = self.pending(phone_number)
+        if pending_at and (last_active_at is None or pending_at > last_active_at):
+            last_active_at = pending_at
+        return last_active_at, (total_messages or 0) + pending_messages
+
+    def flush(self) -> int:
+        """Write all pending activity now. Returns the number of users rows updated."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            conn = None
+            try:
+                conn = get_db_connection()
+                c = conn.cursor()
+                rows = [(phone, at, messages) for phone, (at, messages) in batch.items()]
+                execute_values(c, _BULK_UPDATE_SQL, rows, template=_VALUES_TEMPLATE, page_size=500)
+                conn.commit()
+                self._stats['flushes'] += 1
+                self._stats['rows_updated'] += len(rows)
+                return len(rows)
+            except Exception as e:
+                logger.error(f"Error flushing user activity ({len(batch)} users): {e}")
+                self._stats['errors'] += 1
+                if conn:
+                    conn.rollback()
+                self._merge_back(batch)
+                return 0
+            finally:
+                if conn:
+                    return_db_connection(conn)
+
+    def _merge_back(self, batch: dict) -> None:
+        with self._lock:
+            for phone, (at, messages) in batch.items():
+                entry = self._pending.get(phone)
+                if entry is None:
+                    self._pending[phone] = [at, messages]
+                else:
+                    entry[0] = max(entry[0], at)
+                    entry[1] += messages
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, 'pending_users': len(self._pending)}
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Activity aggregator flush failed: {e}")
+
+
+activity_aggregator = ActivityAggregator()
+atexit.register(activity_aggregator.flush)
+
+
+def record_activity(phone_number: str, messages: int = 0) -> datetime:
+    """Record activity now; writes straight through when coalescing is disabled."""
+    now = datetime.utcnow()
+    activity_aggregator.record(phone_number, now, messages)
+    if not ACTIVITY_COALESCE_ENABLED:
+        activity_aggregator.flush()
+    return now
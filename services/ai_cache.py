@@ -0,0 +1,374 @@
+"""
+AI Result Cache
+Process-wide cache of AI parses keyed on message templates. A message like
+"remind me tomorrow at 8am to call mom" becomes the template
+"remind me tomorrow at «time» to «text»" with slots time0=08:00 and
+text0="call mom". The AI's action is stored as a skeleton: slot values are
+swapped for placeholders and dates become day offsets from the user's local
+today. A later message of the same shape, from a user in the same timezone
+on the same weekday, gets the skeleton back with its own slots filled in and
+skips the AI.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Any, Hashable, Optional
+
+from config import AI_CACHE_ENABLED, AI_CACHE_TTL, AI_CACHE_MAX_ENTRIES, AI_CACHE_ACTIONS
+
+# Fields kept per cacheable action; anything else the AI returned (free-text
+# confirmations that repeat the slots in their own words) is dropped
+CACHEABLE_FIELDS = {
+    'reminder': ('action', 'reminder_text', 'reminder_date', 'confidence'),
+    'reminder_relative': ('action', 'reminder_text', 'offset_minutes', 'offset_days',
+                          'offset_weeks', 'offset_months', 'confidence'),
+    'reminder_recurring': ('action', 'reminder_text', 'recurrence_type', 'recurrence_day', 'time', 'confidence'),
+    'add_to_list': ('action', 'list_name', 'item_text'),
+}
+LIST_ITEMS = 'parse_list_items'
+
+# Only these integer fields may hold a number slot ("in 30 minutes" -> 30, "in 2 hours" -> 120)
+_NUMBER_FIELDS = ('offset_minutes', 'offset_days', 'offset_weeks', 'offset_months', 'recurrence_day')
+
+_WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+_MONTHS = ('january', 'february', 'march', 'april', 'may', 'june', 'july', 'august',
+           'september', 'october', 'november', 'december')
+
+# Words that may surround the free-text slot of a reminder; a template whose
+# head or tail holds anything else is not cached
+_STRUCTURAL = frozenset((
+    'remind', 'me', 'reminder', 'set', 'a', 'an', 'the', 'please', 'can', 'could', 'you', 'hey',
+    'to', 'about', 'that', 'at', 'on', 'in', 'by', 'for', 'of', 'and', 'from', 'now',
+    'today', 'tonight', 'tomorrow', 'this', 'next', 'every', 'each', 'daily',
+    'day', 'days', 'weekday', 'weekdays', 'weekend', 'weekends', 'week', 'weeks', 'month', 'months',
+    'morning', 'afternoon', 'evening', 'night', 'noon', 'midnight', 'half',
+    'minute', 'minutes', 'min', 'mins', 'hour', 'hours', 'hr', 'hrs',
+    '«time»', '«num»', *_WEEKDAYS, *_MONTHS,
+))
+_CONNECTORS = ('to', 'about', 'that')
+
+_TIME = re.compile(r'\b(\d{1,2})(?::(\d{2}))?:?\s*([ap])\.?m\b\.?')
+_NUMBER = re.compile(r'\b\d+(?:st|nd|rd|th)?\b')
+_ADD_TO_LIST = re.compile(r'^(?:please )?add (?P<items>.+?) to (?:my |the )?(?P<list>[\w\' -]+?)(?: list)?$')
+_DATE_PREFIX = re.compile(r'^(\d{4}-\d{2}-\d{2})(?=$| )')
+_PLACEHOLDER = re.compile(r'«(day[+-]\d+|time\d+|text\d+)»')
+_NUMBER_MARKER = re.compile(r'^«(num\d+)(\*60)?»$')
+
+
+def _normalize(message: str) -> str:
+    return ' '.join(message.split()).rstrip('.!?')
+
+
+def message_template(message: str) -> Optional[tuple[str, dict[str, Any]]]:
+    """(template, slots) for a message shape the cache understands, or None.
+
+    Times become «time» (slots time0, time1... as (hour, minute)), numbers
+    outside the free text become «num» (num0...), and the reminder text or
+    list items/name become «text» (text0...).
+    """
+    original = _normalize(message)
+    text = original.lower()
+    if not text or len(text) != len(original) or '«' in text or '»' in text or '\n' in message.strip():
+        return None
+
+    # Matching is case-insensitive but slot text keeps the user's casing,
+    # which is what the AI echoes back. In "add X to Y to Z list" which "to"
+    # splits items from list is up to the AI.
+    add = _ADD_TO_LIST.match(text)
+    if add and ' to ' not in add.group('list'):
+        slots = {'text0': original[add.start('items'):add.end('items')],
+                 'text1': original[add.start('list'):add.end('list')]}
+        suffix = ' list' if text.endswith(' list') else ''
+        return f"add «text» to «text»{suffix}", slots
+
+    if 'remind me' not in text:
+        return None
+    lowered = text
+
+    times = []
+
+    def slot_time(match):
+        hour, minute = int(match.group(1)), int(match.group(2) or 0)
+        if not 1 <= hour <= 12 or minute > 59:
+            raise ValueError
+        times.append((hour % 12 + (12 if match.group(3) == 'p' else 0), minute))
+        return '«time»'
+
+    try:
+        text = _TIME.sub(slot_time, text)
+    except ValueError:
+        return None
+
+    words = text.split(' ')
+    # Head: structural words up to the first connector after "remind me"
+    start = next((i for i in range(len(words) - 1) if words[i:i + 2] == ['remind', 'me']), None)
+    if start is None:
+        return None
+    connector = next((i for i in range(start + 2, len(words)) if words[i] in _CONNECTORS), None)
+    if connector is None or not all(_is_structural(w) for w in words[:connector]):
+        return None
+    # Tail: the shortest all-structural clause after the text ("at «time» tomorrow")
+    end = len(words)
+    for i in range(connector + 2, len(words)):
+        if words[i] in ('at', 'on', 'in', 'by', 'tomorrow', 'today', 'tonight', 'this', 'next', 'every') \
+                and all(_is_structural(w) for w in words[i:]):
+            end = i
+            break
+    body = ' '.join(words[connector + 1:end])
+    if not body or '«' in body:
+        return None
+    at = lowered.find(f" {body}", lowered.find('remind me'))
+    if at < 0:
+        return None
+    body = original[at + 1:at + 1 + len(body)]
+
+    slots = {f'time{i}': hm for i, hm in enumerate(times)}
+    numbers = []
+
+    def slot_number(match):
+        numbers.append(int(re.match(r'\d+', match.group(0)).group(0)))
+        return '«num»'
+
+    head = _NUMBER.sub(slot_number, ' '.join(words[:connector + 1]))
+    tail = _NUMBER.sub(slot_number, ' '.join(words[end:]))
+    slots.update({f'num{i}': n for i, n in enumerate(numbers)})
+    slots['text0'] = body
+    return ' '.join(filter(None, (head, '«text»', tail))), slots
+
+
+def _is_structural(word: str) -> bool:
+    return word in _STRUCTURAL or bool(_NUMBER.fullmatch(word))
+
+
+def _render_time(hm: tuple[int, int]) -> str:
+    return f"{hm[0]:02d}:{hm[1]:02d}"
+
+
+def build_skeleton(action: dict[str, Any], slots: dict[str, Any], today: date) -> Optional[dict[str, Any]]:
+    """The action with slot values replaced by placeholders, or None if it can't be templated.
+
+    Every slot must appear in the action (otherwise the AI answered with
+    something other than what the slot holds, e.g. reworded text), and no two
+    slots may render the same.
+    """
+    fields = CACHEABLE_FIELDS.get(action.get('action'))
+    if fields is None:
+        return None
+    times = {name: _render_time(hm) for name, hm in slots.items() if name.startswith('time')}
+    texts = {name: value for name, value in slots.items() if name.startswith('text')}
+    numbers = {name: value for name, value in slots.items() if name.startswith('num')}
+    if len(set(times.values())) < len(times) or len(set(texts.values())) < len(texts) \
+            or len(set(numbers.values())) < len(numbers):
+        return None
+
+    skeleton = {}
+    used = set()
+    for field in fields:
+        if field not in action:
+            continue
+        value = action[field]
+        if isinstance(value, int) and not isinstance(value, bool) and field in _NUMBER_FIELDS:
+            for name, number in numbers.items():
+                if value in (number, number * 60):
+                    value = f"«{name}{'' if value == number else '*60'}»"
+                    used.add(name)
+                    break
+        elif isinstance(value, str):
+            match = _DATE_PREFIX.match(value)
+            if match:
+                try:
+                    offset = (date.fromisoformat(match.group(1)) - today).days
+                except ValueError:
+                    return None
+                value = f"«day{offset:+d}»" + value[match.end(1):]
+            for name, rendered in times.items():
+                if rendered in value:
+                    value = value.replace(rendered, f"«{name}»")
+                    used.add(name)
+            for name, text in sorted(texts.items(), key=lambda item: -len(item[1])):
+                if text in value:
+                    value = value.replace(text, f"«{name}»")
+                    used.add(name)
+        elif value is not None and not isinstance(value, (int, float, bool)):
+            return None
+        skeleton[field] = value
+
+    if used != set(slots):
+        return None
+    return skeleton
+
+
+def fill_skeleton(skeleton: dict[str, Any], slots: dict[str, Any], today: date) -> dict[str, Any]:
+    """An action from a skeleton and one message's slots."""
+    def render(match):
+        name = match.group(1)
+        if name.startswith('day'):
+            return (today + timedelta(days=int(name[3:]))).isoformat()
+        if name.startswith('time'):
+            return _render_time(slots[name])
+        return slots[name]
+
+    action = {}
+    for field, value in skeleton.items():
+        if isinstance(value, str):
+            number = _NUMBER_MARKER.match(value)
+            if number:
+                value = slots[number.group(1)] * (60 if number.group(2) else 1)
+            else:
+                value = _PLACEHOLDER.sub(render, value)
+        action[field] = value
+    return action
+
+
+class AIResultCache:
+    """AI action skeletons keyed by (template, timezone, weekday, times already past).
+
+    Whether a mentioned time has passed today decides "today" vs "tomorrow"
+    for the AI, so it is part of the key; a filled-in reminder that would
+    land in the past is treated as a miss. List item splits from
+    parse_list_items are cached by their exact text.
+    """
+
+    def __init__(self, ttl_seconds: float = AI_CACHE_TTL, max_entries: int = AI_CACHE_MAX_ENTRIES,
+                 actions: tuple[str, ...] = AI_CACHE_ACTIONS, enabled: bool = AI_CACHE_ENABLED):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.actions = frozenset(actions)
+        self.enabled = enabled
+        # key -> (value, expires_at), least recently used first
+        self._entries: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.uncacheable = 0
+        self.hits_by_action: dict[str, int] = {}
+
+    # -------------------------------------------------
+    # Entries
+    # -------------------------------------------------
+
+    def _get(self, key: Hashable) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def _set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.stores += 1
+
+    def _count(self, hit: bool, action: Optional[str] = None) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+                self.hits_by_action[action] = self.hits_by_action.get(action, 0) + 1
+            else:
+                self.misses += 1
+
+    @staticmethod
+    def _key(template: str, slots: dict[str, Any], user_now: datetime, timezone: str) -> Hashable:
+        passed = tuple(hm <= (user_now.hour, user_now.minute)
+                       for name, hm in sorted(slots.items()) if name.startswith('time'))
+        # Without a clock time or an amount ("tomorrow morning") the AI picks
+        # a time relative to now, so the answer only holds for this hour
+        hour = None if '«time»' in template or '«num»' in template else user_now.hour
+        return ('action', template, timezone, user_now.weekday(), passed, hour)
+
+    # -------------------------------------------------
+    # AI message parses
+    # -------------------------------------------------
+
+    def lookup(self, message: str, user_now: datetime, timezone: str) -> Optional[dict[str, Any]]:
+        """The cached action for a message, with its slots filled in, or None."""
+        if not self.enabled:
+            return None
+        shape = message_template(message)
+        if shape is None:
+            return None
+        template, slots = shape
+        skeleton = self._get(self._key(template, slots, user_now, timezone))
+        action = fill_skeleton(skeleton, slots, user_now.date()) if skeleton else None
+        if action and 'reminder_date' in action:
+            try:
+                due = datetime.strptime(action['reminder_date'], '%Y-%m-%d %H:%M:%S')
+            except ValueError:
+                due = None
+            if due is None or due <= user_now.replace(tzinfo=None):
+                action = None
+        self._count(action is not None, action and action['action'])
+        return action
+
+    def store(self, message: str, user_now: datetime, timezone: str, action: dict[str, Any]) -> bool:
+        """Cache the AI's action for a message if its action type is opted in and it templates cleanly."""
+        if not self.enabled or action.get('action') not in self.actions:
+            return False
+        shape = message_template(message)
+        if shape is None:
+            return False
+        template, slots = shape
+        today = user_now.date()
+        skeleton = build_skeleton(action, slots, today)
+        fields = CACHEABLE_FIELDS[action['action']]
+        if skeleton is None or fill_skeleton(skeleton, slots, today) != {f: action[f] for f in fields if f in action}:
+            with self._lock:
+                self.uncacheable += 1
+            return False
+        self._set(self._key(template, slots, user_now, timezone), skeleton)
+        return True
+
+    # -------------------------------------------------
+    # parse_list_items
+    # -------------------------------------------------
+
+    def lookup_items(self, item_text: str) -> Optional[list[str]]:
+        if not self.enabled or LIST_ITEMS not in self.actions:
+            return None
+        items = self._get((LIST_ITEMS, item_text.strip()))
+        self._count(items is not None, LIST_ITEMS)
+        return list(items) if items is not None else None
+
+    def store_items(self, item_text: str, items: list[str]) -> None:
+        if self.enabled and LIST_ITEMS in self.actions:
+            self._set((LIST_ITEMS, item_text.strip()), tuple(items))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            entries = len(self._entries)
+            by_action = dict(self.hits_by_action)
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "actions": sorted(self.actions),
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "uncacheable": self.uncacheable,
+            "hits_by_action": by_action,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+_ai_result_cache = AIResultCache()
+
+
+def get_ai_result_cache() -> AIResultCache:
+    return _ai_result_cache
@@ -3,184 +3,161 @@ AI Service
 Handles all OpenAI API interactions and natural language processing
 """
 
+import asyncio
 import json
+import time
 from typing import Any, Optional
 
-from openai import OpenAI
+import httpx
+from openai import OpenAI, AsyncOpenAI
+from starlette.concurrency import run_in_threadpool
 from datetime import datetime, timedelta
 import pytz
 
 from config import OPENAI_API_KEY, OPENAI_MODEL, OPENAI_TEMPERATURE, OPENAI_MAX_TOKENS, OPENAI_TIMEOUT, logger, MAX_MEMORIES_IN_CONTEXT, MAX_COMPLETED_REMINDERS_DISPLAY
+from config import (
+    OPENAI_HEDGE_ENABLED, OPENAI_HEDGE_PERCENTILE, OPENAI_HEDGE_MIN_SAMPLES,
+    OPENAI_HEDGE_MIN_DELAY, OPENAI_HEDGE_MAX_DELAY, OPENAI_MAX_CONNECTIONS,
+)
 from models.memory import get_memories
 from models.reminder import get_user_reminders
 from models.user import get_user_timezone, get_user_first_name
-from models.list_model import get_lists, get_list_items
+from models.list_model import get_lists_with_items
+from models.prompt_context import get_prompt_context_cache, MEMORIES, REMINDERS, LISTS
+from services.ai_cache import get_ai_result_cache
 from utils.timezone import get_user_current_time
+from utils.latency import LatencyHistogram
 from database import log_api_usage
 
 
-def process_with_ai(message: str, phone_number: str, context: dict[str, Any]) -> dict[str, Any]:
-    """Process user message with OpenAI and determine action"""
-    try:
-        logger.info(f"Processing message with AI for {phone_number}")
-        
-        # Get and format memories
-        # Tuple format: (id, memory_text, parsed_data, created_at)
-        memories = get_memories(phone_number)
-        if memories:
-            # Get user's timezone for proper date display
-            user_tz_str = get_user_timezone(phone_number)
-            user_tz = pytz.timezone(user_tz_str)
-
-            formatted_memories = []
-            for m in memories[:MAX_MEMORIES_IN_CONTEXT]:
-                memory_text = m[1]
-                created_date = m[3]
-                try:
-                    # Handle both datetime objects and strings from PostgreSQL
-                    if isinstance(created_date, datetime):
-                        date_obj = created_date
-                    else:
-                        date_obj = datetime.strptime(str(created_date), '%Y-%m-%d %H:%M:%S')
-
-                    # Convert from UTC to user's timezone for proper date display
-                    if date_obj.tzinfo is None:
-                        date_obj = pytz.utc.localize(date_obj)
-                    date_obj_local = date_obj.astimezone(user_tz)
-                    readable_date = date_obj_local.strftime('%B %d, %Y')
-                    formatted_memories.append(f"- {memory_text} (recorded on {readable_date})")
-                except (ValueError, TypeError, AttributeError):
-                    formatted_memories.append(f"- {memory_text}")
-            memory_context = "\n".join(formatted_memories)
-        else:
-            memory_context = "No memories stored yet."
-
-        # Get and format reminders
-        reminders = get_user_reminders(phone_number)
-        if reminders:
-            user_tz = get_user_timezone(phone_number)
-            tz = pytz.timezone(user_tz)
-            user_now = get_user_current_time(phone_number)
-            
-            scheduled = []
-            completed = []
-            scheduled_num = 0
-            completed_num = 0
-
-            # Tuple format: (id, reminder_date, reminder_text, recurring_id, sent)
-            for reminder in reminders:
-                reminder_id, reminder_date_utc, reminder_text, recurring_id, sent = reminder
-                try:
-                    # Handle both datetime objects and strings from PostgreSQL
-                    if isinstance(reminder_date_utc, datetime):
-                        utc_dt = reminder_date_utc
-                        if utc_dt.tzinfo is None:
-                            utc_dt = pytz.UTC.localize(utc_dt)
-                    else:
-                        utc_dt = datetime.strptime(str(reminder_date_utc), '%Y-%m-%d %H:%M:%S')
-                        utc_dt = pytz.UTC.localize(utc_dt)
-                    user_dt = utc_dt.astimezone(tz)
-
-                    # Smart date formatting
-                    if user_dt.date() == user_now.date():
-                        date_str = f"Today at {user_dt.strftime('%I:%M %p')}"
-                    elif user_dt.date() == (user_now + timedelta(days=1)).date():
-                        date_str = f"Tomorrow at {user_dt.strftime('%I:%M %p')}"
-                    else:
-                        date_str = user_dt.strftime('%a, %b %d at %I:%M %p')
-
-                    # Add [R] prefix for recurring reminders
-                    display_text = f"[R] {reminder_text}" if recurring_id else reminder_text
-
-                    if sent:
-                        completed_num += 1
-                        completed.append(f"{completed_num}. {display_text}\n   {date_str}")
-                    else:
-                        scheduled_num += 1
-                        scheduled.append(f"{scheduled_num}. {display_text}\n   {date_str}")
-                except (ValueError, TypeError, AttributeError):
-                    display_text = f"[R] {reminder_text}" if recurring_id else reminder_text
-                    if sent:
-                        completed_num += 1
-                        completed.append(f"{completed_num}. {display_text}")
-                    else:
-                        scheduled_num += 1
-                        scheduled.append(f"{scheduled_num}. {display_text}")
-
-            # Build context - limit completed to last 5
-            parts = []
-            if scheduled:
-                parts.append("SCHEDULED:\n\n" + "\n\n".join(scheduled))
-            if completed:
-                # Show only last N completed reminders
-                completed_to_show = completed[-MAX_COMPLETED_REMINDERS_DISPLAY:]
-                completed_text = "\n\n".join(completed_to_show)
-                if len(completed) > MAX_COMPLETED_REMINDERS_DISPLAY:
-                    parts.append(f"COMPLETED (last {MAX_COMPLETED_REMINDERS_DISPLAY} of {len(completed)}):\n\n" + completed_text)
-                else:
-                    parts.append("COMPLETED:\n\n" + completed_text)
-            
-            reminders_context = "\n\n".join(parts) if parts else "No reminders set."
-        else:
-            reminders_context = "No reminders set."
-
-        # Get and format lists
-        lists = get_lists(phone_number)
-        if lists:
-            formatted_lists = []
-            for list_id, list_name, item_count, completed_count in lists:
-                items = get_list_items(list_id)
-                if items:
-                    item_texts = []
-                    for item_id, item_text, completed in items:
-                        if completed:
-                            item_texts.append(f"  [x] {item_text}")
-                        else:
-                            item_texts.append(f"  [ ] {item_text}")
-                    formatted_lists.append(f"- {list_name} ({item_count} items):\n" + "\n".join(item_texts))
-                else:
-                    formatted_lists.append(f"- {list_name} (empty)")
-            lists_context = "\n".join(formatted_lists)
-        else:
-            lists_context = "No lists created yet."
+# =====================================================
+# SHARED OPENAI CLIENTS
+# =====================================================
+# Created once per process so connections (and TLS sessions) are reused
+# across messages instead of being rebuilt on every call.
+
+_async_client: Optional[AsyncOpenAI] = None
+_sync_client: Optional[OpenAI] = None
+
+# Completion latency per attempt ('primary' = first request, 'hedge' = second)
+_ai_latency = {
+    'primary': LatencyHistogram(),
+    'hedge': LatencyHistogram(),
+}
+_hedge_counts = {'sent': 0, 'won': 0}
+
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """Process-wide async OpenAI client with a pooled HTTP connection."""
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncOpenAI(
+            api_key=OPENAI_API_KEY,
+            timeout=OPENAI_TIMEOUT,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+                ),
+                timeout=OPENAI_TIMEOUT,
+            ),
+        )
+    return _async_client
 
-        # Get current time in user's timezone
-        user_time = get_user_current_time(phone_number)
-        user_tz = get_user_timezone(phone_number)
-        user_first_name = get_user_first_name(phone_number)
 
-        current_datetime = user_time.strftime('%Y-%m-%d %H:%M:%S')
-        current_day_of_week = user_time.strftime('%A')
-        current_date_readable = user_time.strftime('%A, %B %d, %Y')
-        current_time_readable = user_time.strftime('%I:%M %p')
+def get_openai_client() -> OpenAI:
+    """Process-wide sync OpenAI client for callers outside the event loop."""
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = OpenAI(api_key=OPENAI_API_KEY, timeout=OPENAI_TIMEOUT)
+    return _sync_client
 
-        # Build system prompt
-        user_name_context = f"USER'S NAME: {user_first_name}" if user_first_name else "USER'S NAME: (not provided)"
 
-        system_prompt = f"""You are a helpful SMS memory assistant with reminder capabilities.
+def get_hedge_delay() -> Optional[float]:
+    """Seconds to wait on the first request before hedging, or None if hedging is off."""
+    if not OPENAI_HEDGE_ENABLED:
+        return None
+    primary = _ai_latency['primary']
+    if primary.recent_count() < OPENAI_HEDGE_MIN_SAMPLES:
+        return OPENAI_HEDGE_MAX_DELAY
+    threshold = primary.percentile(OPENAI_HEDGE_PERCENTILE)
+    return min(OPENAI_HEDGE_MAX_DELAY, max(OPENAI_HEDGE_MIN_DELAY, threshold))
 
-{user_name_context}
 
-CURRENT DATE/TIME INFORMATION (in user's timezone: {user_tz}):
-- Full date: {current_date_readable}
-- Today is: {current_day_of_week}
-- Current time: {current_time_readable}
-- ISO format: {current_datetime}
+def get_ai_latency_stats() -> dict[str, Any]:
+    """Latency histograms per attempt plus hedge counters (for the admin dashboard)."""
+    return {
+        'hedging_enabled': OPENAI_HEDGE_ENABLED,
+        'hedge_delay': get_hedge_delay(),
+        'hedges_sent': _hedge_counts['sent'],
+        'hedges_won': _hedge_counts['won'],
+        'attempts': {label: hist.snapshot() for label, hist in _ai_latency.items()},
+    }
 
-USER'S STORED MEMORIES:
-{memory_context}
 
-USER'S REMINDERS:
-{reminders_context}
+async def _timed_completion(label: str, **kwargs: Any) -> Any:
+    """One chat completion request, recorded in the latency histogram for its attempt."""
+    start = time.perf_counter()
+    response = await get_async_openai_client().chat.completions.create(**kwargs)
+    _ai_latency[label].observe(time.perf_counter() - start)
+    return response
 
-USER'S LISTS:
-{lists_context}
+
+async def _hedged_completion(**kwargs: Any) -> Any:
+    """Chat completion that sends a second request if the first is unusually slow.
+
+    Whichever attempt succeeds first wins and the other is cancelled. An error
+    from one attempt only surfaces if the other fails too.
+    """
+    primary = asyncio.ensure_future(_timed_completion('primary', **kwargs))
+    delay = get_hedge_delay()
+    if delay is None:
+        return await primary
+
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+    except asyncio.CancelledError:
+        primary.cancel()
+        raise
+    if done:
+        return primary.result()
+
+    hedge = asyncio.ensure_future(_timed_completion('hedge', **kwargs))
+    _hedge_counts['sent'] += 1
+    logger.info(f"AI request slower than {delay:.2f}s, sent hedged request")
+
+    pending = {primary, hedge}
+    last_error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        _hedge_counts['won'] += 1
+                    return task.result()
+                last_error = task.exception()
+        raise last_error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+# =====================================================
+# SYSTEM PROMPT
+# =====================================================
+# The instruction block is the same for every user and every message. It is
+# sent as its own leading message, ahead of anything user-specific, so it
+# forms a stable prefix for provider-side prompt caching. Anything that
+# varies per user or per minute belongs in build_user_prompt_context().
+
+_STATIC_SYSTEM_PROMPT = """You are a helpful SMS memory assistant with reminder capabilities.
 
 IMPORTANT: Each memory shows when it was recorded. Use these dates when answering questions about "when did I..."
 
 CAPABILITIES:
 1. STORE new information from the user
-2. RETRIEVE information from the stored memories above
+2. RETRIEVE information from USER'S STORED MEMORIES
 3. SET REMINDERS for future tasks
 4. LIST REMINDERS when asked
 5. PROVIDE HELP when asked
@@ -223,7 +200,7 @@ For SPECIFIC TIME reminders (use action "reminder"):
 - "Saturday at 8am" = next Saturday at 08:00:00
 
 For reminder requests with DAYS OF THE WEEK:
-- Use "Today is: {current_day_of_week}" to calculate
+- Use "Today is:" from CURRENT DATE/TIME INFORMATION to calculate
 - "Saturday" = the next Saturday from today
 - "this Saturday" = this week's Saturday
 - "next Monday" = Monday of next week
@@ -249,14 +226,14 @@ Examples:
 RESPONSE FORMAT (must be valid JSON):
 
 For STORING new information:
-{{
+{
     "action": "store",
     "item": "the item/object being stored",
     "details": "key details",
     "memory_text": "The memory text with relative dates converted to actual dates",
     "confirmation": "Brief, friendly confirmation message"
-}}
-IMPORTANT for memory_text: Convert ALL relative time references to actual dates based on the current date ({current_date_readable}):
+}
+IMPORTANT for memory_text: Convert ALL relative time references to actual dates based on the current date (Full date in CURRENT DATE/TIME INFORMATION):
 - "last night" → "on the night of [yesterday's date]" (e.g., "December 25, 2025")
 - "yesterday" → "[yesterday's date]"
 - "this morning" → "on the morning of [today's date]"
@@ -269,24 +246,24 @@ Examples:
 - User says "My car broke down this morning" on Dec 26 → memory_text: "My car broke down on the morning of December 26, 2025"
 
 For RETRIEVING information:
-{{
+{
     "action": "retrieve",
     "query": "what they're asking about",
     "response": "Answer based ONLY on the stored memories and reminders listed above, including the dates shown. When answering 'when' questions, use the '(recorded on DATE)' information. When asked about reminders, list them from the USER'S REMINDERS section. If no relevant memory or reminder exists, say 'I don't have that information stored yet.'"
-}}
+}
 
 For LISTING REMINDERS:
-{{
+{
     "action": "list_reminders",
     "response": "List all reminders from the USER'S REMINDERS section above, showing scheduled and sent reminders with their times."
-}}
+}
 
 For DELETING/CANCELING A REMINDER:
-{{
+{
     "action": "delete_reminder",
     "search_term": "keyword(s) to search for in reminder text OR the actual reminder text if user references by number",
     "confirmation": "Deleted your reminder about [topic]"
-}}
+}
 WHEN TO USE delete_reminder:
 - "delete reminder about coffee" → search_term: "coffee"
 - "cancel my dentist reminder" → search_term: "dentist"
@@ -299,13 +276,13 @@ IMPORTANT: When user says "delete [keyword]" (without specifying "reminder", "me
 - If the keyword matches both → use delete_reminder (reminders are more time-sensitive)
 
 For UPDATING/CHANGING A REMINDER TIME:
-{{
+{
     "action": "update_reminder",
     "search_term": "keyword(s) to identify which reminder to update",
     "new_time": "HH:MM AM/PM format (e.g., '8:00 AM', '3:30 PM')",
     "new_date": "YYYY-MM-DD format (optional - only if date is also changing)",
     "confirmation": "Updated your [topic] reminder to [new time/date]"
-}}
+}
 WHEN TO USE update_reminder:
 - "change my mammogram reminder to 8am" → search_term: "mammogram", new_time: "8:00 AM"
 - "move my dentist reminder to 3pm" → search_term: "dentist", new_time: "3:00 PM"
@@ -316,12 +293,12 @@ IMPORTANT: Use update_reminder when user wants to CHANGE/MODIFY/RESCHEDULE/MOVE
 IMPORTANT: Do NOT use update_reminder for changing the daily summary time or other settings. Use update_settings instead.
 
 For UPDATING SETTINGS/PREFERENCES (daily summary time, enable/disable summary):
-{{
+{
     "action": "update_settings",
     "setting": "daily_summary_time" | "daily_summary_enabled",
     "value": "the new value (e.g., '8:00 AM' for time, 'true'/'false' for enabled)",
     "confirmation": "Updated your daily summary time to [time]"
-}}
+}
 WHEN TO USE update_settings:
 - "change my daily summary time to 8am" → setting: "daily_summary_time", value: "8:00 AM"
 - "move my summary to 7pm" → setting: "daily_summary_time", value: "7:00 PM"
@@ -332,11 +309,11 @@ WHEN TO USE update_settings:
 IMPORTANT: "daily summary" refers to the daily summary SETTING, NOT a reminder. Any request to change/update/modify the daily summary time or enable/disable it should use update_settings, NOT update_reminder or delete_reminder.
 
 For DELETING/FORGETTING A MEMORY:
-{{
+{
     "action": "delete_memory",
     "search_term": "keyword(s) to search for in memory text",
     "confirmation": "Looking for memories about [topic]..."
-}}
+}
 WHEN TO USE delete_memory:
 - "delete memory about my car" → search_term: "car"
 - "forget my wifi password" → search_term: "wifi password"
@@ -349,16 +326,16 @@ IMPORTANT: Use delete_memory when:
 - User wants to remove stored information/facts, not reminders or list items
 
 For SETTING REMINDERS WITH CLEAR TIME (specific time given):
-{{
+{
     "action": "reminder",
     "reminder_text": "what to remind them about",
-    "reminder_date": "YYYY-MM-DD HH:MM:SS format (this will be in {user_tz} timezone)",
+    "reminder_date": "YYYY-MM-DD HH:MM:SS format (this will be in the user's timezone)",
     "confirmation": "I'll remind you on [readable date/time including day of week] to [action]",
     "confidence": number 0-100 (how confident you are about the date/time parsing)
-}}
+}
 
 For SETTING REMINDERS WITH RELATIVE TIME ("in X minutes/hours/days/weeks/months"):
-{{
+{
     "action": "reminder_relative",
     "reminder_text": "what to remind them about",
     "offset_minutes": number (optional - for minutes/hours, e.g., 30 for "30 minutes", 120 for "2 hours"),
@@ -366,18 +343,18 @@ For SETTING REMINDERS WITH RELATIVE TIME ("in X minutes/hours/days/weeks/months"
     "offset_weeks": number (optional - for weeks, e.g., 2 for "2 weeks"),
     "offset_months": number (optional - for months, e.g., 5 for "5 months"),
     "confidence": number 0-100 (how confident you are about the time parsing)
-}}
+}
 IMPORTANT: Use this action for ANY relative time request. Only include ONE offset type. The server will calculate the exact date/time.
 
 For RECURRING REMINDERS ("every day", "every Sunday", "weekdays", etc.):
-{{
+{
     "action": "reminder_recurring",
     "reminder_text": "what to remind them about",
     "recurrence_type": "daily" | "weekly" | "weekdays" | "weekends" | "monthly",
     "recurrence_day": number (for weekly: 0=Monday through 6=Sunday, for monthly: day of month 1-31, null for others),
     "time": "HH:MM" (24-hour format),
     "confidence": number 0-100 (how confident you are about the recurrence pattern and time)
-}}
+}
 
 CONFIDENCE SCORING GUIDELINES:
 - 90-100: Clear, unambiguous request (e.g., "remind me tomorrow at 3pm to call mom")
@@ -407,13 +384,13 @@ NOT SUPPORTED - If user asks for minute, hourly, or custom day/week/month interv
 - "every 5 minutes" or minute intervals → suggest daily
 - "every 3 months" or "quarterly" → suggest monthly
 Example:
-{{
+{
     "action": "help",
     "response": "I can't do every-2-week reminders, but I can do weekly! Try 'Remind me every Monday at 9am to [task]'."
-}}
+}
 
 For ASKING TIME CLARIFICATION (when time given but missing AM/PM):
-{{
+{
     "action": "clarify_time",
     "reminder_text": "what to remind them about",
     "time_mentioned": "the ambiguous time they said (e.g., '4:35')",
@@ -421,15 +398,15 @@ For ASKING TIME CLARIFICATION (when time given but missing AM/PM):
     "recurrence_type": "daily/weekly/weekdays/weekends/monthly if this is a recurring reminder, omit if one-time",
     "recurrence_day": "day number (0-6 for weekly, 1-31 for monthly) if weekly/monthly, omit otherwise",
     "response": "Got it! Do you mean [time] AM or PM?"
-}}
+}
 
 For ASKING WHAT TIME (when date given but NO time at all):
-{{
+{
     "action": "clarify_date_time",
     "reminder_text": "what to remind them about",
     "reminder_date": "YYYY-MM-DD (just the date, no time)",
     "response": "I'll remind you on [day, date] to [task]. What time would you like the reminder?"
-}}
+}
 WHEN TO USE clarify_date_time:
 - "Remind me tomorrow to check MyChart" → No time given, ask what time
 - "Remind me on Friday to call mom" → No time given, ask what time
@@ -444,11 +421,11 @@ DO NOT USE clarify_date_time when time IS specified:
 CRITICAL: If the message contains "at [time]am" or "at [time]pm" ANYWHERE, extract that time and use action "reminder" - do NOT ask for time again!
 
 For VAGUE TIME (when time expression is unclear like "in a bit", "later", "soon"):
-{{
+{
     "action": "clarify_specific_time",
     "reminder_text": "what to remind them about",
     "response": "I'd be happy to set that reminder! What time works? (e.g., 'in 30 minutes', 'at 3pm', 'tomorrow at 9am')"
-}}
+}
 WHEN TO USE clarify_specific_time:
 - "Remind me in a bit to check email" → vague time "in a bit"
 - "Remind me later to call mom" → vague time "later"
@@ -457,32 +434,32 @@ WHEN TO USE clarify_specific_time:
 DO NOT use this for relative times that ARE specific like "in 30 minutes" - those should use reminder_relative
 
 For UNCLEAR requests or GREETINGS:
-{{
+{
     "action": "help",
     "response": "Personalized greeting using user's name if available (e.g., 'Hi [Name]! How can I help you today?'), otherwise just 'Hi! How can I help you today?'"
-}}
+}
 
 For HELP REQUESTS:
-{{
+{
     "action": "show_help",
     "response": "User is asking how to use the service. Tell them to text INFO (or ? or GUIDE) for the full guide, or answer their specific question briefly."
-}}
+}
 
 For CREATING A LIST (ONLY when no items are provided):
-{{
+{
     "action": "create_list",
     "list_name": "the name of the list to create",
     "confirmation": "Created your [list name]!"
-}}
+}
 IMPORTANT: If the user says "create a list" AND includes items in the same message (e.g., "Create a grocery list\nMilk\nEggs\nBread"), do NOT use create_list. Use add_to_list instead — the system will auto-create the list AND add the items in one step.
 
 For ADDING TO A SPECIFIC LIST (also use this when creating a list WITH items):
-{{
+{
     "action": "add_to_list",
     "list_name": "the name of the list",
     "item_text": "VERBATIM copy of ALL items - do NOT parse or split, just copy exactly as user said",
     "confirmation": "Added [items] to your [list name]"
-}}
+}
 Note: ALWAYS use add_to_list when the user specifies a list name, even if that list doesn't exist yet. The system will auto-create it.
 
 CRITICAL MULTI-ITEM RULE - READ CAREFULLY:
@@ -502,31 +479,31 @@ WRONG - NEVER DO THIS:
 - User says "add apples and oranges" → item_text: "apples" (WRONG - missing oranges!)
 
 For ADDING ITEM BUT NO LIST SPECIFIED (user has lists but didn't say which):
-{{
+{
     "action": "add_item_ask_list",
     "item_text": "VERBATIM copy of ALL items - same rules as add_to_list above",
     "response": "Which list would you like to add these to?"
-}}
+}
 Note: Only use add_item_ask_list if user has multiple lists and didn't specify which one. If user specifies a list name like "grocery list", use add_to_list instead.
 
 For SHOWING A SPECIFIC NAMED LIST (user says a list name like "grocery list", "shopping list"):
-{{
+{
     "action": "show_list",
     "list_name": "the full list name (e.g., 'grocery list', 'shopping list')",
     "response": "Format the list contents from USER'S LISTS above"
-}}
+}
 CRITICAL: Use show_list when user mentions a SPECIFIC list name (singular with a type), even if it contains keywords like "grocery", "shopping".
 Examples of show_list:
-- "show grocery list" → {{"action": "show_list", "list_name": "grocery list"}}
-- "show my shopping list" → {{"action": "show_list", "list_name": "shopping list"}}
-- "show the todo list" → {{"action": "show_list", "list_name": "todo list"}}
-- "what's on my grocery list" → {{"action": "show_list", "list_name": "grocery list"}}
+- "show grocery list" → {"action": "show_list", "list_name": "grocery list"}
+- "show my shopping list" → {"action": "show_list", "list_name": "shopping list"}
+- "show the todo list" → {"action": "show_list", "list_name": "todo list"}
+- "what's on my grocery list" → {"action": "show_list", "list_name": "grocery list"}
 
 For SHOWING THE CURRENT/LAST ACTIVE LIST (no specific list name given):
-{{
+{
     "action": "show_current_list",
     "response": "Showing your current list"
-}}
+}
 Use show_current_list ONLY for generic phrases without a list name:
 - "show list" → show_current_list
 - "show my list" → show_current_list
@@ -534,24 +511,24 @@ Use show_current_list ONLY for generic phrases without a list name:
 - "view list" → show_current_list
 
 For SHOWING ALL LISTS (plural "lists" without a type):
-{{
+{
     "action": "show_all_lists",
     "response": "Showing your lists"
-}}
+}
 Examples:
 - "show lists" → show_all_lists
 - "show my lists" → show_all_lists
 - "what lists do I have" → show_all_lists
 
 For SHOWING FILTERED LISTS (PLURAL "lists" with a type keyword):
-{{
+{
     "action": "show_all_lists",
     "list_filter": "the keyword to filter by",
     "response": "Showing your [type] lists"
-}}
+}
 CRITICAL: ONLY use list_filter when user says PLURAL "lists" with a filter:
-- "show grocery lists" (PLURAL) → {{"action": "show_all_lists", "list_filter": "grocery"}}
-- "show my shopping lists" (PLURAL) → {{"action": "show_all_lists", "list_filter": "shopping"}}
+- "show grocery lists" (PLURAL) → {"action": "show_all_lists", "list_filter": "grocery"}
+- "show my shopping lists" (PLURAL) → {"action": "show_all_lists", "list_filter": "shopping"}
 
 DISAMBIGUATION RULES - SINGULAR vs PLURAL:
 1. "[type] list" (SINGULAR) = show_list with list_name="[type] list"
@@ -560,29 +537,29 @@ DISAMBIGUATION RULES - SINGULAR vs PLURAL:
 4. "lists" (no type) = show_all_lists
 
 For CHECKING OFF AN ITEM:
-{{
+{
     "action": "complete_item",
     "list_name": "the list containing the item",
     "item_text": "the item to check off",
     "confirmation": "Checked off [item] from your [list name]"
-}}
+}
 Note: If item exists in only one list, use that list. If item exists in multiple lists, ask which one.
 
 For UNCHECKING AN ITEM:
-{{
+{
     "action": "uncomplete_item",
     "list_name": "the list containing the item",
     "item_text": "the item to uncheck",
     "confirmation": "Unmarked [item] in your [list name]"
-}}
+}
 
 For DELETING AN ITEM FROM A LIST (not a reminder!):
-{{
+{
     "action": "delete_item",
     "list_name": "the list name",
     "item_text": "the item to delete",
     "confirmation": "Removed [item] from your [list name]"
-}}
+}
 IMPORTANT: Only use delete_item when deleting from a SHOPPING/TODO LIST in USER'S LISTS section.
 - "remove milk from grocery list" → delete_item (it's a list item)
 - "delete coffee" when coffee is in a LIST → delete_item
@@ -590,34 +567,34 @@ IMPORTANT: Only use delete_item when deleting from a SHOPPING/TODO LIST in USER'
 If the item exists in a reminder but NOT in any list, use delete_reminder instead!
 
 For DELETING AN ENTIRE LIST:
-{{
+{
     "action": "delete_list",
     "list_name": "the exact list name to delete",
     "confirmation": "Are you sure you want to delete your [list name]? Reply YES to confirm."
-}}
+}
 
 For DELETING MULTIPLE LISTS BY TYPE (when user says "delete grocery lists" plural):
-{{
+{
     "action": "delete_list",
     "list_filter": "the keyword to filter lists (e.g., 'grocery' for all grocery lists)",
     "confirmation": "Finding your [type] lists..."
-}}
+}
 CRITICAL: When user says "delete grocery lists" or "delete my shopping lists" (PLURAL), use list_filter instead of list_name.
 
 For CLEARING ALL ITEMS FROM A LIST:
-{{
+{
     "action": "clear_list",
     "list_name": "the list to clear",
     "confirmation": "Cleared all items from your [list name]"
-}}
+}
 
 For RENAMING A LIST:
-{{
+{
     "action": "rename_list",
     "old_name": "current list name",
     "new_name": "new list name",
     "confirmation": "Renamed [old name] to [new name]"
-}}
+}
 
 MULTI-COMMAND SUPPORT:
 If the user's message contains MULTIPLE distinct commands, return an array of actions instead of a single action.
@@ -637,13 +614,13 @@ IMPORTANT: "for the next X days" means X separate reminders on consecutive days,
 IMPORTANT: If AM/PM is missing from recurring reminders (e.g., "for the next 3 days at 11 o'clock"), use "clarify_time" action to ask the user.
 
 For MULTIPLE COMMANDS or RECURRING REMINDERS, return:
-{{
+{
     "action": "multiple",
     "actions": [
-        {{ "action": "first_action", ... }},
-        {{ "action": "second_action", ... }}
+        { "action": "first_action", ... },
+        { "action": "second_action", ... }
     ]
-}}
+}
 
 CRITICAL MULTI-COMMAND RULES:
 - Look for command verbs: "remove", "delete", "add", "check off", "remind", etc.
@@ -655,32 +632,235 @@ CRITICAL MULTI-COMMAND RULES:
 - Do NOT split a single command into multiple actions (e.g., "add milk and eggs" is ONE add_to_list with item_text="milk and eggs")
 
 CRITICAL RULES:
-- All times are in user's timezone: {user_tz}
+- All times are in the user's timezone shown in CURRENT DATE/TIME INFORMATION
 - Check for AM/PM in a case-insensitive way: "pm", "PM", "p.m.", "P.M.", "am", "AM", "a.m.", "A.M." are ALL valid
 - If you see ANY variation of AM/PM in the user's message, use action "reminder" NOT "clarify_time"
 - If a time does NOT have ANY form of AM/PM specified, you MUST use action "clarify_time" instead of setting the reminder
-- When answering "when did I..." questions, use the "(recorded on DATE)" timestamp from the memories above
+- When answering "when did I..." questions, use the "(recorded on DATE)" timestamp from USER'S STORED MEMORIES
 - Never say "today" when referring to a date that shows "(recorded on [past date])" - use the actual recorded date
-- When retrieving information, ONLY use the memories listed above
+- When retrieving information, ONLY use the memories listed in USER'S STORED MEMORIES
 - Always include the day of the week in reminder confirmations (e.g., "Saturday, December 21st at 8:00 AM")"""
 
-        # Call OpenAI API with timeout and retry logic
-        client = OpenAI(api_key=OPENAI_API_KEY, timeout=OPENAI_TIMEOUT)
 
+def _format_memories_context(memories: list[tuple], user_tz: Any) -> str:
+    """Render memories with their recorded dates in the user's timezone."""
+    if not memories:
+        return "No memories stored yet."
+
+    # Tuple format: (id, memory_text, parsed_data, created_at)
+    formatted_memories = []
+    for m in memories[:MAX_MEMORIES_IN_CONTEXT]:
+        memory_text = m[1]
+        created_date = m[3]
+        try:
+            # Handle both datetime objects and strings from PostgreSQL
+            if isinstance(created_date, datetime):
+                date_obj = created_date
+            else:
+                date_obj = datetime.strptime(str(created_date), '%Y-%m-%d %H:%M:%S')
+
+            # Convert from UTC to user's timezone for proper date display
+            if date_obj.tzinfo is None:
+                date_obj = pytz.utc.localize(date_obj)
+            date_obj_local = date_obj.astimezone(user_tz)
+            readable_date = date_obj_local.strftime('%B %d, %Y')
+            formatted_memories.append(f"- {memory_text} (recorded on {readable_date})")
+        except (ValueError, TypeError, AttributeError):
+            formatted_memories.append(f"- {memory_text}")
+    return "\n".join(formatted_memories)
+
+
+def _format_reminders_context(reminders: list[tuple], tz: Any, user_now: datetime) -> tuple[str, Optional[float]]:
+    """Render scheduled and completed reminders relative to the user's today.
+
+    Returns (text, seconds until the next scheduled reminder is due). Past that
+    point the reminder will likely have been sent, so a cached copy is stale.
+    """
+    if not reminders:
+        return "No reminders set.", None
+
+    scheduled = []
+    completed = []
+    scheduled_num = 0
+    completed_num = 0
+    next_due = None
+
+    # Tuple format: (id, reminder_date, reminder_text, recurring_id, sent)
+    for reminder in reminders:
+        reminder_id, reminder_date_utc, reminder_text, recurring_id, sent = reminder
+        try:
+            # Handle both datetime objects and strings from PostgreSQL
+            if isinstance(reminder_date_utc, datetime):
+                utc_dt = reminder_date_utc
+                if utc_dt.tzinfo is None:
+                    utc_dt = pytz.UTC.localize(utc_dt)
+            else:
+                utc_dt = datetime.strptime(str(reminder_date_utc), '%Y-%m-%d %H:%M:%S')
+                utc_dt = pytz.UTC.localize(utc_dt)
+            user_dt = utc_dt.astimezone(tz)
+
+            # Smart date formatting
+            if user_dt.date() == user_now.date():
+                date_str = f"Today at {user_dt.strftime('%I:%M %p')}"
+            elif user_dt.date() == (user_now + timedelta(days=1)).date():
+                date_str = f"Tomorrow at {user_dt.strftime('%I:%M %p')}"
+            else:
+                date_str = user_dt.strftime('%a, %b %d at %I:%M %p')
+
+            # Add [R] prefix for recurring reminders
+            display_text = f"[R] {reminder_text}" if recurring_id else reminder_text
+
+            if sent:
+                completed_num += 1
+                completed.append(f"{completed_num}. {display_text}\n   {date_str}")
+            else:
+                scheduled_num += 1
+                scheduled.append(f"{scheduled_num}. {display_text}\n   {date_str}")
+                if next_due is None or utc_dt < next_due:
+                    next_due = utc_dt
+        except (ValueError, TypeError, AttributeError):
+            display_text = f"[R] {reminder_text}" if recurring_id else reminder_text
+            if sent:
+                completed_num += 1
+                completed.append(f"{completed_num}. {display_text}")
+            else:
+                scheduled_num += 1
+                scheduled.append(f"{scheduled_num}. {display_text}")
+
+    # Build context - limit completed to last 5
+    parts = []
+    if scheduled:
+        parts.append("SCHEDULED:\n\n" + "\n\n".join(scheduled))
+    if completed:
+        # Show only last N completed reminders
+        completed_to_show = completed[-MAX_COMPLETED_REMINDERS_DISPLAY:]
+        completed_text = "\n\n".join(completed_to_show)
+        if len(completed) > MAX_COMPLETED_REMINDERS_DISPLAY:
+            parts.append(f"COMPLETED (last {MAX_COMPLETED_REMINDERS_DISPLAY} of {len(completed)}):\n\n" + completed_text)
+        else:
+            parts.append("COMPLETED:\n\n" + completed_text)
+
+    expires_in = (next_due - user_now).total_seconds() if next_due else None
+    return ("\n\n".join(parts) if parts else "No reminders set."), expires_in
+
+
+def _format_lists_context(phone_number: str) -> str:
+    """Render every list with its items and completion marks."""
+    lists = get_lists_with_items(phone_number)
+    if not lists:
+        return "No lists created yet."
+
+    formatted_lists = []
+    for lst in lists:
+        if lst['items']:
+            item_texts = []
+            for item in lst['items']:
+                if item['completed']:
+                    item_texts.append(f"  [x] {item['item_text']}")
+                else:
+                    item_texts.append(f"  [ ] {item['item_text']}")
+            formatted_lists.append(f"- {lst['list_name']} ({lst['item_count']} items):\n" + "\n".join(item_texts))
+        else:
+            formatted_lists.append(f"- {lst['list_name']} (empty)")
+    return "\n".join(formatted_lists)
+
+
+def build_user_prompt_context(phone_number: str) -> str:
+    """Per-user suffix of the system prompt: name, current time, memories, reminders, lists.
+
+    The memories/reminders/lists blocks come from the prompt context cache
+    (models.prompt_context) and are only re-queried and re-rendered after a
+    write invalidates them, the TTL lapses, or the user's local date or
+    timezone changes.
+    """
+    cache = get_prompt_context_cache()
+    user_tz = get_user_timezone(phone_number)
+    tz = pytz.timezone(user_tz)
+    user_time = get_user_current_time(phone_number)
+    user_first_name = get_user_first_name(phone_number)
+
+    memory_context = cache.get(phone_number, MEMORIES, user_tz)
+    if memory_context is None:
+        memory_context = _format_memories_context(get_memories(phone_number), tz)
+        cache.set(phone_number, MEMORIES, user_tz, memory_context)
+
+    # "Today"/"Tomorrow" labels depend on the user's local date
+    reminders_stamp = (user_tz, user_time.date())
+    reminders_context = cache.get(phone_number, REMINDERS, reminders_stamp)
+    if reminders_context is None:
+        reminders_context, expires_in = _format_reminders_context(get_user_reminders(phone_number), tz, user_time)
+        cache.set(phone_number, REMINDERS, reminders_stamp, reminders_context, expires_in=expires_in)
+
+    lists_context = cache.get(phone_number, LISTS, None)
+    if lists_context is None:
+        lists_context = _format_lists_context(phone_number)
+        cache.set(phone_number, LISTS, None, lists_context)
+
+    user_name_context = f"USER'S NAME: {user_first_name}" if user_first_name else "USER'S NAME: (not provided)"
+
+    return f"""{user_name_context}
+
+CURRENT DATE/TIME INFORMATION (in user's timezone: {user_tz}):
+- Full date: {user_time.strftime('%A, %B %d, %Y')}
+- Today is: {user_time.strftime('%A')}
+- Current time: {user_time.strftime('%I:%M %p')}
+- ISO format: {user_time.strftime('%Y-%m-%d %H:%M:%S')}
+
+USER'S STORED MEMORIES:
+{memory_context}
+
+USER'S REMINDERS:
+{reminders_context}
+
+USER'S LISTS:
+{lists_context}"""
+
+
+async def process_with_ai(message: str, phone_number: str, context: dict[str, Any]) -> dict[str, Any]:
+    """Process user message with OpenAI and determine action.
+
+    Awaits the completion on the shared async client so a slow response
+    doesn't block other webhooks on the event loop; the database reads for
+    the prompt run on a worker thread for the same reason. Messages with the
+    same template as an earlier parse are answered from the AI result cache
+    (services.ai_cache) without building the prompt.
+    """
+    try:
+        result_cache = get_ai_result_cache()
+        user_tz = await run_in_threadpool(get_user_timezone, phone_number)
+        user_time = datetime.now(pytz.timezone(user_tz))
+        cached = result_cache.lookup(message, user_time, user_tz)
+        if cached is not None:
+            logger.info(f"AI result cache hit for {phone_number}: {cached['action']}")
+            return cached
+
+        logger.info(f"Processing message with AI for {phone_number}")
+        
+        # Static instructions first, per-user context after: the first
+        # message is byte-identical for every request, so it is served from
+        # the provider's prompt cache and billed at the cached rate.
+        user_context = await run_in_threadpool(build_user_prompt_context, phone_number)
+
+        # Call OpenAI API with timeout and retry logic
         max_retries = 2
         last_error = None
 
         for attempt in range(max_retries + 1):
             try:
-                response = client.chat.completions.create(
-                    model=OPENAI_MODEL,
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": message}
-                    ],
-                    temperature=OPENAI_TEMPERATURE,
-                    max_tokens=OPENAI_MAX_TOKENS,
-                    response_format={"type": "json_object"}  # Force JSON output
+                # Hedged attempts share one overall budget (< Twilio's webhook timeout)
+                response = await asyncio.wait_for(
+                    _hedged_completion(
+                        model=OPENAI_MODEL,
+                        messages=[
+                            {"role": "system", "content": _STATIC_SYSTEM_PROMPT},
+                            {"role": "system", "content": user_context},
+                            {"role": "user", "content": message}
+                        ],
+                        temperature=OPENAI_TEMPERATURE,
+                        max_tokens=OPENAI_MAX_TOKENS,
+                        response_format={"type": "json_object"}  # Force JSON output
+                    ),
+                    timeout=OPENAI_TIMEOUT,
                 )
 
                 # Log API usage for cost tracking
@@ -719,6 +899,7 @@ CRITICAL RULES:
                     result["response"] = "I'm not sure how to help with that. Could you rephrase?"
 
                 logger.info(f"✅ AI processed successfully: {result.get('action')}")
+                result_cache.store(message, user_time, user_tz, result)
                 return result
 
             except json.JSONDecodeError as e:
@@ -781,6 +962,11 @@ def parse_list_items(item_text, phone_number='system'):
         if ',' in item_text and ' and ' not in item_text:
             return [item.strip() for item in item_text.split(',') if item.strip()]
 
+        result_cache = get_ai_result_cache()
+        cached = result_cache.lookup_items(item_text)
+        if cached is not None:
+            return cached
+
         system_prompt = """You are a list item parser. Your job is to separate a user's input into individual list items.
 
 RULES:
@@ -807,7 +993,7 @@ EXAMPLES:
 Return ONLY a JSON array of strings. No explanation, just the array.
 Example output: ["item1", "item2", "item3"]"""
 
-        client = OpenAI(api_key=OPENAI_API_KEY, timeout=OPENAI_TIMEOUT)
+        client = get_openai_client()
         response = client.chat.completions.create(
             model=OPENAI_MODEL,
             messages=[
@@ -834,7 +1020,9 @@ Example output: ["item1", "item2", "item3"]"""
         # Validate result is a list of strings
         if isinstance(result, list) and all(isinstance(item, str) for item in result):
             logger.info(f"Parsed '{item_text}' into {len(result)} items: {result}")
-            return [item.strip() for item in result if item.strip()]
+            items = [item.strip() for item in result if item.strip()]
+            result_cache.store_items(item_text, items)
+            return items
         else:
             logger.warning(f"Unexpected parse result format: {result}")
             return [item_text.strip()]
@@ -0,0 +1,323 @@
+"""
+Broadcast Service
+Broadcast engine: recipients are recorded in broadcast_recipients, split into
+chunks, and sent by Celery tasks at an account-wide rate. Every send is
+recorded per recipient, so a broadcast resumes where it stopped after a crash.
+"""
+
+import time
+from datetime import datetime
+from typing import Any, Optional
+
+import pytz
+from psycopg2.extras import execute_values
+
+from database import get_db_connection, return_db_connection
+from config import (
+    logger, BROADCAST_CHUNK_SIZE, BROADCAST_SEND_RATE, BROADCAST_RATE_BACKEND, BROADCAST_STALL_SECONDS
+)
+from services.sms_service import send_sms
+from utils.rate_limit import create_rate_limiter
+
+BROADCAST_PREFIX = "[Remyndrs System Message] "
+
+# Broadcast time window (8am - 8pm in user's local timezone)
+BROADCAST_START_HOUR = 8
+BROADCAST_END_HOUR = 20  # 8pm
+DEFAULT_TIMEZONE = 'America/New_York'
+
+# Audience -> extra users filter (opted-out users are always excluded)
+_AUDIENCE_FILTERS = {
+    'all': '',
+    'free': "AND (premium_status = 'free' OR premium_status IS NULL)",
+    'premium': "AND premium_status = 'premium'",
+}
+BROADCAST_AUDIENCES = tuple(_AUDIENCE_FILTERS)
+
+# Write progress to broadcast_logs every this many sends
+_PROGRESS_EVERY = 50
+
+# Account-wide send limiter, created on first use
+_send_limiter = None
+
+
+def is_within_broadcast_window(timezone_str: str) -> bool:
+    """Check if current time is within 8am-8pm for the given timezone"""
+    try:
+        tz = pytz.timezone(timezone_str or DEFAULT_TIMEZONE)
+    except pytz.UnknownTimezoneError:
+        tz = pytz.timezone(DEFAULT_TIMEZONE)
+
+    local_time = datetime.now(tz)
+    return BROADCAST_START_HOUR <= local_time.hour < BROADCAST_END_HOUR
+
+
+def get_audience_recipients(cursor, audience: str) -> tuple[list[str], int]:
+    """(phone numbers currently inside the 8am-8pm window, total audience size) for an audience."""
+    cursor.execute(f'''
+        SELECT phone_number, timezone FROM users
+        WHERE onboarding_complete = TRUE
+        {_AUDIENCE_FILTERS[audience]}
+        AND (opted_out = FALSE OR opted_out IS NULL)
+    ''')
+    results = cursor.fetchall()
+    return [phone for phone, timezone in results if is_within_broadcast_window(timezone)], len(results)
+
+
+# =====================================================
+# DISPATCH
+# =====================================================
+
+def start_broadcast(broadcast_id: int, phone_numbers: list[str]) -> int:
+    """Record a broadcast's recipients in chunks and queue one send task per chunk.
+
+    Returns the number of chunks. If queueing fails the recipients stay
+    pending and resume_stalled_broadcasts() picks them up.
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        c = conn.cursor()
+        execute_values(
+            c,
+            '''INSERT INTO broadcast_recipients (broadcast_id, phone_number, chunk) VALUES %s
+               ON CONFLICT (broadcast_id, phone_number) DO NOTHING''',
+            [(broadcast_id, phone, i // BROADCAST_CHUNK_SIZE) for i, phone in enumerate(dict.fromkeys(phone_numbers))],
+            page_size=1000
+        )
+        c.execute(
+            "UPDATE broadcast_logs SET status = 'sending', progress_at = NOW() WHERE id = %s",
+            (broadcast_id,)
+        )
+        c.execute(
+            '''SELECT DISTINCT chunk FROM broadcast_recipients
+               WHERE broadcast_id = %s AND status = 'pending' ORDER BY chunk''',
+            (broadcast_id,)
+        )
+        chunks = [row[0] for row in c.fetchall()]
+        conn.commit()
+    finally:
+        if conn:
+            return_db_connection(conn)
+
+    _dispatch_chunks(broadcast_id, chunks)
+    if not chunks:
+        _finish_if_done(broadcast_id)
+    return len(chunks)
+
+
+def _dispatch_chunks(broadcast_id: int, chunks: list[int]) -> None:
+    from tasks.broadcast_tasks import send_broadcast_chunk
+    for chunk in chunks:
+        try:
+            send_broadcast_chunk.delay(broadcast_id=broadcast_id, chunk=chunk)
+        except Exception as dispatch_err:
+            logger.exception(f"[DISPATCH FAILED] broadcast {broadcast_id} chunk {chunk}: {dispatch_err}")
+
+
+# =====================================================
+# SENDING
+# =====================================================
+
+def _wait_for_send_slot() -> None:
+    """Block until the account-wide limiter allows one more message."""
+    global _send_limiter
+    if _send_limiter is None:
+        _send_limiter = create_rate_limiter('broadcast_sms', BROADCAST_SEND_RATE, 1.0, backend=BROADCAST_RATE_BACKEND)
+    while not _send_limiter.allow('account'):
+        time.sleep(1.0 / BROADCAST_SEND_RATE)
+
+
+def _record_progress(cursor, broadcast_id: int, sent: int, failed: int) -> None:
+    cursor.execute('''
+        UPDATE broadcast_logs
+        SET success_count = success_count + %s, fail_count = fail_count + %s, progress_at = NOW()
+        WHERE id = %s
+    ''', (sent, failed, broadcast_id))
+    cursor.execute('''
+        UPDATE scheduled_broadcasts s SET success_count = b.success_count, fail_count = b.fail_count
+        FROM broadcast_logs b WHERE b.id = %s AND s.id = b.scheduled_broadcast_id
+    ''', (broadcast_id,))
+
+
+def _recount(cursor, broadcast_id: int) -> None:
+    """Set a broadcast's counts from its recipient results (exact, unlike the running increments)."""
+    cursor.execute('''
+        UPDATE broadcast_logs SET
+            success_count = (SELECT COUNT(*) FROM broadcast_recipients WHERE broadcast_id = %(id)s AND status = 'sent'),
+            fail_count = (SELECT COUNT(*) FROM broadcast_recipients WHERE broadcast_id = %(id)s AND status = 'failed'),
+            progress_at = NOW()
+        WHERE id = %(id)s
+    ''', {'id': broadcast_id})
+    cursor.execute('''
+        UPDATE scheduled_broadcasts s SET success_count = b.success_count, fail_count = b.fail_count
+        FROM broadcast_logs b WHERE b.id = %s AND s.id = b.scheduled_broadcast_id
+    ''', (broadcast_id,))
+
+
+def send_chunk(broadcast_id: int, chunk: int) -> dict[str, Any]:
+    """Send every pending recipient in one chunk of a broadcast.
+
+    Each recipient is claimed ('sending') before its SMS goes out and then
+    marked 'sent' or 'failed', one commit each, so a chunk task that runs
+    twice never sends twice and a crash loses at most the message in flight.
+    """
+    conn = None
+    sent = failed = 0
+    unrecorded_sent = unrecorded_failed = 0
+    try:
+        conn = get_db_connection()
+        c = conn.cursor()
+        c.execute("SELECT message, status FROM broadcast_logs WHERE id = %s", (broadcast_id,))
+        row = c.fetchone()
+        if not row or row[1] != 'sending':
+            return {"chunk": chunk, "sent": 0, "failed": 0}
+        full_message = BROADCAST_PREFIX + row[0]
+
+        while True:
+            c.execute('''
+                UPDATE broadcast_recipients SET status = 'sending', updated_at = NOW()
+                WHERE (broadcast_id, phone_number) = (
+                    SELECT broadcast_id, phone_number FROM broadcast_recipients
+                    WHERE broadcast_id = %s AND chunk = %s AND status = 'pending'
+                    LIMIT 1 FOR UPDATE SKIP LOCKED
+                )
+                RETURNING phone_number
+            ''', (broadcast_id, chunk))
+            claimed = c.fetchone()
+            conn.commit()
+            if not claimed:
+                break
+            phone = claimed[0]
+
+            _wait_for_send_slot()
+            error = None
+            try:
+                send_sms(phone, full_message)
+                sent += 1
+                unrecorded_sent += 1
+            except Exception as e:
+                logger.error(f"Failed to send broadcast {broadcast_id} to {phone[-4:]}: {e}")
+                error = str(e)[:500]
+                failed += 1
+                unrecorded_failed += 1
+
+            c.execute('''
+                UPDATE broadcast_recipients SET status = %s, error = %s, updated_at = NOW()
+                WHERE broadcast_id = %s AND phone_number = %s
+            ''', ('failed' if error else 'sent', error, broadcast_id, phone))
+            if unrecorded_sent + unrecorded_failed >= _PROGRESS_EVERY:
+                _record_progress(c, broadcast_id, unrecorded_sent, unrecorded_failed)
+                unrecorded_sent = unrecorded_failed = 0
+            conn.commit()
+
+        if unrecorded_sent or unrecorded_failed:
+            _record_progress(c, broadcast_id, unrecorded_sent, unrecorded_failed)
+            conn.commit()
+    finally:
+        if conn:
+            return_db_connection(conn)
+
+    _finish_if_done(broadcast_id)
+    return {"chunk": chunk, "sent": sent, "failed": failed}
+
+
+def _finish_if_done(broadcast_id: int) -> bool:
+    """Mark a broadcast (and its scheduled_broadcasts row) completed once no recipient is open."""
+    conn = None
+    try:
+        conn = get_db_connection()
+        c = conn.cursor()
+        c.execute('''
+            UPDATE broadcast_logs SET status = 'completed', completed_at = NOW()
+            WHERE id = %s AND status = 'sending'
+            AND NOT EXISTS (
+                SELECT 1 FROM broadcast_recipients
+                WHERE broadcast_id = %s AND status IN ('pending', 'sending')
+            )
+            RETURNING scheduled_broadcast_id
+        ''', (broadcast_id, broadcast_id))
+        completed = c.fetchone()
+        if completed:
+            _recount(c, broadcast_id)
+            if completed[0]:
+                c.execute(
+                    "UPDATE scheduled_broadcasts SET status = 'completed', sent_at = NOW() WHERE id = %s",
+                    (completed[0],)
+                )
+        conn.commit()
+        if completed:
+            logger.info(f"Broadcast {broadcast_id} completed")
+        return bool(completed)
+    finally:
+        if conn:
+            return_db_connection(conn)
+
+
+# =====================================================
+# RESUME
+# =====================================================
+
+def resume_stalled_broadcasts() -> dict[str, Any]:
+    """Re-queue broadcasts that stopped making progress (worker crash, lost tasks).
+
+    Recipients left 'sending' by a crashed task are marked failed rather
+    than retried - the message may already have gone out.
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        c = conn.cursor()
+        c.execute('''
+            SELECT id FROM broadcast_logs
+            WHERE status = 'sending' AND progress_at < NOW() - %s * INTERVAL '1 second'
+            FOR UPDATE SKIP LOCKED
+        ''', (BROADCAST_STALL_SECONDS,))
+        stalled = [row[0] for row in c.fetchall()]
+
+        resumed = {}
+        interrupted = 0
+        for broadcast_id in stalled:
+            c.execute('''
+                UPDATE broadcast_recipients SET status = 'failed', error = 'interrupted during send', updated_at = NOW()
+                WHERE broadcast_id = %s AND status = 'sending'
+            ''', (broadcast_id,))
+            interrupted += c.rowcount
+            _recount(c, broadcast_id)
+            c.execute('''
+                SELECT DISTINCT chunk FROM broadcast_recipients
+                WHERE broadcast_id = %s AND status = 'pending' ORDER BY chunk
+            ''', (broadcast_id,))
+            resumed[broadcast_id] = [row[0] for row in c.fetchall()]
+        conn.commit()
+    finally:
+        if conn:
+            return_db_connection(conn)
+
+    for broadcast_id, chunks in resumed.items():
+        if chunks:
+            logger.warning(f"Resuming stalled broadcast {broadcast_id}: {len(chunks)} chunks")
+            _dispatch_chunks(broadcast_id, chunks)
+        else:
+            _finish_if_done(broadcast_id)
+    return {"resumed": len(resumed), "interrupted": interrupted}
+
+
+def get_broadcast_progress(broadcast_id: int) -> Optional[dict[str, int]]:
+    """Recipient counts by status for a broadcast, or None if it has no recorded recipients."""
+    conn = None
+    try:
+        conn = get_db_connection()
+        c = conn.cursor()
+        c.execute('''
+            SELECT status, COUNT(*) FROM broadcast_recipients WHERE broadcast_id = %s GROUP BY status
+        ''', (broadcast_id,))
+        rows = c.fetchall()
+        if not rows:
+            return None
+        progress = dict.fromkeys(('pending', 'sending', 'sent', 'failed'), 0)
+        progress.update(dict(rows))
+        return progress
+    finally:
+        if conn:
+            return_db_connection(conn)
@@ -1,38 +1,32 @@
 """
 Conversation Analyzer Service
 Analyzes user conversations using AI to identify potential issues.
+
+Unanalyzed logs are packed into batches by estimated prompt tokens and sent
+concurrently over the shared OpenAI client. Each finished batch is saved and
+checkpointed with mark_logs_analyzed, so a run that's cut short loses nothing.
 """
 
 import json
-from openai import OpenAI
-from config import OPENAI_API_KEY, OPENAI_MODEL, OPENAI_TIMEOUT, logger
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from config import (
+    OPENAI_MODEL, logger,
+    CONVERSATION_ANALYSIS_MAX_LOGS, CONVERSATION_ANALYSIS_BATCH_TOKENS, CONVERSATION_ANALYSIS_MAX_BATCH,
+    CONVERSATION_ANALYSIS_MAX_TOKENS, CONVERSATION_ANALYSIS_CONCURRENCY, CONVERSATION_ANALYSIS_TIMEOUT,
+    CONVERSATION_ANALYSIS_TIME_BUDGET
+)
 from database import (
     get_unanalyzed_logs,
     mark_logs_analyzed,
     save_conversation_analysis,
     log_api_usage
 )
+from services.ai_service import get_openai_client
 
-
-def analyze_conversation_batch(conversations: list) -> list:
-    """
-    Analyze a batch of conversations using AI.
-    Returns a list of flagged issues.
-    """
-    if not conversations:
-        return []
-
-    # Format conversations for analysis
-    conv_text = ""
-    for i, c in enumerate(conversations):
-        conv_text += f"""
---- Conversation {i + 1} (ID: {c['id']}) ---
-User: {c['message_in']}
-System: {c['message_out']}
-Intent: {c.get('intent', 'unknown')}
-"""
-
-    system_prompt = """You are a conversation quality analyzer for an SMS reminder service.
+SYSTEM_PROMPT = """You are a conversation quality analyzer for an SMS reminder service.
 Analyze the provided conversations and identify any issues that need attention.
 
 ISSUE TYPES TO FLAG:
@@ -69,90 +63,201 @@ If no issues found, return: {"flagged": []}
 Be conservative - only flag genuine issues, not minor imperfections.
 Focus on cases where the user likely didn't get what they wanted."""
 
-    try:
-        client = OpenAI(api_key=OPENAI_API_KEY, timeout=OPENAI_TIMEOUT)
-
-        response = client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": conv_text}
-            ],
-            temperature=0.3,
-            max_tokens=2000,
-            response_format={"type": "json_object"}
-        )
+# Rough size of a token in characters, for packing batches without a tokenizer
+CHARS_PER_TOKEN = 4
 
-        # Log API usage
-        if response.usage:
-            log_api_usage(
-                'system',
-                'conversation_analysis',
-                response.usage.prompt_tokens,
-                response.usage.completion_tokens,
-                response.usage.total_tokens,
-                OPENAI_MODEL
-            )
+# Attempts per batch on API errors before its logs are left for the next run
+MAX_ATTEMPTS = 2
+
+
+class TruncatedAnalysis(Exception):
+    """The completion ran out of tokens (or wasn't valid JSON) before covering the batch"""
+
+
+def _format_conversation(number: int, conversation: dict) -> str:
+    return f"""
+--- Conversation {number} (ID: {conversation['id']}) ---
+User: {conversation['message_in']}
+System: {conversation['message_out']}
+Intent: {conversation.get('intent', 'unknown')}
+"""
+
+
+def estimate_tokens(conversation: dict) -> int:
+    """Estimated prompt tokens one conversation adds to a batch"""
+    return len(_format_conversation(0, conversation)) // CHARS_PER_TOKEN + 1
+
+
+def pack_batches(conversations: list, token_budget: int = CONVERSATION_ANALYSIS_BATCH_TOKENS,
+                 max_batch: int = CONVERSATION_ANALYSIS_MAX_BATCH) -> list:
+    """
+    Group conversations, in order, into batches of at most token_budget
+    estimated prompt tokens and max_batch conversations.
+    A conversation larger than the budget gets a batch of its own.
+    """
+    batches, batch, tokens = [], [], 0
+    for conversation in conversations:
+        cost = estimate_tokens(conversation)
+        if batch and (tokens + cost > token_budget or len(batch) >= max_batch):
+            batches.append(batch)
+            batch, tokens = [], 0
+        batch.append(conversation)
+        tokens += cost
+    if batch:
+        batches.append(batch)
+    return batches
 
-        result = json.loads(response.choices[0].message.content)
-        return result.get('flagged', [])
 
+def _request_analysis(conversations: list) -> list:
+    """
+    One completion for a batch. Returns the flagged issues.
+    Raises TruncatedAnalysis if the answer was cut off, and API errors as-is.
+    """
+    conv_text = "".join(_format_conversation(i + 1, c) for i, c in enumerate(conversations))
+
+    # No client retries: failed batches are retried by analyze_recent_conversations
+    # (MAX_ATTEMPTS), which stops at the time budget; client retries would not
+    client = get_openai_client().with_options(timeout=CONVERSATION_ANALYSIS_TIMEOUT, max_retries=0)
+    response = client.chat.completions.create(
+        model=OPENAI_MODEL,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": conv_text}
+        ],
+        temperature=0.3,
+        max_tokens=CONVERSATION_ANALYSIS_MAX_TOKENS,
+        response_format={"type": "json_object"}
+    )
+
+    # Log API usage
+    if response.usage:
+        log_api_usage(
+            'system',
+            'conversation_analysis',
+            response.usage.prompt_tokens,
+            response.usage.completion_tokens,
+            response.usage.total_tokens,
+            OPENAI_MODEL
+        )
+
+    choice = response.choices[0]
+    if choice.finish_reason == 'length':
+        raise TruncatedAnalysis(f"output hit max_tokens for {len(conversations)} conversations")
+    try:
+        result = json.loads(choice.message.content)
     except json.JSONDecodeError as e:
-        logger.error(f"JSON parse error in conversation analysis: {e}")
+        raise TruncatedAnalysis(f"JSON parse error: {e}") from e
+    return result.get('flagged', [])
+
+
+def analyze_conversation_batch(conversations: list) -> list:
+    """
+    Analyze a batch of conversations using AI.
+    Returns a list of flagged issues.
+    """
+    if not conversations:
+        return []
+
+    try:
+        return _request_analysis(conversations)
+    except TruncatedAnalysis as e:
+        logger.error(f"Incomplete conversation analysis: {e}")
         return []
     except Exception as e:
         logger.error(f"Error analyzing conversations: {e}")
         return []
 
 
-def analyze_recent_conversations(batch_size: int = 50):
+def _save_batch(batch: list, flagged: list) -> int:
+    """Save a batch's flagged items and mark its logs analyzed. Returns the number saved."""
+    by_id = {c['id']: c for c in batch}
+    saved = 0
+    for item in flagged:
+        # Find the conversation to get phone number
+        conv = by_id.get(item.get('conversation_id'))
+        if conv:
+            save_conversation_analysis(
+                log_id=conv['id'],
+                phone_number=conv['phone_number'],
+                issue_type=item.get('issue_type'),
+                severity=item.get('severity'),
+                explanation=item.get('explanation')
+            )
+            saved += 1
+
+    # Checkpoint: this batch won't be analyzed again
+    mark_logs_analyzed(list(by_id))
+    return saved
+
+
+def analyze_recent_conversations(limit: int = CONVERSATION_ANALYSIS_MAX_LOGS):
     """
     Analyze recent unanalyzed conversations.
     Called manually from admin dashboard or by a scheduled job.
+
+    Runs up to CONVERSATION_ANALYSIS_CONCURRENCY batches at once. A batch whose
+    answer is truncated is split in half and retried; one that fails on an API
+    error is retried once. Logs not reached within
+    CONVERSATION_ANALYSIS_TIME_BUDGET stay unanalyzed for the next run.
     """
     try:
         logger.info("Starting conversation analysis...")
 
         # Get unanalyzed logs
-        logs = get_unanalyzed_logs(limit=batch_size)
+        logs = get_unanalyzed_logs(limit=limit)
 
         if not logs:
             logger.info("No unanalyzed conversations found")
             return {"analyzed": 0, "flagged": 0}
 
-        logger.info(f"Analyzing {len(logs)} conversations...")
-
-        # Analyze in smaller batches to avoid token limits
-        batch_size = 10
-        total_flagged = 0
-        log_ids = []
-
-        for i in range(0, len(logs), batch_size):
-            batch = logs[i:i + batch_size]
-            log_ids.extend([c['id'] for c in batch])
-
-            # Analyze batch
-            flagged = analyze_conversation_batch(batch)
-
-            # Save flagged items
-            for item in flagged:
-                # Find the conversation to get phone number
-                conv = next((c for c in batch if c['id'] == item['conversation_id']), None)
-                if conv:
-                    save_conversation_analysis(
-                        log_id=item['conversation_id'],
-                        phone_number=conv['phone_number'],
-                        issue_type=item['issue_type'],
-                        severity=item['severity'],
-                        explanation=item['explanation']
-                    )
-                    total_flagged += 1
-
-        # Mark all logs as analyzed
-        mark_logs_analyzed(log_ids)
-
-        logger.info(f"Analysis complete: {len(log_ids)} analyzed, {total_flagged} flagged")
-        return {"analyzed": len(log_ids), "flagged": total_flagged}
+        batches = pack_batches(logs, CONVERSATION_ANALYSIS_BATCH_TOKENS, CONVERSATION_ANALYSIS_MAX_BATCH)
+        pending = deque((batch, 1) for batch in batches)
+        logger.info(f"Analyzing {len(logs)} conversations in {len(pending)} batches...")
+
+        deadline = time.monotonic() + CONVERSATION_ANALYSIS_TIME_BUDGET
+        analyzed = total_flagged = splits = failed = 0
+
+        with ThreadPoolExecutor(max_workers=CONVERSATION_ANALYSIS_CONCURRENCY,
+                                thread_name_prefix='conversation-analysis') as executor:
+            running = {}
+            while pending or running:
+                while pending and len(running) < CONVERSATION_ANALYSIS_CONCURRENCY and time.monotonic() < deadline:
+                    batch, attempt = pending.popleft()
+                    running[executor.submit(_request_analysis, batch)] = (batch, attempt)
+                if not running:
+                    break  # Out of time
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch, attempt = running.pop(future)
+                    try:
+                        flagged = future.result()
+                    except TruncatedAnalysis as e:
+                        if len(batch) > 1:
+                            middle = len(batch) // 2
+                            pending.appendleft((batch[middle:], 1))
+                            pending.appendleft((batch[:middle], 1))
+                            splits += 1
+                            continue
+                        # Nothing left to split: don't send this conversation again
+                        logger.warning(f"Skipping conversation {batch[0]['id']}: {e}")
+                        flagged = []
+                    except Exception as e:
+                        if attempt < MAX_ATTEMPTS:
+                            pending.append((batch, attempt + 1))
+                        else:
+                            logger.error(f"Error analyzing conversations: {e}")
+                            failed += len(batch)
+                        continue
+
+                    total_flagged += _save_batch(batch, flagged)
+                    analyzed += len(batch)
+
+        deferred = sum(len(batch) for batch, _ in pending)
+        logger.info(f"Analysis complete: {analyzed} analyzed, {total_flagged} flagged, "
+                    f"{splits} batches split, {failed} failed, {deferred} deferred")
+        return {"analyzed": analyzed, "flagged": total_flagged, "batches_split": splits,
+                "failed": failed, "deferred": deferred}
 
     except Exception as e:
         logger.error(f"Error in analyze_recent_conversations: {e}")
@@ -1,28 +1,124 @@
 """
 Export Service
-Handles exporting user data and emailing it to the user
+Streams a user's data export (JSON, NDJSON or CSV-in-zip) from server-side
+cursors, and emails it to the user
 """
 
+import csv
+import io
 import json
 import smtplib
+import tempfile
+import zipfile
+from datetime import datetime
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.application import MIMEApplication
+from typing import Any, BinaryIO, Iterator, Optional
+
 from database import get_db_connection, return_db_connection
 from config import (
     SMTP_HOST, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD,
-    SMTP_FROM_EMAIL, SMTP_ENABLED, logger
+    SMTP_FROM_EMAIL, SMTP_ENABLED, EXPORT_FETCH_SIZE, EXPORT_SPOOL_MAX_BYTES, logger
 )
 
+# Format -> media type
+EXPORT_FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'zip': 'application/zip',
+}
+
+# Yield output in chunks of about this size rather than per row
+_CHUNK_SIZE = 64 * 1024
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def _reminder(r) -> dict:
+    return {'id': r[0], 'text': r[1], 'date': _iso(r[2]), 'sent': r[3], 'created_at': _iso(r[4])}
+
+
+def _recurring(r) -> dict:
+    return {'id': r[0], 'text': r[1], 'type': r[2], 'day': r[3], 'time': str(r[4]),
+            'timezone': r[5], 'active': r[6], 'created_at': _iso(r[7])}
+
+
+def _memory(r) -> dict:
+    return {'id': r[0], 'text': r[1], 'created_at': _iso(r[2])}
+
+
+# Flat sections in export order: (name, query, row -> record)
+_SECTIONS = [
+    ('reminders', '''SELECT id, reminder_text, reminder_date, sent, created_at
+                     FROM reminders WHERE phone_number = %s ORDER BY created_at DESC''', _reminder),
+    ('recurring_reminders', '''SELECT id, reminder_text, recurrence_type, recurrence_day, reminder_time,
+                                      timezone, active, created_at
+                               FROM recurring_reminders WHERE phone_number = %s ORDER BY id''', _recurring),
+    ('memories', '''SELECT id, memory_text, created_at
+                    FROM memories WHERE phone_number = %s ORDER BY created_at DESC''', _memory),
+]
+
+# Lists with their items in one pass, oldest list first; rows of a list are adjacent
+_LISTS_QUERY = '''
+    SELECT l.id, l.list_name, l.created_at, li.id, li.item_text, li.completed, li.created_at
+    FROM lists l
+    LEFT JOIN list_items li ON li.list_id = l.id
+    WHERE l.phone_number = %s
+    ORDER BY l.created_at, l.id, li.created_at, li.id
+'''
+
+EXPORT_SECTIONS = tuple(name for name, _, _ in _SECTIONS) + ('lists',)
+
+# CSV columns per section (zip format); list items get their own file
+_CSV_COLUMNS = {
+    'profile': ['phone_number', 'first_name', 'last_name', 'email', 'zip_code', 'timezone',
+                'onboarding_complete', 'premium_status', 'created_at', 'last_active_at'],
+    'reminders': ['id', 'text', 'date', 'sent', 'created_at'],
+    'recurring_reminders': ['id', 'text', 'type', 'day', 'time', 'timezone', 'active', 'created_at'],
+    'memories': ['id', 'text', 'created_at'],
+    'lists': ['id', 'name', 'created_at'],
+    'list_items': ['list_id', 'id', 'text', 'completed', 'created_at'],
+}
+
+
+def _server_side_rows(conn, name: str, query: str, phone_number: str) -> Iterator[tuple]:
+    """Rows of a query, fetched EXPORT_FETCH_SIZE at a time through a named cursor."""
+    with conn.cursor(name=f'export_{name}') as cursor:
+        cursor.itersize = EXPORT_FETCH_SIZE
+        cursor.execute(query, (phone_number,))
+        yield from cursor
+
 
-def get_user_export_data(phone_number: str) -> dict:
-    """Collect all user data for export"""
+def _stream_lists(conn, phone_number: str) -> Iterator[dict]:
+    """One list (with its items) at a time from the joined query."""
+    current = None
+    for row in _server_side_rows(conn, 'lists', _LISTS_QUERY, phone_number):
+        if current is None or current['id'] != row[0]:
+            if current is not None:
+                yield current
+            current = {'id': row[0], 'name': row[1], 'created_at': _iso(row[2]), 'items': []}
+        if row[3] is not None:
+            current['items'].append(
+                {'id': row[3], 'text': row[4], 'completed': row[5], 'created_at': _iso(row[6])}
+            )
+    if current is not None:
+        yield current
+
+
+def _export_sections(phone_number: str, exported_by: Optional[str] = None) -> Iterator[Any]:
+    """Yield the export header (exported_at, profile), then (section, record iterator) pairs.
+
+    Yields nothing if the user doesn't exist. Holds one pooled connection
+    until exhausted or closed; each record iterator must be consumed before
+    advancing to the next section.
+    """
     conn = None
     try:
         conn = get_db_connection()
         c = conn.cursor()
-
-        # User profile
         c.execute("""
             SELECT phone_number, first_name, last_name, email, zip_code, timezone,
                    onboarding_complete, premium_status, created_at, last_active_at
@@ -30,85 +126,170 @@ def get_user_export_data(phone_number: str) -> dict:
         """, (phone_number,))
         user_row = c.fetchone()
         if not user_row:
-            return None
+            return
 
-        profile = {
-            'phone_number': user_row[0], 'first_name': user_row[1], 'last_name': user_row[2],
-            'email': user_row[3], 'zip_code': user_row[4], 'timezone': user_row[5],
-            'onboarding_complete': user_row[6], 'premium_status': user_row[7],
-            'created_at': user_row[8].isoformat() if user_row[8] else None,
-            'last_active_at': user_row[9].isoformat() if user_row[9] else None
-        }
+        profile = dict(zip(_CSV_COLUMNS['profile'], user_row))
+        profile['created_at'] = _iso(profile['created_at'])
+        profile['last_active_at'] = _iso(profile['last_active_at'])
+        header = {'exported_at': datetime.utcnow().isoformat() + 'Z'}
+        if exported_by:
+            header['exported_by'] = exported_by
+        header['profile'] = profile
+        yield header
 
-        # Reminders
-        c.execute("""
-            SELECT id, reminder_text, reminder_date, sent, created_at
-            FROM reminders WHERE phone_number = %s ORDER BY created_at DESC
-        """, (phone_number,))
-        reminders = [
-            {'id': r[0], 'text': r[1], 'date': r[2].isoformat() if r[2] else None,
-             'sent': r[3], 'created_at': r[4].isoformat() if r[4] else None}
-            for r in c.fetchall()
-        ]
+        for name, query, to_record in _SECTIONS:
+            yield name, (to_record(row) for row in _server_side_rows(conn, name, query, phone_number))
+        yield 'lists', _stream_lists(conn, phone_number)
+    finally:
+        if conn:
+            conn.rollback()  # ends the read transaction the named cursors ran in
+            return_db_connection(conn)
 
-        # Recurring reminders
-        c.execute("""
-            SELECT id, reminder_text, recurrence_type, recurrence_day, reminder_time, timezone, active, created_at
-            FROM recurring_reminders WHERE phone_number = %s
-        """, (phone_number,))
-        recurring = [
-            {'id': r[0], 'text': r[1], 'type': r[2], 'day': r[3], 'time': str(r[4]),
-             'timezone': r[5], 'active': r[6], 'created_at': r[7].isoformat() if r[7] else None}
-            for r in c.fetchall()
-        ]
 
-        # Memories
-        c.execute("""
-            SELECT id, memory_text, created_at
-            FROM memories WHERE phone_number = %s ORDER BY created_at DESC
-        """, (phone_number,))
-        memories = [
-            {'id': r[0], 'text': r[1], 'created_at': r[2].isoformat() if r[2] else None}
-            for r in c.fetchall()
-        ]
+class _ChunkBuffer:
+    """Collects small strings and hands back ~_CHUNK_SIZE encoded chunks."""
 
-        # Lists and items
-        c.execute("""
-            SELECT id, list_name, created_at
-            FROM lists WHERE phone_number = %s ORDER BY created_at
-        """, (phone_number,))
-        lists_data = []
-        for lst in c.fetchall():
-            c.execute("""
-                SELECT id, item_text, completed, created_at
-                FROM list_items WHERE list_id = %s ORDER BY created_at
-            """, (lst[0],))
-            items = [
-                {'id': i[0], 'text': i[1], 'completed': i[2],
-                 'created_at': i[3].isoformat() if i[3] else None}
-                for i in c.fetchall()
-            ]
-            lists_data.append({
-                'id': lst[0], 'name': lst[1],
-                'created_at': lst[2].isoformat() if lst[2] else None,
-                'items': items
-            })
-
-        from datetime import datetime
-        return {
-            'exported_at': datetime.utcnow().isoformat() + 'Z',
-            'profile': profile,
-            'reminders': reminders,
-            'recurring_reminders': recurring,
-            'memories': memories,
-            'lists': lists_data
-        }
+    def __init__(self):
+        self._parts: list[str] = []
+        self._size = 0
+
+    def write(self, text: str) -> Optional[bytes]:
+        self._parts.append(text)
+        self._size += len(text)
+        return self.drain() if self._size >= _CHUNK_SIZE else None
+
+    def drain(self) -> bytes:
+        data = ''.join(self._parts).encode('utf-8')
+        self._parts, self._size = [], 0
+        return data
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, default=str)
+
+
+def _json_chunks(header: dict, sections: Iterator) -> Iterator[bytes]:
+    """One JSON document: header fields, then each section as an array, one record per line."""
+    buffer = _ChunkBuffer()
+    buffer.write('{' + ',\n'.join(f'{_dumps(key)}: {_dumps(value)}' for key, value in header.items()))
+    for name, records in sections:
+        buffer.write(f',\n{_dumps(name)}: [')
+        separator = '\n'
+        for record in records:
+            chunk = buffer.write(separator + _dumps(record))
+            separator = ',\n'
+            if chunk:
+                yield chunk
+        buffer.write('\n]')
+    buffer.write('}\n')
+    yield buffer.drain()
+
+
+def _ndjson_chunks(header: dict, sections: Iterator) -> Iterator[bytes]:
+    """One JSON object per line: the header, then every record tagged with its section."""
+    buffer = _ChunkBuffer()
+    buffer.write(_dumps({'section': 'export', **header}) + '\n')
+    for name, records in sections:
+        for record in records:
+            chunk = buffer.write(_dumps({'section': name, **record}) + '\n')
+            if chunk:
+                yield chunk
+    yield buffer.drain()
+
+
+def _write_csv(archive: zipfile.ZipFile, name: str, rows: Iterator[dict]) -> None:
+    with archive.open(f'{name}.csv', 'w') as member:
+        text = io.TextIOWrapper(member, encoding='utf-8', newline='')
+        writer = csv.DictWriter(text, fieldnames=_CSV_COLUMNS[name], extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+        text.flush()
+        text.detach()
+
+
+def _zip_chunks(header: dict, sections: Iterator) -> Iterator[bytes]:
+    """CSV per section in a zip, built in a spooled temp file then streamed out."""
+    with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_BYTES) as spool:
+        with zipfile.ZipFile(spool, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('export.json', _dumps({k: v for k, v in header.items() if k != 'profile'}))
+            _write_csv(archive, 'profile', iter([header['profile']]))
+            for name, records in sections:
+                if name != 'lists':
+                    _write_csv(archive, name, records)
+                    continue
+                # Lists and items in one pass: items go to a second member written afterwards,
+                # buffered in a spooled file so a big account doesn't sit in memory
+                with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_BYTES, mode='w+',
+                                                   newline='', encoding='utf-8') as items:
+                    item_writer = csv.DictWriter(items, fieldnames=_CSV_COLUMNS['list_items'])
+                    item_writer.writeheader()
+
+                    def lists_only(records=records):
+                        for lst in records:
+                            item_writer.writerows({'list_id': lst['id'], **item} for item in lst['items'])
+                            yield lst
+
+                    _write_csv(archive, 'lists', lists_only())
+                    items.seek(0)
+                    with archive.open('list_items.csv', 'w') as member:
+                        while block := items.read(_CHUNK_SIZE):
+                            member.write(block.encode('utf-8'))
+        spool.seek(0)
+        while block := spool.read(_CHUNK_SIZE):
+            yield block
+
+
+_FORMATTERS = {'json': _json_chunks, 'ndjson': _ndjson_chunks, 'zip': _zip_chunks}
+
+
+def stream_user_export(phone_number: str, fmt: str = 'json',
+                       exported_by: Optional[str] = None) -> Optional[Iterator[bytes]]:
+    """Start an export: returns an iterator of encoded chunks, or None if the user doesn't exist.
+
+    Reads the profile immediately; everything else is read as the iterator is
+    consumed, so memory stays bounded by the fetch size and chunk size (one
+    list's items at a time) regardless of account size.
+    """
+    if fmt not in _FORMATTERS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    sections = _export_sections(phone_number, exported_by)
+    header = next(sections, None)
+    if header is None:
+        return None
+
+    def chunks():
+        try:
+            yield from _FORMATTERS[fmt](header, sections)
+        except Exception as e:
+            logger.error(f"Error streaming data export: {e}")
+            raise
+        finally:
+            sections.close()
+
+    return chunks()
+
+
+def write_user_export(phone_number: str, fileobj: BinaryIO, fmt: str = 'json') -> bool:
+    """Stream an export into a binary file object. Returns False if the user doesn't exist."""
+    chunks = stream_user_export(phone_number, fmt)
+    if chunks is None:
+        return False
+    for chunk in chunks:
+        fileobj.write(chunk)
+    return True
+
+
+def get_user_export_data(phone_number: str) -> Optional[dict]:
+    """Collect all user data for export as one dict (small accounts/tests; prefer stream_user_export)"""
+    try:
+        sections = _export_sections(phone_number)
+        header = next(sections, None)
+        if header is None:
+            return None
+        return {**header, **{name: list(records) for name, records in sections}}
     except Exception as e:
         logger.error(f"Error collecting export data: {e}")
         return None
-    finally:
-        if conn:
-            return_db_connection(conn)
 
 
 def export_and_email_user_data(phone_number: str, email: str) -> bool:
@@ -117,31 +298,31 @@ def export_and_email_user_data(phone_number: str, email: str) -> bool:
         logger.warning("SMTP not configured - cannot email data export")
         return False
 
-    data = get_user_export_data(phone_number)
-    if not data:
-        return False
-
     try:
-        msg = MIMEMultipart()
-        msg['Subject'] = 'Your Remyndrs Data Export'
-        msg['From'] = SMTP_FROM_EMAIL
-        msg['To'] = email
-
-        body = MIMEText(
-            "Hi!\n\n"
-            "Attached is your complete Remyndrs data export. "
-            "This includes your profile, reminders, recurring reminders, memories, and lists.\n\n"
-            "The file is in JSON format, which can be opened with any text editor.\n\n"
-            "- The Remyndrs Team",
-            'plain'
-        )
-        msg.attach(body)
-
-        # Attach JSON data
-        json_data = json.dumps(data, indent=2, default=str)
-        attachment = MIMEApplication(json_data.encode('utf-8'), _subtype='json')
-        attachment.add_header('Content-Disposition', 'attachment', filename='remyndrs-data-export.json')
-        msg.attach(attachment)
+        with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_BYTES) as spool:
+            if not write_user_export(phone_number, spool):
+                return False
+
+            msg = MIMEMultipart()
+            msg['Subject'] = 'Your Remyndrs Data Export'
+            msg['From'] = SMTP_FROM_EMAIL
+            msg['To'] = email
+
+            body = MIMEText(
+                "Hi!\n\n"
+                "Attached is your complete Remyndrs data export. "
+                "This includes your profile, reminders, recurring reminders, memories, and lists.\n\n"
+                "The file is in JSON format, which can be opened with any text editor.\n\n"
+                "- The Remyndrs Team",
+                'plain'
+            )
+            msg.attach(body)
+
+            # Attach JSON data (MIME encoding needs the payload in memory)
+            spool.seek(0)
+            attachment = MIMEApplication(spool.read(), _subtype='json')
+            attachment.add_header('Content-Disposition', 'attachment', filename='remyndrs-data-export.json')
+            msg.attach(attachment)
 
         with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30) as server:
             server.starttls()
@@ -0,0 +1,360 @@
+"""
+Intent Parser
+Local fast path for the AI call in sms_reply. A small grammar covers the most
+common reminder, list and memory messages and produces the same action dict
+process_with_ai() returns, plus a confidence score. Anything it can't parse
+with confidence (no am/pm, "next Tuesday", vague times, typos, several
+requests in one message) is left to the AI.
+"""
+
+import re
+from datetime import datetime, timedelta
+from typing import Any, Callable, Iterable, Optional
+
+from config import logger, FAST_PATH_ENABLED, FAST_PATH_MIN_CONFIDENCE
+
+_WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+_WEEKDAY_ALIASES = {
+    'mon': 0, 'tue': 1, 'tues': 1, 'wed': 2, 'weds': 2, 'thu': 3, 'thur': 3, 'thurs': 3,
+    'fri': 4, 'sat': 5, 'sun': 6,
+    **{name: i for i, name in enumerate(_WEEKDAYS)},
+}
+_MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+}
+_NUMBER_WORDS = {
+    'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6,
+    'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10, 'eleven': 11, 'twelve': 12,
+    'fifteen': 15, 'twenty': 20, 'thirty': 30, 'forty five': 45, 'ninety': 90,
+}
+
+_WEEKDAY_RE = '|'.join(sorted(_WEEKDAY_ALIASES, key=len, reverse=True))
+_MONTH_RE = r'jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sept?(?:ember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?'
+_NUMBER_RE = r'\d+|' + '|'.join(sorted(_NUMBER_WORDS, key=len, reverse=True))
+_UNIT_RE = r'minutes?|mins?|hours?|hrs?|days?|weeks?|months?'
+_TIME_RE = r'(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?P<ampm>[ap])\.?m\b\.?|(?P<word>noon|midnight)'
+
+# Date/time clauses, removed from the message as they are found
+_RELATIVE = re.compile(
+    rf'\b(?:in (?P<n>{_NUMBER_RE}) (?P<unit>{_UNIT_RE})|in (?P<half>half an hour)'
+    rf'|(?P<n2>{_NUMBER_RE}) (?P<unit2>{_UNIT_RE}) from now)\b', re.IGNORECASE)
+_TIME = re.compile(rf'(?:(?:\bat|@) ?)?(?<![\w:])(?:{_TIME_RE})', re.IGNORECASE)
+_DAY = re.compile(rf'\b(?:(?P<qual>on|this|next) )?(?P<day>today|tonight|tomorrow|tmrw|tmr|{_WEEKDAY_RE})\b', re.IGNORECASE)
+_DATE = re.compile(
+    rf'\b(?:on )?(?P<month>{_MONTH_RE})\.? (?P<mday>\d{{1,2}})(?:st|nd|rd|th)?\b(?:,? (?P<year>\d{{4}})\b)?',
+    re.IGNORECASE)
+_RECURRENCE = re.compile(
+    rf'\b(?:(?:every|each) (?P<every>day|morning|evening|night|weekday|weekend|{_WEEKDAY_RE})|(?P<adverb>daily|weekdays|weekends))\b',
+    re.IGNORECASE)
+
+# Whatever is left after the clauses are removed must not still talk about time
+_LEFTOVER_TIME = re.compile(
+    rf'\d{{1,2}}(?::\d{{2}})?\s*[ap]\.?m\b|\d{{1,2}}:\d{{2}}|\bat \d|\b(?:\d+(?:\.\d+)?|{_NUMBER_RE}) ?(?:{_UNIT_RE})\b'
+    rf'|\b(?:today|tonight|tomorrow|tmrw|tmr|yesterday|noon|midnight|morning|afternoon|evening|night|later|soon|o\'?clock)\b'
+    rf'|\b(?:{_WEEKDAY_RE})s?\b|\b(?:next|this|last|end of|in an?) (?:day|week|month|year|bit|while|weekend)\b'
+    rf'|\b(?:{_MONTH_RE}) \d|\b(?:every|each|daily|weekly|monthly|weekdays|weekends)\b|\bfor the next\b|\bfrom now\b'
+    # "on the 20th", time zones ("5pm EST", "pacific time") and exceptions ("except weekends")
+    rf'|\b\d{{1,2}}(?:st|nd|rd|th)\b|\bon the \w+(?:st|nd|rd|th)\b'
+    rf'|\b(?:[ecmp][sd]?t|ak[sd]t|h[sd]t|utc|gmt|bst|cet|cest)\b|\b(?:eastern|central|mountain|pacific|local|standard|daylight) time\b|\btime ?zone\b'
+    rf'|\b(?:except|unless|but not|other than|excluding)\b',
+    re.IGNORECASE)
+
+_MULTI_COMMAND = re.compile(
+    r'(?:\b(?:and|then|also)|;)\s+(?:then\s+)?(?:remind|add|delete|remove|check|set|create|show|forget|remember|cancel)\b',
+    re.IGNORECASE)
+
+_REMINDER = re.compile(
+    r'^(?:(?P<lead>.+?),? )??(?:(?:hey|hi|ok|okay),? )?(?:(?:can|could|would|will) you (?:please )?|please )?'
+    r'(?P<verb>remind me|(?:set (?:a )?)?reminder(?::| to| for)?) (?P<body>.+)$',
+    re.IGNORECASE)
+_ADD_TO_LIST = re.compile(
+    r'^(?:please )?add (?P<items>.+?) to (?:my |the |our )?(?P<name>.+?)(?P<suffix> list)?$', re.IGNORECASE)
+_REMEMBER = re.compile(r'^(?:please )?remember(?: that)?:? (?P<fact>.+)$', re.IGNORECASE)
+_NOT_A_FACT = re.compile(
+    r'^(?:to|what|when|where|who|how|which|if|whether|why)\b|\?|\b(?:yesterday|today|tonight|tomorrow|ago|last|next|this '
+    r'(?:morning|afternoon|evening|week|month|year))\b', re.IGNORECASE)
+_DANGLING = re.compile(r'\b(?:at|on|by|in|to|for|about|and|from)$', re.IGNORECASE)
+
+CONFIDENT = 95
+UNSURE = 75
+
+
+def _clean(message: str) -> Optional[str]:
+    """Collapse whitespace and drop trailing punctuation/politeness; None for multi-line messages."""
+    if '\n' in message.strip():
+        return None
+    text = ' '.join(message.split())
+    text = re.sub(r'(?:[,\s]+(?:please|thanks|thank you|thx))?[\s.!]*$', '', text, flags=re.IGNORECASE)
+    return text or None
+
+
+def _remove(text: str, match: re.Match) -> str:
+    return ' '.join((text[:match.start()] + ' ' + text[match.end():]).split())
+
+
+def _number(word: str) -> int:
+    return int(word) if word.isdigit() else _NUMBER_WORDS[word.lower()]
+
+
+def _parse_time(match: re.Match) -> Optional[tuple[int, int]]:
+    word = (match.group('word') or '').lower()
+    if word:
+        return (12, 0) if word == 'noon' else (0, 0)
+    hour, minute = int(match.group('hour')), int(match.group('minute') or 0)
+    if not 1 <= hour <= 12 or minute > 59:
+        return None
+    if match.group('ampm').lower() == 'p':
+        hour = hour % 12 + 12
+    else:
+        hour = hour % 12
+    return hour, minute
+
+
+def _strip_clauses(text: str) -> str:
+    for pattern in (_RECURRENCE, _RELATIVE, _TIME, _DAY, _DATE):
+        text = pattern.sub(' ', text)
+    return ' '.join(text.split())
+
+
+def _split_reminder(text: str) -> Optional[tuple[str, str]]:
+    """(verb, body) for a reminder request, or None.
+
+    A leading date/time ("tomorrow at 9am, remind me to ...") is moved to the
+    end of the body; anything else before "remind me" is not ours to parse.
+    """
+    match = _REMINDER.match(text)
+    if not match:
+        return None
+    body, lead = match.group('body'), match.group('lead')
+    if lead:
+        if _strip_clauses(lead).strip(' ,'):
+            return None
+        body = f"{body} {lead}"
+    return match.group('verb').lower(), body
+
+
+def _task(verb: str, rest: str) -> Optional[str]:
+    """Reminder text left after the date/time clauses, or None if it is still ambiguous.
+
+    "remind me to X" is stored as "X"; "about/for/that X" keep their preposition.
+    """
+    rest = rest.strip(' ,.!?')
+    if verb == 'remind me':
+        match = re.match(r'^(to|about|that|for) (.+)$', rest, re.IGNORECASE)
+        if not match:
+            return None
+        conn, rest = match.group(1).lower(), match.group(2)
+    elif verb.endswith('for'):
+        conn = 'for'
+    else:
+        conn, rest = 'to', re.sub(r'^to ', '', rest, flags=re.IGNORECASE)
+    if not rest or _LEFTOVER_TIME.search(rest) or _DANGLING.search(rest):
+        return None
+    return rest if conn == 'to' else f"{conn} {rest}"
+
+
+def _parse_recurring(verb: str, body: str) -> Optional[dict[str, Any]]:
+    recurrence = _RECURRENCE.search(body)
+    if not recurrence:
+        return None
+    rest = _remove(body, recurrence)
+    time_match = _TIME.search(rest)
+    if not time_match:
+        return None
+    rest = _remove(rest, time_match)
+    if _DAY.search(rest) or _DATE.search(rest) or _RELATIVE.search(rest):
+        return None
+    hm = _parse_time(time_match)
+    task = _task(verb, rest)
+    if hm is None or task is None or (time_match.group('word') or '').lower() == 'midnight':
+        return None
+
+    every = (recurrence.group('every') or recurrence.group('adverb')).lower()
+    recurrence_day = None
+    if every in ('day', 'morning', 'evening', 'night', 'daily'):
+        recurrence_type = 'daily'
+    elif every in ('weekday', 'weekdays'):
+        recurrence_type = 'weekdays'
+    elif every in ('weekend', 'weekends'):
+        recurrence_type = 'weekends'
+    else:
+        recurrence_type, recurrence_day = 'weekly', _WEEKDAY_ALIASES[every]
+    return {
+        "action": "reminder_recurring",
+        "reminder_text": task,
+        "recurrence_type": recurrence_type,
+        "recurrence_day": recurrence_day,
+        "time": f"{hm[0]:02d}:{hm[1]:02d}",
+        "confidence": CONFIDENT,
+    }
+
+
+def _parse_reminder(text: str, now: datetime) -> Optional[dict[str, Any]]:
+    split = _split_reminder(text)
+    if split is None:
+        return None
+    verb, body = split
+    if re.search(r'\b(?:every|each|daily|weekdays|weekends)\b', body, re.IGNORECASE):
+        return _parse_recurring(verb, body)
+
+    relative = _RELATIVE.search(body)
+    if relative:
+        rest = _remove(body, relative)
+        task = _task(verb, rest)
+        if task is None or _TIME.search(rest) or _DAY.search(rest) or _DATE.search(rest):
+            return None
+        if relative.group('half'):
+            n, unit = 30, 'minutes'
+        else:
+            n = _number(relative.group('n') or relative.group('n2'))
+            unit = (relative.group('unit') or relative.group('unit2')).lower()
+        action = {"action": "reminder_relative", "reminder_text": task, "confidence": CONFIDENT}
+        if unit.startswith('min'):
+            action["offset_minutes"] = n
+        elif unit.startswith('h'):
+            action["offset_minutes"] = n * 60
+        elif unit.startswith('d'):
+            action["offset_days"] = n
+        elif unit.startswith('w'):
+            action["offset_weeks"] = n
+        else:
+            action["offset_months"] = n
+        return action if n > 0 else None
+
+    # Absolute: a time with am/pm (or noon/midnight), optionally a day or a date
+    time_match = _TIME.search(body)
+    if not time_match:
+        return None
+    rest = _remove(body, time_match)
+    day_match = _DAY.search(rest)
+    if day_match:
+        rest = _remove(rest, day_match)
+    date_match = _DATE.search(rest)
+    if date_match:
+        rest = _remove(rest, date_match)
+    task = _task(verb, rest)
+    hm = _parse_time(time_match)
+    if task is None or hm is None or (day_match and date_match):
+        return None
+
+    today = now.replace(tzinfo=None, second=0, microsecond=0)
+    confidence = CONFIDENT
+    midnight = (time_match.group('word') or '').lower() == 'midnight'
+    if date_match:
+        month = _MONTHS[date_match.group('month').lower()[:3]]
+        year = int(date_match.group('year') or today.year)
+        try:
+            day = datetime(year, month, int(date_match.group('mday')))
+        except ValueError:
+            return None
+        if day.date() < today.date():
+            if date_match.group('year'):
+                return None
+            # "January 5th" in December means next year, probably
+            day, confidence = day.replace(year=year + 1), UNSURE
+    elif day_match:
+        qual = (day_match.group('qual') or '').lower()
+        word = day_match.group('day').lower()
+        if qual == 'next' or midnight:
+            return None
+        if word == 'today':
+            day = today
+        elif word == 'tonight':
+            if hm[0] < 17:
+                return None
+            day = today
+        elif word in ('tomorrow', 'tmrw', 'tmr'):
+            day = today + timedelta(days=1)
+            if today.hour < 4:
+                # Said after midnight, "tomorrow" often means later today
+                confidence = UNSURE
+        else:
+            ahead = (_WEEKDAY_ALIASES[word] - today.weekday()) % 7
+            if ahead == 0:
+                return None
+            day = today + timedelta(days=ahead)
+    else:
+        # A bare midnight is the coming one; any other bare time must still be ahead today
+        day = today + timedelta(days=1) if midnight else today
+
+    when = day.replace(hour=hm[0], minute=hm[1], second=0, microsecond=0)
+    if when <= today:
+        return None
+    return {
+        "action": "reminder",
+        "reminder_text": task,
+        "reminder_date": when.strftime('%Y-%m-%d %H:%M:%S'),
+        "confidence": confidence,
+    }
+
+
+def _parse_add_to_list(text: str, list_names: Callable[[], Iterable[str]]) -> Optional[dict[str, Any]]:
+    match = _ADD_TO_LIST.match(text)
+    if not match or len(re.findall(r'\bto\b', text, re.IGNORECASE)) != 1:
+        return None
+    items = match.group('items').strip(' ,')
+    name = match.group('name').strip()
+    typed = name + (match.group('suffix') or '')
+    if not items or not name or len(name.split()) > 4:
+        return None
+
+    candidates = {typed.lower(), name.lower(), f"{name.lower()} list"}
+    for existing in list_names():
+        if existing.lower() in candidates or re.sub(r' list$', '', existing.lower()) == name.lower():
+            return {"action": "add_to_list", "list_name": existing, "item_text": items, "confidence": CONFIDENT}
+    if not match.group('suffix'):
+        # "add butter to groceries": maybe a list, maybe not - the AI knows the user's lists
+        return None
+    return {"action": "add_to_list", "list_name": typed, "item_text": items, "confidence": 90}
+
+
+def _parse_store(text: str) -> Optional[dict[str, Any]]:
+    match = _REMEMBER.match(text)
+    if not match:
+        return None
+    fact = match.group('fact').strip()
+    if len(fact.split()) < 3 or _NOT_A_FACT.search(fact):
+        return None
+    return {"action": "store", "memory_text": fact[0].upper() + fact[1:], "confidence": CONFIDENT}
+
+
+def parse_intent(message: str, user_now: datetime,
+                 list_names: Callable[[], Iterable[str]] = tuple) -> Optional[dict[str, Any]]:
+    """Parse a message into the action dict process_single_action() consumes.
+
+    user_now is the current time in the user's timezone; reminder dates are
+    returned as naive local times, like the AI's. list_names is only called
+    for "add ... to ..." messages. Returns None when the message isn't one
+    of the covered forms; otherwise the action's "confidence" says how sure
+    the parse is.
+    """
+    text = _clean(message)
+    if text is None or _MULTI_COMMAND.search(text):
+        return None
+    first = text.split(' ', 1)[0].lower()
+    if first == 'add':
+        return _parse_add_to_list(text, list_names)
+    if first == 'remember':
+        return _parse_store(text)
+    return _parse_reminder(text, user_now)
+
+
+def fast_path_intent(message: str, phone_number: str) -> Optional[dict[str, Any]]:
+    """parse_intent() for a user, or None if the AI should handle the message."""
+    if not FAST_PATH_ENABLED:
+        return None
+    from utils.timezone import get_user_current_time
+    from models.list_model import get_lists
+
+    try:
+        intent = parse_intent(
+            message, get_user_current_time(phone_number),
+            list_names=lambda: [row[1] for row in get_lists(phone_number)]
+        )
+    except Exception as e:
+        logger.error(f"Fast path parse failed, using AI: {e}")
+        return None
+    if intent is None or intent["confidence"] < FAST_PATH_MIN_CONFIDENCE:
+        return None
+    return intent
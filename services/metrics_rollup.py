@@ -0,0 +1,238 @@
+"""
+Metrics Rollups
+Hourly per-plan usage (logs, api_usage) and daily creation counts (memories,
+reminders, lists, list_items) rolled up behind watermarks, so dashboard
+metrics read rollup rows plus only the partial buckets at the edges live
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from database import get_db_connection, return_db_connection
+from config import logger, METRICS_ROLLUP_LAG_MINUTES, METRICS_ROLLUP_MAX_HOURS
+
+# metrics_rollup_state names
+HOURLY = 'usage_hourly'
+DAILY = 'counts_daily'
+
+PLANS = ('free', 'trial', 'premium', 'family')
+
+# The plan usage is attributed to; rollups evaluate it when the hour is rolled up
+PLAN_SQL = '''CASE WHEN u.trial_end_date > NOW() AND u.premium_status IN ('premium', 'family')
+                   THEN 'trial' ELSE COALESCE(u.premium_status, 'free') END'''
+
+# metrics_daily metric name -> source table (rows counted by created_at day)
+DAILY_METRICS = {
+    'memories': 'memories',
+    'reminders': 'reminders',
+    'lists': 'lists',
+    'list_items': 'list_items',
+}
+
+_USAGE_SQL = f'''
+    SELECT {{bucket}} AS bucket, plan, SUM(messages), SUM(prompt_tokens), SUM(completion_tokens) FROM (
+        SELECT {{bucket_l}} AS bucket, {PLAN_SQL} AS plan, COUNT(*) AS messages,
+               0 AS prompt_tokens, 0 AS completion_tokens
+        FROM logs l JOIN users u ON l.phone_number = u.phone_number
+        WHERE l.created_at >= %(start)s AND l.created_at < %(end)s
+        GROUP BY 1, 2
+        UNION ALL
+        SELECT {{bucket_a}}, {PLAN_SQL}, 0,
+               COALESCE(SUM(a.prompt_tokens), 0), COALESCE(SUM(a.completion_tokens), 0)
+        FROM api_usage a JOIN users u ON a.phone_number = u.phone_number
+        WHERE a.created_at >= %(start)s AND a.created_at < %(end)s
+        GROUP BY 1, 2
+    ) usage
+    GROUP BY 1, 2
+'''
+
+_COUNTS_SQL = ' UNION ALL '.join(
+    f'''SELECT {{day}} AS day, '{metric}' AS metric, COUNT(*) FROM {table}
+        WHERE created_at >= %(start)s AND created_at < %(end)s GROUP BY 1'''
+    for metric, table in DAILY_METRICS.items()
+)
+
+
+def _floor_hour(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def _floor_day(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _ceil(value: datetime, floor, step: timedelta) -> datetime:
+    floored = floor(value)
+    return floored if floored == value else floored + step
+
+
+# =====================================================
+# ROLLUP JOB
+# =====================================================
+
+def _lock_watermark(cursor, name: str) -> Optional[datetime]:
+    """Watermark for a rollup (exclusive end of what's rolled up), locked until commit."""
+    cursor.execute('INSERT INTO metrics_rollup_state (name) VALUES (%s) ON CONFLICT (name) DO NOTHING', (name,))
+    cursor.execute('SELECT watermark FROM metrics_rollup_state WHERE name = %s FOR UPDATE', (name,))
+    return cursor.fetchone()[0]
+
+
+def _set_watermark(cursor, name: str, watermark: datetime) -> None:
+    cursor.execute('UPDATE metrics_rollup_state SET watermark = %s, updated_at = NOW() WHERE name = %s',
+                   (watermark, name))
+
+
+def _earliest(cursor, tables) -> Optional[datetime]:
+    cursor.execute(' UNION ALL '.join(f'SELECT MIN(created_at) FROM {table}' for table in tables))
+    values = [row[0] for row in cursor.fetchall() if row[0] is not None]
+    return min(values) if values else None
+
+
+def _rollup_hours(cursor, start: datetime, end: datetime) -> None:
+    cursor.execute('DELETE FROM metrics_hourly WHERE bucket >= %s AND bucket < %s', (start, end))
+    cursor.execute(
+        'INSERT INTO metrics_hourly (bucket, plan, messages, prompt_tokens, completion_tokens) '
+        + _USAGE_SQL.format(bucket='bucket', bucket_l="date_trunc('hour', l.created_at)",
+                            bucket_a="date_trunc('hour', a.created_at)"),
+        {'start': start, 'end': end}
+    )
+
+
+def _rollup_days(cursor, start: datetime, end: datetime) -> None:
+    cursor.execute('DELETE FROM metrics_daily WHERE day >= %s AND day < %s', (start.date(), end.date()))
+    cursor.execute(
+        'INSERT INTO metrics_daily (day, metric, value) ' + _COUNTS_SQL.format(day='DATE(created_at)'),
+        {'start': start, 'end': end}
+    )
+
+
+def rollup_metrics(rebuild_daily: bool = False) -> dict[str, Any]:
+    """Advance the hourly and daily rollups to the last closed bucket.
+
+    Buckets close METRICS_ROLLUP_LAG_MINUTES after they end, so rows queued by the log
+    sink land first. Hourly usage is append-only and only rolled forward (at
+    most METRICS_ROLLUP_MAX_HOURS per run, so the first run backfills in
+    steps); usage from a deleted account stays in the rolled-up hours, as
+    anonymous per-plan totals. Daily counts also re-roll the last closed day to pick up deletes;
+    rebuild_daily recounts every day (run nightly).
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        c = conn.cursor()
+        c.execute('SELECT LOCALTIMESTAMP')
+        cutoff = c.fetchone()[0] - timedelta(minutes=METRICS_ROLLUP_LAG_MINUTES)
+
+        # Hourly usage
+        hour_end = _floor_hour(cutoff)
+        hour_start = _lock_watermark(c, HOURLY)
+        if hour_start is None:
+            earliest = _earliest(c, ('logs', 'api_usage'))
+            hour_start = _floor_hour(earliest) if earliest else hour_end
+        hour_end = min(hour_end, hour_start + timedelta(hours=METRICS_ROLLUP_MAX_HOURS))
+        hours = 0
+        if hour_end > hour_start:
+            _rollup_hours(c, hour_start, hour_end)
+            _set_watermark(c, HOURLY, hour_end)
+            hours = int((hour_end - hour_start) / timedelta(hours=1))
+
+        # Daily counts
+        day_end = _floor_day(cutoff)
+        day_start = _lock_watermark(c, DAILY)
+        if day_start is None or rebuild_daily:
+            if rebuild_daily:
+                # Days whose rows were all deleted have nothing left to recount
+                c.execute('DELETE FROM metrics_daily WHERE day < %s', (day_end.date(),))
+            earliest = _earliest(c, DAILY_METRICS.values())
+            day_start = _floor_day(earliest) if earliest else day_end
+        else:
+            day_start -= timedelta(days=1)
+        days = 0
+        if day_end > day_start:
+            _rollup_days(c, day_start, day_end)
+            _set_watermark(c, DAILY, day_end)
+            days = (day_end - day_start).days
+
+        conn.commit()
+        logger.info(f"Metrics rollup: {hours} hours to {hour_end}, {days} days to {day_end.date()}")
+        return {'hours_rolled': hours, 'hourly_watermark': hour_end.isoformat(),
+                'days_rolled': days, 'daily_watermark': day_end.date().isoformat()}
+    finally:
+        if conn:
+            return_db_connection(conn)
+
+
+# =====================================================
+# READS (rollups + live edges)
+# =====================================================
+
+def _watermark(cursor, name: str) -> Optional[datetime]:
+    cursor.execute('SELECT watermark FROM metrics_rollup_state WHERE name = %s', (name,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _split(start: datetime, end: datetime, watermark: Optional[datetime], floor, step: timedelta):
+    """Split [start, end) into live ranges and one rolled-up range of whole buckets below watermark."""
+    if watermark is not None:
+        lo = _ceil(start, floor, step)
+        hi = min(floor(end), watermark) if end < datetime.max else watermark
+        if lo < hi:
+            live = [(start, lo)] if start < lo else []
+            live += [(hi, end)] if hi < end else []
+            return live, (lo, hi)
+    return [(start, end)], None
+
+
+def usage_by_plan(cursor, start: Optional[datetime] = None,
+                  end: Optional[datetime] = None) -> dict[str, dict[str, int]]:
+    """Messages (logs rows) and OpenAI tokens per plan for [start, end).
+
+    Rolled-up hours still include usage from accounts deleted since; the live
+    edges only count rows that still exist.
+    """
+    start, end = start or datetime.min, end or datetime.max
+    live, rolled = _split(start, end, _watermark(cursor, HOURLY), _floor_hour, timedelta(hours=1))
+    rows = []
+    if rolled:
+        cursor.execute(
+            '''SELECT NULL, plan, SUM(messages), SUM(prompt_tokens), SUM(completion_tokens)
+               FROM metrics_hourly WHERE bucket >= %s AND bucket < %s GROUP BY plan''',
+            rolled
+        )
+        rows += cursor.fetchall()
+    for live_start, live_end in live:
+        cursor.execute(_USAGE_SQL.format(bucket='NULL', bucket_l='NULL', bucket_a='NULL'),
+                       {'start': live_start, 'end': live_end})
+        rows += cursor.fetchall()
+
+    totals = {}
+    for _, plan, messages, prompt_tokens, completion_tokens in rows:
+        entry = totals.setdefault(plan, {'messages': 0, 'prompt_tokens': 0, 'completion_tokens': 0})
+        entry['messages'] += int(messages or 0)
+        entry['prompt_tokens'] += int(prompt_tokens or 0)
+        entry['completion_tokens'] += int(completion_tokens or 0)
+    return totals
+
+
+def created_counts(cursor, start: Optional[datetime] = None,
+                   end: Optional[datetime] = None) -> dict[str, int]:
+    """Rows created in [start, end) per DAILY_METRICS table that still exist.
+
+    Deletes on days older than the last re-roll show up after the nightly rebuild.
+    """
+    start, end = start or datetime.min, end or datetime.max
+    live, rolled = _split(start, end, _watermark(cursor, DAILY), _floor_day, timedelta(days=1))
+    counts = dict.fromkeys(DAILY_METRICS, 0)
+    if rolled:
+        cursor.execute(
+            'SELECT metric, SUM(value) FROM metrics_daily WHERE day >= %s AND day < %s GROUP BY metric',
+            (rolled[0].date(), rolled[1].date())
+        )
+        for metric, value in cursor.fetchall():
+            counts[metric] += int(value)
+    for live_start, live_end in live:
+        cursor.execute(_COUNTS_SQL.format(day='NULL::date'), {'start': live_start, 'end': live_end})
+        for _, metric, value in cursor.fetchall():
+            counts[metric] += int(value)
+    return counts
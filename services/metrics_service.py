@@ -3,9 +3,12 @@ Metrics Service
 Handles user activity tracking and metrics aggregation
 """
 
-from datetime import datetime
+from datetime import datetime, timedelta
 from database import get_db_connection, return_db_connection
 from config import logger
+from models.user_context import get_user_context, update_user_context
+from services.activity_aggregator import record_activity
+from services.metrics_rollup import usage_by_plan, created_counts, PLANS, PLAN_SQL
 
 
 def _date_filter(column, start_date=None, end_date=None):
@@ -43,39 +46,23 @@ OPENAI_OUTPUT_COST_PER_1K = 0.0006   # $0.0006 per 1K output tokens
 # =============================================================================
 
 def track_user_activity(phone_number):
-    """Update user's last active timestamp"""
-    conn = None
+    """Update user's last active timestamp (coalesced, see services.activity_aggregator)"""
     try:
-        conn = get_db_connection()
-        c = conn.cursor()
-        c.execute(
-            'UPDATE users SET last_active_at = %s WHERE phone_number = %s',
-            (datetime.utcnow(), phone_number)
-        )
-        conn.commit()
+        now = record_activity(phone_number)
+        update_user_context(phone_number, last_active_at=now)
     except Exception as e:
         logger.error(f"Error tracking user activity: {e}")
-    finally:
-        if conn:
-            return_db_connection(conn)
 
 
 def increment_message_count(phone_number):
-    """Increment user's total message count"""
-    conn = None
+    """Increment user's total message count (coalesced, see services.activity_aggregator)"""
     try:
-        conn = get_db_connection()
-        c = conn.cursor()
-        c.execute(
-            'UPDATE users SET total_messages = COALESCE(total_messages, 0) + 1 WHERE phone_number = %s',
-            (phone_number,)
-        )
-        conn.commit()
+        record_activity(phone_number, messages=1)
+        ctx = get_user_context(phone_number)
+        if ctx is not None:
+            update_user_context(phone_number, total_messages=(ctx.get('total_messages') or 0) + 1)
     except Exception as e:
         logger.error(f"Error incrementing message count: {e}")
-    finally:
-        if conn:
-            return_db_connection(conn)
 
 
 def track_reminder_delivery(reminder_id, status, error=None):
@@ -113,6 +100,7 @@ def set_referral_source(phone_number, source):
             (source, phone_number)
         )
         conn.commit()
+        update_user_context(phone_number, referral_source=source)
     except Exception as e:
         logger.error(f"Error setting referral source: {e}")
     finally:
@@ -327,39 +315,18 @@ def get_engagement_stats(start_date=None, end_date=None):
         c.execute(query, dp_user)
         total_users = c.fetchone()[0] or 1
 
-        # Get total memories
-        df_mem, dp_mem = _date_filter('created_at', start_date, end_date)
-        query = 'SELECT COUNT(*) FROM memories WHERE 1=1'
-        query += df_mem
-        c.execute(query, dp_mem)
-        total_memories = c.fetchone()[0]
-
-        # Get total reminders
-        df_rem, dp_rem = _date_filter('created_at', start_date, end_date)
-        query = 'SELECT COUNT(*) FROM reminders WHERE 1=1'
-        query += df_rem
-        c.execute(query, dp_rem)
-        total_reminders = c.fetchone()[0]
-
         # Get total messages (from users created in range)
         query = 'SELECT SUM(COALESCE(total_messages, 0)) FROM users WHERE 1=1'
         query += df_user
         c.execute(query, list(dp_user))
         total_messages = c.fetchone()[0] or 0
 
-        # Get total lists
-        df_list, dp_list = _date_filter('created_at', start_date, end_date)
-        query = 'SELECT COUNT(*) FROM lists WHERE 1=1'
-        query += df_list
-        c.execute(query, dp_list)
-        total_lists = c.fetchone()[0]
-
-        # Get total list items
-        df_li, dp_li = _date_filter('created_at', start_date, end_date)
-        query = 'SELECT COUNT(*) FROM list_items WHERE 1=1'
-        query += df_li
-        c.execute(query, dp_li)
-        total_list_items = c.fetchone()[0]
+        # Memories, reminders, lists and items created in range (daily rollups + today live)
+        created = created_counts(c, start_date, end_date)
+        total_memories = created['memories']
+        total_reminders = created['reminders']
+        total_lists = created['lists']
+        total_list_items = created['list_items']
 
         # Calculate avg items per list
         avg_items_per_list = round(total_list_items / total_lists, 2) if total_lists > 0 else 0
@@ -429,24 +396,18 @@ def get_cost_analytics(start_date=None, end_date=None):
         conn = get_db_connection()
         c = conn.cursor()
 
-        # Time period intervals
+        # Time period windows
         periods = {
-            'hour': '1 hour',
-            'day': '1 day',
-            'week': '7 days',
-            'month': '30 days'
+            'hour': timedelta(hours=1),
+            'day': timedelta(days=1),
+            'week': timedelta(days=7),
+            'month': timedelta(days=30)
         }
 
         # Get user counts by plan (distinguishing trial users)
-        user_query = '''
-            SELECT
-                CASE
-                    WHEN trial_end_date > NOW() AND premium_status IN ('premium', 'family')
-                        THEN 'trial'
-                    ELSE COALESCE(premium_status, 'free')
-                END as plan,
-                COUNT(*) as count
-            FROM users
+        user_query = f'''
+            SELECT {PLAN_SQL} as plan, COUNT(*) as count
+            FROM users u
             WHERE onboarding_complete = TRUE
         '''
         user_params = []
@@ -456,58 +417,25 @@ def get_cost_analytics(start_date=None, end_date=None):
         c.execute(user_query, user_params)
         user_counts = {row[0]: row[1] for row in c.fetchall()}
 
+        c.execute('SELECT LOCALTIMESTAMP')
+        now = c.fetchone()[0]
+
         results = {}
 
-        for period_name, interval in periods.items():
+        for period_name, window in periods.items():
             period_data = {}
 
-            # Build additional date filter for logs/api_usage
-            df_l, dp_l = _date_filter('l.created_at', start_date, end_date)
-            df_a, dp_a = _date_filter('a.created_at', start_date, end_date)
-
-            # Get SMS costs by plan (count messages from logs table)
-            sms_query = '''
-                SELECT
-                    CASE
-                        WHEN u.trial_end_date > NOW() AND u.premium_status IN ('premium', 'family')
-                            THEN 'trial'
-                        ELSE COALESCE(u.premium_status, 'free')
-                    END as plan,
-                    COUNT(*) as message_count
-                FROM logs l
-                JOIN users u ON l.phone_number = u.phone_number
-                WHERE l.created_at >= NOW() - %s::interval
-            '''
-            sms_params = [interval]
-            sms_query += df_l
-            sms_params.extend(dp_l)
-            sms_query += ' GROUP BY 1'
-            c.execute(sms_query, sms_params)
-            sms_by_plan = {row[0]: row[1] for row in c.fetchall()}
-
-            # Get AI costs by plan (from api_usage table)
-            ai_query = '''
-                SELECT
-                    CASE
-                        WHEN u.trial_end_date > NOW() AND u.premium_status IN ('premium', 'family')
-                            THEN 'trial'
-                        ELSE COALESCE(u.premium_status, 'free')
-                    END as plan,
-                    SUM(a.prompt_tokens) as prompt_tokens,
-                    SUM(a.completion_tokens) as completion_tokens
-                FROM api_usage a
-                JOIN users u ON a.phone_number = u.phone_number
-                WHERE a.created_at >= NOW() - %s::interval
-            '''
-            ai_params = [interval]
-            ai_query += df_a
-            ai_params.extend(dp_a)
-            ai_query += ' GROUP BY 1'
-            c.execute(ai_query, ai_params)
-            ai_by_plan = {row[0]: {'prompt': row[1] or 0, 'completion': row[2] or 0} for row in c.fetchall()}
+            # Messages (logs) and tokens (api_usage) by plan: hourly rollups plus live edges
+            window_start = now - window
+            if start_date and start_date > window_start:
+                window_start = start_date
+            usage = usage_by_plan(c, window_start, end_date)
+            sms_by_plan = {plan: u['messages'] for plan, u in usage.items()}
+            ai_by_plan = {plan: {'prompt': u['prompt_tokens'], 'completion': u['completion_tokens']}
+                          for plan, u in usage.items()}
 
             # Calculate costs for each plan tier (including trial)
-            for plan in ['free', 'trial', 'premium', 'family']:
+            for plan in PLANS:
                 message_count = sms_by_plan.get(plan, 0)
                 # Each interaction = 1 inbound + 1 outbound
                 sms_cost = message_count * 2 * SMS_COST_PER_MESSAGE
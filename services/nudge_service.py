@@ -27,7 +27,7 @@ def gather_user_data(phone_number: str, timezone_str: str) -> dict[str, Any]:
     """
     from models.memory import get_memories
     from models.reminder import get_pending_reminders, get_user_reminders
-    from models.list_model import get_lists, get_list_items
+    from models.list_model import get_lists_with_items
 
     user_tz = pytz.timezone(timezone_str)
     utc_now = datetime.now(pytz.UTC)
@@ -76,21 +76,16 @@ def gather_user_data(phone_number: str, timezone_str: str) -> dict[str, Any]:
                 })
 
     # Gather lists with items
-    lists = get_lists(phone_number)
-    for list_id, list_name, item_count, completed_count in lists:
-        items = get_list_items(list_id)
-        list_data = {
-            'name': list_name,
-            'total_items': item_count,
-            'completed_items': completed_count or 0,
-            'items': [],
-        }
-        for item_id, item_text, completed in items:
-            list_data['items'].append({
-                'text': item_text,
-                'completed': completed,
-            })
-        data['lists'].append(list_data)
+    for lst in get_lists_with_items(phone_number):
+        data['lists'].append({
+            'name': lst['list_name'],
+            'total_items': lst['item_count'],
+            'completed_items': lst['completed_count'],
+            'items': [
+                {'text': item['item_text'], 'completed': item['completed']}
+                for item in lst['items']
+            ],
+        })
 
     # Gather recently sent nudges (last 14 days for repetition prevention)
     data['recent_nudges'] = get_recent_nudges(phone_number, days=14)
@@ -0,0 +1,263 @@
+"""
+Reminder Scheduler
+Event-driven reminder firing: a hierarchical timing wheel preloaded with the
+next few minutes of reminders, kept current through LISTEN/NOTIFY.
+
+save_reminder, save_reminder_with_local_time, update_reminder_time and
+timezone recalculation NOTIFY on REMINDER_NOTIFY_CHANNEL. The scheduler times
+each reminder to the wheel tick, claims it by id when it fires, and hands the
+batch to send_reminder_batch. Anything it misses (NOTIFY dropped while
+reconnecting, scheduler down) is caught by the periodic window reload and by
+the Beat recovery sweep running the regular claim query.
+
+Run with: python scheduler.py
+"""
+
+import json
+import math
+import select
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Hashable, Optional
+
+import psycopg2
+import psycopg2.extensions
+
+from config import (
+    logger,
+    DATABASE_URL,
+    REMINDER_NOTIFY_CHANNEL,
+    REMINDER_SCHEDULER_TICK_SECONDS,
+    REMINDER_SCHEDULER_LOOKAHEAD_MINUTES,
+    REMINDER_SCHEDULER_REFILL_SECONDS,
+    REMINDER_BATCH_MAX_SIZE,
+)
+from models.reminder import claim_reminders_by_ids, get_upcoming_reminders
+
+
+class TimingWheel:
+    """Hierarchical timing wheel.
+
+    Level 0 has `slots` buckets of one tick each; every higher level covers
+    `slots` times the span of the one below. Entries are cascaded down a level
+    when the wheel reaches their bucket, so scheduling, cancelling and firing
+    are O(1) per entry regardless of how many are pending.
+    """
+
+    def __init__(self, tick_seconds: float, slots: int = 64, levels: int = 3, start: Optional[float] = None):
+        self.tick_seconds = tick_seconds
+        self.slots = slots
+        self.levels = levels
+        self._current = int((time.time() if start is None else start) // tick_seconds)
+        self._wheels: list[list[dict[Hashable, int]]] = [
+            [{} for _ in range(slots)] for _ in range(levels)
+        ]
+        self._ready: dict[Hashable, int] = {}
+        # key -> (level, slot), or None when sitting in _ready
+        self._index: dict[Hashable, Optional[tuple[int, int]]] = {}
+
+    @property
+    def horizon_seconds(self) -> float:
+        """How far ahead of the current tick entries can be scheduled."""
+        return (self.slots ** self.levels) * self.tick_seconds
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._index
+
+    def schedule(self, key: Hashable, when: float) -> bool:
+        """Schedule (or reschedule) key to fire at epoch time `when`.
+
+        Returns False if `when` is beyond the horizon (the entry is dropped).
+        """
+        self.cancel(key)
+        # Round up so an entry never fires before its time
+        return self._insert(key, math.ceil(when / self.tick_seconds))
+
+    def cancel(self, key: Hashable) -> bool:
+        """Remove key if scheduled. Returns True if it was."""
+        if key not in self._index:
+            return False
+        location = self._index.pop(key)
+        if location is None:
+            del self._ready[key]
+        else:
+            level, slot = location
+            del self._wheels[level][slot][key]
+        return True
+
+    def advance(self, now: Optional[float] = None) -> list[Hashable]:
+        """Move the wheel up to `now` and return every key that came due."""
+        target = int((time.time() if now is None else now) // self.tick_seconds)
+        while self._current < target:
+            self._current += 1
+            self._cascade()
+            bucket = self._wheels[0][self._current % self.slots]
+            for key, due in list(bucket.items()):
+                if due <= self._current:
+                    del bucket[key]
+                    self._index[key] = None
+                    self._ready[key] = due
+
+        fired = list(self._ready)
+        for key in fired:
+            del self._index[key]
+        self._ready.clear()
+        return fired
+
+    def _insert(self, key: Hashable, due: int) -> bool:
+        delta = due - self._current
+        if delta <= 0:
+            self._ready[key] = due
+            self._index[key] = None
+            return True
+        for level in range(self.levels):
+            if delta < self.slots ** (level + 1):
+                slot = (due // self.slots ** level) % self.slots
+                self._wheels[level][slot][key] = due
+                self._index[key] = (level, slot)
+                return True
+        return False
+
+    def _cascade(self) -> None:
+        """Redistribute higher-level buckets whose span starts at the current tick."""
+        for level in range(self.levels - 1, 0, -1):
+            span = self.slots ** level
+            if self._current % span:
+                continue
+            slot = (self._current // span) % self.slots
+            bucket = self._wheels[level][slot]
+            self._wheels[level][slot] = {}
+            for key, due in bucket.items():
+                del self._index[key]
+                self._insert(key, due)
+
+
+def _to_epoch(reminder_date: Any) -> float:
+    """reminder_date is a naive UTC TIMESTAMP (datetime, or ISO string from a NOTIFY payload)."""
+    if isinstance(reminder_date, str):
+        reminder_date = datetime.fromisoformat(reminder_date)
+    return reminder_date.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _dispatch_to_batch_task(reminders: list[dict[str, Any]]) -> None:
+    from tasks.reminder_tasks import send_reminder_batch
+    result = send_reminder_batch.delay(reminders=reminders)
+    logger.info(f"[SCHEDULER] {len(reminders)} reminders queued with task_id={result.id}")
+
+
+class ReminderScheduler:
+    """Fires reminders from a timing wheel instead of polling the reminders table."""
+
+    def __init__(
+        self,
+        dispatch: Optional[Callable[[list[dict[str, Any]]], None]] = None,
+        lookahead_minutes: int = REMINDER_SCHEDULER_LOOKAHEAD_MINUTES,
+        refill_seconds: float = REMINDER_SCHEDULER_REFILL_SECONDS,
+        tick_seconds: float = REMINDER_SCHEDULER_TICK_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.dispatch = dispatch or _dispatch_to_batch_task
+        self.lookahead_seconds = lookahead_minutes * 60
+        self.refill_seconds = refill_seconds
+        self.clock = clock
+        self.wheel = TimingWheel(tick_seconds, start=clock())
+        if self.wheel.horizon_seconds < self.lookahead_seconds:
+            raise ValueError("Timing wheel horizon is shorter than the lookahead window")
+        self._next_refill = 0.0
+        self._listen_conn = None
+
+    def schedule(self, reminder_id: int, reminder_date: Any) -> None:
+        """Time a reminder, or drop it if it was moved past the lookahead window."""
+        when = _to_epoch(reminder_date)
+        if when - self.clock() > self.lookahead_seconds:
+            # Picked up again by a later refill once it's inside the window
+            self.wheel.cancel(reminder_id)
+        else:
+            self.wheel.schedule(reminder_id, when)
+
+    def refill(self) -> int:
+        """Load every unclaimed reminder due within the lookahead window (overdue ones fire next tick)."""
+        rows = get_upcoming_reminders(self.lookahead_seconds // 60)
+        for reminder_id, reminder_date in rows:
+            self.schedule(reminder_id, reminder_date)
+        self._next_refill = self.clock() + self.refill_seconds
+        logger.debug(f"[SCHEDULER] Refilled {len(rows)} reminders ({len(self.wheel)} in wheel)")
+        return len(rows)
+
+    def handle_notify(self, payload: str) -> None:
+        """Apply a NOTIFY payload from _notify_reminder_scheduled."""
+        try:
+            data = json.loads(payload)
+            self.schedule(int(data["id"]), data["reminder_date"])
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"[SCHEDULER] Ignoring malformed notification {payload!r}: {e}")
+
+    def fire_due(self) -> int:
+        """Claim and dispatch everything the wheel says is due. Returns the number dispatched."""
+        due_ids = self.wheel.advance(self.clock())
+        if not due_ids:
+            return 0
+        # Claims skip anything already sent, claimed elsewhere, or snoozed since
+        reminders = claim_reminders_by_ids(due_ids)
+        dispatched = 0
+        # Split a :00 spike into REMINDER_BATCH_MAX_SIZE batches, like the Beat dispatcher,
+        # so one task isn't left with more than it can send before its deadline
+        for start in range(0, len(reminders), REMINDER_BATCH_MAX_SIZE):
+            batch = reminders[start:start + REMINDER_BATCH_MAX_SIZE]
+            try:
+                self.dispatch(batch)
+            except Exception as e:
+                # Claims go stale after 5 minutes and the refill picks them up again
+                logger.exception(f"[SCHEDULER] Dispatch failed for {len(batch)} reminders: {e}")
+                continue
+            dispatched += len(batch)
+        return dispatched
+
+    def _connect_listener(self) -> None:
+        conn = psycopg2.connect(DATABASE_URL)
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        conn.cursor().execute(f"LISTEN {REMINDER_NOTIFY_CHANNEL}")
+        self._listen_conn = conn
+        logger.info(f"[SCHEDULER] Listening on {REMINDER_NOTIFY_CHANNEL}")
+
+    def _close_listener(self) -> None:
+        if self._listen_conn is not None:
+            try:
+                self._listen_conn.close()
+            except Exception:
+                pass
+            self._listen_conn = None
+
+    def poll_notifications(self, timeout: float) -> int:
+        """Wait up to `timeout` seconds for NOTIFYs and apply them."""
+        if select.select([self._listen_conn], [], [], timeout) == ([], [], []):
+            return 0
+        self._listen_conn.poll()
+        count = 0
+        while self._listen_conn.notifies:
+            self.handle_notify(self._listen_conn.notifies.pop(0).payload)
+            count += 1
+        return count
+
+    def run_forever(self) -> None:
+        """Main loop: wait for notifications until the next tick, fire, refill on schedule."""
+        while True:
+            try:
+                if self._listen_conn is None:
+                    # LISTEN before loading so nothing created in between is missed
+                    self._connect_listener()
+                    self.refill()
+
+                now = self.clock()
+                next_tick = (math.floor(now / self.wheel.tick_seconds) + 1) * self.wheel.tick_seconds
+                self.poll_notifications(max(0.0, next_tick - now))
+                self.fire_due()
+                if self.clock() >= self._next_refill:
+                    self.refill()
+            except psycopg2.Error as e:
+                logger.error(f"[SCHEDULER] Listener connection lost, reconnecting: {e}")
+                self._close_listener()
+                time.sleep(1)
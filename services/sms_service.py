@@ -4,8 +4,10 @@ Handles sending SMS messages via Twilio
 """
 
 import os
+from requests.adapters import HTTPAdapter
 from twilio.rest import Client
-from config import TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER, logger
+from twilio.http.http_client import TwilioHttpClient
+from config import TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER, REMINDER_SEND_CONCURRENCY, logger
 
 # Safety check: Detect test environment
 _ENVIRONMENT = os.environ.get("ENVIRONMENT", "production").lower()
@@ -18,7 +20,11 @@ if _IS_TEST_ENV:
     twilio_client = None
     logger.warning("SMS Service: Running in TEST mode - Twilio client NOT initialized")
 else:
-    twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+    # One pooled HTTP session shared by every send; sized so batched reminder
+    # delivery can keep REMINDER_SEND_CONCURRENCY requests in flight at once
+    _http_client = TwilioHttpClient(pool_connections=True)
+    _http_client.session.mount("https://", HTTPAdapter(pool_maxsize=max(REMINDER_SEND_CONCURRENCY, 10)))
+    twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, http_client=_http_client)
 
 
 def send_sms(to_number, message, media_url=None):
@@ -5,8 +5,11 @@ Handles subscription tier checks and limit enforcement
 
 from datetime import datetime, timedelta
 from database import get_db_connection, return_db_connection
+from models.user_context import get_user_context
+from models.usage import get_usage
+from utils.db_helpers import execute_with_phone_lookup
 from config import (
-    logger, ENCRYPTION_ENABLED, BETA_MODE,
+    logger, BETA_MODE,
     TIER_FREE, TIER_PREMIUM, TIER_FAMILY,
     TIER_LIMITS, get_tier_limits
 )
@@ -19,29 +22,15 @@ def get_user_tier(phone_number: str) -> str:
     """
     conn = None
     try:
-        conn = get_db_connection()
-        c = conn.cursor()
-
-        if ENCRYPTION_ENABLED:
-            from utils.encryption import hash_phone
-            phone_hash = hash_phone(phone_number)
-            c.execute(
-                'SELECT premium_status, trial_end_date FROM users WHERE phone_hash = %s',
-                (phone_hash,)
-            )
-            result = c.fetchone()
-            if not result:
-                c.execute(
-                    'SELECT premium_status, trial_end_date FROM users WHERE phone_number = %s',
-                    (phone_number,)
-                )
-                result = c.fetchone()
+        ctx = get_user_context(phone_number)
+        if ctx is not None:
+            result = (ctx.get('premium_status'), ctx.get('trial_end_date')) if ctx.exists else None
         else:
-            c.execute(
-                'SELECT premium_status, trial_end_date FROM users WHERE phone_number = %s',
-                (phone_number,)
+            conn = get_db_connection()
+            c = conn.cursor()
+            result = execute_with_phone_lookup(
+                c, 'SELECT premium_status, trial_end_date FROM users WHERE {phone_condition}', phone_number
             )
-            result = c.fetchone()
 
         if result:
             premium_status, trial_end_date = result[0], result[1]
@@ -74,29 +63,15 @@ def get_trial_info(phone_number: str) -> dict:
     """
     conn = None
     try:
-        conn = get_db_connection()
-        c = conn.cursor()
-
-        if ENCRYPTION_ENABLED:
-            from utils.encryption import hash_phone
-            phone_hash = hash_phone(phone_number)
-            c.execute(
-                'SELECT trial_end_date FROM users WHERE phone_hash = %s',
-                (phone_hash,)
-            )
-            result = c.fetchone()
-            if not result:
-                c.execute(
-                    'SELECT trial_end_date FROM users WHERE phone_number = %s',
-                    (phone_number,)
-                )
-                result = c.fetchone()
+        ctx = get_user_context(phone_number)
+        if ctx is not None:
+            result = (ctx.get('trial_end_date'),) if ctx.exists else None
         else:
-            c.execute(
-                'SELECT trial_end_date FROM users WHERE phone_number = %s',
-                (phone_number,)
+            conn = get_db_connection()
+            c = conn.cursor()
+            result = execute_with_phone_lookup(
+                c, 'SELECT trial_end_date FROM users WHERE {phone_condition}', phone_number
             )
-            result = c.fetchone()
 
         if result and result[0]:
             trial_end = result[0]
@@ -120,103 +95,17 @@ def get_trial_info(phone_number: str) -> dict:
 
 def get_memory_count(phone_number: str) -> int:
     """Get count of user's memories."""
-    conn = None
-    try:
-        conn = get_db_connection()
-        c = conn.cursor()
-
-        if ENCRYPTION_ENABLED:
-            from utils.encryption import hash_phone
-            phone_hash = hash_phone(phone_number)
-            c.execute(
-                'SELECT COUNT(*) FROM memories WHERE phone_hash = %s OR phone_number = %s',
-                (phone_hash, phone_number)
-            )
-        else:
-            c.execute(
-                'SELECT COUNT(*) FROM memories WHERE phone_number = %s',
-                (phone_number,)
-            )
-
-        result = c.fetchone()
-        return result[0] if result else 0
-    except Exception as e:
-        logger.error(f"Error getting memory count: {e}")
-        return 0
-    finally:
-        if conn:
-            return_db_connection(conn)
+    return get_usage(phone_number)['memories']
 
 
 def get_reminders_created_today(phone_number: str) -> int:
-    """Get count of reminders created today by this user."""
-    conn = None
-    try:
-        conn = get_db_connection()
-        c = conn.cursor()
-
-        # Get start of today (UTC)
-        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-
-        if ENCRYPTION_ENABLED:
-            from utils.encryption import hash_phone
-            phone_hash = hash_phone(phone_number)
-            c.execute(
-                '''SELECT COUNT(*) FROM reminders
-                   WHERE (phone_hash = %s OR phone_number = %s)
-                   AND created_at >= %s
-                   AND (snoozed IS NOT TRUE)''',
-                (phone_hash, phone_number, today_start)
-            )
-        else:
-            c.execute(
-                '''SELECT COUNT(*) FROM reminders
-                   WHERE phone_number = %s AND created_at >= %s
-                   AND (snoozed IS NOT TRUE)''',
-                (phone_number, today_start)
-            )
-
-        result = c.fetchone()
-        return result[0] if result else 0
-    except Exception as e:
-        logger.error(f"Error getting today's reminder count: {e}")
-        return 0
-    finally:
-        if conn:
-            return_db_connection(conn)
+    """Get count of reminders created today (UTC) by this user, excluding snoozed ones."""
+    return get_usage(phone_number)['reminders_today']
 
 
 def get_recurring_reminder_count(phone_number: str) -> int:
     """Get count of active recurring reminders for user."""
-    conn = None
-    try:
-        conn = get_db_connection()
-        c = conn.cursor()
-
-        if ENCRYPTION_ENABLED:
-            from utils.encryption import hash_phone
-            phone_hash = hash_phone(phone_number)
-            c.execute(
-                '''SELECT COUNT(*) FROM recurring_reminders
-                   WHERE (phone_hash = %s OR phone_number = %s)
-                   AND is_active = TRUE''',
-                (phone_hash, phone_number)
-            )
-        else:
-            c.execute(
-                '''SELECT COUNT(*) FROM recurring_reminders
-                   WHERE phone_number = %s AND is_active = TRUE''',
-                (phone_number,)
-            )
-
-        result = c.fetchone()
-        return result[0] if result else 0
-    except Exception as e:
-        logger.error(f"Error getting recurring reminder count: {e}")
-        return 0
-    finally:
-        if conn:
-            return_db_connection(conn)
+    return get_usage(phone_number)['recurring_active']
 
 
 # =====================================================
@@ -0,0 +1,45 @@
+"""
+Broadcast Tasks
+Celery tasks for the broadcast engine (services/broadcast_service.py):
+one task per recipient chunk, plus a periodic resume of stalled broadcasts.
+"""
+
+from celery_app import celery_app
+from config import logger
+
+
+@celery_app.task(
+    bind=True,
+    max_retries=3,
+    default_retry_delay=30,
+    acks_late=True,
+    time_limit=3600,
+    soft_time_limit=3540,
+)
+def send_broadcast_chunk(self, broadcast_id: int, chunk: int):
+    """
+    Send the pending recipients of one broadcast chunk.
+
+    Safe to run more than once for the same chunk: recipients are claimed
+    one at a time, so a redelivered or retried task only sends what's left.
+    """
+    from services.broadcast_service import send_chunk
+    try:
+        return send_chunk(broadcast_id, chunk)
+    except Exception as exc:
+        logger.exception(f"Error sending broadcast {broadcast_id} chunk {chunk}")
+        raise self.retry(exc=exc)
+
+
+@celery_app.task(time_limit=300, soft_time_limit=270)
+def resume_stalled_broadcasts_task():
+    """
+    Re-queue broadcasts with no progress for BROADCAST_STALL_SECONDS.
+    Runs every 5 minutes via Beat.
+    """
+    from services.broadcast_service import resume_stalled_broadcasts
+    try:
+        return resume_stalled_broadcasts()
+    except Exception:
+        logger.exception("Error resuming stalled broadcasts")
+        raise
@@ -4,14 +4,31 @@ Implements atomic reminder claiming with SELECT FOR UPDATE SKIP LOCKED.
 """
 
 import os
+import random
+import time
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from celery import shared_task
 from celery.utils.log import get_task_logger
 from psycopg2 import sql
 
 from celery_app import celery_app
+from config import (
+    REMINDER_DISPATCH_MODE,
+    REMINDER_BATCH_MIN_SIZE,
+    REMINDER_BATCH_MAX_SIZE,
+    REMINDER_MAX_BATCHES_PER_TICK,
+    REMINDER_SEND_CONCURRENCY,
+    REMINDER_BATCH_SEND_DEADLINE,
+)
 from models.reminder import (
     claim_due_reminders,
+    count_due_reminders,
+    mark_reminders_sent_bulk,
+    release_reminder_claims,
+    renew_reminder_claims,
+    update_last_sent_reminders_bulk,
+    materialize_recurring_occurrences,
     mark_reminder_sent,
     update_last_sent_reminder,
     release_stale_claims,
@@ -21,6 +38,7 @@ from models.reminder import (
     check_reminder_exists_for_recurring,
     update_recurring_reminder_generated,
 )
+from models.prompt_context import notify_prompt_context_changed, REMINDERS
 from services.sms_service import send_sms
 from services.metrics_service import track_reminder_delivery
 
@@ -42,7 +60,14 @@ def check_and_send_reminders(self):
 
     This task runs every 30 seconds via Celery Beat.
     Each invocation claims a batch of reminders atomically.
+
+    In 'batch' mode (REMINDER_DISPATCH_MODE) the backlog is claimed in
+    adaptively sized batches, each delivered by one send_reminder_batch task.
+    In 'single' mode one send_single_reminder task is queued per reminder.
     """
+    if REMINDER_DISPATCH_MODE == "batch":
+        return _dispatch_reminder_batches(self)
+
     try:
         # Claim up to 10 reminders atomically
         reminders = claim_due_reminders(batch_size=10)
@@ -73,6 +98,210 @@ def check_and_send_reminders(self):
         raise self.retry(exc=exc)
 
 
+def compute_reminder_batch_size(backlog: int) -> int:
+    """Size the next claim from backlog depth.
+
+    Quiet periods claim REMINDER_BATCH_MIN_SIZE; spikes (e.g. :00 and :30)
+    grow the batch up to REMINDER_BATCH_MAX_SIZE so one task can drain them.
+    """
+    return max(REMINDER_BATCH_MIN_SIZE, min(backlog, REMINDER_BATCH_MAX_SIZE))
+
+
+def _dispatch_reminder_batches(task):
+    """Claim the due backlog in batches and queue one send_reminder_batch task per batch."""
+    try:
+        backlog = count_due_reminders()
+        if not backlog:
+            logger.debug("No due reminders found")
+            return {"processed": 0, "batches": 0}
+
+        batch_size = compute_reminder_batch_size(backlog)
+        processed = 0
+        batches = 0
+        while batches < REMINDER_MAX_BATCHES_PER_TICK and processed < backlog:
+            reminders = claim_due_reminders(batch_size=batch_size)
+            if not reminders:
+                break
+            try:
+                result = send_reminder_batch.delay(reminders=reminders)
+                logger.info(f"[DISPATCH SUCCESS] batch of {len(reminders)} reminders queued with task_id={result.id}")
+            except Exception as dispatch_err:
+                # Claims expire after 5 minutes, so these get picked up again
+                logger.exception(f"[DISPATCH FAILED] batch of {len(reminders)} reminders: {dispatch_err}")
+            processed += len(reminders)
+            batches += 1
+            if len(reminders) < batch_size:
+                break
+
+        logger.info(f"Claimed {processed} of {backlog} due reminders in {batches} batches (size {batch_size})")
+        return {"processed": processed, "batches": batches}
+
+    except Exception as exc:
+        logger.exception("Error in check_and_send_reminders (batch mode)")
+        raise task.retry(exc=exc)
+
+
+def format_reminder_message(reminder_text: str) -> str:
+    """Format reminder SMS with friendly opener and snooze option"""
+    openers = [
+        "Hey, just a heads up",
+        "Quick reminder",
+        "Don't forget",
+        "Friendly reminder",
+    ]
+    opener = random.choice(openers)
+    return f"{opener} — {reminder_text}\n\n(Reply SNOOZE to snooze 15 min)"
+
+
+def _claims_by_token(reminders):
+    """Group reminder ids by the claimed_at token they were claimed with"""
+    claims = {}
+    for reminder in reminders:
+        claims.setdefault(reminder.get("claimed_at"), []).append(reminder["id"])
+    return claims
+
+
+def _mark_sent(sent_ids):
+    """Record sent flags in one statement. The SMS already went out,
+    so retry the UPDATE (fresh connection), never the send."""
+    for attempt in range(2):
+        try:
+            mark_reminders_sent_bulk(sent_ids)
+            return
+        except Exception as e:
+            if attempt == 0:
+                logger.warning(f"Bulk mark sent failed, retrying: {e}")
+            else:
+                logger.critical(f"[CRITICAL] {len(sent_ids)} reminders sent but could not be marked as sent: {sent_ids}")
+
+
+def deliver_reminder_batch(reminders, send_fn=None, concurrency=None, deadline_seconds=None):
+    """
+    Send a claimed batch of reminders concurrently and record results in bulk.
+
+    Exactly-once rules (same guarantees as send_single_reminder):
+    - Each wave renews its claims right before sending (renew_reminder_claims).
+      Only reminders still holding this batch's claim token go out, so a batch
+      that started after its claims went stale and were re-claimed sends
+      nothing, and anything deleted or already sent is skipped.
+    - Sent flags are written with one bulk UPDATE per wave, retried on a fresh
+      connection if it fails. A successful send is never retried.
+    - Sends stop at the deadline, inside the task's time limit; the
+      unattempted rest is released for the next tick.
+    - Failed sends keep their claim and are retried once it goes stale.
+
+    Returns:
+        dict with sent/failed/skipped/released counts
+    """
+    send_fn = send_fn or send_sms
+    concurrency = concurrency or REMINDER_SEND_CONCURRENCY
+    deadline = time.monotonic() + (deadline_seconds or REMINDER_BATCH_SEND_DEADLINE)
+
+    sent_ids = []
+    failed = {}
+    skipped = 0
+    last_sent = {}
+    unattempted = []
+
+    def _send(reminder):
+        send_fn(reminder["phone_number"], format_reminder_message(reminder["reminder_text"]))
+        return reminder
+
+    # Work in waves so each claim is renewed just before its send and the deadline is honored
+    wave_size = concurrency * 4
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for start in range(0, len(reminders), wave_size):
+            wave = reminders[start:start + wave_size]
+            if time.monotonic() > deadline:
+                unattempted.extend(reminders[start:])
+                break
+
+            try:
+                owned_ids = set()
+                for claimed_at, ids in _claims_by_token(wave).items():
+                    owned_ids |= renew_reminder_claims(ids, claimed_at)
+            except Exception as e:
+                logger.error(f"Could not verify reminder batch before sending, deferring {len(wave)}: {e}")
+                unattempted.extend(wave)
+                continue
+
+            futures = {}
+            for reminder in wave:
+                if reminder["id"] not in owned_ids:
+                    skipped += 1
+                    continue
+                if not reminder.get("phone_number"):
+                    logger.error(f"[INVALID INPUT] reminder_id={reminder['id']} has no phone_number!")
+                    skipped += 1
+                    continue
+                futures[pool.submit(_send, reminder)] = reminder
+
+            wave_sent = []
+            for future in as_completed(futures):
+                reminder = futures[future]
+                try:
+                    future.result()
+                    wave_sent.append(reminder["id"])
+                    last_sent[reminder["phone_number"]] = max(reminder["id"], last_sent.get(reminder["phone_number"], 0))
+                except Exception as exc:
+                    logger.error(f"Error sending SMS for reminder {reminder['id']}: {exc}")
+                    failed[reminder["id"]] = str(exc)
+
+            if wave_sent:
+                _mark_sent(wave_sent)
+                sent_ids.extend(wave_sent)
+
+    # Renewed claims no longer match the token, so only unattempted ones are released
+    released = sum(
+        release_reminder_claims(ids, claimed_at)
+        for claimed_at, ids in _claims_by_token(unattempted).items()
+    )
+
+    # Nice-to-have bookkeeping, don't fail the batch over it
+    try:
+        update_last_sent_reminders_bulk(last_sent)
+    except Exception as e:
+        logger.error(f"Failed to update last_sent_reminder for batch: {e}")
+    outcomes = [(reminder_id, "sent", None) for reminder_id in sent_ids]
+    outcomes += [(reminder_id, "failed", error) for reminder_id, error in failed.items()]
+    for reminder_id, status, error in outcomes:
+        try:
+            track_reminder_delivery(reminder_id, status, error)
+        except Exception as e:
+            logger.error(f"Failed to track delivery metrics: {e}")
+
+    return {
+        "sent": len(sent_ids),
+        "failed": len(failed),
+        "skipped": skipped,
+        "released": released,
+    }
+
+
+@celery_app.task(
+    bind=True,
+    acks_late=True,
+    time_limit=270,
+    soft_time_limit=240,
+)
+def send_reminder_batch(self, reminders):
+    """
+    Deliver a batch of claimed reminders (batch dispatch mode).
+    See deliver_reminder_batch for the exactly-once rules.
+
+    The time limit stays under the 5-minute claim lease, so a wave's renewed
+    claims can't go stale and be re-claimed while it is still sending.
+
+    Not retried as a whole: a retry would resend the reminders that already
+    went out. Failed and unattempted reminders are picked up again by
+    check_and_send_reminders once their claims are released or go stale.
+    """
+    logger.info(f"[TASK START] send_reminder_batch received {len(reminders)} reminders")
+    result = deliver_reminder_batch(reminders)
+    logger.info(f"[TASK COMPLETE] send_reminder_batch: {result}")
+    return result
+
+
 @celery_app.task(
     bind=True,
     max_retries=3,
@@ -136,15 +365,7 @@ def send_single_reminder(self, reminder_id: int, phone_number: str, reminder_tex
             logger.info(f"Sending reminder {reminder_id} to {phone_number}")
 
             # Format message with friendly opener and snooze option
-            import random
-            openers = [
-                "Hey, just a heads up",
-                "Quick reminder",
-                "Don't forget",
-                "Friendly reminder",
-            ]
-            opener = random.choice(openers)
-            message = f"{opener} — {reminder_text}\n\n(Reply SNOOZE to snooze 15 min)"
+            message = format_reminder_message(reminder_text)
 
             # Send SMS via Twilio
             send_sms(phone_number, message)
@@ -161,6 +382,7 @@ def send_single_reminder(self, reminder_id: int, phone_number: str, reminder_tex
         # are committed atomically, preventing duplicate sends on mark failure.
         try:
             c.execute('UPDATE reminders SET sent = TRUE WHERE id = %s', (reminder_id,))
+            notify_prompt_context_changed(c, [phone_number], REMINDERS)
             conn.commit()  # Atomic: releases lock AND marks sent in one commit
             logger.info(f"[VERIFIED] Reminder {reminder_id} marked as sent and lock released")
         except Exception as e:
@@ -177,6 +399,7 @@ def send_single_reminder(self, reminder_id: int, phone_number: str, reminder_tex
                 mark_conn = get_fresh_conn()
                 mark_cursor = mark_conn.cursor()
                 mark_cursor.execute('UPDATE reminders SET sent = TRUE WHERE id = %s', (reminder_id,))
+                notify_prompt_context_changed(mark_cursor, [phone_number], REMINDERS)
                 mark_conn.commit()
                 logger.info(f"[FALLBACK] Marked reminder {reminder_id} as sent via fresh connection")
             except Exception as fallback_err:
@@ -235,6 +458,38 @@ def release_stale_claims_task():
         raise
 
 
+@celery_app.task(time_limit=600, soft_time_limit=540)
+def reconcile_usage_counters_task():
+    """
+    Recount user_usage and lists.item_count from the source tables.
+
+    The counters are kept in step by the models' write paths; this repairs
+    drift from writes that bypass them. Runs nightly via Beat.
+    """
+    from models.usage import reconcile_usage
+    try:
+        return reconcile_usage()
+    except Exception:
+        logger.exception("Error reconciling usage counters")
+        raise
+
+
+@celery_app.task(time_limit=600, soft_time_limit=540)
+def rollup_metrics_task(rebuild_daily=False):
+    """
+    Advance the hourly usage and daily count rollups read by the dashboard metrics.
+
+    Runs every 5 minutes via Beat; a nightly run with rebuild_daily=True
+    recounts every day so deletes show up in the daily counts.
+    """
+    from services.metrics_rollup import rollup_metrics
+    try:
+        return rollup_metrics(rebuild_daily=rebuild_daily)
+    except Exception:
+        logger.exception("Error rolling up metrics")
+        raise
+
+
 @celery_app.task(time_limit=600, soft_time_limit=540)
 def analyze_conversations_task():
     """
@@ -243,7 +498,7 @@ def analyze_conversations_task():
     """
     try:
         from services.conversation_analyzer import analyze_recent_conversations
-        result = analyze_recent_conversations(batch_size=50)
+        result = analyze_recent_conversations()
         logger.info(f"Conversation analysis complete: {result}")
         return result
     except Exception as exc:
@@ -370,6 +625,81 @@ def generate_first_occurrence(recurring_id):
         return None
 
 
+def compute_recurring_occurrences(recurring_list, hours_ahead=24, utc_now=None):
+    """
+    Compute every occurrence of the given recurring patterns within the horizon.
+
+    Work is shared across patterns: local "now" is computed once per timezone,
+    candidate days once per (timezone, time), and the recurrence check once
+    per (recurrence_type, recurrence_day, day).
+
+    Args:
+        recurring_list: dicts from get_all_active_recurring_reminders()
+        hours_ahead: Horizon in hours
+        utc_now: Aware UTC datetime to compute from (defaults to now)
+
+    Returns:
+        List of occurrence dicts for materialize_recurring_occurrences()
+    """
+    import pytz
+    from datetime import datetime, timedelta
+
+    utc_now = utc_now or datetime.now(pytz.UTC)
+
+    local_now_by_tz = {}
+    candidates_by_slot = {}
+    trigger_cache = {}
+    occurrences = []
+
+    for recurring in recurring_list:
+        try:
+            time_str = recurring['reminder_time']
+            time_parts = time_str.split(':')
+            hour = int(time_parts[0])
+            minute = int(time_parts[1])
+            tz_name = recurring['timezone']
+
+            slot = (tz_name, hour, minute)
+            if slot not in candidates_by_slot:
+                if tz_name not in local_now_by_tz:
+                    local_now_by_tz[tz_name] = utc_now.astimezone(pytz.timezone(tz_name))
+                now = local_now_by_tz[tz_name]
+                end_time = now + timedelta(hours=hours_ahead)
+
+                # Start checking from now; if time already passed today, start from tomorrow
+                check_date = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+                if check_date <= now:
+                    check_date = check_date + timedelta(days=1)
+
+                candidates = []
+                while check_date <= end_time:
+                    # UTC (naive) is what's stored in the DB
+                    candidates.append((check_date, check_date.astimezone(pytz.UTC).replace(tzinfo=None)))
+                    check_date = check_date + timedelta(days=1)
+                candidates_by_slot[slot] = candidates
+
+            for local_dt, utc_dt in candidates_by_slot[slot]:
+                key = (recurring['recurrence_type'], recurring['recurrence_day'], local_dt.date())
+                if key not in trigger_cache:
+                    trigger_cache[key] = should_trigger_on_date(
+                        recurring['recurrence_type'], recurring['recurrence_day'], local_dt
+                    )
+                if trigger_cache[key]:
+                    occurrences.append({
+                        'recurring_id': recurring['id'],
+                        'phone_number': recurring['phone_number'],
+                        'reminder_text': recurring['reminder_text'],
+                        'reminder_date': utc_dt,
+                        'local_time': time_str,
+                        'timezone': tz_name,
+                    })
+        except Exception as e:
+            logger.error(f"Error processing recurring {recurring['id']}: {e}")
+            continue
+
+    return occurrences
+
+
 @celery_app.task(time_limit=300, soft_time_limit=270)
 def generate_recurring_reminders():
     """
@@ -377,12 +707,13 @@ def generate_recurring_reminders():
     Runs hourly via Celery Beat.
     Creates reminders for the next 24 hours.
 
+    Occurrences are computed in memory and written with one
+    INSERT ... ON CONFLICT DO NOTHING (existing ones are skipped),
+    so the cost no longer grows by three connections per occurrence.
+
     Returns:
         dict with count of generated reminders
     """
-    import pytz
-    from datetime import datetime, timedelta
-
     try:
         recurring_list = get_all_active_recurring_reminders()
 
@@ -392,65 +723,8 @@ def generate_recurring_reminders():
 
         logger.info(f"Processing {len(recurring_list)} active recurring reminders")
 
-        generated_count = 0
-        hours_ahead = 24  # Generate reminders for next 24 hours
-
-        for recurring in recurring_list:
-            try:
-                recurring_id = recurring['id']
-
-                # Parse time
-                time_str = recurring['reminder_time']
-                time_parts = time_str.split(':')
-                hour = int(time_parts[0])
-                minute = int(time_parts[1].split(':')[0]) if ':' in time_parts[1] else int(time_parts[1])
-
-                # Get user's timezone
-                user_tz = pytz.timezone(recurring['timezone'])
-                now = datetime.now(user_tz)
-                end_time = now + timedelta(hours=hours_ahead)
-
-                # Start checking from now
-                check_date = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
-
-                # If time already passed today, start from tomorrow
-                if check_date <= now:
-                    check_date = check_date + timedelta(days=1)
-
-                # Check each day in the window
-                while check_date <= end_time:
-                    if should_trigger_on_date(
-                        recurring['recurrence_type'],
-                        recurring['recurrence_day'],
-                        check_date
-                    ):
-                        # Convert to UTC FIRST (must match what's stored in DB)
-                        utc_dt = check_date.astimezone(pytz.UTC)
-
-                        # Check if reminder already exists for this date (using UTC date to match DB)
-                        if not check_reminder_exists_for_recurring(recurring_id, utc_dt.date()):
-                            # Create the reminder
-                            reminder_id = save_reminder_with_local_time(
-                                phone_number=recurring['phone_number'],
-                                reminder_text=recurring['reminder_text'],
-                                reminder_date=utc_dt.strftime('%Y-%m-%d %H:%M:%S'),
-                                local_time=time_str,
-                                timezone=recurring['timezone'],
-                                recurring_id=recurring_id
-                            )
-
-                            if reminder_id:
-                                logger.info(f"Generated reminder {reminder_id} for recurring {recurring_id} at {utc_dt}")
-                                generated_count += 1
-
-                                # Update next occurrence
-                                update_recurring_reminder_generated(recurring_id, utc_dt.date(), utc_dt)
-
-                    check_date = check_date + timedelta(days=1)
-
-            except Exception as e:
-                logger.error(f"Error processing recurring {recurring['id']}: {e}")
-                continue
+        occurrences = compute_recurring_occurrences(recurring_list, hours_ahead=24)
+        generated_count = materialize_recurring_occurrences(occurrences)
 
         logger.info(f"Generated {generated_count} reminders from recurring patterns")
         return {"generated": generated_count}
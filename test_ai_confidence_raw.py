@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 """Test to see raw AI confidence scores"""
 
+import asyncio
 import sys
 sys.stdout.reconfigure(encoding='utf-8')
 
@@ -26,20 +27,26 @@ context = {
     'timezone': 'America/Los_Angeles'
 }
 
-for msg in test_messages:
-    print(f"\nInput: '{msg}'")
-    print("-"*40)
 
-    response = process_with_ai(msg, phone, context)
+async def main():
+    # One event loop for every message: the shared async client's connections belong to it
+    for msg in test_messages:
+        print(f"\nInput: '{msg}'")
+        print("-"*40)
 
-    print(f"Action: {response.get('action')}")
-    print(f"Confidence: {response.get('confidence', 'NOT RETURNED')}")
+        response = await process_with_ai(msg, phone, context)
 
-    # Show relevant fields based on action
-    action = response.get('action')
-    if action == 'reminder':
-        print(f"Date: {response.get('reminder_date')}")
-        print(f"Text: {response.get('reminder_text')}")
-    elif action == 'reminder_relative':
-        print(f"Offset: mins={response.get('offset_minutes')}, days={response.get('offset_days')}")
-        print(f"Text: {response.get('reminder_text')}")
+        print(f"Action: {response.get('action')}")
+        print(f"Confidence: {response.get('confidence', 'NOT RETURNED')}")
+
+        # Show relevant fields based on action
+        action = response.get('action')
+        if action == 'reminder':
+            print(f"Date: {response.get('reminder_date')}")
+            print(f"Text: {response.get('reminder_text')}")
+        elif action == 'reminder_relative':
+            print(f"Offset: mins={response.get('offset_minutes')}, days={response.get('offset_days')}")
+            print(f"Text: {response.get('reminder_text')}")
+
+
+asyncio.run(main())
@@ -0,0 +1,72 @@
+"""
+Tests for the coalesced users activity writer (services/activity_aggregator.py).
+"""
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+
+def _read_activity(phone):
+    from database import get_db_connection, return_db_connection
+    conn = get_db_connection()
+    try:
+        c = conn.cursor()
+        c.execute("SELECT last_active_at, COALESCE(total_messages, 0) FROM users WHERE phone_number = %s", (phone,))
+        return c.fetchone()
+    finally:
+        return_db_connection(conn)
+
+
+class TestActivityAggregator:
+    """Many messages become one bulk UPDATE; unflushed deltas stay readable."""
+
+    def test_messages_coalesce_into_one_update(self, onboarded_user):
+        from services.activity_aggregator import ActivityAggregator
+        import services.activity_aggregator as module
+        phone = onboarded_user["phone"]
+        _, before = _read_activity(phone)
+        aggregator = ActivityAggregator(flush_interval=3600)
+        start = datetime(2026, 1, 1, 12, 0)
+
+        for n in range(10):
+            aggregator.record(phone, start + timedelta(seconds=n), messages=1)
+        assert aggregator.effective(phone, None, before) == (start + timedelta(seconds=9), before + 10)
+
+        with patch.object(module, 'get_db_connection', wraps=module.get_db_connection) as get_conn:
+            assert aggregator.flush() == 1
+        assert get_conn.call_count == 1
+        assert _read_activity(phone) == (start + timedelta(seconds=9), before + 10)
+        assert aggregator.pending(phone) == (None, 0)
+
+    def test_older_flush_does_not_move_last_active_back(self, onboarded_user):
+        from services.activity_aggregator import ActivityAggregator
+        phone = onboarded_user["phone"]
+        aggregator = ActivityAggregator(flush_interval=3600)
+        newer, older = datetime(2026, 3, 1), datetime(2026, 2, 1)
+        aggregator.record(phone, newer)
+        aggregator.flush()
+        aggregator.record(phone, older)
+        aggregator.flush()
+        assert _read_activity(phone)[0] == newer
+
+    def test_failed_flush_keeps_pending(self):
+        from services.activity_aggregator import ActivityAggregator
+        import services.activity_aggregator as module
+        aggregator = ActivityAggregator(flush_interval=3600)
+        when = datetime(2026, 1, 1)
+        aggregator.record("+15550002222", when, messages=2)
+        with patch.object(module, 'get_db_connection', side_effect=Exception("db down")):
+            assert aggregator.flush() == 0
+        aggregator.record("+15550002222", when, messages=1)
+        assert aggregator.pending("+15550002222") == (when, 3)
+        assert aggregator.stats()['errors'] == 1
+
+    def test_message_count_mirrored_into_user_context(self, onboarded_user):
+        from models.user_context import user_context
+        from services.metrics_service import increment_message_count
+        phone = onboarded_user["phone"]
+        with user_context(phone) as ctx, \
+             patch('services.metrics_service.update_user_context') as update:
+            before = ctx.get('total_messages') or 0
+            increment_message_count(phone)
+        update.assert_called_once_with(phone, total_messages=before + 1)
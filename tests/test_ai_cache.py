@@ -0,0 +1,169 @@
+"""
+Tests for the template-keyed AI result cache (services/ai_cache.py).
+"""
+
+import pytest
+from datetime import datetime
+from unittest.mock import patch, MagicMock
+
+# Saturday, January 17, 2026 at 5:44 PM in the user's timezone
+NOW = datetime(2026, 1, 17, 17, 44)
+TZ = "America/New_York"
+
+
+def _cache(**kwargs):
+    from services.ai_cache import AIResultCache
+    return AIResultCache(**{"ttl_seconds": 60, "max_entries": 10, "enabled": True,
+                            "actions": ("reminder", "reminder_relative", "reminder_recurring",
+                                        "add_to_list", "parse_list_items"), **kwargs})
+
+
+def _reminder(text, date):
+    return {"action": "reminder", "reminder_text": text, "reminder_date": date, "confidence": 95}
+
+
+class TestMessageTemplate:
+    """Which messages template, and what goes in the slots."""
+
+    @pytest.mark.parametrize("message,template,slots", [
+        ("Remind me tomorrow at 8am to Call Mom", "remind me tomorrow at «time» to «text»",
+         {"time0": (8, 0), "text0": "Call Mom"}),
+        ("remind me to call mom at 5:30 p.m. tomorrow", "remind me to «text» at «time» tomorrow",
+         {"time0": (17, 30), "text0": "call mom"}),
+        ("Remind me in 2 hours to stretch!", "remind me in «num» hours to «text»",
+         {"num0": 2, "text0": "stretch"}),
+        ("add Milk, eggs to my grocery list", "add «text» to «text» list",
+         {"text0": "Milk, eggs", "text1": "grocery"}),
+    ])
+    def test_templates(self, message, template, slots):
+        from services.ai_cache import message_template
+        assert message_template(message) == (template, slots)
+
+    @pytest.mark.parametrize("message", [
+        "what are my reminders",
+        "remind me at 5pm to look at the 3pm schedule",     # time inside the text
+        "remind me after lunch to call mom",                # non-structural head
+        "remind me at 13pm to call mom",
+        "add trip to paris to bucket list",
+        "remind me at 9pm to take\nmeds",
+    ])
+    def test_not_templated(self, message):
+        from services.ai_cache import message_template
+        assert message_template(message) is None
+
+
+class TestAIResultCache:
+    """Skeletons, slot refill, the key and eviction."""
+
+    def test_same_template_refills_slots(self):
+        cache = _cache()
+        assert cache.store("Remind me tomorrow at 8am to Call Mom", NOW, TZ,
+                           {**_reminder("Call Mom", "2026-01-18 08:00:00"), "confirmation": "Got it"})
+        assert cache.lookup("remind me tomorrow at 9:15am to water the plants", NOW, TZ) == \
+            _reminder("water the plants", "2026-01-18 09:15:00")
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["hits_by_action"] == {"reminder": 1}
+
+    def test_numbers_refill_offsets(self):
+        cache = _cache()
+        cache.store("remind me in 2 hours to stretch", NOW, TZ,
+                    {"action": "reminder_relative", "reminder_text": "stretch", "offset_minutes": 120})
+        assert cache.lookup("Remind me in 3 hours to eat", NOW, TZ) == \
+            {"action": "reminder_relative", "reminder_text": "eat", "offset_minutes": 180}
+
+    def test_key_includes_timezone_weekday_and_passed_times(self):
+        cache = _cache()
+        cache.store("remind me at 6pm to stretch", NOW, TZ, _reminder("stretch", "2026-01-17 18:00:00"))
+        assert cache.lookup("remind me at 7pm to eat", NOW, "UTC") is None
+        assert cache.lookup("remind me at 7pm to eat", NOW.replace(day=18), TZ) is None
+        # 9am has already passed today, so the AI's answer would be tomorrow
+        assert cache.lookup("remind me at 9am to eat", NOW, TZ) is None
+        assert cache.lookup("remind me at 7pm to eat", NOW, TZ)["reminder_date"] == "2026-01-17 19:00:00"
+
+    def test_filled_reminder_in_the_past_is_a_miss(self):
+        cache = _cache()
+        cache.store("remind me at 6pm to stretch", NOW, TZ, _reminder("stretch", "2026-01-17 18:00:00"))
+        later = NOW.replace(hour=18, minute=30)
+        assert cache.lookup("remind me at 7pm to eat", later, TZ) is not None
+        assert cache.lookup("remind me at 6:15pm to eat", later.replace(minute=10), TZ) is not None
+        assert cache.lookup("remind me at 6:15pm to eat", later.replace(minute=15), TZ) is None
+
+    def test_reworded_answers_and_other_actions_are_not_stored(self):
+        cache = _cache()
+        # The AI changed the text, so the slot isn't in the answer
+        assert not cache.store("remind me at 6pm to call mom", NOW, TZ, _reminder("Call your mother", "2026-01-17 18:00:00"))
+        assert not cache.store("remind me at 6pm to call mom", NOW, TZ, {"action": "help", "response": "?"})
+        assert cache.stats()["uncacheable"] == 1
+        assert cache.lookup("remind me at 7pm to call dad", NOW, TZ) is None
+
+    def test_per_action_opt_in(self):
+        cache = _cache(actions=("reminder_relative",))
+        assert not cache.store("remind me at 6pm to stretch", NOW, TZ, _reminder("stretch", "2026-01-17 18:00:00"))
+        cache.store_items("ham and eggs", ["ham", "eggs"])
+        assert cache.lookup_items("ham and eggs") is None
+
+    def test_list_items_by_exact_text(self):
+        cache = _cache()
+        cache.store_items("mac and cheese, eggs and milk", ["mac and cheese", "eggs", "milk"])
+        assert cache.lookup_items("mac and cheese, eggs and milk") == ["mac and cheese", "eggs", "milk"]
+        assert cache.lookup_items("mac and cheese and eggs") is None
+        assert cache.stats()["hit_rate"] == 0.5
+
+    def test_least_recently_used_evicted_and_ttl(self):
+        cache = _cache(max_entries=2)
+        cache.store_items("a and b", ["a", "b"])
+        cache.store_items("c and d", ["c", "d"])
+        cache.lookup_items("a and b")
+        cache.store_items("e and f", ["e", "f"])
+        assert cache.lookup_items("c and d") is None
+        assert cache.lookup_items("a and b") == ["a", "b"]
+
+        expired = _cache(ttl_seconds=-1)
+        expired.store_items("a and b", ["a", "b"])
+        assert expired.lookup_items("a and b") is None
+
+    def test_disabled(self):
+        cache = _cache(enabled=False)
+        assert not cache.store("remind me at 6pm to stretch", NOW, TZ, _reminder("stretch", "2026-01-17 18:00:00"))
+        assert cache.lookup("remind me at 6pm to stretch", NOW, TZ) is None
+
+
+@pytest.mark.asyncio
+class TestAIServiceIntegration:
+    """process_with_ai and parse_list_items consult the shared cache."""
+
+    async def test_second_message_skips_openai(self, onboarded_user):
+        import services.ai_service as ai
+        calls = []
+
+        async def create(**kwargs):
+            calls.append(kwargs)
+            response = MagicMock()
+            response.choices = [MagicMock()]
+            response.choices[0].message.content = (
+                '{"action": "reminder_relative", "reminder_text": "stretch", "offset_minutes": 30, "confidence": 95}')
+            response.choices[0].finish_reason = "stop"
+            response.usage = None
+            return response
+
+        client = MagicMock()
+        client.chat.completions.create = create
+        with patch.object(ai, 'get_async_openai_client', return_value=client):
+            first = await ai.process_with_ai("Remind me in 30 minutes to stretch", onboarded_user["phone"], None)
+            second = await ai.process_with_ai("remind me in 45 minutes to drink water", onboarded_user["phone"], None)
+
+        assert len(calls) == 1
+        assert first["offset_minutes"] == 30
+        assert second == {"action": "reminder_relative", "reminder_text": "drink water",
+                          "offset_minutes": 45, "confidence": 95}
+
+    async def test_parse_list_items_cached(self):
+        import services.ai_service as ai
+        client = MagicMock()
+        client.chat.completions.create.return_value.choices = [MagicMock()]
+        client.chat.completions.create.return_value.choices[0].message.content = '["ham and cheese sandwich", "milk"]'
+        client.chat.completions.create.return_value.usage = None
+        with patch.object(ai, 'get_openai_client', return_value=client):
+            assert ai.parse_list_items("ham and cheese sandwich, milk and") == ["ham and cheese sandwich", "milk"]
+            assert ai.parse_list_items("ham and cheese sandwich, milk and") == ["ham and cheese sandwich", "milk"]
+        assert client.chat.completions.create.call_count == 1
@@ -0,0 +1,133 @@
+"""
+Tests for the shared async OpenAI client, request hedging, and latency histograms.
+"""
+
+import asyncio
+import pytest
+from unittest.mock import patch, MagicMock
+
+
+def _response(content='{"action": "store", "response": "ok"}'):
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = content
+    response.choices[0].finish_reason = "stop"
+    response.usage = None
+    return response
+
+
+def _client(*delays_and_results):
+    """Mock async client whose successive create() calls sleep then return/raise."""
+    calls = list(delays_and_results)
+    client = MagicMock()
+
+    async def create(**kwargs):
+        delay, result = calls.pop(0)
+        await asyncio.sleep(delay)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    client.chat.completions.create = create
+    return client
+
+
+class TestLatencyHistogram:
+    """Bucket counts and rolling percentiles."""
+
+    def test_buckets_and_percentiles(self):
+        from utils.latency import LatencyHistogram
+        hist = LatencyHistogram(buckets=(1, 2), window=100)
+        for seconds in [0.5] * 90 + [1.5] * 9 + [10]:
+            hist.observe(seconds)
+
+        snap = hist.snapshot()
+        assert snap["count"] == 100
+        assert snap["buckets"] == {"le_1": 90, "le_2": 9, "le_inf": 1}
+        assert hist.percentile(0.5) == 0.5
+        assert hist.percentile(0.95) == 1.5
+        assert hist.percentile(1.0) == 10
+
+    def test_window_tracks_recent_samples(self):
+        from utils.latency import LatencyHistogram
+        hist = LatencyHistogram(window=3)
+        for seconds in [9, 9, 9, 1, 1, 1]:
+            hist.observe(seconds)
+        assert hist.percentile(0.99) == 1
+        assert hist.count == 6
+
+
+class TestHedgedCompletion:
+    """A slow first request is hedged; the first success wins."""
+
+    @pytest.mark.asyncio
+    async def test_fast_primary_not_hedged(self):
+        import services.ai_service as ai
+        fast = _response()
+        with patch.object(ai, 'get_async_openai_client', return_value=_client((0, fast))), \
+             patch.object(ai, 'get_hedge_delay', return_value=0.05):
+            sent_before = ai._hedge_counts['sent']
+            assert await ai._hedged_completion(model="m") is fast
+            assert ai._hedge_counts['sent'] == sent_before
+
+    @pytest.mark.asyncio
+    async def test_slow_primary_hedge_wins(self):
+        import services.ai_service as ai
+        slow, quick = _response("slow"), _response("hedge")
+        client = _client((1.0, slow), (0, quick))
+        with patch.object(ai, 'get_async_openai_client', return_value=client), \
+             patch.object(ai, 'get_hedge_delay', return_value=0.05):
+            won_before = ai._hedge_counts['won']
+            assert await ai._hedged_completion(model="m") is quick
+            assert ai._hedge_counts['won'] == won_before + 1
+
+    @pytest.mark.asyncio
+    async def test_failed_primary_falls_back_to_hedge(self):
+        import services.ai_service as ai
+        quick = _response("hedge")
+        client = _client((0.1, RuntimeError("boom")), (0.2, quick))
+        with patch.object(ai, 'get_async_openai_client', return_value=client), \
+             patch.object(ai, 'get_hedge_delay', return_value=0.05):
+            assert await ai._hedged_completion(model="m") is quick
+
+    @pytest.mark.asyncio
+    async def test_both_fail_raises(self):
+        import services.ai_service as ai
+        client = _client((0.1, RuntimeError("first")), (0, RuntimeError("second")))
+        with patch.object(ai, 'get_async_openai_client', return_value=client), \
+             patch.object(ai, 'get_hedge_delay', return_value=0.05):
+            with pytest.raises(RuntimeError):
+                await ai._hedged_completion(model="m")
+
+    def test_hedge_delay_follows_percentile(self):
+        import services.ai_service as ai
+        from utils.latency import LatencyHistogram
+        hist = LatencyHistogram()
+        for _ in range(50):
+            hist.observe(2.5)
+        with patch.object(ai, 'OPENAI_HEDGE_ENABLED', True), \
+             patch.dict(ai._ai_latency, {'primary': hist}):
+            assert ai.get_hedge_delay() == 2.5
+        with patch.object(ai, 'OPENAI_HEDGE_ENABLED', False):
+            assert ai.get_hedge_delay() is None
+
+
+class TestProcessWithAI:
+    """process_with_ai is a coroutine on the shared client."""
+
+    @pytest.mark.asyncio
+    async def test_returns_parsed_action(self, onboarded_user):
+        import services.ai_service as ai
+        client = _client((0, _response('{"action": "store", "memory_text": "x", "response": "Got it"}')))
+        with patch.object(ai, 'get_async_openai_client', return_value=client):
+            result = await ai.process_with_ai("remember x", onboarded_user["phone"], None)
+        assert result["action"] == "store"
+
+    @pytest.mark.asyncio
+    async def test_timeout_returns_error(self, onboarded_user):
+        import services.ai_service as ai
+        client = _client((1.0, _response()))
+        with patch.object(ai, 'get_async_openai_client', return_value=client), \
+             patch.object(ai, 'OPENAI_TIMEOUT', 0.1):
+            result = await ai.process_with_ai("remember x", onboarded_user["phone"], None)
+        assert result["action"] == "error"
@@ -89,6 +89,139 @@ class TestReminderSending:
         assert len(resent) == 0
 
 
+class TestBatchReminderDelivery:
+    """Tests for batched reminder delivery (REMINDER_DISPATCH_MODE=batch)."""
+
+    def _claim(self, phone, texts, minutes_ago=5):
+        from models.reminder import save_reminder, claim_due_reminders
+        reminder_date = (datetime.utcnow() - timedelta(minutes=minutes_ago)).strftime("%Y-%m-%d %H:%M:%S")
+        for text in texts:
+            save_reminder(phone, text, reminder_date)
+        return [r for r in claim_due_reminders(batch_size=100) if r["phone_number"] == phone]
+
+    def _sent_flags(self, ids):
+        from database import get_db_connection, return_db_connection
+        conn = get_db_connection()
+        try:
+            c = conn.cursor()
+            c.execute("SELECT id, sent, claimed_at FROM reminders WHERE id = ANY(%s)", (ids,))
+            return {row[0]: (row[1], row[2]) for row in c.fetchall()}
+        finally:
+            return_db_connection(conn)
+
+    def test_batch_size_adapts_to_backlog(self):
+        from tasks.reminder_tasks import compute_reminder_batch_size
+        from config import REMINDER_BATCH_MIN_SIZE, REMINDER_BATCH_MAX_SIZE
+        assert compute_reminder_batch_size(1) == REMINDER_BATCH_MIN_SIZE
+        assert compute_reminder_batch_size(REMINDER_BATCH_MIN_SIZE + 50) == REMINDER_BATCH_MIN_SIZE + 50
+        assert compute_reminder_batch_size(100000) == REMINDER_BATCH_MAX_SIZE
+
+    def test_batch_sends_and_marks_all(self, onboarded_user, sms_capture):
+        phone = onboarded_user["phone"]
+        reminders = self._claim(phone, [f"Batch reminder {i}" for i in range(5)])
+        assert len(reminders) == 5
+
+        from tasks.reminder_tasks import deliver_reminder_batch
+        result = deliver_reminder_batch(reminders, send_fn=sms_capture.send_sms)
+
+        assert result["sent"] == 5
+        assert len([m for m in sms_capture.messages if "batch reminder" in m["message"].lower()]) == 5
+        flags = self._sent_flags([r["id"] for r in reminders])
+        assert all(sent for sent, _ in flags.values())
+
+    def test_already_sent_reminder_skipped(self, onboarded_user, sms_capture):
+        phone = onboarded_user["phone"]
+        reminders = self._claim(phone, ["Skip me", "Send me"])
+
+        # Another worker finished one of them after the claim
+        from models.reminder import mark_reminders_sent_bulk
+        skip = next(r for r in reminders if r["reminder_text"] == "Skip me")
+        mark_reminders_sent_bulk([skip["id"]])
+
+        from tasks.reminder_tasks import deliver_reminder_batch
+        result = deliver_reminder_batch(reminders, send_fn=sms_capture.send_sms)
+
+        assert result["sent"] == 1 and result["skipped"] == 1
+        assert not any("skip me" in m["message"].lower() for m in sms_capture.messages)
+
+    def test_failed_send_keeps_claim(self, onboarded_user):
+        phone = onboarded_user["phone"]
+        reminders = self._claim(phone, ["Fails to send"])
+
+        def failing_sms(*args, **kwargs):
+            raise Exception("Simulated Twilio error")
+
+        from tasks.reminder_tasks import deliver_reminder_batch
+        result = deliver_reminder_batch(reminders, send_fn=failing_sms)
+
+        assert result["failed"] == 1
+        sent, claimed_at = self._sent_flags([reminders[0]["id"]])[reminders[0]["id"]]
+        assert sent is False and claimed_at is not None
+
+    def test_past_deadline_releases_claims(self, onboarded_user, sms_capture):
+        phone = onboarded_user["phone"]
+        reminders = self._claim(phone, ["Deadline reminder"])
+
+        from tasks.reminder_tasks import deliver_reminder_batch
+        with patch('tasks.reminder_tasks.time.monotonic', side_effect=[0, 1000]):
+            result = deliver_reminder_batch(reminders, send_fn=sms_capture.send_sms, deadline_seconds=1)
+
+        assert result["sent"] == 0 and result["released"] == 1
+        assert len(sms_capture.messages) == 0
+        sent, claimed_at = self._sent_flags([reminders[0]["id"]])[reminders[0]["id"]]
+        assert sent is False and claimed_at is None
+
+    def test_reclaimed_batch_sends_nothing(self, onboarded_user, sms_capture):
+        phone = onboarded_user["phone"]
+        stale = self._claim(phone, ["Reclaimed reminder"])
+
+        # The batch sat in the queue past the lease and the next tick re-claimed it
+        from database import get_db_connection, return_db_connection
+        conn = get_db_connection()
+        try:
+            conn.cursor().execute("UPDATE reminders SET claimed_at = claimed_at - INTERVAL '6 minutes' WHERE id = %s",
+                                  (stale[0]["id"],))
+            conn.commit()
+        finally:
+            return_db_connection(conn)
+        fresh = self._claim(phone, [])
+        assert [r["id"] for r in fresh] == [stale[0]["id"]]
+
+        from tasks.reminder_tasks import deliver_reminder_batch
+        assert deliver_reminder_batch(stale, send_fn=sms_capture.send_sms)["skipped"] == 1
+        assert deliver_reminder_batch(fresh, send_fn=sms_capture.send_sms)["sent"] == 1
+        assert len([m for m in sms_capture.messages if "reclaimed reminder" in m["message"].lower()]) == 1
+
+    def test_marks_sent_per_wave_and_tracks_delivery(self, onboarded_user, sms_capture):
+        phone = onboarded_user["phone"]
+        reminders = self._claim(phone, [f"Wave reminder {i}" for i in range(6)])
+
+        import tasks.reminder_tasks as rt
+        with patch.object(rt, 'mark_reminders_sent_bulk', wraps=rt.mark_reminders_sent_bulk) as mark, \
+             patch.object(rt, 'track_reminder_delivery') as track:
+            result = rt.deliver_reminder_batch(reminders, send_fn=sms_capture.send_sms, concurrency=1)
+
+        assert result["sent"] == 6
+        assert [len(call.args[0]) for call in mark.call_args_list] == [4, 2]
+        assert sorted(call.args[0] for call in track.call_args_list) == sorted(r["id"] for r in reminders)
+        assert all(call.args[1] == "sent" for call in track.call_args_list)
+
+    def test_single_mode_uses_per_reminder_tasks(self, onboarded_user, sms_capture):
+        phone = onboarded_user["phone"]
+        from models.reminder import save_reminder
+        save_reminder(phone, "Single mode reminder",
+                      (datetime.utcnow() - timedelta(minutes=5)).strftime("%Y-%m-%d %H:%M:%S"))
+
+        with patch('tasks.reminder_tasks.REMINDER_DISPATCH_MODE', 'single'), \
+             patch('tasks.reminder_tasks.send_reminder_batch.delay') as batch_delay, \
+             patch('tasks.reminder_tasks.send_sms', side_effect=sms_capture.send_sms):
+            from tasks.reminder_tasks import check_and_send_reminders
+            check_and_send_reminders()
+
+        batch_delay.assert_not_called()
+        assert any("single mode reminder" in m["message"].lower() for m in sms_capture.messages)
+
+
 class TestRecurringReminderGeneration:
     """Tests for recurring reminder generation."""
 
@@ -150,6 +283,59 @@ class TestRecurringReminderGeneration:
 
         # Verify generated reminder is on Monday
 
+    def test_generation_is_idempotent(self, onboarded_user):
+        """Re-running generation over the same horizon creates nothing new."""
+        phone = onboarded_user["phone"]
+
+        from models.reminder import save_recurring_reminder, get_recurring_reminder_by_id
+        from database import get_db_connection, return_db_connection
+        from tasks.reminder_tasks import generate_first_occurrence, generate_recurring_reminders
+
+        recurring_id = save_recurring_reminder(phone, "Idempotent daily", "daily", None, "09:00", "America/New_York")
+        # First occurrence and the hourly job overlap on the same day
+        generate_first_occurrence(recurring_id)
+        generate_recurring_reminders()
+        generate_recurring_reminders()
+
+        conn = get_db_connection()
+        c = conn.cursor()
+        c.execute(
+            "SELECT occurrence_date, COUNT(*) FROM reminders WHERE recurring_id = %s GROUP BY occurrence_date",
+            (recurring_id,)
+        )
+        counts = c.fetchall()
+        c.execute("SELECT MAX(reminder_date) FROM reminders WHERE recurring_id = %s", (recurring_id,))
+        latest = c.fetchone()[0]
+        return_db_connection(conn)
+
+        assert counts and all(count == 1 for _, count in counts)
+        assert get_recurring_reminder_by_id(recurring_id)['next_occurrence'] == latest.isoformat()
+
+    def test_compute_occurrences_respects_pattern(self):
+        """Occurrences follow the recurrence pattern in the user's timezone."""
+        from tasks.reminder_tasks import compute_recurring_occurrences
+
+        # Sunday 2026-03-01 12:00 UTC = 7:00 AM Eastern
+        utc_now = datetime(2026, 3, 1, 12, 0, tzinfo=pytz.UTC)
+        patterns = [
+            {'id': 1, 'phone_number': '+15550000001', 'reminder_text': 'daily', 'recurrence_type': 'daily',
+             'recurrence_day': None, 'reminder_time': '09:00:00', 'timezone': 'America/New_York'},
+            {'id': 2, 'phone_number': '+15550000002', 'reminder_text': 'weekdays', 'recurrence_type': 'weekdays',
+             'recurrence_day': None, 'reminder_time': '09:00:00', 'timezone': 'America/New_York'},
+            {'id': 3, 'phone_number': '+15550000003', 'reminder_text': 'passed', 'recurrence_type': 'daily',
+             'recurrence_day': None, 'reminder_time': '06:00:00', 'timezone': 'America/New_York'},
+        ]
+
+        occurrences = compute_recurring_occurrences(patterns, hours_ahead=24, utc_now=utc_now)
+        by_id = {}
+        for occ in occurrences:
+            by_id.setdefault(occ['recurring_id'], []).append(occ['reminder_date'])
+
+        # 9 AM today (Sunday) only; weekdays skips Sunday; 6 AM already passed, so tomorrow
+        assert by_id[1] == [datetime(2026, 3, 1, 14, 0)]
+        assert 2 not in by_id
+        assert by_id[3] == [datetime(2026, 3, 2, 11, 0)]
+
     @pytest.mark.asyncio
     async def test_paused_recurring_not_generated(self, onboarded_user):
         """Test that paused recurring reminders don't generate."""
@@ -227,6 +413,83 @@ class TestDailySummary:
             send_daily_summaries()
 
 
+class TestScheduleBuckets:
+    """Tests for the UTC minute-of-day buckets behind daily summary / smart nudge lookups."""
+
+    def _local_time(self, tz_name, minutes_from_now=0):
+        return (datetime.now(pytz.timezone(tz_name)) + timedelta(minutes=minutes_from_now)).strftime("%H:%M")
+
+    def _buckets(self, phone):
+        from database import get_db_connection, return_db_connection
+        conn = get_db_connection()
+        try:
+            c = conn.cursor()
+            c.execute(
+                "SELECT daily_summary_utc_minute, smart_nudge_utc_minute, schedule_utc_offset FROM users WHERE phone_number = %s",
+                (phone,)
+            )
+            return c.fetchone()
+        finally:
+            return_db_connection(conn)
+
+    def test_due_at_local_summary_time(self, onboarded_user):
+        from models.user import create_or_update_user, get_users_due_for_daily_summary
+        phone = onboarded_user["phone"]
+        create_or_update_user(phone, daily_summary_enabled=True,
+                              daily_summary_time=self._local_time("America/New_York"))
+
+        due = [u["phone_number"] for u in get_users_due_for_daily_summary()]
+        assert phone in due
+
+    def test_not_due_at_other_minutes(self, onboarded_user):
+        from models.user import create_or_update_user, get_users_due_for_daily_summary
+        phone = onboarded_user["phone"]
+        create_or_update_user(phone, daily_summary_enabled=True,
+                              daily_summary_time=self._local_time("America/New_York", minutes_from_now=2))
+
+        due = [u["phone_number"] for u in get_users_due_for_daily_summary()]
+        assert phone not in due
+
+    def test_smart_nudge_bucket(self, onboarded_user):
+        from models.user import create_or_update_user, get_users_due_for_smart_nudge
+        phone = onboarded_user["phone"]
+        create_or_update_user(phone, smart_nudges_enabled=True,
+                              smart_nudge_time=self._local_time("America/New_York"))
+
+        due = [u["phone_number"] for u in get_users_due_for_smart_nudge()]
+        assert phone in due
+
+    def test_timezone_change_recomputes_bucket(self, onboarded_user):
+        from models.user import create_or_update_user, update_user_timezone, refresh_schedule_buckets
+        phone = onboarded_user["phone"]
+        create_or_update_user(phone, daily_summary_enabled=True, daily_summary_time="08:00")
+        refresh_schedule_buckets()
+        eastern_bucket = self._buckets(phone)[0]
+
+        update_user_timezone(phone, "America/Los_Angeles")
+        assert self._buckets(phone)[2] is None
+        refresh_schedule_buckets()
+        # Same local time, three hours later in UTC
+        assert self._buckets(phone)[0] == (eastern_bucket + 180) % 1440
+
+    def test_dst_transition_shifts_bucket(self, onboarded_user):
+        import models.user as user_model
+        phone = onboarded_user["phone"]
+        user_model.create_or_update_user(phone, daily_summary_enabled=True, daily_summary_time="08:00")
+        user_model.refresh_schedule_buckets()
+        before, _, offset = self._buckets(phone)
+
+        # Clocks spring forward: same zone, offset one hour later
+        shifted = dict(user_model._current_utc_offsets(), **{"America/New_York": offset + 60})
+        with patch('models.user._current_utc_offsets', return_value=shifted):
+            user_model.refresh_schedule_buckets()
+        assert self._buckets(phone)[0] == (before - 60) % 1440
+
+        # And back, so later tests see real offsets
+        user_model.refresh_schedule_buckets()
+        assert self._buckets(phone)[0] == before
+
+
 class TestOnboardingRecovery:
     """Tests for abandoned onboarding recovery."""
 
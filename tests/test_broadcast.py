@@ -0,0 +1,130 @@
+"""
+Tests for the broadcast engine (services/broadcast_service.py).
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+PHONES = [f"+1555019{i:04d}" for i in range(7)]
+FAILING = PHONES[3]
+
+
+def _execute(sql, params=None):
+    from database import get_db_connection, return_db_connection
+    conn = get_db_connection()
+    try:
+        c = conn.cursor()
+        c.execute(sql, params)
+        rows = c.fetchall() if c.description else None
+        conn.commit()
+        return rows
+    finally:
+        return_db_connection(conn)
+
+
+def _create_broadcast(status='pending'):
+    return _execute('''
+        INSERT INTO broadcast_logs (sender, message, audience, recipient_count, status, source)
+        VALUES ('test', 'Hello there', 'all', %s, %s, 'immediate') RETURNING id
+    ''', (len(PHONES), status))[0][0]
+
+
+@pytest.fixture
+def broadcast_engine():
+    """Small chunks, an in-memory limiter, and an SMS sender that fails for one number."""
+    sent = []
+
+    def fake_send(to_number, message, media_url=None):
+        if to_number == FAILING:
+            raise RuntimeError("undeliverable")
+        sent.append((to_number, message))
+
+    created = []
+    with patch('services.broadcast_service.BROADCAST_CHUNK_SIZE', 3), \
+         patch('services.broadcast_service.BROADCAST_SEND_RATE', 10000), \
+         patch('services.broadcast_service.BROADCAST_RATE_BACKEND', 'memory'), \
+         patch('services.broadcast_service._send_limiter', None), \
+         patch('services.broadcast_service.send_sms', side_effect=fake_send):
+        yield {'sent': sent, 'created': created}
+    for broadcast_id in created:
+        _execute("DELETE FROM broadcast_logs WHERE id = %s", (broadcast_id,))
+
+
+class TestBroadcastEngine:
+    """Chunked fan-out with per-recipient results."""
+
+    def test_start_broadcast_sends_every_chunk(self, broadcast_engine):
+        from services.broadcast_service import start_broadcast, get_broadcast_progress, BROADCAST_PREFIX
+        broadcast_id = _create_broadcast()
+        broadcast_engine['created'].append(broadcast_id)
+
+        # Duplicates are recorded once; Celery runs eagerly under test
+        chunks = start_broadcast(broadcast_id, PHONES + [PHONES[0]])
+        assert chunks == 3
+
+        sent = broadcast_engine['sent']
+        assert sorted(phone for phone, _ in sent) == sorted(p for p in PHONES if p != FAILING)
+        assert all(message == BROADCAST_PREFIX + 'Hello there' for _, message in sent)
+
+        assert get_broadcast_progress(broadcast_id) == {'pending': 0, 'sending': 0, 'sent': 6, 'failed': 1}
+        status, success, fail, completed_at = _execute(
+            "SELECT status, success_count, fail_count, completed_at FROM broadcast_logs WHERE id = %s",
+            (broadcast_id,))[0]
+        assert (status, success, fail) == ('completed', 6, 1)
+        assert completed_at is not None
+        error = _execute("SELECT error FROM broadcast_recipients WHERE broadcast_id = %s AND phone_number = %s",
+                         (broadcast_id, FAILING))[0][0]
+        assert 'undeliverable' in error
+
+    def test_chunk_rerun_does_not_resend(self, broadcast_engine):
+        from services.broadcast_service import start_broadcast, send_chunk
+        broadcast_id = _create_broadcast()
+        broadcast_engine['created'].append(broadcast_id)
+        start_broadcast(broadcast_id, PHONES)
+        sent_before = len(broadcast_engine['sent'])
+
+        _execute("UPDATE broadcast_logs SET status = 'sending' WHERE id = %s", (broadcast_id,))
+        assert send_chunk(broadcast_id, 0) == {'chunk': 0, 'sent': 0, 'failed': 0}
+        assert len(broadcast_engine['sent']) == sent_before
+
+    def test_resume_stalled_broadcast(self, broadcast_engine):
+        from services.broadcast_service import resume_stalled_broadcasts, get_broadcast_progress
+        broadcast_id = _create_broadcast(status='sending')
+        broadcast_engine['created'].append(broadcast_id)
+        _execute("UPDATE broadcast_logs SET progress_at = NOW() - INTERVAL '1 hour' WHERE id = %s", (broadcast_id,))
+
+        # A crashed worker left chunk 0 part-sent and chunk 1 untouched
+        rows = [('sent', 0), ('sent', 0), ('sending', 0), ('pending', 1), ('pending', 1)]
+        phones = [p for p in PHONES if p != FAILING]
+        for phone, (status, chunk) in zip(phones, rows):
+            _execute('''INSERT INTO broadcast_recipients (broadcast_id, phone_number, chunk, status)
+                        VALUES (%s, %s, %s, %s)''', (broadcast_id, phone, chunk, status))
+
+        result = resume_stalled_broadcasts()
+        assert result['resumed'] >= 1
+        assert result['interrupted'] >= 1
+
+        # Only the never-attempted recipients are sent; the in-flight one is not retried
+        assert sorted(phone for phone, _ in broadcast_engine['sent']) == phones[3:5]
+        assert get_broadcast_progress(broadcast_id) == {'pending': 0, 'sending': 0, 'sent': 4, 'failed': 1}
+        assert _execute("SELECT status, success_count, fail_count FROM broadcast_logs WHERE id = %s",
+                        (broadcast_id,))[0] == ('completed', 4, 1)
+
+    def test_fresh_broadcast_is_not_resumed(self, broadcast_engine):
+        from services.broadcast_service import resume_stalled_broadcasts
+        broadcast_id = _create_broadcast(status='sending')
+        broadcast_engine['created'].append(broadcast_id)
+        _execute("UPDATE broadcast_logs SET progress_at = NOW() WHERE id = %s", (broadcast_id,))
+        _execute('''INSERT INTO broadcast_recipients (broadcast_id, phone_number, chunk)
+                    VALUES (%s, %s, 0)''', (broadcast_id, PHONES[0]))
+
+        resume_stalled_broadcasts()
+        assert broadcast_engine['sent'] == []
+        assert _execute("SELECT status FROM broadcast_logs WHERE id = %s", (broadcast_id,))[0][0] == 'sending'
+
+    def test_chunks_routed_off_the_reminder_queue(self):
+        from celery_app import celery_app
+        route = celery_app.amqp.router.route({}, 'tasks.broadcast_tasks.send_broadcast_chunk')
+        assert route['queue'].name == 'broadcast'
+        assert celery_app.amqp.router.route({}, 'tasks.reminder_tasks.send_reminder_batch')['queue'].name == 'celery'
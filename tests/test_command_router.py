@@ -0,0 +1,60 @@
+"""
+Tests for the keyword command router (routes/command_router.py).
+"""
+
+import pytest
+
+
+class TestCommandRouter:
+    """COMMAND_ROUTER reports the same matches the inline cascade tested for."""
+
+    @pytest.mark.parametrize("message,expected", [
+        ("STOP", ["stop"]),
+        ("  my lists ", ["list_lists"]),
+        ("Delete 2", ["delete_number"]),
+        ("delete 1 and 3", ["delete_multiple"]),
+        ("Cancel reminder 4", ["delete_reminder_number"]),
+        ("check off 2", ["check_item"]),
+        ("SUMMARY", ["summary_status"]),
+        ("summary off tomorrow", ["summary_off"]),
+        ("set my summary to 8am", ["summary_time"]),
+        ("NUDGE TIME 9:30pm", ["nudge_time"]),
+        ("TIMEZONE America/Chicago", ["timezone_set"]),
+        ("snooze30", ["snooze"]),
+        ("please cancel my subscription", ["cancel_subscription"]),
+        ("Remind me to call mom at 5pm", []),
+    ])
+    def test_resolve(self, message, expected):
+        from routes.command_router import COMMAND_ROUTER
+        assert list(COMMAND_ROUTER.resolve(message).matches) == expected
+
+    def test_command_keywords_match_parse_command(self):
+        from main import parse_command
+        from routes.command_router import COMMAND_ROUTER
+        for message in ["Feedback love it", "feedback:great", "FEEDBACK", "feedbacks are nice", "my feedback"]:
+            command, _ = parse_command(message, known_commands=["FEEDBACK"])
+            assert ('feedback' in COMMAND_ROUTER.resolve(message)) == (command == "FEEDBACK")
+
+    def test_pattern_match_groups_and_priority(self):
+        from routes.command_router import COMMAND_ROUTER
+        route = COMMAND_ROUTER.resolve("summary time 7:15 pm")
+        assert route.name == 'summary_time'
+        assert route.get('summary_time').groups() == ('7', '15', 'pm')
+
+        # "DELETE ALL" is both the menu and a prefix of the typed delete-all phrases
+        assert COMMAND_ROUTER.resolve("delete all").name == 'delete_all_menu'
+        assert COMMAND_ROUTER.resolve("delete all lists").name == 'delete_all_lists'
+        # "YES" is only the START/resubscribe keyword here; confirmations are stateful
+        assert COMMAND_ROUTER.resolve("yes").name == 'start'
+
+    def test_custom_router(self):
+        from routes.command_router import CommandRouter
+        router = CommandRouter()
+        router.add('greet', phrases=["HI"], prefixes=["HELLO "])
+        router.add('number', patterns=[r'^(\d+)$'])
+        assert router.resolve("hello there").name == 'greet'
+        assert router.resolve("hi").name == 'greet'
+        assert router.resolve("hip").name is None
+        assert router.resolve("42").get('number').group(1) == '42'
+        with pytest.raises(ValueError):
+            router.add('greet', phrases=["HEY"])
@@ -0,0 +1,127 @@
+"""
+Tests for token-budgeted, concurrent conversation analysis.
+"""
+
+import json
+import threading
+import time
+from unittest.mock import patch, MagicMock
+
+
+def _conversation(log_id, text="remind me to call mom at 5"):
+    return {'id': log_id, 'phone_number': '+15555550000', 'message_in': text,
+            'message_out': 'Got it', 'intent': 'reminder', 'success': True, 'created_at': None}
+
+
+def _response(flagged=(), finish_reason="stop"):
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = json.dumps({"flagged": list(flagged)})
+    response.choices[0].finish_reason = finish_reason
+    response.usage = None
+    return response
+
+
+def _run(logs, create):
+    """Run analyze_recent_conversations over logs with a mocked client; returns (result, marked ids, saved log ids)."""
+    from services import conversation_analyzer
+    client = MagicMock()
+    client.with_options.return_value.chat.completions.create.side_effect = create
+    marked, saved = [], []
+    with patch.object(conversation_analyzer, 'get_openai_client', return_value=client), \
+         patch.object(conversation_analyzer, 'get_unanalyzed_logs', return_value=logs), \
+         patch.object(conversation_analyzer, 'mark_logs_analyzed', side_effect=marked.extend), \
+         patch.object(conversation_analyzer, 'save_conversation_analysis',
+                      side_effect=lambda **kw: saved.append(kw['log_id'])):
+        result = conversation_analyzer.analyze_recent_conversations()
+    return result, marked, saved
+
+
+def _ids(kwargs):
+    return [int(line.split('ID: ')[1].rstrip(') -'))
+            for line in kwargs['messages'][1]['content'].splitlines() if 'ID: ' in line]
+
+
+class TestBatchPacking:
+    """Batches are packed by estimated tokens, not a fixed count."""
+
+    def test_token_budget_and_max_batch(self):
+        from services.conversation_analyzer import pack_batches, estimate_tokens
+        short = [_conversation(i) for i in range(10)]
+        cost = estimate_tokens(short[0])
+
+        assert [len(b) for b in pack_batches(short, token_budget=cost * 4, max_batch=40)] == [4, 4, 2]
+        assert [len(b) for b in pack_batches(short, token_budget=10 ** 6, max_batch=3)] == [3, 3, 3, 1]
+
+        huge = _conversation(99, "x" * 10000)
+        batches = pack_batches([short[0], huge, short[1]], token_budget=cost * 4, max_batch=40)
+        assert [[c['id'] for c in b] for b in batches] == [[0], [99], [1]]
+
+
+class TestConcurrentAnalysis:
+    """Batches run concurrently, split on truncation, and checkpoint as they finish."""
+
+    def test_truncated_batch_is_split(self):
+        logs = [_conversation(i) for i in range(1, 9)]
+
+        def create(**kwargs):
+            ids = _ids(kwargs)
+            if len(ids) > 2:
+                return _response(finish_reason="length")
+            return _response([{"conversation_id": ids[0], "issue_type": "poor_response",
+                               "severity": "low", "explanation": "meh"}])
+
+        with patch('services.conversation_analyzer.CONVERSATION_ANALYSIS_MAX_BATCH', 8):
+            result, marked, saved = _run(logs, create)
+
+        assert sorted(marked) == list(range(1, 9))
+        assert result['analyzed'] == 8
+        assert result['batches_split'] == 3
+        assert sorted(saved) == [1, 3, 5, 7]
+
+    def test_api_errors_are_retried_then_left_unanalyzed(self):
+        logs = [_conversation(i) for i in range(1, 5)]
+        calls = {'count': 0}
+
+        def create(**kwargs):
+            calls['count'] += 1
+            if 3 in _ids(kwargs):
+                raise TimeoutError("timed out")
+            return _response()
+
+        with patch('services.conversation_analyzer.CONVERSATION_ANALYSIS_MAX_BATCH', 2):
+            result, marked, _ = _run(logs, create)
+
+        assert sorted(marked) == [1, 2]
+        assert result['failed'] == 2
+        assert calls['count'] == 3
+
+    def test_requests_are_not_retried_by_the_client(self):
+        from services import conversation_analyzer
+        client = MagicMock()
+        client.with_options.return_value.chat.completions.create.return_value = _response()
+        with patch.object(conversation_analyzer, 'get_openai_client', return_value=client):
+            conversation_analyzer._request_analysis([_conversation(1)])
+        assert client.with_options.call_args.kwargs['max_retries'] == 0
+
+    def test_concurrency_is_bounded(self):
+        logs = [_conversation(i) for i in range(1, 13)]
+        lock = threading.Lock()
+        state = {'active': 0, 'peak': 0}
+
+        def create(**kwargs):
+            with lock:
+                state['active'] += 1
+                state['peak'] = max(state['peak'], state['active'])
+            time.sleep(0.05)
+            with lock:
+                state['active'] -= 1
+            return _response()
+
+        with patch('services.conversation_analyzer.CONVERSATION_ANALYSIS_MAX_BATCH', 1), \
+             patch('services.conversation_analyzer.CONVERSATION_ANALYSIS_CONCURRENCY', 3):
+            result, marked, _ = _run(logs, create)
+
+        assert result['analyzed'] == 12
+        assert sorted(marked) == list(range(1, 13))
+        assert 1 < state['peak'] <= 3
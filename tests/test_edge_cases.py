@@ -97,7 +97,7 @@ class TestRateLimiting:
         # This test would need time manipulation
         # For now, just verify the rate limit can be reset
         from main import rate_limit_store
-        rate_limit_store[phone] = []
+        rate_limit_store.reset(phone)
 
         result = await simulator.send_message(phone, "Test after reset")
         assert "too quickly" not in result["output"].lower()
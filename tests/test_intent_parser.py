@@ -0,0 +1,155 @@
+"""
+Tests for the local intent parser (services/intent_parser.py).
+"""
+
+from datetime import datetime
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+# Saturday, January 17, 2026 at 5:44 PM in the user's timezone
+NOW = datetime(2026, 1, 17, 17, 44)
+LISTS = ['grocery list', 'Hardware']
+
+
+def _parse(message):
+    from services.intent_parser import parse_intent
+    return parse_intent(message, NOW, list_names=lambda: LISTS)
+
+
+class TestReminderGrammar:
+    """Reminders parse to the actions the AI would return."""
+
+    @pytest.mark.parametrize("message,text,date", [
+        ("Remind me at 9pm to take meds", "take meds", "2026-01-17 21:00:00"),
+        ("remind me tomorrow at 10am to take my vitamins", "take my vitamins", "2026-01-18 10:00:00"),
+        ("remind me to call the bank on Friday at 2 p.m.", "call the bank", "2026-01-23 14:00:00"),
+        ("tomorrow at 9am, remind me to call Bob", "call Bob", "2026-01-18 09:00:00"),
+        ("remind me at 11:59pm tonight to lock the doors", "lock the doors", "2026-01-17 23:59:00"),
+        ("remind me at midnight to wish Sarah happy birthday", "wish Sarah happy birthday", "2026-01-18 00:00:00"),
+        ("remind me December 31st 2026 at 11pm for new years countdown", "for new years countdown", "2026-12-31 23:00:00"),
+        ("Can you remind me at noon tomorrow about the dentist?", "about the dentist", "2026-01-18 12:00:00"),
+    ])
+    def test_absolute(self, message, text, date):
+        assert _parse(message) == {"action": "reminder", "reminder_text": text, "reminder_date": date, "confidence": 95}
+
+    @pytest.mark.parametrize("message,offset", [
+        ("remind me in 30 minutes to move the laundry", {"offset_minutes": 30}),
+        ("Remind me in 2 hours to move the laundry", {"offset_minutes": 120}),
+        ("remind me in an hour to move the laundry", {"offset_minutes": 60}),
+        ("remind me to move the laundry in three days", {"offset_days": 3}),
+        ("5 months from now remind me to move the laundry", {"offset_months": 5}),
+    ])
+    def test_relative(self, message, offset):
+        assert _parse(message) == {"action": "reminder_relative", "reminder_text": "move the laundry",
+                                   "confidence": 95, **offset}
+
+    @pytest.mark.parametrize("message,recurrence_type,recurrence_day,time", [
+        ("remind me every day at 8am to take medication", "daily", None, "08:00"),
+        ("Every Sunday at 6pm remind me to take medication", "weekly", 6, "18:00"),
+        ("remind me weekdays at 7:30am to take medication", "weekdays", None, "07:30"),
+    ])
+    def test_recurring(self, message, recurrence_type, recurrence_day, time):
+        action = _parse(message)
+        assert action["action"] == "reminder_recurring"
+        assert action["reminder_text"] == "take medication"
+        assert (action["recurrence_type"], action["recurrence_day"], action["time"]) == (recurrence_type, recurrence_day, time)
+
+    @pytest.mark.parametrize("message", [
+        "Remind me at 3 to call mom",                              # no am/pm
+        "Remind me to call mom at 3pm",                            # already past today
+        "remind me saturday at 9am to run",                        # today's weekday: this week or next?
+        "next Tuesday at noon remind me about the dentist",
+        "Remind me tomorrow to pay rent",                          # no time
+        "remind me later to call mom",
+        "tomorrow morning remind me to call the insurance company",
+        "reminde me tmrw at 3pm to call doctor",
+        "remind me at 5pm to look at the 3pm schedule",
+        "Remind me every day for the next five days at 5 PM to stop working",
+        "Remind me at 5pm to pick up groceries and add milk to grocery list",
+        "remind me at 9pm to take\nmeds",
+        "remind me to call mom at 5pm on the 20th",               # day of month
+        "remind me at 9pm on the first to pay rent",
+        "remind me to call mom at 9pm except weekends",
+        "remind me every day at 8am to take medication unless I already did",
+        "remind me to call mom at 9pm EST",                        # time zone
+        "remind me to call mom at 9pm pacific time",
+    ])
+    def test_left_to_ai(self, message):
+        assert _parse(message) is None
+
+    def test_after_midnight_tomorrow_is_unsure(self):
+        from services.intent_parser import parse_intent
+        action = parse_intent("remind me tomorrow at 9am to call mom", datetime(2026, 1, 17, 0, 30))
+        assert action["reminder_date"] == "2026-01-18 09:00:00"
+        assert action["confidence"] < 90
+
+
+class TestListAndMemoryGrammar:
+    """add_to_list and store actions."""
+
+    @pytest.mark.parametrize("message,list_name,items,confidence", [
+        ("add milk, eggs, and bread to my grocery list", "grocery list", "milk, eggs, and bread", 95),
+        ("Add nails to the hardware list", "Hardware", "nails", 95),
+        ("add nails to hardware", "Hardware", "nails", 95),
+        ("Add apples to fruit list", "fruit list", "apples", 90),
+    ])
+    def test_add_to_list(self, message, list_name, items, confidence):
+        assert _parse(message) == {"action": "add_to_list", "list_name": list_name,
+                                   "item_text": items, "confidence": confidence}
+
+    @pytest.mark.parametrize("message", [
+        "add butter to groceries",              # not a known list
+        "Add tape",
+        "Add trip to Paris to bucket list",     # which "to"?
+    ])
+    def test_add_left_to_ai(self, message):
+        assert _parse(message) is None
+
+    def test_store(self):
+        assert _parse("remember that my locker is in row 4") == {
+            "action": "store", "memory_text": "My locker is in row 4", "confidence": 95}
+        # Relative dates need converting, and questions are retrievals
+        assert _parse("remember I paid rent yesterday") is None
+        assert _parse("remember where I parked?") is None
+        assert _parse("remember to buy milk") is None
+
+
+@pytest.mark.asyncio
+class TestFastPathWebhook:
+    """sms_reply answers fast-path messages without calling the AI."""
+
+    async def test_reminder_skips_ai(self, simulator, onboarded_user):
+        from services.intent_parser import fast_path_intent
+        phone = onboarded_user["phone"]
+        with patch('main.fast_path_intent', side_effect=fast_path_intent), \
+             patch('main.process_with_ai', new_callable=AsyncMock) as ai:
+            result = await simulator.send_message(phone, "Remind me in 30 minutes to stretch")
+            listed = await simulator.send_message(phone, "Add milk to grocery list")
+            await simulator.send_message(phone, "Remind me at 3 to call mom")
+
+        assert "to stretch" in result["output"]
+        assert "milk" in listed["output"] and "grocery list" in listed["output"]
+        # Only the message without am/pm went to the AI
+        assert ai.await_count == 1
+        assert ai.await_args.args[0] == "Remind me at 3 to call mom"
+
+    async def test_unpatched_fast_path_saves_reminder(self, real_ai_simulator, onboarded_user):
+        """No ai_mock: the real fast_path_intent runs inside sms_reply."""
+        from models.reminder import get_pending_reminders
+        phone = onboarded_user["phone"]
+        with patch('main.process_with_ai', new_callable=AsyncMock,
+                   return_value={"action": "help", "response": "Which day?"}) as ai:
+            result = await real_ai_simulator.send_message(phone, "Remind me in 2 hours to water the plants")
+            await real_ai_simulator.send_message(phone, "remind me to call mom at 9pm on the 20th")
+
+        assert "water the plants" in result["output"]
+        assert [text for _, text, _ in get_pending_reminders(phone)] == ["water the plants"]
+        # Only the day-of-month reminder went to the AI
+        assert ai.await_count == 1
+        assert ai.await_args.args[0].endswith("on the 20th")
+
+    async def test_disabled(self, simulator, onboarded_user):
+        from services.intent_parser import fast_path_intent
+        with patch('services.intent_parser.FAST_PATH_ENABLED', False):
+            assert fast_path_intent("Remind me in 30 minutes to stretch", onboarded_user["phone"]) is None
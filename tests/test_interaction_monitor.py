@@ -0,0 +1,120 @@
+"""
+Tests for the incremental interaction monitor (agents/interaction_monitor.py).
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+
+def _execute(sql, params=None):
+    from database import get_db_connection, return_db_connection
+    conn = get_db_connection()
+    try:
+        c = conn.cursor()
+        c.execute(sql, params)
+        rows = c.fetchall() if c.description else None
+        conn.commit()
+        return rows
+    finally:
+        return_db_connection(conn)
+
+
+def _log(log_id, message_in, created_at, phone="+15555550000"):
+    return {'id': log_id, 'phone_number': phone, 'message_in': message_in, 'message_out': 'ok',
+            'intent': 'store', 'success': True, 'created_at': created_at}
+
+
+class TestCorrelation:
+    """Confidence rejections and repeated attempts are matched without full scans."""
+
+    def test_confidence_rejection_within_window(self):
+        from agents.interaction_monitor import build_confidence_index, detect_low_confidence_rejection
+        t = datetime(2026, 1, 1, 12, 0, 0)
+        rejections = [
+            {'phone_number': '+15555550000', 'action_type': 'delete', 'confidence_score': 40, 'threshold': 70,
+             'confirmed': False, 'user_message': 'delete it', 'created_at': t + timedelta(minutes=m)}
+            for m in (30, -20, 4)
+        ]
+        rejections.append(dict(rejections[0], confirmed=True, created_at=t))
+        index = build_confidence_index(rejections)
+
+        assert detect_low_confidence_rejection(_log(1, 'x', t), index)['issue_type'] == 'confidence_rejection'
+        assert detect_low_confidence_rejection(_log(2, 'x', t - timedelta(minutes=6)), index) is None
+        assert detect_low_confidence_rejection(_log(3, 'x', t + timedelta(minutes=9)), index) is None
+        assert detect_low_confidence_rejection(_log(4, 'x', t, phone='+15555550001'), index) is None
+
+    def test_repeated_attempt_uses_carried_logs(self):
+        from agents.interaction_monitor import detect_repeated_attempt
+        t = datetime(2026, 1, 1, 12, 0, 0)
+        recent = [_log(1, 'Remind me at 5', t), _log(2, 'remind me at 5', t + timedelta(seconds=40))]
+
+        issue = detect_repeated_attempt(_log(3, 'REMIND ME AT 5', t + timedelta(seconds=90)), recent)
+        assert issue['log_id'] == 1
+        assert issue['details']['time_span_seconds'] == 90
+        assert detect_repeated_attempt(_log(3, 'remind me at 5', t + timedelta(minutes=6)), recent) is None
+        assert detect_repeated_attempt(_log(3, 'remind me at 6', t + timedelta(seconds=90)), recent) is None
+        assert detect_repeated_attempt(_log(3, 'remind me at 5', t), recent[1:]) is None
+
+
+class TestIncrementalRuns:
+    """Runs pick up where the last one stopped, with per-phone state carried over."""
+
+    @pytest.fixture
+    def monitor(self, onboarded_user, monkeypatch):
+        import agents.interaction_monitor as interaction_monitor
+        monkeypatch.setattr(interaction_monitor, 'MONITOR_SETTLE_SECONDS', 0)
+        phone = onboarded_user["phone"]
+        interaction_monitor.analyze_interactions(hours=1)  # Start from the current watermark
+        yield phone
+        _execute("DELETE FROM monitoring_issues WHERE phone_number = %s", (phone,))
+        _execute("DELETE FROM monitoring_phone_state WHERE phone_number = %s", (phone,))
+
+    def _insert_log(self, phone, message_in, message_out, minutes_ago):
+        return _execute('''INSERT INTO logs (phone_number, message_in, message_out, intent, success, created_at)
+                           VALUES (%s, %s, %s, 'store', TRUE, NOW() - %s * INTERVAL '1 minute') RETURNING id''',
+                        (phone, message_in, message_out, minutes_ago))[0][0]
+
+    def _issues(self, phone):
+        return _execute("SELECT log_id, issue_type FROM monitoring_issues WHERE phone_number = %s ORDER BY id",
+                        (phone,))
+
+    def test_only_new_logs_are_analyzed(self, monitor):
+        from agents.interaction_monitor import analyze_interactions
+        phone = monitor
+        log_id = self._insert_log(phone, 'huh', 'Got it', 10)
+
+        first = analyze_interactions(hours=1)
+        assert first['logs_analyzed'] >= 1
+        assert first['log_id_range'][1] >= log_id
+        assert (log_id, 'user_confusion') in self._issues(phone)
+
+        second = analyze_interactions(hours=1)
+        assert second['log_id_range'][0] >= log_id
+        assert second['logs_analyzed'] == 0
+
+        full = analyze_interactions(hours=1, dry_run=True, incremental=False)
+        assert full['logs_analyzed'] >= 1
+
+    def test_state_carries_across_runs(self, monitor):
+        from agents.interaction_monitor import analyze_interactions
+        phone = monitor
+        first_id = self._insert_log(phone, 'call mom', 'Saved', 4)
+        self._insert_log(phone, 'call mom', 'Saved', 3)
+        self._insert_log(phone, 'Delete it?', 'Reply YES to confirm or NO to cancel', 2)
+        analyze_interactions(hours=1)
+        assert self._issues(phone) == []
+
+        reply_id = self._insert_log(phone, 'YES', 'Here are your lists', 1)
+        analyze_interactions(hours=1)
+        assert self._issues(phone) == [(reply_id, 'flow_violation')]
+
+        # Repeated attempts spanning two runs
+        repeat_id = self._insert_log(phone, 'call mom', 'Saved', 1)
+        self._insert_log(phone, 'call mom', 'Saved', 1)
+        analyze_interactions(hours=1)
+        assert len(self._issues(phone)) == 1
+        self._insert_log(phone, 'call mom', 'Saved', 0)
+        analyze_interactions(hours=1)
+        assert self._issues(phone)[1:] == [(repeat_id, 'repeated_attempts')]
+        assert first_id not in [log_id for log_id, _ in self._issues(phone)]
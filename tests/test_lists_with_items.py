@@ -0,0 +1,46 @@
+"""
+Tests for the single-query list loader (get_lists_with_items).
+"""
+
+
+class TestGetListsWithItems:
+    """One query returns what get_lists + get_list_items per list used to."""
+
+    def test_matches_per_list_queries(self, onboarded_user):
+        from models.list_model import (
+            create_list, add_list_item, mark_item_complete,
+            get_lists, get_list_items, get_lists_with_items,
+        )
+        phone = onboarded_user["phone"]
+        grocery = create_list(phone, "Grocery")
+        for item in ("milk", "eggs", "bread"):
+            add_list_item(grocery, phone, item)
+        mark_item_complete(phone, "Grocery", "eggs")
+        create_list(phone, "Packing")
+
+        combined = get_lists_with_items(phone)
+        legacy = get_lists(phone)
+
+        assert [(l['id'], l['list_name'], l['item_count'], l['completed_count']) for l in combined] == \
+            [(list_id, name, count, completed or 0) for list_id, name, count, completed in legacy]
+        for lst in combined:
+            assert [(i['id'], i['item_text'], i['completed']) for i in lst['items']] == get_list_items(lst['id'])
+
+        packing = next(l for l in combined if l['list_name'] == "Packing")
+        assert packing['items'] == [] and packing['item_count'] == 0
+
+    def test_no_lists(self, onboarded_user):
+        from models.list_model import get_lists_with_items
+        assert get_lists_with_items(onboarded_user["phone"]) == []
+
+    def test_export_includes_items(self, onboarded_user):
+        from models.list_model import create_list, add_list_item
+        from services.export_service import get_user_export_data
+        phone = onboarded_user["phone"]
+        list_id = create_list(phone, "Errands")
+        add_list_item(list_id, phone, "post office")
+
+        data = get_user_export_data(phone)
+        errands = next(l for l in data['lists'] if l['name'] == "Errands")
+        assert [i['text'] for i in errands['items']] == ["post office"]
+        assert errands['items'][0]['created_at']
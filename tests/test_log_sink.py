@@ -0,0 +1,129 @@
+"""
+Tests for the batched interaction-log writer (utils/log_sink.py) and the
+database.log_* functions that feed it.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+PHONE = "+15550001111"
+
+
+def _sink(write_batch, **overrides):
+    from utils.log_sink import BatchedLogSink
+    options = dict(name="test", batch_size=100, flush_interval=60, max_queue=100, enqueue_timeout=0.01)
+    options.update(overrides)
+    return BatchedLogSink(write_batch, **options)
+
+
+class TestBatchedLogSink:
+    """Size/time triggers, flush, backpressure and bad-row isolation."""
+
+    def test_batches_by_size_and_flush(self):
+        batches = []
+        sink = _sink(batches.append, batch_size=2)
+        for n in range(5):
+            sink.submit(n)
+        assert sink.flush(timeout=5)
+        assert [n for batch in batches for n in batch] == [0, 1, 2, 3, 4]
+        assert max(len(batch) for batch in batches) == 2
+        assert sink.stats()['written'] == 5
+
+    def test_time_trigger(self):
+        batches = []
+        sink = _sink(batches.append, flush_interval=0.05)
+        sink.submit("a")
+        deadline = time.monotonic() + 5
+        while not batches and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert batches == [["a"]]
+
+    def test_full_queue_writes_inline(self):
+        release = threading.Event()
+        written = []
+
+        def slow_write(batch):
+            if threading.current_thread().name == "test-sink":
+                release.wait(5)
+            written.extend(batch)
+
+        sink = _sink(slow_write, batch_size=1, max_queue=1)
+        for n in range(4):
+            sink.submit(n)
+        assert sink.stats()['direct_writes'] >= 1
+        release.set()
+        assert sink.flush(timeout=5)
+        assert sorted(written) == [0, 1, 2, 3]
+
+    def test_bad_row_does_not_lose_batch(self):
+        written = []
+
+        def write(batch):
+            if "bad" in batch:
+                raise ValueError("bad row")
+            written.extend(batch)
+
+        sink = _sink(write)
+        for record in ("a", "bad", "b"):
+            sink.submit(record)
+        assert sink.flush(timeout=5)
+        assert written == ["a", "b"]
+        assert sink.stats()['failed'] == 1
+
+
+@pytest.fixture
+def log_rows():
+    from database import get_db_connection, return_db_connection, flush_log_sink
+
+    def cleanup():
+        flush_log_sink()
+        conn = get_db_connection()
+        try:
+            c = conn.cursor()
+            for table in ("logs", "api_usage", "confidence_logs"):
+                c.execute(f"DELETE FROM {table} WHERE phone_number = %s", (PHONE,))
+            conn.commit()
+        finally:
+            return_db_connection(conn)
+
+    def count(table):
+        conn = get_db_connection()
+        try:
+            c = conn.cursor()
+            c.execute(f"SELECT COUNT(*), MIN(created_at) FROM {table} WHERE phone_number = %s", (PHONE,))
+            return c.fetchone()
+        finally:
+            return_db_connection(conn)
+
+    cleanup()
+    yield count
+    cleanup()
+
+
+class TestDatabaseLogFunctions:
+    """log_interaction / log_api_usage / log_confidence go through the sink."""
+
+    def test_rows_written_after_flush(self, log_rows):
+        import database
+        queued_at = datetime.utcnow()
+        for n in range(3):
+            database.log_interaction(PHONE, f"in {n}", f"out {n}", "test", True)
+        database.log_api_usage(PHONE, "test", 10, 5, 15, "gpt-4o-mini")
+        database.log_confidence(PHONE, "reminder", 80, 70, confirmed=True, user_message="hi")
+        assert database.flush_log_sink()
+
+        count, created_at = log_rows("logs")
+        assert count == 3
+        assert abs(created_at - queued_at) < timedelta(seconds=5)
+        assert log_rows("api_usage")[0] == 1
+        assert log_rows("confidence_logs")[0] == 1
+
+    def test_disabled_writes_synchronously(self, log_rows):
+        from unittest.mock import patch
+        import database
+        with patch.object(database, 'LOG_SINK_ENABLED', False):
+            database.log_interaction(PHONE, "in", "out", "test", True)
+        assert log_rows("logs")[0] == 1
@@ -0,0 +1,75 @@
+"""
+Tests for memory de-duplication through the stored keyword signature (models/memory.py).
+"""
+
+import random
+
+
+def _brute_force_match(memories, memory_text):
+    """The original full-scan rule: best Jaccard over every memory, first wins on ties."""
+    from models.memory import (_extract_keywords, _keyword_jaccard, _SIMILARITY_THRESHOLD,
+                               _SHORT_MEMORY_THRESHOLD, _SHORT_MEMORY_KEYWORD_LIMIT)
+    new_keywords = _extract_keywords(memory_text)
+    best_id, best_score = None, 0.0
+    for mem_id, text in memories:
+        score = _keyword_jaccard(new_keywords, _extract_keywords(text))
+        if score > best_score:
+            best_id, best_score = mem_id, score
+    threshold = _SHORT_MEMORY_THRESHOLD if len(new_keywords) <= _SHORT_MEMORY_KEYWORD_LIMIT else _SIMILARITY_THRESHOLD
+    return best_id if best_score >= threshold else None
+
+
+def _insert_raw(phone, texts, with_keywords=True):
+    """Insert memories directly (no dedup) and return [(id, text)] in id order."""
+    from database import get_db_connection, return_db_connection
+    from models.memory import _keyword_signature
+    conn = get_db_connection()
+    try:
+        c = conn.cursor()
+        rows = []
+        for text in texts:
+            c.execute('INSERT INTO memories (phone_number, memory_text, keywords) VALUES (%s, %s, %s) RETURNING id',
+                      (phone, text, _keyword_signature(text) if with_keywords else None))
+            rows.append((c.fetchone()[0], text))
+        conn.commit()
+        return rows
+    finally:
+        return_db_connection(conn)
+
+
+def _find(phone, text):
+    from database import get_db_connection, return_db_connection
+    from models.memory import _find_similar_memory
+    conn = get_db_connection()
+    try:
+        result = _find_similar_memory(conn.cursor(), phone, text)
+        conn.commit()
+        return result
+    finally:
+        return_db_connection(conn)
+
+
+class TestMemoryDedup:
+    """Indexed candidate lookup gives the same answer as scanning every memory."""
+
+    def test_matches_full_scan(self, onboarded_user):
+        phone = onboarded_user["phone"]
+        rng = random.Random(7)
+        vocab = ["wifi", "password", "garage", "code", "locker", "dentist", "doctor", "plumber",
+                 "mom", "birthday", "june", "parking", "spot", "blue", "car", "passport", "number",
+                 "42", "7731", "abc", "xyz", "gym", "membership", "insurance", "policy"]
+        texts = [" ".join(rng.sample(vocab, rng.randint(1, 8))) for _ in range(150)]
+        texts += ["My WiFi password is ABC", "The garage code is 7731", "remember this"]
+        memories = _insert_raw(phone, texts)
+
+        probes = [" ".join(rng.sample(vocab, rng.randint(1, 8))) for _ in range(150)]
+        probes += ["WiFi password is XYZ", "garage code is 9999", "the a an", "brand new topic"]
+        for probe in probes:
+            assert _find(phone, probe) == _brute_force_match(memories, probe), probe
+
+    def test_legacy_rows_backfilled(self, onboarded_user):
+        from models.memory import save_memory
+        phone = onboarded_user["phone"]
+        [(legacy_id, _)] = _insert_raw(phone, ["My WiFi password is ABC"], with_keywords=False)
+        assert _find(phone, "WiFi password is XYZ") == legacy_id
+        assert save_memory(phone, "WiFi password is QRS", {}) is True
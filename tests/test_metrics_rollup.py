@@ -0,0 +1,96 @@
+"""
+Tests for the metrics rollups (services/metrics_rollup.py).
+"""
+
+from datetime import timedelta
+
+import pytest
+
+
+def _execute(sql, params=None):
+    from database import get_db_connection, return_db_connection
+    conn = get_db_connection()
+    try:
+        c = conn.cursor()
+        c.execute(sql, params)
+        rows = c.fetchall() if c.description else None
+        conn.commit()
+        return rows
+    finally:
+        return_db_connection(conn)
+
+
+def _read(fn, *args):
+    from database import get_db_connection, return_db_connection
+    conn = get_db_connection()
+    try:
+        return fn(conn.cursor(), *args)
+    finally:
+        return_db_connection(conn)
+
+
+def _reset_rollups():
+    _execute("DELETE FROM metrics_hourly")
+    _execute("DELETE FROM metrics_daily")
+    _execute("DELETE FROM metrics_rollup_state")
+
+
+@pytest.fixture
+def backdated_activity(onboarded_user):
+    """Logs, api_usage and memories for the test user spread over the last three days."""
+    phone = onboarded_user["phone"]
+    _reset_rollups()
+    _execute("DELETE FROM api_usage WHERE phone_number = %s", (phone,))
+    now = _execute("SELECT LOCALTIMESTAMP")[0][0]
+    for minutes_ago in (10, 95, 130, 60 * 26 + 7, 60 * 50 + 41, 60 * 71):
+        created = now - timedelta(minutes=minutes_ago)
+        _execute("INSERT INTO logs (phone_number, message_in, message_out, created_at) VALUES (%s, 'in', 'out', %s)",
+                 (phone, created))
+        _execute('''INSERT INTO api_usage (phone_number, request_type, prompt_tokens, completion_tokens, created_at)
+                    VALUES (%s, 'process', 120, 30, %s)''', (phone, created))
+        _execute("INSERT INTO memories (phone_number, memory_text, created_at) VALUES (%s, 'note', %s)",
+                 (phone, created))
+    yield {'phone': phone, 'now': now}
+    _execute("DELETE FROM api_usage WHERE phone_number = %s", (phone,))
+    _reset_rollups()
+
+
+class TestMetricsRollup:
+    """Rolled-up reads match the live queries they replace."""
+
+    def test_rollup_matches_live(self, backdated_activity):
+        from services.metrics_rollup import rollup_metrics, usage_by_plan, created_counts
+        now = backdated_activity['now']
+        windows = [
+            (None, None),
+            (now - timedelta(days=2, minutes=17), None),
+            (now - timedelta(hours=49, minutes=3), now - timedelta(minutes=47)),
+        ]
+        live = [(_read(usage_by_plan, *w), _read(created_counts, *w)) for w in windows]
+
+        result = rollup_metrics()
+        assert result['hours_rolled'] > 0
+        assert result['days_rolled'] > 0
+        assert _execute("SELECT COUNT(*) FROM metrics_hourly")[0][0] > 0
+
+        rolled = [(_read(usage_by_plan, *w), _read(created_counts, *w)) for w in windows]
+        assert rolled == live
+
+    def test_watermark_advances_and_rerun_is_stable(self, backdated_activity):
+        from services.metrics_rollup import rollup_metrics, usage_by_plan
+        first = rollup_metrics()
+        before = _read(usage_by_plan)
+        second = rollup_metrics()
+        assert second['hourly_watermark'] >= first['hourly_watermark']
+        assert second['hours_rolled'] <= 1
+        assert _read(usage_by_plan) == before
+
+    def test_nightly_rebuild_picks_up_deletes(self, backdated_activity):
+        from services.metrics_rollup import rollup_metrics, created_counts
+        phone = backdated_activity['phone']
+        rollup_metrics()
+        before = _read(created_counts)['memories']
+        _execute("DELETE FROM memories WHERE phone_number = %s AND created_at < LOCALTIMESTAMP - INTERVAL '2 days'",
+                 (phone,))
+        rollup_metrics(rebuild_daily=True)
+        assert _read(created_counts)['memories'] == before - 2
@@ -0,0 +1,182 @@
+"""
+Tests for the prompt context cache and the static/dynamic system prompt split.
+"""
+
+import time
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch, MagicMock
+
+
+class TestPromptContextCache:
+    """Stamps, expiry, invalidation and the LRU bound."""
+
+    def _cache(self, **kwargs):
+        from models.prompt_context import PromptContextCache
+        return PromptContextCache(**{"ttl_seconds": 60, "max_users": 10, **kwargs})
+
+    def test_hit_requires_matching_stamp(self):
+        cache = self._cache()
+        assert cache.get("+1", "reminders", ("UTC", 1)) is None
+        cache.set("+1", "reminders", ("UTC", 1), "text")
+        assert cache.get("+1", "reminders", ("UTC", 1)) == "text"
+        assert cache.get("+1", "reminders", ("UTC", 2)) is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 2
+
+    def test_expires_in_shortens_ttl(self):
+        cache = self._cache()
+        cache.set("+1", "reminders", None, "soon", expires_in=-5)
+        assert cache.get("+1", "reminders", None) is None
+        cache.set("+1", "reminders", None, "later", expires_in=3600)
+        assert cache.get("+1", "reminders", None) == "later"
+
+    def test_invalidate_one_kind_or_all(self):
+        cache = self._cache()
+        for kind in ("memories", "reminders", "lists"):
+            cache.set("+1", kind, None, kind)
+        cache.invalidate("+1", "lists")
+        assert cache.get("+1", "lists", None) is None
+        assert cache.get("+1", "memories", None) == "memories"
+        cache.invalidate("+1")
+        assert cache.get("+1", "memories", None) is None
+        assert cache.stats()["users"] == 0
+
+    def test_least_recently_used_user_evicted(self):
+        cache = self._cache(max_users=2)
+        cache.set("+1", "lists", None, "a")
+        cache.set("+2", "lists", None, "b")
+        cache.get("+1", "lists", None)
+        cache.set("+3", "lists", None, "c")
+        assert cache.get("+2", "lists", None) is None
+        assert cache.get("+1", "lists", None) == "a"
+
+
+class TestUserPromptContext:
+    """build_user_prompt_context serves from cache until a model write invalidates it."""
+
+    def test_repeat_build_uses_cache(self, onboarded_user):
+        from services.ai_service import build_user_prompt_context
+        phone = onboarded_user["phone"]
+        build_user_prompt_context(phone)
+        with patch('services.ai_service.get_memories') as memories, \
+             patch('services.ai_service.get_user_reminders') as reminders, \
+             patch('services.ai_service.get_lists_with_items') as lists:
+            context = build_user_prompt_context(phone)
+        assert not memories.called and not reminders.called and not lists.called
+        assert "USER'S NAME: Test" in context
+        assert "No memories stored yet." in context
+
+    def test_memory_write_invalidates(self, onboarded_user):
+        from services.ai_service import build_user_prompt_context
+        from models.memory import save_memory, delete_all_memories
+        phone = onboarded_user["phone"]
+        assert "No memories stored yet." in build_user_prompt_context(phone)
+
+        save_memory(phone, "Locker code is 4411", {})
+        assert "Locker code is 4411" in build_user_prompt_context(phone)
+
+        delete_all_memories(phone)
+        assert "No memories stored yet." in build_user_prompt_context(phone)
+
+    def test_list_write_invalidates(self, onboarded_user):
+        from services.ai_service import build_user_prompt_context
+        from models.list_model import create_list, add_list_item, mark_item_complete
+        phone = onboarded_user["phone"]
+        assert "No lists created yet." in build_user_prompt_context(phone)
+
+        list_id = create_list(phone, "Hardware")
+        add_list_item(list_id, phone, "hinges")
+        assert "[ ] hinges" in build_user_prompt_context(phone)
+
+        mark_item_complete(phone, "Hardware", "hinges")
+        assert "[x] hinges" in build_user_prompt_context(phone)
+
+    def test_reminder_write_invalidates(self, onboarded_user):
+        from services.ai_service import build_user_prompt_context
+        from models.reminder import save_reminder_with_local_time, delete_reminder
+        phone = onboarded_user["phone"]
+        assert "No reminders set." in build_user_prompt_context(phone)
+
+        due = datetime.utcnow() + timedelta(days=3)
+        reminder_id = save_reminder_with_local_time(phone, "Renew passport", due, "10:00", "America/New_York")
+        assert "Renew passport" in build_user_prompt_context(phone)
+
+        assert delete_reminder(phone, reminder_id)
+        assert "No reminders set." in build_user_prompt_context(phone)
+
+    def test_write_from_another_process_invalidates(self, onboarded_user):
+        """Celery marks a reminder sent on its own connection; the NOTIFY reaches this process."""
+        import psycopg2
+        import database
+        from config import DATABASE_URL
+        from models.prompt_context import get_prompt_context_cache, notify_prompt_context_changed, REMINDERS, LISTS
+        phone = onboarded_user["phone"]
+        cache = get_prompt_context_cache()
+        database.get_setting("prompt_context_listener_probe")
+        for _ in range(100):
+            if database._settings_listener['connected']:
+                break
+            time.sleep(0.05)
+        cache.set(phone, REMINDERS, "stamp", "Call mom")
+        cache.set(phone, LISTS, "stamp", "Groceries")
+
+        other = psycopg2.connect(DATABASE_URL)
+        try:
+            notify_prompt_context_changed(other.cursor(), [phone], REMINDERS)
+            other.commit()
+        finally:
+            other.close()
+
+        for _ in range(100):
+            if cache.get(phone, REMINDERS, "stamp") is None:
+                break
+            time.sleep(0.05)
+        assert cache.get(phone, REMINDERS, "stamp") is None
+        assert cache.get(phone, LISTS, "stamp") == "Groceries"
+
+    def test_reminders_expire_when_next_one_is_due(self):
+        import pytz
+        from services.ai_service import _format_reminders_context
+        tz = pytz.timezone("America/New_York")
+        now = datetime.now(tz)
+        due = (now + timedelta(minutes=5)).astimezone(pytz.UTC).replace(tzinfo=None)
+        text, expires_in = _format_reminders_context([(1, due, "Call mom", None, False)], tz, now)
+        assert "Call mom" in text
+        assert 290 < expires_in <= 300
+
+
+class TestStaticSystemPrompt:
+    """The instruction block is a fixed prefix; per-user data follows it."""
+
+    def test_static_prompt_has_no_user_data(self):
+        from services.ai_service import _STATIC_SYSTEM_PROMPT
+        assert "{" in _STATIC_SYSTEM_PROMPT  # JSON examples survive as literal braces
+        assert "{{" not in _STATIC_SYSTEM_PROMPT
+        assert "USER'S NAME" not in _STATIC_SYSTEM_PROMPT
+        assert "ISO format:" not in _STATIC_SYSTEM_PROMPT
+
+    @pytest.mark.asyncio
+    async def test_static_prompt_sent_first(self, onboarded_user):
+        import services.ai_service as ai
+        response = MagicMock()
+        response.choices = [MagicMock()]
+        response.choices[0].message.content = '{"action": "help", "response": "ok"}'
+        response.choices[0].finish_reason = "stop"
+        response.usage = None
+        sent = []
+
+        async def create(**kwargs):
+            sent.append(kwargs["messages"])
+            return response
+
+        client = MagicMock()
+        client.chat.completions.create = create
+        with patch.object(ai, 'get_async_openai_client', return_value=client):
+            await ai.process_with_ai("help", onboarded_user["phone"], None)
+
+        messages = sent[0]
+        assert messages[0] == {"role": "system", "content": ai._STATIC_SYSTEM_PROMPT}
+        assert messages[1]["role"] == "system"
+        assert "USER'S NAME: Test" in messages[1]["content"]
+        assert messages[2] == {"role": "user", "content": "help"}
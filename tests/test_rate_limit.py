@@ -0,0 +1,135 @@
+"""
+Tests for the pluggable rate limiters and webhook dedup stores.
+Redis-backed classes run only when a Redis server is reachable at UPSTASH_REDIS_URL.
+"""
+
+import pytest
+from unittest.mock import patch
+
+
+@pytest.fixture
+def redis_client():
+    import redis
+    from config import UPSTASH_REDIS_URL
+    client = redis.Redis.from_url(UPSTASH_REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5)
+    try:
+        client.ping()
+    except redis.exceptions.RedisError:
+        pytest.skip("Redis not available")
+    return client
+
+
+class TestTokenBucketLimiter:
+    """Burst up to the limit, continuous refill, bounded key count."""
+
+    def test_burst_then_refill(self):
+        from utils.rate_limit import TokenBucketLimiter
+        clock = [100.0]
+        limiter = TokenBucketLimiter(limit=3, window_seconds=30)
+        with patch('utils.rate_limit.time.monotonic', lambda: clock[0]):
+            assert [limiter.allow("+1") for _ in range(4)] == [True, True, True, False]
+            clock[0] += 10  # one token per 10s
+            assert limiter.allow("+1") is True
+            assert limiter.allow("+1") is False
+            assert limiter.allow("+2") is True
+
+    def test_lru_bound_and_reset(self):
+        from utils.rate_limit import TokenBucketLimiter
+        limiter = TokenBucketLimiter(limit=1, window_seconds=60, max_keys=2)
+        for key in ("a", "b", "c"):
+            limiter.allow(key)
+        assert len(limiter) == 2
+        assert limiter.allow("a") is True  # evicted, so starts full again
+        assert limiter.allow("c") is False
+        limiter.reset("c")
+        assert limiter.allow("c") is True
+
+
+class TestLocalDedupStore:
+    """First sighting wins until the TTL passes."""
+
+    def test_duplicates_within_ttl(self):
+        from utils.rate_limit import LocalDedupStore
+        clock = [0.0]
+        store = LocalDedupStore(ttl_seconds=600, max_entries=100)
+        with patch('utils.rate_limit.time.monotonic', lambda: clock[0]):
+            assert store.first_seen("SM1") is True
+            assert store.first_seen("SM1") is False
+            clock[0] += 601
+            assert store.first_seen("SM1") is True
+
+    def test_bounded(self):
+        from utils.rate_limit import LocalDedupStore
+        store = LocalDedupStore(ttl_seconds=600, max_entries=2)
+        for sid in ("SM1", "SM2", "SM3"):
+            store.first_seen(sid)
+        assert store.first_seen("SM1") is True
+
+
+class TestFactories:
+    """Backend selection and fail-open behaviour."""
+
+    def test_memory_backend(self):
+        from utils.rate_limit import create_rate_limiter, create_dedup_store, TokenBucketLimiter, LocalDedupStore
+        assert isinstance(create_rate_limiter("t", 5, 60, backend="memory"), TokenBucketLimiter)
+        assert isinstance(create_dedup_store("t", 60, backend="memory"), LocalDedupStore)
+
+    def test_redis_down_falls_back_to_local(self):
+        import redis
+        import utils.rate_limit as rl
+        dead = redis.Redis(host="127.0.0.1", port=1, socket_timeout=0.1, socket_connect_timeout=0.1)
+        with patch.object(rl, 'get_redis_client', return_value=dead):
+            limiter = rl.create_rate_limiter("t", 2, 60, backend="redis")
+            dedup = rl.create_dedup_store("t", 60, backend="redis")
+        assert [limiter.allow("+1") for _ in range(3)] == [True, True, False]
+        assert dedup.first_seen("SM1") is True
+        assert dedup.first_seen("SM1") is False
+
+    def test_redis_skipped_after_failure(self):
+        import utils.rate_limit as rl
+        primary = rl.LocalDedupStore(60)
+        store = rl._FailOpenToLocal(primary, rl.LocalDedupStore(60), "test", retry_after=30)
+        clock = [100.0]
+        with patch('utils.rate_limit.time.monotonic', lambda: clock[0]), \
+             patch.object(primary, 'first_seen', side_effect=ConnectionError("down")) as first_seen:
+            assert store.first_seen("SM1") is True
+            assert store.first_seen("SM1") is False
+            assert first_seen.call_count == 1   # no timeout paid on the second call
+            clock[0] += 31
+            store.first_seen("SM2")
+            assert first_seen.call_count == 2
+
+    def test_shared_client_times_out_fast(self):
+        import utils.rate_limit as rl
+        with patch.object(rl, '_redis_client', None):
+            kwargs = rl.get_redis_client().connection_pool.connection_kwargs
+        assert kwargs['socket_timeout'] == kwargs['socket_connect_timeout'] == rl.REDIS_SOCKET_TIMEOUT < 0.5
+        assert kwargs['retry_on_timeout'] is False
+
+
+class TestRedisBackends:
+    """GCRA limiter and SET NX dedup against a real Redis."""
+
+    def test_gcra_limit_shared_across_instances(self, redis_client):
+        from utils.rate_limit import RedisGCRALimiter
+        worker_a = RedisGCRALimiter(redis_client, "test_gcra", limit=3, window_seconds=60)
+        worker_b = RedisGCRALimiter(redis_client, "test_gcra", limit=3, window_seconds=60)
+        worker_a.clear()
+        try:
+            results = [worker_a.allow("+1"), worker_b.allow("+1"), worker_a.allow("+1"), worker_b.allow("+1")]
+            assert results == [True, True, True, False]
+            worker_a.reset("+1")
+            assert worker_b.allow("+1") is True
+        finally:
+            worker_a.clear()
+
+    def test_setnx_dedup(self, redis_client):
+        from utils.rate_limit import RedisDedupStore
+        store = RedisDedupStore(redis_client, "test_dedup", ttl_seconds=60)
+        store.clear()
+        try:
+            assert store.first_seen("SM1") is True
+            assert store.first_seen("SM1") is False
+            assert 0 < redis_client.ttl("dedup:test_dedup:SM1") <= 60
+        finally:
+            store.clear()
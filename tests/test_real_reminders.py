@@ -35,6 +35,7 @@ def clean_test_user_data():
             c.execute("DELETE FROM reminders WHERE phone_number = %s", (PHONE,))
             c.execute("DELETE FROM recurring_reminders WHERE phone_number = %s", (PHONE,))
             c.execute("DELETE FROM memories WHERE phone_number = %s", (PHONE,))
+            c.execute("DELETE FROM user_usage WHERE phone_number = %s", (PHONE,))
             c.execute("DELETE FROM support_tickets WHERE phone_number = %s", (PHONE,))
             c.execute("DELETE FROM logs WHERE phone_number = %s", (PHONE,))
             c.execute("DELETE FROM users WHERE phone_number = %s", (PHONE,))
@@ -0,0 +1,158 @@
+"""
+Tests for the event-driven reminder scheduler.
+Covers the timing wheel, NOTIFY from reminder writes, and claim/dispatch on fire.
+"""
+
+import json
+import select
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+
+class TestTimingWheel:
+    """Timing wheel scheduling, cascading, and cancellation."""
+
+    def _wheel(self):
+        from services.reminder_scheduler import TimingWheel
+        return TimingWheel(tick_seconds=1.0, slots=8, levels=3, start=1000.0)
+
+    def test_fires_on_its_tick(self):
+        wheel = self._wheel()
+        wheel.schedule("a", 1005.0)
+        assert wheel.advance(1004.9) == []
+        assert wheel.advance(1005.0) == ["a"]
+        assert len(wheel) == 0
+
+    def test_never_fires_early(self):
+        wheel = self._wheel()
+        wheel.schedule("a", 1003.2)
+        assert wheel.advance(1003.9) == []
+        assert wheel.advance(1004.0) == ["a"]
+
+    def test_cascades_from_higher_levels(self):
+        wheel = self._wheel()
+        # 8 ticks per level-0 revolution, 64 per level-1: these live on levels 1 and 2
+        wheel.schedule("level1", 1000.0 + 30)
+        wheel.schedule("level2", 1000.0 + 200)
+        assert wheel.advance(1000.0 + 29) == []
+        assert wheel.advance(1000.0 + 30) == ["level1"]
+        assert wheel.advance(1000.0 + 199) == []
+        assert wheel.advance(1000.0 + 200) == ["level2"]
+
+    def test_overdue_fires_immediately(self):
+        wheel = self._wheel()
+        wheel.schedule("late", 900.0)
+        assert wheel.advance(1000.0) == ["late"]
+
+    def test_reschedule_and_cancel(self):
+        wheel = self._wheel()
+        wheel.schedule("snoozed", 1002.0)
+        wheel.schedule("snoozed", 1010.0)
+        wheel.schedule("deleted", 1003.0)
+        assert wheel.cancel("deleted") is True
+        assert wheel.advance(1009.0) == []
+        assert wheel.advance(1010.0) == ["snoozed"]
+
+    def test_beyond_horizon_rejected(self):
+        wheel = self._wheel()
+        assert wheel.schedule("far", 1000.0 + wheel.horizon_seconds + 1) is False
+        assert "far" not in wheel
+
+
+class TestReminderNotify:
+    """Reminder writes notify the scheduler on commit."""
+
+    def _listen(self):
+        import psycopg2
+        import psycopg2.extensions
+        from config import DATABASE_URL, REMINDER_NOTIFY_CHANNEL
+        conn = psycopg2.connect(DATABASE_URL)
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        conn.cursor().execute(f"LISTEN {REMINDER_NOTIFY_CHANNEL}")
+        return conn
+
+    def _payloads(self, conn):
+        select.select([conn], [], [], 2)
+        conn.poll()
+        payloads = [json.loads(n.payload) for n in conn.notifies]
+        conn.notifies.clear()
+        return payloads
+
+    def test_save_and_snooze_notify(self, onboarded_user):
+        from models.reminder import save_reminder_with_local_time, update_reminder_time
+        phone = onboarded_user["phone"]
+        conn = self._listen()
+        try:
+            due = datetime(2030, 1, 1, 15, 0, 0)
+            reminder_id = save_reminder_with_local_time(phone, "Notify me", due, "10:00", "America/New_York")
+            assert {"id": reminder_id, "reminder_date": "2030-01-01T15:00:00"} in self._payloads(conn)
+
+            assert update_reminder_time(phone, reminder_id, due + timedelta(minutes=15))
+            assert {"id": reminder_id, "reminder_date": "2030-01-01T15:15:00"} in self._payloads(conn)
+        finally:
+            conn.close()
+
+
+class TestReminderScheduler:
+    """The scheduler claims and dispatches reminders when the wheel fires."""
+
+    def _scheduler(self, now):
+        from services.reminder_scheduler import ReminderScheduler
+        clock = {"now": now}
+        dispatched = []
+        scheduler = ReminderScheduler(dispatch=dispatched.append, clock=lambda: clock["now"])
+        return scheduler, clock, dispatched
+
+    def test_fires_notified_reminder_on_time(self, onboarded_user):
+        from models.reminder import save_reminder_with_local_time
+        phone = onboarded_user["phone"]
+        due = datetime.utcnow().replace(microsecond=0) - timedelta(seconds=1)
+        reminder_id = save_reminder_with_local_time(phone, "Wheel reminder", due, "10:00", "America/New_York")
+
+        scheduler, clock, dispatched = self._scheduler(datetime.utcnow().timestamp() - 60)
+        scheduler.handle_notify(json.dumps({"id": reminder_id, "reminder_date": due.isoformat()}))
+        assert scheduler.fire_due() == 0
+
+        from services.reminder_scheduler import _to_epoch
+        clock["now"] = _to_epoch(due) + 0.3
+        assert scheduler.fire_due() == 1
+        assert [r["id"] for r in dispatched[0]] == [reminder_id]
+
+        # Already claimed: a second fire (e.g. a duplicate refill) claims nothing
+        scheduler.schedule(reminder_id, due)
+        assert scheduler.fire_due() == 0
+
+    def test_spike_split_into_batches(self, onboarded_user):
+        from models.reminder import save_reminder_with_local_time
+        phone = onboarded_user["phone"]
+        due = datetime.utcnow().replace(microsecond=0) - timedelta(seconds=1)
+        ids = [save_reminder_with_local_time(phone, f"Spike {i}", due, "10:00", "America/New_York") for i in range(3)]
+
+        scheduler, _, dispatched = self._scheduler(datetime.utcnow().timestamp())
+        for reminder_id in ids:
+            scheduler.schedule(reminder_id, due)
+        with patch('services.reminder_scheduler.REMINDER_BATCH_MAX_SIZE', 2):
+            assert scheduler.fire_due() == 3
+        assert [len(batch) for batch in dispatched] == [2, 1]
+
+    def test_refill_loads_window_and_skips_far_reminders(self, onboarded_user):
+        from models.reminder import save_reminder_with_local_time
+        phone = onboarded_user["phone"]
+        soon = datetime.utcnow() + timedelta(minutes=2)
+        later = datetime.utcnow() + timedelta(hours=3)
+        soon_id = save_reminder_with_local_time(phone, "Soon", soon, "10:00", "America/New_York")
+        later_id = save_reminder_with_local_time(phone, "Later", later, "13:00", "America/New_York")
+
+        scheduler, _, _ = self._scheduler(datetime.utcnow().timestamp())
+        scheduler.refill()
+        assert soon_id in scheduler.wheel
+        assert later_id not in scheduler.wheel
+
+    def test_snoozed_past_window_is_dropped(self, onboarded_user):
+        scheduler, clock, _ = self._scheduler(1_000_000.0)
+        near = datetime.utcfromtimestamp(clock["now"] + 60)
+        far = datetime.utcfromtimestamp(clock["now"] + 3600)
+        scheduler.schedule(42, near)
+        assert 42 in scheduler.wheel
+        scheduler.handle_notify(json.dumps({"id": 42, "reminder_date": far.isoformat()}))
+        assert 42 not in scheduler.wheel
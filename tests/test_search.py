@@ -0,0 +1,117 @@
+"""
+Tests for ranked search over memories, reminders and list items (models/search.py).
+"""
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+
+def _trigram_installed():
+    from database import get_db_connection, return_db_connection
+    conn = get_db_connection()
+    try:
+        c = conn.cursor()
+        c.execute("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+        return c.fetchone()[0]
+    finally:
+        return_db_connection(conn)
+
+
+class TestTextSearch:
+    """Plaintext search: substring and full-text matches, ranked."""
+
+    def test_substring_and_stemmed_matches(self, onboarded_user):
+        from models.memory import save_memory, search_memories
+        phone = onboarded_user["phone"]
+        save_memory(phone, "Team meetings are on Tuesdays", {})
+        save_memory(phone, "Dentist is Dr Patel on Elm Street", {})
+
+        assert [m[1] for m in search_memories(phone, "dent")] == ["Dentist is Dr Patel on Elm Street"]
+        # Full-text stemming: "meeting" finds "meetings", "tuesday" finds "Tuesdays"
+        assert [m[1] for m in search_memories(phone, "meeting tuesday")] == ["Team meetings are on Tuesdays"]
+        assert search_memories(phone, "plumber") == []
+
+    def test_substring_ranks_before_full_text_only(self, onboarded_user):
+        from models.reminder import save_reminder, search_pending_reminders
+        phone = onboarded_user["phone"]
+        soon = datetime.utcnow() + timedelta(days=1)
+        save_reminder(phone, "call the doctors office", soon)
+        save_reminder(phone, "call doctor Lee", soon + timedelta(hours=1))
+
+        results = search_pending_reminders(phone, "call doctor")
+        assert [r[1] for r in results] == ["call doctor Lee", "call the doctors office"]
+
+    def test_like_wildcards_are_literal(self, onboarded_user):
+        from models.memory import save_memory, search_memories
+        phone = onboarded_user["phone"]
+        save_memory(phone, "Wifi network abc guest", {})
+        assert search_memories(phone, "ab_") == []
+        assert len(search_memories(phone, "abc")) == 1
+
+    def test_list_items(self, onboarded_user):
+        from models.list_model import create_list, add_list_item, search_list_items
+        phone = onboarded_user["phone"]
+        list_id = create_list(phone, "Groceries")
+        item_id = add_list_item(list_id, phone, "Almond milk")
+        add_list_item(list_id, phone, "Bread")
+        assert search_list_items(phone, "milk") == [(list_id, "Groceries", item_id, "Almond milk")]
+
+    def test_check_off_falls_back_to_search(self, onboarded_user):
+        from models.list_model import create_list, add_list_item, find_item_in_any_list, mark_item_complete
+        phone = onboarded_user["phone"]
+        list_id = create_list(phone, "Groceries")
+        item_id = add_list_item(list_id, phone, "Almond milk")
+        add_list_item(list_id, phone, "Bread")
+        assert find_item_in_any_list(phone, "milk") == [(list_id, "Groceries", item_id, "Almond milk")]
+        mark_item_complete(phone, "Groceries", "Almond milk")
+        # Checked-off items are not offered again
+        assert find_item_in_any_list(phone, "milk") == []
+
+    def test_typo_tolerance(self, onboarded_user):
+        if not _trigram_installed():
+            pytest.skip("pg_trgm not installed")
+        from models.memory import save_memory, search_memories
+        phone = onboarded_user["phone"]
+        save_memory(phone, "Dentist is Dr Patel on Elm Street", {})
+        save_memory(phone, "Garage code is 7731", {})
+        assert [m[1] for m in search_memories(phone, "dentsit")] == ["Dentist is Dr Patel on Elm Street"]
+
+
+class TestBlindSearch:
+    """With encryption on, matching goes through HMAC'd keyword tokens."""
+
+    @pytest.fixture
+    def encrypted(self):
+        import models.search as search_module
+        import utils.encryption as encryption
+        with patch.object(search_module, 'ENCRYPTION_ENABLED', True), \
+                patch.object(encryption, '_hash_key', b'k' * 32):
+            yield
+
+    def test_tokens_are_blind(self, encrypted):
+        from models.search import blind_tokens
+        tokens = blind_tokens("Garage code is 7731")
+        assert len(tokens) == 3
+        assert not {"garage", "code", "7731"} & set(tokens)
+        assert blind_tokens("CODE garage 7731") == tokens
+
+    def test_legacy_rows_backfilled_and_ranked(self, onboarded_user, encrypted):
+        from database import get_db_connection, return_db_connection
+        from models.search import search
+        phone = onboarded_user["phone"]
+        conn = get_db_connection()
+        try:
+            c = conn.cursor()
+            for text in ("Garage code is 7731", "Gym locker code 12", "Passport number X99"):
+                c.execute("INSERT INTO memories (phone_number, memory_text) VALUES (%s, %s)", (phone, text))
+            conn.commit()
+        finally:
+            return_db_connection(conn)
+
+        assert [m[1] for m in search('memories', phone, "garage code")] == ["Garage code is 7731"]
+        # No row has every keyword: partial matches, most keywords first
+        assert [m[1] for m in search('memories', phone, "locker code plumber")] == [
+            "Gym locker code 12", "Garage code is 7731"]
+        assert search('memories', phone, "plumber") == []
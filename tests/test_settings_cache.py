@@ -0,0 +1,112 @@
+"""
+Tests for the per-process settings cache behind database.get_setting.
+"""
+
+import json
+import time
+import pytest
+from unittest.mock import patch
+
+KEY = "test_settings_cache_key"
+
+
+@pytest.fixture
+def settings_key():
+    """A settings row that is removed (and uncached) before and after the test."""
+    from database import get_db_connection, return_db_connection, clear_settings_cache
+
+    def cleanup():
+        conn = get_db_connection()
+        try:
+            conn.cursor().execute("DELETE FROM settings WHERE key = %s", (KEY,))
+            conn.commit()
+        finally:
+            return_db_connection(conn)
+        clear_settings_cache()
+
+    cleanup()
+    yield KEY
+    cleanup()
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+class TestSettingsCache:
+    """Reads are served from memory; writes and NOTIFYs invalidate."""
+
+    def test_repeat_reads_hit_cache(self, settings_key):
+        import database
+        database.set_setting(settings_key, "on")
+        database.clear_settings_cache()
+
+        with patch.object(database, 'get_db_connection', wraps=database.get_db_connection) as get_conn:
+            assert database.get_setting(settings_key) == "on"
+            assert database.get_setting(settings_key) == "on"
+            assert database.get_setting(settings_key) == "on"
+        assert get_conn.call_count == 1
+
+    def test_missing_key_cached_and_default_respected(self, settings_key):
+        import database
+        assert database.get_setting(settings_key, "a") == "a"
+        with patch.object(database, 'get_db_connection') as get_conn:
+            assert database.get_setting(settings_key, "b") == "b"
+            assert database.get_setting(settings_key) is None
+        assert not get_conn.called
+
+    def test_set_setting_writes_through(self, settings_key):
+        import database
+        database.set_setting(settings_key, "first")
+        assert database.get_setting(settings_key) == "first"
+        database.set_setting(settings_key, "second")
+        with patch.object(database, 'get_db_connection') as get_conn:
+            assert database.get_setting(settings_key) == "second"
+        assert not get_conn.called
+
+    def test_change_from_another_process_invalidates(self, settings_key):
+        import psycopg2
+        import database
+        from config import DATABASE_URL, SETTINGS_NOTIFY_CHANNEL
+
+        database.get_setting(settings_key)
+        assert _wait_for(lambda: database._settings_listener['connected'])
+        database.set_setting(settings_key, "old")
+        assert database.get_setting(settings_key) == "old"
+
+        # Another process's set_setting: same UPDATE + NOTIFY on its own connection
+        other = psycopg2.connect(DATABASE_URL)
+        try:
+            other.cursor().execute("UPDATE settings SET value = 'new' WHERE key = %s", (settings_key,))
+            other.cursor().execute(
+                "SELECT pg_notify(%s, %s)",
+                (SETTINGS_NOTIFY_CHANNEL, json.dumps({"key": settings_key, "origin": "other-process"}))
+            )
+            other.commit()
+        finally:
+            other.close()
+
+        assert _wait_for(lambda: database.get_setting(settings_key) == "new", timeout=2.0)
+
+    def test_short_ttl_without_listener(self, settings_key):
+        import database
+        database.set_setting(settings_key, "v")
+        with patch.dict(database._settings_listener, {'connected': False}), \
+             patch.object(database, 'SETTINGS_CACHE_FALLBACK_TTL', 0), \
+             patch.object(database, 'get_db_connection', wraps=database.get_db_connection) as get_conn:
+            assert database.get_setting(settings_key) == "v"
+        assert get_conn.call_count == 1
+
+    def test_stats(self, settings_key):
+        import database
+        before = database.get_settings_cache_stats()
+        database.get_setting(settings_key)
+        database.get_setting(settings_key)
+        after = database.get_settings_cache_stats()
+        assert after['misses'] == before['misses'] + 1
+        assert after['hits'] == before['hits'] + 1
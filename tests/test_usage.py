@@ -0,0 +1,115 @@
+"""
+Tests for the materialized usage counters (models/usage.py).
+"""
+
+from datetime import date, datetime, timedelta
+
+
+def _execute(sql, params):
+    from database import get_db_connection, return_db_connection
+    conn = get_db_connection()
+    try:
+        c = conn.cursor()
+        c.execute(sql, params)
+        conn.commit()
+    finally:
+        return_db_connection(conn)
+
+
+class TestUsageCounters:
+    """Model writes keep user_usage in step with the source tables."""
+
+    def test_model_writes_adjust_counters(self, onboarded_user):
+        from models.usage import get_usage
+        from models.memory import save_memory, get_memories, delete_memory
+        from models.list_model import create_list, delete_list
+        from models.reminder import save_reminder, save_recurring_reminder, pause_recurring_reminder, resume_recurring_reminder
+        phone = onboarded_user["phone"]
+
+        assert get_usage(phone) == {'memories': 0, 'lists': 0, 'recurring_active': 0, 'reminders_today': 0}
+
+        save_memory(phone, "Locker code is 4312", {})
+        create_list(phone, "Groceries")
+        create_list(phone, "Hardware")
+        recurring_id = save_recurring_reminder(phone, "water plants", "daily", None, "09:00", "America/New_York")
+        save_reminder(phone, "call the dentist", datetime.utcnow() + timedelta(days=1))
+        assert get_usage(phone) == {'memories': 1, 'lists': 2, 'recurring_active': 1, 'reminders_today': 1}
+
+        pause_recurring_reminder(recurring_id, phone)
+        pause_recurring_reminder(recurring_id, phone)  # already paused: no double decrement
+        assert get_usage(phone)['recurring_active'] == 0
+        resume_recurring_reminder(recurring_id, phone)
+        assert get_usage(phone)['recurring_active'] == 1
+
+        delete_list(phone, "Hardware")
+        memory_id = get_memories(phone)[0][0]
+        delete_memory(phone, memory_id)
+        usage = get_usage(phone)
+        assert (usage['memories'], usage['lists']) == (0, 1)
+
+    def test_missing_row_is_rebuilt(self, onboarded_user):
+        from models.usage import get_usage
+        from models.list_model import create_list
+        phone = onboarded_user["phone"]
+        create_list(phone, "Groceries")
+        get_usage(phone)
+        _execute("DELETE FROM user_usage WHERE phone_number = %s", (phone,))
+        assert get_usage(phone)['lists'] == 1
+
+    def test_reminders_today_resets_on_new_day(self, onboarded_user):
+        from models.usage import get_usage
+        phone = onboarded_user["phone"]
+        get_usage(phone)
+        _execute("UPDATE user_usage SET reminders_today = 7, reminders_day = %s WHERE phone_number = %s",
+                 (date.today() - timedelta(days=1), phone))
+        assert get_usage(phone)['reminders_today'] == 0
+
+    def test_reconcile_fixes_drift(self, onboarded_user):
+        from models.usage import get_usage, reconcile_usage
+        from models.list_model import create_list, add_list_item, get_item_count
+        phone = onboarded_user["phone"]
+        list_id = create_list(phone, "Groceries")
+        add_list_item(list_id, phone, "milk")
+        get_usage(phone)
+        _execute("UPDATE user_usage SET lists = 9, updated_at = NOW() - INTERVAL '1 hour' WHERE phone_number = %s",
+                 (phone,))
+        _execute("UPDATE lists SET item_count = 5 WHERE id = %s", (list_id,))
+
+        result = reconcile_usage()
+        assert result['users_fixed'] >= 1
+        assert result['lists_fixed'] >= 1
+        assert get_usage(phone)['lists'] == 1
+        assert get_item_count(list_id) == 1
+
+    async def test_deleting_one_list_by_number_decrements(self, simulator, onboarded_user):
+        from models.usage import get_usage
+        from models.list_model import create_list
+        from models.user import create_or_update_user
+        phone = onboarded_user["phone"]
+        first, second = create_list(phone, "Grocery"), create_list(phone, "Grocery 2")
+        assert get_usage(phone)['lists'] == 2
+        create_or_update_user(phone, pending_delete=True, pending_list_item=f"__DELETE_MULTI__:grocery:{first},{second}")
+
+        result = await simulator.send_message(phone, "2")
+
+        assert "Deleted" in result["output"]
+        assert get_usage(phone)['lists'] == 1
+
+    def test_admin_delete_user_drops_counters(self, onboarded_user):
+        from admin_dashboard import delete_user
+        from models.usage import get_usage
+        from models.list_model import create_list
+        phone = onboarded_user["phone"]
+        create_list(phone, "Groceries")
+        assert get_usage(phone)['lists'] == 1
+
+        delete_user(phone, admin="test")
+
+        from database import get_db_connection, return_db_connection
+        conn = get_db_connection()
+        try:
+            c = conn.cursor()
+            c.execute("SELECT COUNT(*) FROM user_usage WHERE phone_number = %s", (phone,))
+            assert c.fetchone()[0] == 0
+        finally:
+            return_db_connection(conn)
@@ -0,0 +1,179 @@
+"""
+Tests for the request-scoped UserContext.
+Covers single-load behavior, write-through from models.user,
+tier lookups, and context lifetime around the /sms webhook.
+"""
+
+import json
+import pytest
+from unittest.mock import patch
+
+
+class TestUserContextReads:
+    """Accessors should be served from one users row load."""
+
+    def test_accessors_share_one_load(self, onboarded_user):
+        from models.user_context import user_context
+        from models.user import (
+            get_user, get_user_timezone, get_user_first_name, is_user_onboarded,
+            get_pending_list_item, get_pending_reminder_delete, get_pending_reminder_confirmation,
+        )
+        phone = onboarded_user["phone"]
+
+        with user_context(phone) as ctx:
+            assert get_user(phone)[0] == phone
+            # Any further accessor must not touch the pool
+            with patch('models.user.get_db_connection') as mock_conn:
+                assert get_user_timezone(phone) == "America/New_York"
+                assert get_user_first_name(phone) == "Test"
+                assert is_user_onboarded(phone) is True
+                assert get_pending_list_item(phone) is None
+                assert get_pending_reminder_delete(phone) is None
+                assert get_pending_reminder_confirmation(phone) is None
+                mock_conn.assert_not_called()
+            assert ctx.load_count == 1
+
+    def test_tier_and_trial_served_from_context(self, onboarded_user):
+        from models.user_context import user_context
+        from services.tier_service import get_user_tier, get_trial_info
+        phone = onboarded_user["phone"]
+
+        with user_context(phone) as ctx:
+            with patch('services.tier_service.get_db_connection') as mock_conn:
+                assert get_user_tier(phone) == 'free'
+                assert get_trial_info(phone)['is_trial'] is False
+                mock_conn.assert_not_called()
+            assert ctx.load_count == 1
+
+    def test_missing_user_returns_defaults(self, clean_test_user):
+        from models.user_context import user_context
+        from models.user import get_user, get_user_timezone, is_user_onboarded
+
+        with user_context(clean_test_user):
+            assert get_user(clean_test_user) is None
+            assert get_user_timezone(clean_test_user) == 'America/New_York'
+            assert is_user_onboarded(clean_test_user) is False
+
+    def test_other_phone_numbers_bypass_context(self, onboarded_user):
+        from models.user_context import user_context, get_user_context
+        with user_context(onboarded_user["phone"]):
+            assert get_user_context("+15550000000") is None
+
+
+class TestUserContextWrites:
+    """Writes through models.user keep the cached row current."""
+
+    def test_create_or_update_user_updates_in_place(self, onboarded_user):
+        from models.user_context import user_context
+        from models.user import create_or_update_user, get_pending_list_item, get_pending_reminder_confirmation
+        phone = onboarded_user["phone"]
+
+        with user_context(phone) as ctx:
+            assert get_pending_list_item(phone) is None
+            create_or_update_user(
+                phone,
+                pending_list_item="milk",
+                pending_reminder_confirmation=json.dumps({"action": "reminder"}),
+            )
+            assert get_pending_list_item(phone) == "milk"
+            assert get_pending_reminder_confirmation(phone) == {"action": "reminder"}
+            assert ctx.load_count == 1
+
+    def test_update_user_timezone_updates_in_place(self, onboarded_user):
+        from models.user_context import user_context
+        from models.user import update_user_timezone, get_user_timezone
+        phone = onboarded_user["phone"]
+
+        with user_context(phone) as ctx:
+            assert get_user_timezone(phone) == "America/New_York"
+            success, old_tz = update_user_timezone(phone, "America/Chicago")
+            assert success and old_tz == "America/New_York"
+            assert get_user_timezone(phone) == "America/Chicago"
+            assert ctx.load_count == 1
+
+    def test_new_user_insert_reloads(self, clean_test_user):
+        from models.user_context import user_context
+        from models.user import create_or_update_user, get_user, get_onboarding_step
+
+        with user_context(clean_test_user) as ctx:
+            assert get_user(clean_test_user) is None
+            create_or_update_user(clean_test_user, onboarding_step=1)
+            assert get_onboarding_step(clean_test_user) == 1
+            assert ctx.load_count == 2
+
+
+class TestPendingStateWriteBack:
+    """Pending-state writes are staged and flushed in one UPDATE."""
+
+    def _stored(self, phone, field):
+        from database import get_db_connection, return_db_connection
+        conn = get_db_connection()
+        try:
+            c = conn.cursor()
+            c.execute(f"SELECT {field} FROM users WHERE phone_number = %s", (phone,))
+            return c.fetchone()[0]
+        finally:
+            return_db_connection(conn)
+
+    def test_pending_writes_flushed_once(self, onboarded_user):
+        from models.user_context import user_context
+        from models.user import create_or_update_user, get_pending_list_item, get_pending_memory_delete
+        phone = onboarded_user["phone"]
+
+        with user_context(phone) as ctx:
+            with patch('models.user.get_db_connection') as mock_conn:
+                create_or_update_user(phone, pending_list_item="milk")
+                create_or_update_user(phone, pending_memory_delete="[1, 2]")
+                create_or_update_user(phone, pending_list_item="eggs")
+                assert get_pending_list_item(phone) == "eggs"
+                assert get_pending_memory_delete(phone) == "[1, 2]"
+                mock_conn.assert_not_called()
+            assert self._stored(phone, 'pending_list_item') is None
+        assert ctx.write_count == 1
+        assert self._stored(phone, 'pending_list_item') == "eggs"
+        assert self._stored(phone, 'pending_memory_delete') == "[1, 2]"
+
+    def test_write_through_supersedes_staged_value(self, onboarded_user):
+        from models.user_context import user_context
+        from models.user import create_or_update_user
+        phone = onboarded_user["phone"]
+
+        with user_context(phone) as ctx:
+            create_or_update_user(phone, pending_list_item="milk")
+            # Mixed write goes straight to the database
+            create_or_update_user(phone, pending_list_item="bread", last_active_list="Groceries")
+            assert self._stored(phone, 'pending_list_item') == "bread"
+        assert ctx.write_count == 0
+        assert self._stored(phone, 'pending_list_item') == "bread"
+
+    def test_invalidate_flushes_before_reload(self, onboarded_user):
+        from models.user_context import user_context
+        from models.user import create_or_update_user, get_pending_list_create
+        phone = onboarded_user["phone"]
+
+        with user_context(phone) as ctx:
+            create_or_update_user(phone, pending_list_create="Groceries")
+            ctx.invalidate()
+            assert get_pending_list_create(phone) == "Groceries"
+            assert ctx.load_count == 2
+
+
+class TestWebhookContextLifetime:
+    """The webhook scopes the context to a single request."""
+
+    @pytest.mark.asyncio
+    async def test_context_cleared_after_request(self, simulator, onboarded_user):
+        from models.user_context import get_user_context
+        phone = onboarded_user["phone"]
+
+        await simulator.send_message(phone, "hello")
+        assert get_user_context(phone) is None
+
+    @pytest.mark.asyncio
+    async def test_pending_state_visible_to_next_message(self, simulator, sms_capture, onboarded_user):
+        phone = onboarded_user["phone"]
+
+        result = await simulator.send_message(phone, "DELETE ACCOUNT")
+        assert "YES DELETE ACCOUNT" in result["output"]
+        result = await simulator.send_message(phone, "never mind")
+        assert "cancelled" in result["output"].lower()
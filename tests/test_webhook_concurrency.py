@@ -0,0 +1,130 @@
+"""
+Tests for keeping database I/O off the event loop: the webhook worker
+thread and the connection pool's wait-for-a-free-connection behavior.
+"""
+
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+
+class TestConnectionPoolWaits:
+    """get_db_connection() queues for a free connection instead of failing."""
+
+    def _single_connection_pool(self):
+        import database
+        from psycopg2 import pool
+        return pool.ThreadedConnectionPool(1, 1, database.DATABASE_URL)
+
+    def test_waits_for_returned_connection(self):
+        import database
+        single = self._single_connection_pool()
+        try:
+            with patch.object(database, '_connection_pool', single):
+                first = database.get_db_connection()
+                got = []
+                waiter = threading.Thread(target=lambda: got.append(database.get_db_connection()))
+                waiter.start()
+                time.sleep(0.1)
+                assert not got  # still waiting for `first`
+
+                database.return_db_connection(first)
+                waiter.join(timeout=5)
+                assert len(got) == 1
+                database.return_db_connection(got[0])
+        finally:
+            single.closeall()
+
+    def test_times_out_with_pool_error(self):
+        import database
+        from psycopg2.pool import PoolError
+        single = self._single_connection_pool()
+        try:
+            with patch.object(database, '_connection_pool', single), \
+                 patch.object(database, 'CONNECTION_WAIT_TIMEOUT', 0.05):
+                first = database.get_db_connection()
+                try:
+                    with pytest.raises(PoolError):
+                        database.get_db_connection()
+                finally:
+                    database.return_db_connection(first)
+        finally:
+            single.closeall()
+
+
+class TestAdminRoutesThreaded:
+    """Admin handlers are plain def, so FastAPI runs their DB work in its threadpool."""
+
+    def test_no_admin_route_runs_on_event_loop(self):
+        import inspect
+        import admin_dashboard
+        async_routes = [route.path for route in admin_dashboard.router.routes
+                        if inspect.iscoroutinefunction(route.endpoint)]
+        assert async_routes == []
+
+
+@pytest.mark.asyncio
+class TestWebhookConcurrency:
+    """sms_reply handles messages on worker threads."""
+
+    async def test_slow_query_does_not_serialize_webhooks(self, simulator, onboarded_user):
+        phone = onboarded_user["phone"]
+
+        def slow_activity(phone_number):
+            time.sleep(0.3)
+
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        with patch('main.track_user_activity', side_effect=slow_activity):
+            tick_task = asyncio.create_task(ticker())
+            start = time.monotonic()
+            results = await asyncio.gather(
+                simulator.send_message(phone, "HELP"),
+                simulator.send_message(phone, "HELP"),
+            )
+            elapsed = time.monotonic() - start
+            tick_task.cancel()
+
+        assert all(result["output"] for result in results)
+        # Both 0.3s "queries" overlapped, and the loop kept running meanwhile
+        assert elapsed < 0.55
+        assert ticks >= 10
+
+    async def test_ai_call_runs_on_event_loop(self, simulator, onboarded_user, ai_mock):
+        loops = []
+
+        async def answer(message, phone_number, context):
+            loops.append(asyncio.get_running_loop())
+            return {"action": "store", "memory_text": "My locker is 12", "response": "Got it! I'll remember that."}
+
+        with patch('main.process_with_ai', side_effect=answer):
+            await simulator.send_message(onboarded_user["phone"], "my locker is 12")
+
+        assert loops == [asyncio.get_running_loop()]
+
+    async def test_saturated_threadpools_do_not_deadlock(self, real_ai_simulator, onboarded_user):
+        """Every SMS thread waits on process_with_ai, which needs a default-pool thread for its prompt reads."""
+        import anyio
+        import anyio.to_thread
+        default_limiter = anyio.to_thread.current_default_thread_limiter()
+        tokens = default_limiter.total_tokens
+        default_limiter.total_tokens = 2
+        try:
+            with patch('main._sms_limiter', anyio.CapacityLimiter(2)):
+                results = await asyncio.wait_for(asyncio.gather(*(
+                    real_ai_simulator.send_message(onboarded_user["phone"], f"what is the weather like {n}")
+                    for n in range(4)
+                )), timeout=20)
+        finally:
+            default_limiter.total_tokens = tokens
+
+        assert all(result["output"] for result in results)
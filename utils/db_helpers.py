@@ -136,3 +136,17 @@ class UserColumn:
     FIVE_MINUTE_NUDGE_SENT = 19
     POST_ONBOARDING_INTERACTIONS = 20
     OPTED_OUT = 21
+
+
+# Column list loaded once per webhook by models.user_context.UserContext.
+# Starts with USER_COLUMNS so the first len(USER_COLUMNS) values keep the
+# same index layout as get_user(); the remaining columns back the per-field
+# accessors (pending_* state, tier/trial info, encrypted first name).
+USER_CONTEXT_EXTRA_COLUMNS = (
+    'phone_hash', 'first_name_encrypted', 'trial_end_date', 'last_active_list',
+    'pending_list_item', 'pending_reminder_delete', 'pending_memory_delete',
+    'pending_reminder_date', 'pending_list_create', 'pending_reminder_confirmation',
+    'pending_nudge_response', 'pending_delete_account', 'pending_cancellation_feedback',
+)
+
+USER_CONTEXT_COLUMNS = USER_COLUMNS + ",\n    " + ", ".join(USER_CONTEXT_EXTRA_COLUMNS)
@@ -7,7 +7,7 @@ import os
 import base64
 import hashlib
 import hmac
-from typing import Tuple
+from typing import Iterable, Tuple
 
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from config import logger
@@ -128,6 +128,19 @@ def hash_phone(phone_number: str) -> str:
         raise
 
 
+def blind_index(tokens: Iterable[str]) -> list[str]:
+    """
+    HMAC-SHA256 each search token with the hash key (domain-separated from phone hashes)
+    Equal tokens give equal digests, so keyword search can match without plaintext.
+    Returns sorted, de-duplicated hex digests
+    """
+    key = _get_hash_key()
+    return sorted({
+        hmac.new(key, b'search:' + token.encode('utf-8'), hashlib.sha256).hexdigest()[:32]
+        for token in tokens
+    })
+
+
 def safe_decrypt(encrypted: str, fallback: str = "") -> str:
     """
     Safely decrypt a field, returning fallback if decryption fails.
@@ -0,0 +1,73 @@
+"""
+Latency Utilities
+In-process latency histograms for external calls (OpenAI, etc.)
+"""
+
+import threading
+from collections import deque
+from typing import Any, Optional
+
+# Bucket upper bounds in seconds, sized around the 15s Twilio webhook budget
+DEFAULT_LATENCY_BUCKETS = (0.25, 0.5, 1, 1.5, 2, 3, 5, 8, 12)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram plus a rolling window of recent samples.
+
+    Bucket counts are cumulative for the life of the process (for dashboards);
+    percentiles come from the last `window` samples so they track current
+    conditions.
+    """
+
+    def __init__(self, buckets: tuple = DEFAULT_LATENCY_BUCKETS, window: int = 500):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._recent: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        """Record one latency sample."""
+        with self._lock:
+            index = len(self.buckets)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    index = i
+                    break
+            self._counts[index] += 1
+            self._count += 1
+            self._sum += seconds
+            self._recent.append(seconds)
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def recent_count(self) -> int:
+        """Number of samples in the rolling window."""
+        return len(self._recent)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """q-th percentile (0-1) of the rolling window, or None if empty."""
+        with self._lock:
+            samples = sorted(self._recent)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, int(round(q * len(samples))) - 1))
+        return samples[index]
+
+    def snapshot(self) -> dict[str, Any]:
+        """Counts per bucket plus summary percentiles, JSON-serializable."""
+        with self._lock:
+            counts = list(self._counts)
+            count, total = self._count, self._sum
+        labels = [f"le_{bound}" for bound in self.buckets] + ["le_inf"]
+        return {
+            "count": count,
+            "mean": round(total / count, 4) if count else None,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "buckets": dict(zip(labels, counts)),
+        }
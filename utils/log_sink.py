@@ -0,0 +1,133 @@
+"""
+Log Sink
+Bounded in-memory queue drained by a background thread that hands records to
+a batch writer, so request handlers don't pay a DB round trip per log row
+"""
+
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from config import logger
+
+
+class _FlushRequest:
+    """Queued by flush(): the worker writes what it has collected so far, then sets `done`."""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class BatchedLogSink:
+    """Queues records and writes them in batches from a daemon thread.
+
+    A batch is written once it reaches `batch_size` records or `flush_interval`
+    seconds after its first record arrived, whichever comes first. When the
+    queue is full, submit() waits up to `enqueue_timeout` for room and then
+    writes the record synchronously in the caller's thread, so a slow database
+    pushes back on callers instead of dropping rows. A batch that fails is
+    retried one record at a time so a single bad row can't lose the rest.
+
+    `write_batch(records)` must write every record or raise.
+    """
+
+    def __init__(self, write_batch: Callable[[list], None], name: str, batch_size: int,
+                 flush_interval: float, max_queue: int, enqueue_timeout: float):
+        self.write_batch = write_batch
+        self.name = name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.enqueue_timeout = enqueue_timeout
+        self._queue: Optional[queue.Queue] = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._stats = {'queued': 0, 'written': 0, 'batches': 0, 'direct_writes': 0, 'failed': 0}
+
+    def _ensure_started(self) -> queue.Queue:
+        """Start the worker on first use, and again in a forked child (threads don't survive fork)."""
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._start_lock:
+                if self._pid != pid:
+                    self._queue = queue.Queue(maxsize=self.max_queue)
+                    threading.Thread(target=self._run, args=(self._queue,), daemon=True,
+                                     name=f"{self.name}-sink").start()
+                    self._pid = pid
+        return self._queue
+
+    def submit(self, record: Any) -> None:
+        """Queue a record for the next batch; writes it inline if the queue stays full."""
+        q = self._ensure_started()
+        try:
+            q.put(record, timeout=self.enqueue_timeout)
+            self._stats['queued'] += 1
+        except queue.Full:
+            self._stats['direct_writes'] += 1
+            self.write_now(record)
+
+    def write_now(self, record: Any) -> None:
+        """Write one record synchronously in the caller's thread, bypassing the queue."""
+        self._write([record])
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Write everything queued so far. Returns False if it didn't finish within timeout."""
+        q = self._queue
+        if q is None or self._pid != os.getpid():
+            return True
+        deadline = time.monotonic() + timeout
+        request = _FlushRequest()
+        try:
+            q.put(request, timeout=timeout)
+        except queue.Full:
+            return False
+        # The queue is FIFO, so once the worker reaches the request every earlier record is written
+        if not request.done.wait(max(0.0, deadline - time.monotonic())):
+            logger.warning(f"{self.name} sink: flush timed out with {q.qsize()} records pending")
+            return False
+        return True
+
+    def stats(self) -> dict:
+        q = self._queue
+        return {**self._stats, 'pending': q.qsize() if q is not None and self._pid == os.getpid() else 0}
+
+    def _run(self, q: queue.Queue) -> None:
+        while True:
+            batch, flush_request = [], None
+            record = q.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if isinstance(record, _FlushRequest):
+                    flush_request = record
+                    break
+                batch.append(record)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self.batch_size or remaining <= 0:
+                    break
+                try:
+                    record = q.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            try:
+                if batch:
+                    self._write(batch)
+            finally:
+                if flush_request:
+                    flush_request.done.set()
+
+    def _write(self, batch: list) -> None:
+        try:
+            self.write_batch(batch)
+            self._stats['written'] += len(batch)
+            self._stats['batches'] += 1
+            return
+        except Exception as e:
+            if len(batch) == 1:
+                self._stats['failed'] += 1
+                logger.error(f"Error writing {self.name} record: {e}")
+                return
+            logger.warning(f"{self.name} sink: batch of {len(batch)} failed, retrying individually: {e}")
+        for record in batch:
+            self._write([record])
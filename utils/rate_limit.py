@@ -0,0 +1,216 @@
+"""
+Rate Limiting Utilities
+Pluggable rate limiters and webhook dedup stores: bounded in-process
+implementations for a single worker, Redis-backed ones shared by every worker
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from config import (
+    logger, UPSTASH_REDIS_URL, RATE_LIMIT_BACKEND, RATE_LIMIT_MAX_KEYS, REDIS_SOCKET_TIMEOUT, REDIS_RETRY_AFTER,
+)
+
+
+class TokenBucketLimiter:
+    """In-process token bucket per key with LRU eviction.
+
+    Allows `limit` requests per `window_seconds`, refilling continuously, so a
+    key that sends its full allowance at once waits window/limit seconds per
+    extra request. Checks are O(1) and at most `max_keys` buckets are kept; an
+    evicted key simply starts again with a full bucket.
+    """
+
+    def __init__(self, limit: int, window_seconds: float, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._rate = limit / window_seconds
+        # key -> (tokens, monotonic time of last update), least recently used first
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def allow(self, key: str) -> bool:
+        """Take one token for key. Returns True if the request is allowed."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (float(self.limit), now))
+            tokens = min(float(self.limit), tokens + (now - updated) * self._rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return allowed
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+# GCRA: one key per client holding its theoretical arrival time (TAT), in
+# milliseconds of Redis server time so every worker shares one clock.
+_GCRA_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local interval = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local new_tat = tat + interval
+if new_tat - now > window then
+    return 0
+end
+redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil(new_tat - now))
+return 1
+"""
+
+
+class RedisGCRALimiter:
+    """Shared limiter using the generic cell rate algorithm in a Lua script.
+
+    Same allowance as TokenBucketLimiter (`limit` per `window_seconds`, bursts
+    up to `limit`), but enforced across every worker. One small key per
+    client that expires once the client is idle.
+    """
+
+    def __init__(self, client, name: str, limit: int, window_seconds: float):
+        self.client = client
+        self.prefix = f"ratelimit:{name}:"
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self._interval_ms = window_seconds * 1000 / limit
+        self._script = client.register_script(_GCRA_SCRIPT)
+
+    def allow(self, key: str) -> bool:
+        return bool(self._script(keys=[self.prefix + key], args=[self._interval_ms, self.window_seconds * 1000]))
+
+    def reset(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+    def clear(self) -> None:
+        for redis_key in self.client.scan_iter(match=self.prefix + "*", count=500):
+            self.client.delete(redis_key)
+
+
+class LocalDedupStore:
+    """Remembers recently seen ids (e.g. Twilio MessageSids) in-process, bounded by count and age."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int = RATE_LIMIT_MAX_KEYS):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._seen: OrderedDict[str, float] = OrderedDict()  # id -> expiry, oldest first
+        self._lock = threading.Lock()
+
+    def first_seen(self, item_id: str) -> bool:
+        """Record item_id. Returns True the first time it is seen within the TTL."""
+        now = time.monotonic()
+        with self._lock:
+            # Entries are in insertion order with equal TTLs, so expired ones are at the front
+            while self._seen and next(iter(self._seen.values())) <= now:
+                self._seen.popitem(last=False)
+            if item_id in self._seen:
+                return False
+            self._seen[item_id] = now + self.ttl_seconds
+            while len(self._seen) > self.max_entries:
+                self._seen.popitem(last=False)
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._seen.clear()
+
+
+class RedisDedupStore:
+    """Shared dedup: SET NX with a TTL, so exactly one worker handles each id."""
+
+    def __init__(self, client, name: str, ttl_seconds: int):
+        self.client = client
+        self.prefix = f"dedup:{name}:"
+        self.ttl_seconds = ttl_seconds
+
+    def first_seen(self, item_id: str) -> bool:
+        return bool(self.client.set(self.prefix + item_id, 1, nx=True, ex=self.ttl_seconds))
+
+    def clear(self) -> None:
+        for redis_key in self.client.scan_iter(match=self.prefix + "*", count=500):
+            self.client.delete(redis_key)
+
+
+class _FailOpenToLocal:
+    """Wraps a Redis-backed store; if Redis is unreachable, answers from an in-process fallback.
+
+    After a failure Redis is left alone for `retry_after` seconds, so an outage
+    costs one timeout per window instead of one per request.
+    """
+
+    def __init__(self, primary, fallback, name: str, retry_after: float = REDIS_RETRY_AFTER):
+        self.primary = primary
+        self.fallback = fallback
+        self.name = name
+        self.retry_after = retry_after
+        self._down_until = 0.0
+
+    def _call(self, method: str, *args):
+        if time.monotonic() >= self._down_until:
+            try:
+                return getattr(self.primary, method)(*args)
+            except Exception as e:
+                self._down_until = time.monotonic() + self.retry_after
+                logger.warning(f"Redis {self.name} unavailable, using in-process fallback for {self.retry_after}s: {e}")
+        return getattr(self.fallback, method)(*args)
+
+    def allow(self, key: str) -> bool:
+        return self._call('allow', key)
+
+    def first_seen(self, item_id: str) -> bool:
+        return self._call('first_seen', item_id)
+
+    def reset(self, key: str) -> None:
+        self.fallback.reset(key)
+        self._call('reset', key)
+
+    def clear(self) -> None:
+        self.fallback.clear()
+        self._call('clear')
+
+
+_redis_client = None
+
+
+def get_redis_client():
+    """Shared Redis client for limiter/dedup keys (same instance Celery uses as its broker)."""
+    global _redis_client
+    if _redis_client is None:
+        import redis
+        _redis_client = redis.Redis.from_url(
+            UPSTASH_REDIS_URL, socket_timeout=REDIS_SOCKET_TIMEOUT, socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+            retry_on_timeout=False,
+        )
+    return _redis_client
+
+
+def create_rate_limiter(name: str, limit: int, window_seconds: float, backend: Optional[str] = None):
+    """Rate limiter for `name` on the configured backend ('memory' or 'redis')."""
+    local = TokenBucketLimiter(limit, window_seconds)
+    if (backend or RATE_LIMIT_BACKEND) != 'redis':
+        return local
+    return _FailOpenToLocal(RedisGCRALimiter(get_redis_client(), name, limit, window_seconds), local, f"rate limiter '{name}'")
+
+
+def create_dedup_store(name: str, ttl_seconds: int, backend: Optional[str] = None):
+    """Dedup store for `name` on the configured backend ('memory' or 'redis')."""
+    local = LocalDedupStore(ttl_seconds)
+    if (backend or RATE_LIMIT_BACKEND) != 'redis':
+        return local
+    return _FailOpenToLocal(RedisDedupStore(get_redis_client(), name, ttl_seconds), local, f"dedup store '{name}'")